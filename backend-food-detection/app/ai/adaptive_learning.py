@@ -1,14 +1,21 @@
-import numpy as np
-import pandas as pd
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime, date, timedelta
 from dataclasses import dataclass
 import logging
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.user import User
-from app.models.progress import DailyStats, WeightEntry
+from app.models.progress import DailyStats, TDEEState, WeightEntry, WeightTrend
 from app.schemas.progress import AdaptiveGoalsUpdate
+from app.ai.nutrition_engine import mifflin_st_jeor_bmr, activity_multiplier, adaptive_calorie_target
+from app.ai.weight_trend import TrendPoint
+from app.ai.tdee_core import (
+    IntakeDay, WeightPoint, clamp_tdee_change, energy_balance_tdee, intake_array, linear_weight_trend
+)
+from app.core.time_ranges import day_range
+from app.services.dashboard_service import invalidate_dashboard_on_commit
+from app.services.tdee_filter_service import TDEEFilterService, filter_state
 
 logger = logging.getLogger(__name__)
 
@@ -34,26 +41,11 @@ class AdaptiveLearningEngine:
         
     def calculate_bmr(self, user: User, weight: float) -> float:
         """Calcular BMR usando ecuación de Mifflin-St Jeor"""
-        if not user.age or not user.height or not user.gender:
-            return 1800.0  # Valor por defecto
-        
-        if user.gender == "male":
-            bmr = 10 * weight + 6.25 * user.height - 5 * user.age + 5
-        else:
-            bmr = 10 * weight + 6.25 * user.height - 5 * user.age - 161
-        
-        return bmr
+        return mifflin_st_jeor_bmr(weight, user.height, user.age, user.gender)
     
     def get_activity_multiplier(self, activity_level: str) -> float:
         """Obtener multiplicador de actividad"""
-        multipliers = {
-            "sedentary": 1.2,
-            "light": 1.375,
-            "moderate": 1.55,
-            "active": 1.725,
-            "very_active": 1.9
-        }
-        return multipliers.get(activity_level, 1.55)
+        return activity_multiplier(activity_level)
     
     def calculate_traditional_tdee(self, user: User, current_weight: float) -> float:
         """Calcular TDEE usando método tradicional"""
@@ -62,42 +54,62 @@ class AdaptiveLearningEngine:
         return bmr * activity_multiplier
     
     def analyze_weight_trend(self, weight_entries: List[WeightEntry], 
-                           days: int = 14) -> Tuple[float, float]:
-        """Analizar tendencia de peso"""
+                           days: int = 14,
+                           weight_trend: Optional[WeightTrend] = None) -> Tuple[float, float]:
+        """
+        Analizar tendencia de peso: cambio semanal (kg) y confianza (0-1)
+        
+        Usa la tendencia guardada del usuario (WeightTrend); sin ella ajusta
+        una recta a los últimos registros (pendiente y R² en forma cerrada)
+        """
         if len(weight_entries) < 2:
             return 0.0, 0.0
         
-        # Convertir a DataFrame para análisis
-        df = pd.DataFrame([
-            {"date": entry.date, "weight": entry.weight}
-            for entry in weight_entries[-days:]
-        ])
-        
-        if len(df) < 2:
-            return 0.0, 0.0
-        
-        df = df.sort_values("date")
-        
-        # Calcular tendencia usando regresión lineal simple
-        x = np.arange(len(df))
-        y = df["weight"].values
-        
-        # Pendiente de la línea de tendencia (kg por día)
-        slope = np.polyfit(x, y, 1)[0]
+        if weight_trend is not None and weight_trend.last_date is not None:
+            point = TrendPoint(weight_trend.trend_weight, weight_trend.slope or 0.0, weight_trend.noise or 0.0)
+            return point.weekly_change, point.confidence
         
-        # Convertir a kg por semana
-        weekly_trend = slope * 7
-        
-        # Calcular R² para confianza
-        correlation = np.corrcoef(x, y)[0, 1] if len(x) > 1 else 0
-        confidence = abs(correlation) ** 2
+        return linear_weight_trend(weight_entries, days)
+    
+    def filtered_tdee(self, tdee_state: TDEEState, weight_entries: List[WeightEntry],
+                      weight_trend: Optional[WeightTrend] = None) -> TDEECalculation:
+        """
+        TDEE del filtro de Kalman del usuario (app/ai/tdee_filter.py)
+        
+        La confianza sale de la varianza posterior del TDEE y el filtro ya
+        suaviza los cambios, sin recortes respecto del valor anterior
+        """
+        posterior = filter_state(tdee_state)
+        weekly_trend, _ = self.analyze_weight_trend(weight_entries[-30:], weight_trend=weight_trend)
+        
+        factors = ["kalman_filter"]
+        if posterior.confidence > self.confidence_threshold:
+            factors.append("low_uncertainty")
+        if abs(weekly_trend) < 0.1:
+            factors.append("stable_weight")
         
-        return weekly_trend, confidence
+        return TDEECalculation(
+            estimated_tdee=round(posterior.tdee),
+            confidence=posterior.confidence,
+            method="adaptive",
+            factors=factors,
+            adjustment_reason=(
+                f"Balance energético filtrado: {posterior.tdee:.0f} ± {posterior.tdee_sd:.0f} kcal "
+                f"({tdee_state.intake_days} días con registro, {tdee_state.weigh_ins} pesajes)"
+            )
+        )
     
     def calculate_adaptive_tdee(self, user: User, daily_stats: List[DailyStats],
-                              weight_entries: List[WeightEntry]) -> TDEECalculation:
+                              weight_entries: List[WeightEntry],
+                              weight_trend: Optional[WeightTrend] = None,
+                              tdee_state: Optional[TDEEState] = None) -> TDEECalculation:
         """Calcular TDEE adaptativo basado en datos reales"""
         
+        # Con el filtro de Kalman al día y suficientes días registrados se usa su estimación
+        if (filter_state(tdee_state) is not None
+                and tdee_state.intake_days >= self.min_data_days and tdee_state.weigh_ins >= 2):
+            return self.filtered_tdee(tdee_state, weight_entries, weight_trend)
+        
         if len(daily_stats) < self.min_data_days:
             # No hay suficientes datos, usar método tradicional
             current_weight = weight_entries[-1].weight if weight_entries else 70.0
@@ -116,12 +128,13 @@ class AdaptiveLearningEngine:
         recent_weights = weight_entries[-30:]
         
         # Calcular tendencia de peso
-        weight_trend, weight_confidence = self.analyze_weight_trend(recent_weights)
+        weekly_trend, weight_confidence = self.analyze_weight_trend(recent_weights, weight_trend=weight_trend)
         
-        # Calcular promedio de calorías consumidas
-        valid_days = [stat for stat in recent_stats if stat.consumed_calories > 0]
+        # Calorías de los días con consumo (arreglo NumPy)
+        calories = intake_array(recent_stats)
+        valid_calories = calories[calories > 0]
         
-        if len(valid_days) < self.min_data_days:
+        if len(valid_calories) < self.min_data_days:
             current_weight = recent_weights[-1].weight if recent_weights else 70.0
             traditional_tdee = self.calculate_traditional_tdee(user, current_weight)
             
@@ -133,22 +146,8 @@ class AdaptiveLearningEngine:
                 adjustment_reason="Pocos días con datos válidos"
             )
         
-        avg_calories = np.mean([stat.consumed_calories for stat in valid_days])
-        
-        # Calcular TDEE basado en balance energético
-        # 1 kg de grasa = ~7700 calorías
-        calories_per_kg = 7700
-        
-        # Si está perdiendo peso: TDEE = calorías consumidas - (pérdida de peso * 7700 / días)
-        # Si está ganando peso: TDEE = calorías consumidas + (ganancia de peso * 7700 / días)
-        
-        days_analyzed = len(valid_days)
-        weight_change_total = weight_trend * (days_analyzed / 7)  # Cambio total en el período
-        
-        # Ajuste calórico por cambio de peso
-        caloric_adjustment = (weight_change_total * calories_per_kg) / days_analyzed
-        
-        estimated_tdee = avg_calories + caloric_adjustment
+        # TDEE por balance energético: ingesta media + cambio de peso en kcal/día
+        estimated_tdee, calorie_cv = energy_balance_tdee(valid_calories, weekly_trend)
         
         # Calcular confianza basada en varios factores
         confidence_factors = []
@@ -157,12 +156,10 @@ class AdaptiveLearningEngine:
         confidence_factors.append(weight_confidence * 0.4)
         
         # Factor 2: Consistencia en el registro
-        logging_consistency = len(valid_days) / len(recent_stats)
+        logging_consistency = len(valid_calories) / len(recent_stats)
         confidence_factors.append(logging_consistency * 0.3)
         
         # Factor 3: Estabilidad de las calorías
-        calorie_std = np.std([stat.consumed_calories for stat in valid_days])
-        calorie_cv = calorie_std / avg_calories if avg_calories > 0 else 1
         stability_score = max(0, 1 - calorie_cv)
         confidence_factors.append(stability_score * 0.3)
         
@@ -174,28 +171,24 @@ class AdaptiveLearningEngine:
             factors.append("strong_weight_trend")
         if logging_consistency > 0.8:
             factors.append("consistent_logging")
-        if abs(weight_trend) < 0.1:
+        if abs(weekly_trend) < 0.1:
             factors.append("stable_weight")
         if calorie_cv < 0.2:
             factors.append("consistent_intake")
         
         # Razón del ajuste
-        if abs(weight_trend) > 0.2:
-            if weight_trend > 0:
-                adjustment_reason = f"Ganando {abs(weight_trend):.1f}kg/semana, aumentando TDEE"
+        if abs(weekly_trend) > 0.2:
+            if weekly_trend > 0:
+                adjustment_reason = f"Ganando {abs(weekly_trend):.1f}kg/semana, TDEE menor que la ingesta"
             else:
-                adjustment_reason = f"Perdiendo {abs(weight_trend):.1f}kg/semana, aumentando TDEE"
+                adjustment_reason = f"Perdiendo {abs(weekly_trend):.1f}kg/semana, TDEE mayor que la ingesta"
         else:
             adjustment_reason = "Peso estable, TDEE basado en balance energético"
         
-        # Suavizar cambios drásticos
-        if user.estimated_tdee:
-            max_change = user.estimated_tdee * 0.15  # Máximo 15% de cambio
-            tdee_diff = estimated_tdee - user.estimated_tdee
-            
-            if abs(tdee_diff) > max_change:
-                estimated_tdee = user.estimated_tdee + (max_change if tdee_diff > 0 else -max_change)
-                factors.append("smoothed_change")
+        # Suavizar cambios drásticos (máximo 15% respecto del TDEE anterior)
+        estimated_tdee, smoothed = clamp_tdee_change(estimated_tdee, user.estimated_tdee)
+        if smoothed:
+            factors.append("smoothed_change")
         
         return TDEECalculation(
             estimated_tdee=round(estimated_tdee),
@@ -207,24 +200,7 @@ class AdaptiveLearningEngine:
     
     def calculate_adaptive_calories(self, user: User, estimated_tdee: float) -> float:
         """Calcular calorías objetivo adaptativas basadas en el objetivo del usuario"""
-        
-        goal_adjustments = {
-            "lose_weight": -500,    # Déficit de 500 cal (aprox 0.5kg/semana)
-            "maintain": 0,          # Mantenimiento
-            "gain_weight": 300,     # Superávit de 300 cal
-            "gain_muscle": 200      # Superávit moderado para ganancia muscular
-        }
-        
-        adjustment = goal_adjustments.get(user.goal, 0)
-        adaptive_calories = estimated_tdee + adjustment
-        
-        # Límites de seguridad
-        min_calories = max(1200, estimated_tdee * 0.7)  # No menos del 70% del TDEE
-        max_calories = estimated_tdee * 1.3  # No más del 130% del TDEE
-        
-        adaptive_calories = max(min_calories, min(adaptive_calories, max_calories))
-        
-        return round(adaptive_calories)
+        return adaptive_calorie_target(user.goal, estimated_tdee)
     
     def should_update_goals(self, user: User, new_tdee: float, confidence: float) -> bool:
         """Determinar si se deben actualizar los objetivos"""
@@ -243,11 +219,42 @@ class AdaptiveLearningEngine:
         # Actualizar si la diferencia es significativa (>5%)
         return tdee_diff_pct > 0.05
     
-    def update_user_goals(self, db: Session, user: User, 
-                         tdee_calc: TDEECalculation) -> Optional[AdaptiveGoalsUpdate]:
-        """Actualizar objetivos del usuario"""
+    async def load_user_history(self, db: AsyncSession, user: User, days: int = 30) -> Tuple[
+            List[IntakeDay], List[WeightPoint], Optional[WeightTrend], Optional[TDEEState]]:
+        """
+        Calorías diarias y pesos recientes del usuario, en orden cronológico, su tendencia de peso
+        (solo las columnas necesarias, como registros livianos en lugar de objetos ORM) y el
+        filtro del TDEE avanzado hasta ayer (sin commit)
+        """
+        start_date = date.today() - timedelta(days=days)
+        
+        intake = await db.execute(select(DailyStats.date, DailyStats.consumed_calories).where(
+            DailyStats.user_id == user.id, *day_range(DailyStats.date, start_date)
+        ).order_by(DailyStats.date))
+        weights = await db.execute(select(WeightEntry.date, WeightEntry.weight).where(
+            WeightEntry.user_id == user.id, *day_range(WeightEntry.date, start_date)
+        ).order_by(WeightEntry.date))
+        weight_trend = await db.get(WeightTrend, user.id)
+        tdee_state = await TDEEFilterService(db).advance(user)
+        
+        return (
+            [IntakeDay(row.date, row.consumed_calories) for row in intake],
+            [WeightPoint(row.date, row.weight) for row in weights],
+            weight_trend,
+            tdee_state
+        )
+    
+    async def update_user_goals(self, db: AsyncSession, user: User,
+                                tdee_calc: Optional[TDEECalculation] = None) -> Optional[AdaptiveGoalsUpdate]:
+        """Actualizar objetivos del usuario (sin cálculo previo, se hace con su historial reciente)"""
+        
+        if tdee_calc is None:
+            daily_stats, weight_entries, weight_trend, tdee_state = await self.load_user_history(db, user)
+            tdee_calc = self.calculate_adaptive_tdee(user, daily_stats, weight_entries, weight_trend, tdee_state)
         
         if not self.should_update_goals(user, tdee_calc.estimated_tdee, tdee_calc.confidence):
+            # Guardar igual el avance del filtro
+            await db.commit()
             return None
         
         # Calcular nuevas calorías objetivo
@@ -262,7 +269,8 @@ class AdaptiveLearningEngine:
         if not user.target_calories or abs(user.target_calories - (user.adaptive_calories or 0)) < 50:
             user.target_calories = new_calories
         
-        db.commit()
+        invalidate_dashboard_on_commit(db, user.id)
+        await db.commit()
         
         return AdaptiveGoalsUpdate(
             new_tdee=tdee_calc.estimated_tdee,
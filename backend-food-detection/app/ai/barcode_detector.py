@@ -9,6 +9,8 @@ from typing import Dict, Optional, List
 import json
 import os
 
+from app.ai.gs1 import classify_barcode, lookup_prefix
+
 # Imports condicionales para evitar errores en Vercel
 try:
     import cv2
@@ -77,6 +79,13 @@ class BarcodeDetector:
             for barcode in barcodes:
                 # Decodificar el código de barras
                 barcode_data = barcode.data.decode('utf-8')
+                
+                # Descartar lecturas sin dígito de control válido (lecturas erróneas);
+                # la simbología distingue un UPC-E de 8 dígitos de un EAN-8
+                if not classify_barcode(barcode_data, barcode.type)["check_digit_verified"]:
+                    logger.info(f"Código de barras descartado por validación GS1: {barcode_data}")
+                    continue
+                
                 detected_codes.append(barcode_data)
                 logger.info(f"Código de barras detectado: {barcode_data}")
             
@@ -86,32 +95,48 @@ class BarcodeDetector:
             logger.error(f"Error detectando código de barras: {str(e)}")
             return []
     
-    def get_product_info(self, barcode: str) -> Dict:
+    def get_product_info(self, barcode: str, symbology: Optional[str] = None) -> Dict:
         """
         Obtiene información del producto usando el código de barras
         Prioriza OpenFoodFacts (gratuito) y opcionalmente usa UPC Database si está configurado
         
         Args:
             barcode: Código de barras del producto
+            symbology: Simbología del lector ("UPCE", "EAN8", ...) si se conoce
             
         Returns:
             Información del producto
         """
-        # Intentar con OpenFoodFacts primero (siempre disponible)
-        product_info = self._get_from_openfoodfacts(barcode)
+        # Validar antes de consultar: un código inválido nunca sale a la red
+        barcode_info = classify_barcode(barcode, symbology)
+        if not barcode_info["valid"]:
+            logger.info(f"Código de barras inválido, se omite la consulta externa: {barcode}")
+            return self._create_invalid_barcode_response(barcode_info)
         
-        if product_info and product_info.get("found"):
-            logger.info(f"Producto encontrado en OpenFoodFacts: {barcode}")
-            return product_info
+        # UPC-E se consulta con su UPC-A expandido; un EAN-8 que también es un
+        # UPC-E válido (sin simbología que lo aclare) se intenta de las dos formas
+        barcode = barcode_info["lookup_code"]
+        lookup_codes = [barcode]
+        if barcode_info.get("alternate_lookup_code"):
+            lookup_codes.append(barcode_info["alternate_lookup_code"])
         
-        # Solo intentar UPC Database si se configuró API key (opcional)
-        if self.upc_api_key:
-            logger.info(f"Producto no encontrado en OpenFoodFacts, intentando UPC Database: {barcode}")
-            product_info = self._get_from_upc_database(barcode)
+        # Intentar con OpenFoodFacts primero (siempre disponible)
+        for code in lookup_codes:
+            product_info = self._get_from_openfoodfacts(code)
             
             if product_info and product_info.get("found"):
-                logger.info(f"Producto encontrado en UPC Database: {barcode}")
+                logger.info(f"Producto encontrado en OpenFoodFacts: {code}")
                 return product_info
+        
+        # Solo intentar UPC Database si se configuró API key (opcional)
+        if self.upc_api_key:
+            for code in lookup_codes:
+                logger.info(f"Producto no encontrado en OpenFoodFacts, intentando UPC Database: {code}")
+                product_info = self._get_from_upc_database(code)
+                
+                if product_info and product_info.get("found"):
+                    logger.info(f"Producto encontrado en UPC Database: {code}")
+                    return product_info
         else:
             logger.info("UPC Database no configurado (API key no disponible)")
         
@@ -234,64 +259,33 @@ class BarcodeDetector:
             "note": "OpenFoodFacts es una base de datos colaborativa - puedes contribuir agregando este producto"
         }
     
+    def _create_invalid_barcode_response(self, barcode_info: Dict) -> Dict:
+        """
+        Crea respuesta para códigos que no pasan la validación GS1
+        """
+        return {
+            "found": False,
+            "valid": False,
+            "barcode": barcode_info["barcode"],
+            "format": barcode_info["format"],
+            "message": "Código de barras inválido",
+            "error": barcode_info.get("error", "Código no válido"),
+            "suggestion": "Verifica que el código esté completo o vuelve a escanearlo con mejor enfoque",
+            "is_peruvian_product": False
+        }
+    
     def analyze_barcode_format(self, barcode: str) -> Dict:
         """
         Analiza el formato del código de barras y proporciona información
         """
-        info = {
-            "barcode": barcode,
-            "length": len(barcode),
-            "format": "Unknown"
-        }
-        
-        if len(barcode) == 13:
-            info["format"] = "EAN-13"
-            country_code = barcode[:3]
-            
-            if country_code == "775":
-                info["country"] = "Perú"
-                info["is_peruvian"] = True
-            else:
-                info["country"] = self._get_country_by_code(country_code)
-                info["is_peruvian"] = False
-                
-        elif len(barcode) == 12:
-            info["format"] = "UPC-A"
-            info["country"] = "Estados Unidos/Canadá"
-            info["is_peruvian"] = False
-            
-        elif len(barcode) == 8:
-            info["format"] = "EAN-8"
-            info["country"] = "Variable"
-            info["is_peruvian"] = False
-        
-        return info
+        return classify_barcode(barcode)
     
     def _get_country_by_code(self, code: str) -> str:
         """
-        Obtiene el país por código de barras (códigos más comunes)
+        Obtiene el país por prefijo GS1 de tres dígitos
         """
-        country_codes = {
-            "780-789": "Chile",
-            "770-771": "Colombia",
-            "740-745": "Guatemala",
-            "750": "México",
-            "773": "Uruguay",
-            "779": "Argentina",
-            "775": "Perú",
-            "690-699": "China",
-            "300-379": "Francia",
-            "400-440": "Alemania",
-            "800-839": "Italia",
-            "500-509": "Reino Unido"
-        }
-        
-        for range_code, country in country_codes.items():
-            if "-" in range_code:
-                start, end = range_code.split("-")
-                if start <= code <= end:
-                    return country
-            elif code.startswith(range_code):
-                return country
+        if not (code.isascii() and code.isdigit()) or len(code) != 3:
+            return "No identificado"
         
-        return "No identificado"
\ No newline at end of file
+        entry = lookup_prefix(int(code))
+        return entry[0] if entry else "No identificado"
\ No newline at end of file
@@ -0,0 +1,163 @@
+"""
+Escaneo de códigos de barras en vivo a partir de fotogramas de cámara
+Descarta fotogramas casi idénticos con un hash perceptual (dHash, calculado
+en un hilo) y decodifica el resto en un pool de procesos usando BarcodeDetector
+"""
+
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from app.ai.barcode_detector import BarcodeDetector, BARCODE_LIBS_AVAILABLE, cv2, np
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Pool de procesos compartido para decodificación (se crea bajo demanda)
+_decode_pool: Optional[ProcessPoolExecutor] = None
+
+# Detector por proceso trabajador
+_worker_detector: Optional[BarcodeDetector] = None
+
+
+def get_decode_pool() -> ProcessPoolExecutor:
+    """Obtener el pool de procesos para decodificar fotogramas"""
+    global _decode_pool
+    if _decode_pool is None:
+        _decode_pool = ProcessPoolExecutor(max_workers=settings.BARCODE_DECODE_WORKERS)
+        logger.info(f"Pool de decodificación iniciado con {settings.BARCODE_DECODE_WORKERS} procesos")
+    return _decode_pool
+
+
+def shutdown_decode_pool():
+    """Cerrar el pool de procesos si fue creado"""
+    global _decode_pool
+    if _decode_pool is not None:
+        _decode_pool.shutdown(wait=False, cancel_futures=True)
+        _decode_pool = None
+
+
+def _decode_frame(image_data: bytes) -> List[str]:
+    """Decodificar un fotograma dentro de un proceso trabajador"""
+    global _worker_detector
+    if _worker_detector is None:
+        _worker_detector = BarcodeDetector()
+    return _worker_detector.detect_barcode_from_image(image_data)
+
+
+def frame_dhash(image_data: bytes) -> Optional[int]:
+    """
+    Calcula un hash de diferencias de 64 bits sobre el fotograma en escala de grises
+
+    Usa la decodificación reducida de OpenCV (1/4 de resolución) para que el
+    costo sea mucho menor que el de la decodificación del código de barras
+    """
+    if not BARCODE_LIBS_AVAILABLE:
+        return None
+
+    gray = cv2.imdecode(np.frombuffer(image_data, np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_4)
+    if gray is None:
+        return None
+
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = np.packbits(small[:, 1:] > small[:, :-1])
+    return int.from_bytes(bits.tobytes(), "big")
+
+
+class BarcodeStreamSession:
+    """
+    Sesión de escaneo en vivo para una conexión WebSocket
+
+    Mantiene solo el fotograma más reciente pendiente: si llegan fotogramas
+    mientras se decodifica otro, se reemplazan en lugar de encolarse. Los
+    duplicados se comparan con el último fotograma aceptado solo hasta que
+    su decodificación termina sin código: después se acepta de nuevo
+    """
+
+    def __init__(self, product_service, hash_distance: Optional[int] = None):
+        self.product_service = product_service
+        self.hash_distance = settings.BARCODE_FRAME_HASH_DISTANCE if hash_distance is None else hash_distance
+        self._last_hash: Optional[int] = None
+        self._pending: Optional[bytes] = None
+        self._frame_ready = asyncio.Event()
+        self.stats = {
+            "frames_received": 0,
+            "frames_duplicated": 0,
+            "frames_replaced": 0,
+            "frames_decoded": 0
+        }
+
+    async def offer(self, image_data: bytes) -> str:
+        """
+        Recibe un fotograma y decide si se descarta o queda pendiente
+
+        La decodificación reducida y el hash corren en un hilo (OpenCV libera
+        el GIL) para no frenar el event loop con cada fotograma
+
+        Returns:
+            Estado del fotograma: 'too_large', 'invalid', 'duplicate' o 'queued'
+        """
+        self.stats["frames_received"] += 1
+
+        if len(image_data) > settings.BARCODE_FRAME_MAX_BYTES:
+            return "too_large"
+
+        frame_hash = await asyncio.to_thread(frame_dhash, image_data)
+        if frame_hash is None:
+            return "invalid"
+
+        if self._last_hash is not None and (frame_hash ^ self._last_hash).bit_count() <= self.hash_distance:
+            self.stats["frames_duplicated"] += 1
+            return "duplicate"
+
+        self._last_hash = frame_hash
+        if self._pending is not None:
+            self.stats["frames_replaced"] += 1
+        self._pending = image_data
+        self._frame_ready.set()
+        return "queued"
+
+    async def scan(self, notify: Callable[[Dict], Awaitable[None]]) -> Dict:
+        """
+        Decodifica fotogramas pendientes hasta encontrar un código válido
+        y devuelve el análisis del producto
+        """
+        loop = asyncio.get_running_loop()
+        pool = get_decode_pool()
+
+        while True:
+            await self._frame_ready.wait()
+            self._frame_ready.clear()
+            image_data, self._pending = self._pending, None
+            if image_data is None:
+                continue
+
+            barcodes = await loop.run_in_executor(pool, _decode_frame, image_data)
+            self.stats["frames_decoded"] += 1
+
+            if not barcodes:
+                # Sin código (p. ej. foto movida): la misma toma, nítida, no es un duplicado
+                if self._pending is None:
+                    self._last_hash = None
+                await notify({"type": "frame", "status": "no_barcode"})
+                continue
+
+            primary_barcode = barcodes[0]
+            await notify({"type": "detected", "barcode": primary_barcode})
+
+            # La consulta del producto es bloqueante (requests), se ejecuta en un hilo
+            analysis = await asyncio.to_thread(
+                self.product_service.analyze_product_by_barcode, primary_barcode
+            )
+
+            if analysis.get("success"):
+                analysis["detection_info"] = {
+                    "total_barcodes_detected": len(barcodes),
+                    "all_detected_barcodes": barcodes,
+                    "primary_barcode_used": primary_barcode,
+                    "detection_method": "live_stream",
+                    **self.stats
+                }
+
+            return analysis
@@ -3,9 +3,12 @@ Servicio de análisis corporal que integra la detección de composición corpora
 con recomendaciones nutricionales personalizadas.
 """
 
+import asyncio
 import logging
-from typing import Dict, List, Optional
+import time
+from typing import Awaitable, Dict, List, Optional
 from .body_analyzer import body_analyzer
+from .nutrition_engine import nutrition_engine
 
 logger = logging.getLogger(__name__)
 
@@ -18,31 +21,58 @@ class BodyAnalysisService:
         self.body_analyzer = body_analyzer
         logger.info("BodyAnalysisService inicializado")
     
-    def analyze_body_photo(self, image_data: bytes, user_info: Dict = None) -> Dict:
+    async def analyze_body_photo(self, image_data: bytes, user_info: Dict = None,
+                                 ai_advice: bool = False) -> Dict:
         """
         Analiza una fotografía corporal y proporciona análisis completo
         
         Args:
             image_data: Datos de la imagen en bytes
             user_info: Información del usuario (edad, altura, peso, etc.)
+            ai_advice: Si se solicitan consejos adicionales en texto libre a Gemini
             
         Returns:
-            Análisis completo con métricas corporales y recomendaciones
+            Análisis completo con métricas corporales, recomendaciones
+            y tiempos por etapa en milisegundos
         """
+        timings: Dict[str, float] = {}
+        pipeline_start = time.perf_counter()
+        
         try:
+            # El preprocesamiento corre en un hilo mientras se arma el prompt corporal
+            image_task = asyncio.create_task(self._timed_stage(
+                timings, "image_preprocessing", self.body_analyzer.prepare_image(image_data)
+            ))
+            body_prompt = self.body_analyzer._create_body_analysis_prompt(user_info)
+            image = await image_task
+            
             # Realizar análisis corporal
-            body_analysis = self.body_analyzer.analyze_body_composition(
-                image_data, user_info
+            body_analysis = await self._timed_stage(
+                timings, "body_composition",
+                self.body_analyzer.analyze_body_composition(
+                    image_data, user_info, image=image, prompt=body_prompt
+                )
             )
             
             if not body_analysis.get("success", True):
+                body_analysis["timings_ms"] = self._finish_timings(timings, pipeline_start)
                 return body_analysis
             
-            # Generar recomendaciones nutricionales personalizadas
-            nutrition_recommendations = self._generate_nutrition_recommendations(
-                body_analysis.get("analysis", {}), user_info
+            # Generar recomendaciones nutricionales personalizadas (cálculo local)
+            nutrition_recommendations = await self._timed_stage(
+                timings, "nutrition_recommendations",
+                self._generate_nutrition_recommendations(body_analysis.get("analysis", {}), user_info)
             )
             
+            # Consejos opcionales en texto libre
+            if ai_advice and self.body_analyzer.model:
+                nutrition_recommendations["ai_advice"] = await self._timed_stage(
+                    timings, "ai_advice",
+                    self._generate_ai_advice(
+                        body_analysis.get("analysis", {}), nutrition_recommendations, user_info
+                    )
+                )
+            
             # Combinar resultados
             complete_analysis = {
                 "success": True,
@@ -54,6 +84,7 @@ class BodyAnalysisService:
                     user_info
                 ),
                 "timestamp": self._get_timestamp(),
+                "timings_ms": self._finish_timings(timings, pipeline_start),
                 "disclaimer": "Este análisis es estimativo y educativo. Consulte profesionales de la salud para decisiones médicas."
             }
             
@@ -64,42 +95,62 @@ class BodyAnalysisService:
             return {
                 "success": False,
                 "error": str(e),
-                "message": "Error procesando análisis corporal"
+                "message": "Error procesando análisis corporal",
+                "timings_ms": self._finish_timings(timings, pipeline_start)
             }
     
-    def _generate_nutrition_recommendations(self, body_analysis: Dict, user_info: Dict = None) -> Dict:
+    async def _timed_stage(self, timings: Dict[str, float], stage: str, awaitable: Awaitable):
+        """
+        Ejecuta una etapa del pipeline registrando su duración en milisegundos
+        """
+        start = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            timings[stage] = round((time.perf_counter() - start) * 1000, 2)
+    
+    def _finish_timings(self, timings: Dict[str, float], pipeline_start: float) -> Dict[str, float]:
+        """
+        Agrega la duración total del pipeline a los tiempos por etapa
+        """
+        timings["total"] = round((time.perf_counter() - pipeline_start) * 1000, 2)
+        return timings
+    
+    async def _generate_nutrition_recommendations(self, body_analysis: Dict, user_info: Dict = None) -> Dict:
         """
         Genera recomendaciones nutricionales basadas en el análisis corporal
+        Las cifras se calculan localmente con el motor de nutrición
         """
         try:
-            # Crear prompt para recomendaciones nutricionales
-            prompt = self._create_nutrition_prompt(body_analysis, user_info)
-            
-            # Generar recomendaciones con Gemini
-            if self.body_analyzer.model:
-                response = self.body_analyzer.model.generate_content(prompt)
-                recommendations = self._process_nutrition_response(response.text)
-            else:
-                recommendations = self._get_default_nutrition_recommendations()
-            
-            return recommendations
+            return nutrition_engine.recommend(body_analysis, user_info)
             
         except Exception as e:
             logger.error(f"Error generando recomendaciones nutricionales: {str(e)}")
             return self._get_default_nutrition_recommendations()
     
-    def _create_nutrition_prompt(self, body_analysis: Dict, user_info: Dict = None) -> str:
+    async def _generate_ai_advice(self, body_analysis: Dict, recommendations: Dict,
+                                  user_info: Dict = None) -> List[str]:
         """
-        Crea prompt para recomendaciones nutricionales personalizadas
+        Solicita a Gemini consejos breves sobre el plan ya calculado
+        """
+        try:
+            prompt = self._create_advice_prompt(body_analysis, recommendations, user_info)
+            response = await self.body_analyzer.generate_content(prompt)
+            return self._process_advice_response(response.text)
+            
+        except Exception as e:
+            logger.error(f"Error generando consejos nutricionales: {str(e)}")
+            return []
+    
+    def _create_advice_prompt(self, body_analysis: Dict, recommendations: Dict,
+                              user_info: Dict = None) -> str:
+        """
+        Crea prompt para consejos en texto libre sobre el plan calculado
         """
         user_data = ""
         if user_info:
             if user_info.get("age"):
                 user_data += f"Edad: {user_info['age']} años\n"
-            if user_info.get("height"):
-                user_data += f"Altura: {user_info['height']} cm\n"
-            if user_info.get("weight"):
-                user_data += f"Peso: {user_info['weight']} kg\n"
             if user_info.get("gender"):
                 user_data += f"Sexo: {user_info['gender']}\n"
             if user_info.get("activity_level"):
@@ -107,108 +158,39 @@ class BodyAnalysisService:
             if user_info.get("dietary_restrictions"):
                 user_data += f"Restricciones dietéticas: {user_info['dietary_restrictions']}\n"
         
-        body_data = ""
-        if body_analysis.get("body_composition"):
-            comp = body_analysis["body_composition"]
-            body_data += f"Porcentaje de grasa estimado: {comp.get('estimated_body_fat_percentage', 'No determinado')}\n"
-            body_data += f"Tipo de cuerpo: {comp.get('body_type', 'No determinado')}\n"
-            body_data += f"Nivel de masa muscular: {comp.get('muscle_mass_level', 'No determinado')}\n"
-            body_data += f"Nivel de fitness: {comp.get('overall_fitness_level', 'No determinado')}\n"
+        comp = body_analysis.get("body_composition", {})
+        targets = recommendations.get("targets", {})
         
         prompt = f"""
-Eres un nutricionista experto. Basándote en el análisis corporal y la información del usuario, crea un plan nutricional personalizado.
+Eres un nutricionista experto. El plan nutricional ya fue calculado; NO cambies las cifras.
 
 INFORMACIÓN DEL USUARIO:
 {user_data if user_data else "No se proporcionó información adicional."}
 
 ANÁLISIS CORPORAL:
-{body_data if body_data else "Análisis corporal no disponible."}
+Tipo de cuerpo: {comp.get('body_type', 'No determinado')}
+Nivel de masa muscular: {comp.get('muscle_mass_level', 'No determinado')}
 
-Proporciona tu respuesta en el siguiente formato JSON:
+PLAN CALCULADO:
+Calorías diarias: {targets.get('calories')} kcal
+Proteínas: {targets.get('protein_g')} g, Carbohidratos: {targets.get('carbs_g')} g, Grasas: {targets.get('fat_g')} g
 
-{{
-    "caloric_needs": {{
-        "daily_calories": "calorías diarias recomendadas",
-        "bmr_estimate": "metabolismo basal estimado",
-        "activity_calories": "calorías por actividad"
-    }},
-    "macronutrient_distribution": {{
-        "proteins": {{
-            "percentage": "porcentaje de proteínas",
-            "grams_per_day": "gramos diarios",
-            "sources": ["fuente 1", "fuente 2", "fuente 3"]
-        }},
-        "carbohydrates": {{
-            "percentage": "porcentaje de carbohidratos",
-            "grams_per_day": "gramos diarios",
-            "sources": ["fuente 1", "fuente 2", "fuente 3"]
-        }},
-        "fats": {{
-            "percentage": "porcentaje de grasas",
-            "grams_per_day": "gramos diarios",
-            "sources": ["fuente 1", "fuente 2", "fuente 3"]
-        }}
-    }},
-    "meal_timing": {{
-        "meals_per_day": "número de comidas",
-        "pre_workout": "recomendaciones pre-entrenamiento",
-        "post_workout": "recomendaciones post-entrenamiento",
-        "hydration": "recomendaciones de hidratación"
-    }},
-    "specific_recommendations": [
-        "recomendación específica 1",
-        "recomendación específica 2",
-        "recomendación específica 3"
-    ],
-    "foods_to_prioritize": [
-        "alimento prioritario 1",
-        "alimento prioritario 2",
-        "alimento prioritario 3"
-    ],
-    "foods_to_limit": [
-        "alimento a limitar 1",
-        "alimento a limitar 2"
-    ],
-    "supplements_consideration": [
-        "suplemento a considerar 1",
-        "suplemento a considerar 2"
-    ],
-    "weekly_goals": [
-        "objetivo semanal 1",
-        "objetivo semanal 2"
-    ]
-}}
-
-IMPORTANTE:
-- Adapta las recomendaciones al contexto peruano
-- Incluye alimentos locales y accesibles
-- Considera el presupuesto promedio
-- Sé específico con las cantidades
-- Responde SOLO en español
-- Mantén un enfoque saludable y sostenible
+Da entre 3 y 5 consejos prácticos para cumplir este plan con alimentos peruanos accesibles.
+Responde SOLO en español, un consejo por línea, sin numeración ni formato adicional.
 """
         
         return prompt
     
-    def _process_nutrition_response(self, response_text: str) -> Dict:
+    def _process_advice_response(self, response_text: str) -> List[str]:
         """
-        Procesa la respuesta de recomendaciones nutricionales
+        Convierte la respuesta de texto libre en una lista de consejos
         """
-        try:
-            import json
-            import re
-            
-            # Buscar JSON en la respuesta
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                json_str = json_match.group()
-                return json.loads(json_str)
-            else:
-                return self._get_default_nutrition_recommendations()
-                
-        except Exception as e:
-            logger.error(f"Error procesando respuesta nutricional: {str(e)}")
-            return self._get_default_nutrition_recommendations()
+        advice = []
+        for line in response_text.splitlines():
+            line = line.strip().lstrip("-*•0123456789.) ").strip()
+            if line:
+                advice.append(line)
+        return advice[:5]
     
     def _get_default_nutrition_recommendations(self) -> Dict:
         """
@@ -4,6 +4,7 @@ Procesa fotografías del usuario para estimar métricas corporales.
 """
 
 import os
+import asyncio
 import logging
 from typing import Dict, List, Optional
 import base64
@@ -44,13 +45,35 @@ class BodyAnalyzer:
             else:
                 logger.warning("GEMINI_API_KEY no configurada - usando modo simulación")
     
-    def analyze_body_composition(self, image_data: bytes, user_info: Dict = None) -> Dict:
+    async def generate_content(self, contents):
+        """
+        Genera contenido con Gemini sin bloquear el event loop
+        Usa la llamada asíncrona del SDK si existe, o un hilo en caso contrario
+        """
+        if hasattr(self.model, "generate_content_async"):
+            return await self.model.generate_content_async(contents)
+        return await asyncio.to_thread(self.model.generate_content, contents)
+    
+    async def prepare_image(self, image_data: bytes) -> Optional[Image.Image]:
+        """
+        Preprocesa la imagen en un hilo (decodificación y redimensionado con PIL)
+        Devuelve None en modo simulación, donde la imagen no se usa
+        """
+        if not self.model:
+            return None
+        return await asyncio.to_thread(self._process_image, image_data)
+    
+    async def analyze_body_composition(self, image_data: bytes, user_info: Dict = None,
+                                       image: Optional[Image.Image] = None,
+                                       prompt: Optional[str] = None) -> Dict:
         """
         Analiza la composición corporal a partir de una fotografía
         
         Args:
             image_data: Datos de la imagen en bytes
             user_info: Información adicional del usuario (edad, altura, sexo, etc.)
+            image: Imagen ya preprocesada (opcional, evita procesarla de nuevo)
+            prompt: Prompt ya construido (opcional)
             
         Returns:
             Análisis completo de composición corporal
@@ -60,13 +83,15 @@ class BodyAnalyzer:
                 return self._get_simulation_response(user_info)
             
             # Procesar imagen
-            image = self._process_image(image_data)
+            if image is None:
+                image = await self.prepare_image(image_data)
             
             # Crear prompt para análisis corporal
-            prompt = self._create_body_analysis_prompt(user_info)
+            if prompt is None:
+                prompt = self._create_body_analysis_prompt(user_info)
             
             # Generar análisis con Gemini
-            response = self.model.generate_content([prompt, image])
+            response = await self.generate_content([prompt, image])
             
             # Procesar respuesta
             analysis = self._process_gemini_response(response.text)
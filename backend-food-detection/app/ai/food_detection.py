@@ -7,9 +7,20 @@ import logging
 from typing import Dict, List
 from app.core.config import settings
 from app.ai.gemini_detector import GeminiFoodDetector
+from app.ai.nutrition_db import get_nutrition_db
 
 logger = logging.getLogger(__name__)
 
+# Plato de la detección simulada: (etiqueta, alimento en la base nutricional, confianza, bbox)
+SIMULATED_DETECTIONS = [
+    ("pechuga_pollo", "chicken_breast", 0.94, [0.2, 0.3, 0.3, 0.4]),
+    ("arroz", "rice", 0.89, [0.5, 0.4, 0.25, 0.3]),
+    ("brócoli", "broccoli", 0.87, [0.1, 0.6, 0.2, 0.25]),
+]
+
+# Columnas por 100g que trae cada detección simulada
+SIMULATED_NUTRIENTS = ("calories", "protein", "carbs", "fat", "fiber", "sugar", "sodium")
+
 class FoodDetectionSystem:
     """
     Sistema principal de detección de alimentos usando Google Gemini.
@@ -70,16 +81,14 @@ class FoodDetectionSystem:
         if self.detector:
             return self.detector.get_supported_foods()
         
-        # Información básica para modo simulación
+        # Información básica para modo simulación (misma base nutricional local)
+        nutrition_db = get_nutrition_db()
         return {
             "detection_capability": "simulation",
             "description": "Modo simulación - API key de Gemini no configurada",
             "local_nutrition_database": {
-                "count": 29,
-                "foods": [
-                    "manzana", "plátano", "naranja", "pechuga_pollo", "arroz", 
-                    "brócoli", "pan", "huevo", "leche", "queso"
-                ],
+                "count": len(nutrition_db),
+                "foods": nutrition_db.names[:10],
                 "note": "Lista limitada para simulación"
             },
             "simulation_note": "Para capacidades completas, configura GEMINI_API_KEY",
@@ -134,65 +143,42 @@ class FoodDetectionSystem:
     def _simulate_detection(self) -> Dict:
         """
         Simulación de detección para desarrollo y testing.
+        Los valores por 100g y las porciones salen de la base nutricional.
         
         Returns:
             Resultados simulados realistas
         """
-        return {
-            "detections": [
-                {
-                    "class": "pechuga_pollo",
-                    "confidence": 0.94,
-                    "bbox": [0.2, 0.3, 0.3, 0.4],
-                    "estimated_weight": 150,
-                    "nutrition": {
-                        "calories": 165,
-                        "protein": 31.0,
-                        "carbs": 0.0,
-                        "fat": 3.6,
-                        "fiber": 0.0,
-                        "sugar": 0.0,
-                        "sodium": 74
-                    }
-                },
-                {
-                    "class": "arroz",
-                    "confidence": 0.89,
-                    "bbox": [0.5, 0.4, 0.25, 0.3],
-                    "estimated_weight": 120,
-                    "nutrition": {
-                        "calories": 130,
-                        "protein": 2.7,
-                        "carbs": 28.0,
-                        "fat": 0.3,
-                        "fiber": 0.4,
-                        "sugar": 0.1,
-                        "sodium": 1
-                    }
-                },
-                {
-                    "class": "brócoli",
-                    "confidence": 0.87,
-                    "bbox": [0.1, 0.6, 0.2, 0.25],
-                    "estimated_weight": 80,
-                    "nutrition": {
-                        "calories": 27,
-                        "protein": 2.2,
-                        "carbs": 5.6,
-                        "fat": 0.3,
-                        "fiber": 2.2,
-                        "sugar": 1.5,
-                        "sodium": 26
-                    }
+        nutrition_db = get_nutrition_db()
+        names = [name for _, name, _, _ in SIMULATED_DETECTIONS]
+        weights = [nutrition_db.serving_weight(name) for name in names]
+        values = nutrition_db.per_100g(names, SIMULATED_NUTRIENTS)
+        
+        detections = [
+            {
+                "class": label,
+                "confidence": confidence,
+                "bbox": bbox,
+                "estimated_weight": weight,
+                "nutrition": {
+                    column: round(float(value), 1) for column, value in zip(SIMULATED_NUTRIENTS, row)
                 }
-            ],
+            }
+            for (label, _, confidence, bbox), weight, row in zip(SIMULATED_DETECTIONS, weights, values)
+        ]
+        
+        # Totales del plato con las porciones estimadas
+        totals = nutrition_db.totals(names, weights)
+        calories = totals["calories"] or 1
+        
+        return {
+            "detections": detections,
             "meal_analysis": {
                 "meal_type": "almuerzo",
-                "estimated_calories": 322,
+                "estimated_calories": round(totals["calories"]),
                 "nutritional_balance": "balanceado",
-                "protein_percentage": 35.8,
-                "carbs_percentage": 41.6,
-                "fat_percentage": 22.6,
+                "protein_percentage": round(totals["protein"] * 4 / calories * 100, 1),
+                "carbs_percentage": round(totals["carbs"] * 4 / calories * 100, 1),
+                "fat_percentage": round(totals["fat"] * 9 / calories * 100, 1),
                 "health_score": 8.5,
                 "recommendations": [
                     "Excelente balance de proteínas",
@@ -200,8 +186,8 @@ class FoodDetectionSystem:
                     "Porción adecuada de carbohidratos"
                 ]
             },
-            "total_items": 3,
-            "confidence_avg": 0.90,
+            "total_items": len(detections),
+            "confidence_avg": round(sum(confidence for _, _, confidence, _ in SIMULATED_DETECTIONS) / len(detections), 2),
             "backend_used": "gemini_simulation",
             "processing_time": "1.2s"
         }
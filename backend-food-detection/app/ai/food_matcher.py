@@ -0,0 +1,259 @@
+"""
+Búsqueda difusa de nombres de alimentos (español e inglés)
+Índice en memoria con trigramas de caracteres y un BK-tree por distancia de
+edición, sobre nombres sin tildes. El vocabulario y los sinónimos bilingües
+(plátano/banana, pollo/chicken, ...) salen de la base nutricional local.
+"""
+
+import re
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.ai.nutrition_db import get_nutrition_db
+
+# Consultas difusas recientes que se guardan por proceso
+MATCH_CACHE_SIZE = 1024
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def strip_accents(text: str) -> str:
+    """Minúsculas y sin tildes"""
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def fold_text(text: str) -> str:
+    """Minúsculas, sin tildes y solo letras/números separados por un espacio"""
+    return _NON_ALNUM.sub(" ", strip_accents(text)).strip()
+
+
+def trigrams(folded: str) -> Set[str]:
+    """Trigramas por palabra con relleno (estilo pg_trgm)"""
+    grams = set()
+    for word in folded.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _bit_pattern(pattern: str) -> Tuple[Dict[str, int], int, int]:
+    """Máscaras de posición por carácter del patrón (para Myers)"""
+    peq: Dict[str, int] = {}
+    for i, char in enumerate(pattern):
+        peq[char] = peq.get(char, 0) | (1 << i)
+    return peq, (1 << len(pattern)) - 1, 1 << (len(pattern) - 1)
+
+
+def _myers_distance(compiled: Tuple[Dict[str, int], int, int], length: int, text: str) -> int:
+    """
+    Distancia de edición con el algoritmo bit-paralelo de Myers (Hyyrö)
+    Cada carácter del texto procesa una columna completa con operaciones sobre enteros
+    """
+    peq, mask, last = compiled
+    pv, mv, score = mask, 0, length
+
+    for char in text:
+        eq = peq.get(char, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = (mv | ~(xh | pv)) & mask
+        mh = pv & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        ph = (ph << 1) | 1
+        mh <<= 1
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv & mask
+
+    return score
+
+
+def levenshtein(a: str, b: str) -> int:
+    """Distancia de edición entre dos textos"""
+    if not a or not b:
+        return len(a) or len(b)
+    return _myers_distance(_bit_pattern(a), len(a), b)
+
+
+class BKTree:
+    """BK-tree de términos para búsquedas por distancia de edición"""
+
+    def __init__(self):
+        self._root: Optional[Tuple[str, Dict[int, tuple]]] = None
+
+    def add(self, term: str):
+        if self._root is None:
+            self._root = (term, {})
+            return
+
+        node = self._root
+        while True:
+            node_term, children = node
+            distance = levenshtein(term, node_term)
+            if distance == 0:
+                return
+            if distance not in children:
+                children[distance] = (term, {})
+                return
+            node = children[distance]
+
+    def search(self, term: str, max_distance: int) -> List[Tuple[int, str]]:
+        """Términos a distancia <= max_distance, como (distancia, término)"""
+        if self._root is None:
+            return []
+
+        if not term:
+            return []
+
+        # El patrón de la consulta se compila una vez para todo el recorrido
+        compiled, length = _bit_pattern(term), len(term)
+        results = []
+        pending = [self._root]
+        while pending:
+            node_term, children = pending.pop()
+            distance = _myers_distance(compiled, length, node_term)
+            if distance <= max_distance:
+                results.append((distance, node_term))
+            for child_distance in range(distance - max_distance, distance + max_distance + 1):
+                child = children.get(child_distance)
+                if child is not None:
+                    pending.append(child)
+        return results
+
+
+@dataclass
+class FoodMatch:
+    """Candidato de la búsqueda difusa"""
+    name: str       # Nombre canónico en la base nutricional
+    term: str       # Término (nombre o sinónimo) que coincidió
+    score: float    # 1.0 = coincidencia exacta
+
+
+class FoodMatcher:
+    """
+    Índice difuso de nombres de alimentos
+
+    Cada término (nombre canónico, nombre en español o sinónimo) se indexa
+    sin tildes; los candidatos salen del índice invertido de trigramas y del
+    BK-tree, y se puntúan con el mejor de Dice (trigramas) y similitud de edición
+    """
+
+    def __init__(self, vocabulary: Dict[str, str]):
+        """
+        Args:
+            vocabulary: término → nombre canónico
+        """
+        self._canonical: Dict[str, str] = {}
+        self._synonyms: Dict[str, List[str]] = {}
+        self._trigrams: Dict[str, Set[str]] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        # Un BK-tree por longitud: la diferencia de longitudes acota la distancia
+        self._bktrees: Dict[int, BKTree] = {}
+        self._cache: "OrderedDict[Tuple[str, int, float], List[FoodMatch]]" = OrderedDict()
+
+        for term, canonical in vocabulary.items():
+            folded = fold_text(term)
+            if not folded or folded in self._canonical:
+                continue
+            self._canonical[folded] = canonical
+            self._synonyms.setdefault(canonical, []).append(term)
+            grams = trigrams(folded)
+            self._trigrams[folded] = grams
+            for gram in grams:
+                self._postings.setdefault(gram, set()).add(folded)
+            self._bktrees.setdefault(len(folded), BKTree()).add(folded)
+
+    @classmethod
+    def from_nutrition_db(cls, db=None) -> "FoodMatcher":
+        """Construir el índice a partir de la base nutricional local"""
+        db = db or get_nutrition_db()
+        vocabulary = {name.replace("_", " "): name for name in db.names}
+        for alias, row in db.aliases.items():
+            vocabulary.setdefault(alias.replace("_", " "), db.names[row])
+        return cls(vocabulary)
+
+    def vocabulary(self) -> Dict[str, str]:
+        """Términos indexados (sin tildes) → nombre canónico"""
+        return dict(self._canonical)
+
+    def synonyms(self, name: str) -> List[str]:
+        """Todos los términos registrados para un nombre canónico"""
+        return list(self._synonyms.get(name, []))
+
+    def lookup(self, text: str) -> Optional[str]:
+        """Coincidencia exacta (sin tildes) o None"""
+        return self._canonical.get(fold_text(text))
+
+    def match(self, query: str, limit: int = 5, min_score: float = 0.5) -> List[FoodMatch]:
+        """
+        Candidatos ordenados por puntaje, uno por nombre canónico
+        """
+        folded = fold_text(query)
+        if not folded:
+            return []
+
+        exact = self._canonical.get(folded)
+        if exact is not None:
+            return [FoodMatch(name=exact, term=folded, score=1.0)]
+
+        key = (folded, limit, min_score)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return list(cached)
+
+        query_grams = trigrams(folded)
+        candidates: Dict[str, int] = {}
+        for gram in query_grams:
+            for term in self._postings.get(gram, ()):
+                candidates[term] = candidates.get(term, 0) + 1
+
+        max_distance = 1 if len(folded) <= 4 else 2
+        edit_hits = {}
+        for length in range(len(folded) - max_distance, len(folded) + max_distance + 1):
+            tree = self._bktrees.get(length)
+            if tree is not None:
+                edit_hits.update((term, distance) for distance, term in tree.search(folded, max_distance))
+
+        best: Dict[str, FoodMatch] = {}
+        for term in set(candidates) | set(edit_hits):
+            shared = candidates.get(term, 0)
+            dice = 2 * shared / (len(query_grams) + len(self._trigrams[term]))
+            distance = edit_hits.get(term)
+            edit = 1 - distance / max(len(folded), len(term)) if distance is not None else 0.0
+            score = round(max(dice, edit), 3)
+            if score < min_score:
+                continue
+
+            canonical = self._canonical[term]
+            if canonical not in best or score > best[canonical].score:
+                best[canonical] = FoodMatch(name=canonical, term=term, score=score)
+
+        matches = sorted(best.values(), key=lambda m: (-m.score, m.name))[:limit]
+        self._cache[key] = matches
+        if len(self._cache) > MATCH_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return list(matches)
+
+    def best(self, query: str, min_score: float = 0.5) -> Optional[FoodMatch]:
+        """Mejor candidato o None"""
+        matches = self.match(query, limit=1, min_score=min_score)
+        return matches[0] if matches else None
+
+
+_food_matcher: Optional[FoodMatcher] = None
+
+
+def get_food_matcher() -> FoodMatcher:
+    """Obtener el índice difuso del proceso (se construye bajo demanda)"""
+    global _food_matcher
+    if _food_matcher is None:
+        _food_matcher = FoodMatcher.from_nutrition_db()
+    return _food_matcher
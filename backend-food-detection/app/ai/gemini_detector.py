@@ -14,6 +14,8 @@ import time
 import random
 
 from app.core.config import settings
+from app.ai.nutrition_db import get_nutrition_db
+from app.ai.food_matcher import get_food_matcher
 
 logger = logging.getLogger(__name__)
 
@@ -42,66 +44,9 @@ class GeminiFoodDetector:
         
         self.api_url = f"https://generativelanguage.googleapis.com/v1beta/models/{self.model_name}:generateContent?key={self.api_key}"
         
-        # Nutritional database mapping
-        self.nutritional_data = {
-            # Frutas
-            "apple": {"calories": 52, "protein": 0.3, "carbs": 14, "fat": 0.2, "fiber": 2.4},
-            "banana": {"calories": 89, "protein": 1.1, "carbs": 23, "fat": 0.3, "fiber": 2.6},
-            "orange": {"calories": 47, "protein": 0.9, "carbs": 12, "fat": 0.1, "fiber": 2.4},
-            "strawberry": {"calories": 32, "protein": 0.7, "carbs": 8, "fat": 0.3, "fiber": 2.0},
-            "grapes": {"calories": 62, "protein": 0.6, "carbs": 16, "fat": 0.2, "fiber": 0.9},
-            
-            # Vegetales
-            "broccoli": {"calories": 34, "protein": 2.8, "carbs": 7, "fat": 0.4, "fiber": 2.6},
-            "carrot": {"calories": 41, "protein": 0.9, "carbs": 10, "fat": 0.2, "fiber": 2.8},
-            "tomato": {"calories": 18, "protein": 0.9, "carbs": 4, "fat": 0.2, "fiber": 1.2},
-            "lettuce": {"calories": 15, "protein": 1.4, "carbs": 3, "fat": 0.2, "fiber": 1.3},
-            "spinach": {"calories": 23, "protein": 2.9, "carbs": 4, "fat": 0.4, "fiber": 2.2},
-            
-            # Proteínas
-            "chicken_breast": {"calories": 165, "protein": 31, "carbs": 0, "fat": 3.6, "fiber": 0},
-            "salmon": {"calories": 208, "protein": 20, "carbs": 0, "fat": 12, "fiber": 0},
-            "beef": {"calories": 250, "protein": 26, "carbs": 0, "fat": 15, "fiber": 0},
-            "egg": {"calories": 155, "protein": 13, "carbs": 1.1, "fat": 11, "fiber": 0},
-            "tofu": {"calories": 76, "protein": 8, "carbs": 1.9, "fat": 4.8, "fiber": 0.3},
-            
-            # Carbohidratos
-            "rice": {"calories": 130, "protein": 2.7, "carbs": 28, "fat": 0.3, "fiber": 0.4},
-            "bread": {"calories": 265, "protein": 9, "carbs": 49, "fat": 3.2, "fiber": 2.7},
-            "pasta": {"calories": 131, "protein": 5, "carbs": 25, "fat": 1.1, "fiber": 1.8},
-            "potato": {"calories": 77, "protein": 2, "carbs": 17, "fat": 0.1, "fiber": 2.2},
-            "quinoa": {"calories": 120, "protein": 4.4, "carbs": 22, "fat": 1.9, "fiber": 2.8},
-            
-            # Lácteos
-            "milk": {"calories": 42, "protein": 3.4, "carbs": 5, "fat": 1, "fiber": 0},
-            "cheese": {"calories": 113, "protein": 7, "carbs": 1, "fat": 9, "fiber": 0},
-            "yogurt": {"calories": 59, "protein": 10, "carbs": 3.6, "fat": 0.4, "fiber": 0},
-            
-            # Frutos secos y semillas
-            "almonds": {"calories": 579, "protein": 21, "carbs": 22, "fat": 50, "fiber": 12},
-            "walnuts": {"calories": 654, "protein": 15, "carbs": 14, "fat": 65, "fiber": 7},
-            
-            # Legumbres
-            "beans": {"calories": 127, "protein": 9, "carbs": 23, "fat": 0.5, "fiber": 9},
-            "lentils": {"calories": 116, "protein": 9, "carbs": 20, "fat": 0.4, "fiber": 8},
-            
-            # Aceites y grasas
-            "olive_oil": {"calories": 884, "protein": 0, "carbs": 0, "fat": 100, "fiber": 0},
-            "avocado": {"calories": 160, "protein": 2, "carbs": 9, "fat": 15, "fiber": 7},
-        }
+        # Base nutricional local (archivo columnar compartido entre workers)
+        self.nutrition_db = get_nutrition_db()
         
-        # Weight estimation factors (grams per typical serving)
-        self.weight_factors = {
-            "apple": 150, "banana": 120, "orange": 130, "strawberry": 15, "grapes": 5,
-            "broccoli": 100, "carrot": 80, "tomato": 120, "lettuce": 20, "spinach": 30,
-            "chicken_breast": 150, "salmon": 150, "beef": 150, "egg": 50, "tofu": 100,
-            "rice": 150, "bread": 30, "pasta": 100, "potato": 150, "quinoa": 100,
-            "milk": 250, "cheese": 30, "yogurt": 150,
-            "almonds": 30, "walnuts": 30,
-            "beans": 100, "lentils": 100,
-            "olive_oil": 15, "avocado": 150
-        }
-
     def _make_request_with_retry(self, url: str, json: Dict, headers: Dict, max_retries: int = 4) -> Optional[requests.Response]:
         """
         Make API request with exponential backoff retry logic for 429 errors.
@@ -503,17 +448,23 @@ class GeminiFoodDetector:
         Returns:
             Nutritional information dictionary
         """
-        # Normalize food name
-        normalized_name = food_name.lower().replace(" ", "_")
+        nutrition = self.nutrition_db.get(food_name)
+        if nutrition:
+            return nutrition
         
-        # Return nutritional data or default values
-        return self.nutritional_data.get(normalized_name, {
+        # Búsqueda difusa (sin tildes, español/inglés, errores de escritura)
+        match = get_food_matcher().best(food_name)
+        if match:
+            return self.nutrition_db.get(match.name)
+        
+        # Default values
+        return {
             "calories": 100,
             "protein": 5,
             "carbs": 15,
             "fat": 3,
             "fiber": 2
-        })
+        }
 
     def _simulate_natural_response(self) -> Dict:
         """
@@ -689,8 +640,8 @@ Sube una foto de tu comida y te daré un análisis nutricional detallado con rec
             "detection_capability": "unlimited",
             "description": "Gemini puede detectar miles de alimentos diferentes",
             "local_nutrition_database": {
-                "count": len(self.nutritional_data),
-                "foods": list(self.nutritional_data.keys())[:10],  # Solo muestra 10 ejemplos
+                "count": len(self.nutrition_db),
+                "foods": self.nutrition_db.names[:10],  # Solo muestra 10 ejemplos
                 "note": "Base de datos local para respaldo nutricional"
             },
             "gemini_capabilities": {
@@ -751,7 +702,7 @@ Sube una foto de tu comida y te daré un análisis nutricional detallado con rec
         Returns:
             Estimated weight in grams
         """
-        base_weight = self.weight_factors.get(food_name.lower(), 100)
+        base_weight = self.nutrition_db.serving_weight(food_name, 100)
         
         # Calculate area from bounding box
         area = bbox[2] * bbox[3]  # width * height
@@ -0,0 +1,322 @@
+"""
+Utilidades GS1 para códigos de barras
+Validación de dígito de control (EAN-8, EAN-13, UPC-A, UPC-E, GTIN-14),
+expansión de UPC-E y clasificación por prefijo GS1 con índice de intervalos
+"""
+
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+
+# Tabla de prefijos GS1 (rango inicial, rango final, país/uso, tipo de prefijo)
+# Los prefijos son los tres primeros dígitos del GTIN-13
+GS1_PREFIX_RANGES: List[Tuple[int, int, str, str]] = [
+    (0, 19, "Estados Unidos/Canadá", "country"),
+    (20, 29, "Circulación restringida (uso interno)", "restricted"),
+    (30, 39, "Estados Unidos (medicamentos)", "country"),
+    (40, 49, "Circulación restringida (uso interno)", "restricted"),
+    (50, 59, "Cupones", "coupon"),
+    (60, 139, "Estados Unidos/Canadá", "country"),
+    (200, 299, "Circulación restringida (uso interno)", "restricted"),
+    (300, 379, "Francia", "country"),
+    (380, 380, "Bulgaria", "country"),
+    (383, 383, "Eslovenia", "country"),
+    (385, 385, "Croacia", "country"),
+    (387, 387, "Bosnia y Herzegovina", "country"),
+    (389, 389, "Montenegro", "country"),
+    (400, 440, "Alemania", "country"),
+    (450, 459, "Japón", "country"),
+    (460, 469, "Rusia", "country"),
+    (470, 470, "Kirguistán", "country"),
+    (471, 471, "Taiwán", "country"),
+    (474, 474, "Estonia", "country"),
+    (475, 475, "Letonia", "country"),
+    (476, 476, "Azerbaiyán", "country"),
+    (477, 477, "Lituania", "country"),
+    (478, 478, "Uzbekistán", "country"),
+    (479, 479, "Sri Lanka", "country"),
+    (480, 480, "Filipinas", "country"),
+    (481, 481, "Bielorrusia", "country"),
+    (482, 482, "Ucrania", "country"),
+    (484, 484, "Moldavia", "country"),
+    (485, 485, "Armenia", "country"),
+    (486, 486, "Georgia", "country"),
+    (487, 487, "Kazajistán", "country"),
+    (488, 488, "Tayikistán", "country"),
+    (489, 489, "Hong Kong", "country"),
+    (490, 499, "Japón", "country"),
+    (500, 509, "Reino Unido", "country"),
+    (520, 521, "Grecia", "country"),
+    (528, 528, "Líbano", "country"),
+    (529, 529, "Chipre", "country"),
+    (530, 530, "Albania", "country"),
+    (531, 531, "Macedonia del Norte", "country"),
+    (535, 535, "Malta", "country"),
+    (539, 539, "Irlanda", "country"),
+    (540, 549, "Bélgica/Luxemburgo", "country"),
+    (560, 560, "Portugal", "country"),
+    (569, 569, "Islandia", "country"),
+    (570, 579, "Dinamarca", "country"),
+    (590, 590, "Polonia", "country"),
+    (594, 594, "Rumania", "country"),
+    (599, 599, "Hungría", "country"),
+    (600, 601, "Sudáfrica", "country"),
+    (611, 611, "Marruecos", "country"),
+    (613, 613, "Argelia", "country"),
+    (615, 615, "Nigeria", "country"),
+    (616, 616, "Kenia", "country"),
+    (619, 619, "Túnez", "country"),
+    (622, 622, "Egipto", "country"),
+    (625, 625, "Jordania", "country"),
+    (626, 626, "Irán", "country"),
+    (628, 628, "Arabia Saudita", "country"),
+    (629, 629, "Emiratos Árabes Unidos", "country"),
+    (640, 649, "Finlandia", "country"),
+    (690, 699, "China", "country"),
+    (700, 709, "Noruega", "country"),
+    (729, 729, "Israel", "country"),
+    (730, 739, "Suecia", "country"),
+    (740, 740, "Guatemala", "country"),
+    (741, 741, "El Salvador", "country"),
+    (742, 742, "Honduras", "country"),
+    (743, 743, "Nicaragua", "country"),
+    (744, 744, "Costa Rica", "country"),
+    (745, 745, "Panamá", "country"),
+    (746, 746, "República Dominicana", "country"),
+    (750, 750, "México", "country"),
+    (754, 755, "Canadá", "country"),
+    (759, 759, "Venezuela", "country"),
+    (760, 769, "Suiza", "country"),
+    (770, 771, "Colombia", "country"),
+    (773, 773, "Uruguay", "country"),
+    (775, 775, "Perú", "country"),
+    (777, 777, "Bolivia", "country"),
+    (778, 779, "Argentina", "country"),
+    (780, 780, "Chile", "country"),
+    (784, 784, "Paraguay", "country"),
+    (786, 786, "Ecuador", "country"),
+    (789, 790, "Brasil", "country"),
+    (800, 839, "Italia", "country"),
+    (840, 849, "España", "country"),
+    (850, 850, "Cuba", "country"),
+    (858, 858, "Eslovaquia", "country"),
+    (859, 859, "República Checa", "country"),
+    (860, 860, "Serbia", "country"),
+    (865, 865, "Mongolia", "country"),
+    (867, 867, "Corea del Norte", "country"),
+    (868, 869, "Turquía", "country"),
+    (870, 879, "Países Bajos", "country"),
+    (880, 880, "Corea del Sur", "country"),
+    (884, 884, "Camboya", "country"),
+    (885, 885, "Tailandia", "country"),
+    (888, 888, "Singapur", "country"),
+    (890, 890, "India", "country"),
+    (893, 893, "Vietnam", "country"),
+    (896, 896, "Pakistán", "country"),
+    (899, 899, "Indonesia", "country"),
+    (900, 919, "Austria", "country"),
+    (930, 939, "Australia", "country"),
+    (940, 949, "Nueva Zelanda", "country"),
+    (950, 951, "GS1 Global Office", "special"),
+    (955, 955, "Malasia", "country"),
+    (958, 958, "Macao", "country"),
+    (960, 969, "GS1 Reino Unido (GTIN-8)", "special"),
+    (977, 977, "Publicaciones seriadas (ISSN)", "publication"),
+    (978, 979, "Libros (ISBN)", "publication"),
+    (980, 980, "Recibos de reembolso", "coupon"),
+    (981, 984, "Cupones", "coupon"),
+    (990, 999, "Cupones", "coupon"),
+]
+
+PERU_PREFIX = 775
+
+# Índice de intervalos precompilado (listas paralelas ordenadas por inicio)
+_RANGE_STARTS = [start for start, _, _, _ in GS1_PREFIX_RANGES]
+_RANGE_ENDS = [end for _, end, _, _ in GS1_PREFIX_RANGES]
+_RANGE_LABELS = [(label, kind) for _, _, label, kind in GS1_PREFIX_RANGES]
+
+# Longitudes aceptadas y su formato
+FORMAT_BY_LENGTH = {8: "EAN-8", 12: "UPC-A", 13: "EAN-13", 14: "GTIN-14"}
+
+# Simbologías del lector (tipo de pyzbar o nombre GS1) que fijan el formato de 8 dígitos
+UPCE_SYMBOLOGIES = {"UPCE", "UPC-E"}
+EAN8_SYMBOLOGIES = {"EAN8", "EAN-8"}
+
+
+def lookup_prefix(prefix: int) -> Optional[Tuple[str, str]]:
+    """
+    Busca un prefijo GS1 de tres dígitos en el índice de intervalos
+
+    Returns:
+        Tupla (país/uso, tipo de prefijo) o None si el prefijo no está asignado
+    """
+    idx = bisect_right(_RANGE_STARTS, prefix) - 1
+    if idx >= 0 and prefix <= _RANGE_ENDS[idx]:
+        return _RANGE_LABELS[idx]
+    return None
+
+
+def compute_check_digit(body: str) -> int:
+    """
+    Calcula el dígito de control GS1 (módulo 10) para el cuerpo de un GTIN
+    Los pesos 3 y 1 se alternan empezando por el dígito más a la derecha
+    """
+    total = 0
+    for position, char in enumerate(reversed(body)):
+        digit = ord(char) - 48
+        total += digit * 3 if position % 2 == 0 else digit
+    return (10 - total % 10) % 10
+
+
+def has_valid_check_digit(code: str) -> bool:
+    """
+    Verifica el dígito de control de un EAN-8, UPC-A, EAN-13 o GTIN-14
+    """
+    if not (code.isascii() and code.isdigit()) or len(code) not in FORMAT_BY_LENGTH:
+        return False
+    return compute_check_digit(code[:-1]) == ord(code[-1]) - 48
+
+
+def expand_upce(code: str) -> Optional[str]:
+    """
+    Expande un UPC-E (6, 7 u 8 dígitos) a su UPC-A equivalente de 12 dígitos
+
+    Solo la forma de 8 dígitos trae dígito de control y se verifica; a las
+    formas de 6 y 7 dígitos (sin control) se les calcula, así que cualquier
+    cuerpo con sistema de numeración 0/1 se expande
+
+    Returns:
+        UPC-A expandido o None si el código no es un UPC-E válido
+    """
+    if not (code.isascii() and code.isdigit()):
+        return None
+
+    if len(code) == 6:
+        number_system, body, check = "0", code, None
+    elif len(code) == 7:
+        number_system, body, check = code[0], code[1:], None
+    elif len(code) == 8:
+        number_system, body, check = code[0], code[1:7], code[7]
+    else:
+        return None
+
+    if number_system not in ("0", "1"):
+        return None
+
+    d1, d2, d3, d4, d5, d6 = body
+    if d6 in "012":
+        manufacturer, product = f"{d1}{d2}{d6}00", f"00{d3}{d4}{d5}"
+    elif d6 == "3":
+        manufacturer, product = f"{d1}{d2}{d3}00", f"000{d4}{d5}"
+    elif d6 == "4":
+        manufacturer, product = f"{d1}{d2}{d3}{d4}0", f"0000{d5}"
+    else:
+        manufacturer, product = f"{d1}{d2}{d3}{d4}{d5}", f"0000{d6}"
+
+    upca_body = f"{number_system}{manufacturer}{product}"
+    expected = str(compute_check_digit(upca_body))
+
+    if check is not None and check != expected:
+        return None
+
+    return upca_body + expected
+
+
+def to_gtin13(code: str) -> str:
+    """
+    Normaliza un GTIN-12/13/14 al prefijo GS1 de tres dígitos comparable
+    (UPC-A se completa con un cero a la izquierda, GTIN-14 omite el indicador)
+    """
+    if len(code) == 12:
+        return "0" + code
+    if len(code) == 14:
+        return code[1:]
+    return code
+
+
+def classify_barcode(code: str, symbology: Optional[str] = None) -> Dict:
+    """
+    Valida y clasifica un código de barras en una sola pasada
+
+    Un UPC-E de 6 o 7 dígitos no trae dígito de control: se acepta (entrada
+    manual de lo impreso bajo las barras) con check_digit_verified en False.
+    Los lectores devuelven siempre la forma de 8 dígitos, que sí se verifica
+
+    Un código de 8 dígitos con sistema 0/1 puede ser a la vez un EAN-8 y un
+    UPC-E válidos. La simbología del lector (barcode.type de pyzbar) decide;
+    sin ella se clasifica como EAN-8 y el UPC-A expandido queda en
+    alternate_lookup_code para intentarlo también en la consulta
+
+    Args:
+        code: Código leído o escrito
+        symbology: Simbología informada por el lector ("UPCE", "EAN8", ...) o None
+
+    Returns:
+        Diccionario con formato, validez, si se verificó el dígito de
+        control, GTIN normalizado para consultas, país/uso del prefijo GS1 y
+        si es producto peruano
+    """
+    code = (code or "").strip()
+    symbology = (symbology or "").upper()
+    info = {
+        "barcode": code,
+        "length": len(code),
+        "format": "Unknown",
+        "valid": False,
+        "check_digit_verified": False,
+        "lookup_code": None,
+        "country": "No identificado",
+        "prefix_type": None,
+        "is_peruvian": False,
+    }
+
+    if not (code.isascii() and code.isdigit()):
+        info["error"] = "El código contiene caracteres no numéricos"
+        return info
+
+    lookup_code = None
+    # Con simbología conocida un código de 8 dígitos es solo EAN-8 o solo UPC-E
+    read_as_upce = len(code) == 8 and symbology in UPCE_SYMBOLOGIES
+    read_as_ean8 = len(code) == 8 and symbology in EAN8_SYMBOLOGIES
+    if not read_as_upce and len(code) in FORMAT_BY_LENGTH and has_valid_check_digit(code):
+        info["format"] = FORMAT_BY_LENGTH[len(code)]
+        lookup_code = code
+        if len(code) == 8 and not read_as_ean8:
+            alternate = expand_upce(code)
+            if alternate:
+                info["alternate_lookup_code"] = alternate
+    elif not read_as_ean8:
+        # UPC-E: 6/7 dígitos sin control u 8 dígitos con NS 0/1
+        expanded = expand_upce(code) if len(code) in (6, 7, 8) else None
+        if expanded:
+            info["format"] = "UPC-E"
+            info["expanded_upca"] = expanded
+            lookup_code = expanded
+
+    if lookup_code is None:
+        if len(code) in FORMAT_BY_LENGTH:
+            info["format"] = "UPC-E" if read_as_upce else FORMAT_BY_LENGTH[len(code)]
+            info["error"] = "Dígito de control inválido"
+        else:
+            info["error"] = "Longitud no soportada"
+        return info
+
+    info["valid"] = True
+    info["check_digit_verified"] = len(code) not in (6, 7)
+    info["lookup_code"] = lookup_code
+
+    if len(lookup_code) == 8:
+        # GTIN-8 usa prefijos propios: 0xx/2xx son de circulación restringida
+        prefix = int(lookup_code[:3])
+        if lookup_code[0] in "02":
+            entry = ("Circulación restringida (uso interno)", "restricted")
+        else:
+            entry = lookup_prefix(prefix)
+    else:
+        prefix = int(to_gtin13(lookup_code)[:3])
+        entry = lookup_prefix(prefix)
+
+    if entry:
+        info["country"], info["prefix_type"] = entry
+    info["is_peruvian"] = prefix == PERU_PREFIX
+
+    return info
@@ -0,0 +1,285 @@
+"""
+Parser de comidas en lenguaje natural
+Extrae alimentos, cantidades y unidades de textos como "2 huevos",
+"200 g de arroz" o "media taza de avena". Las frases de alimentos se buscan
+en una sola pasada con un autómata Aho-Corasick por palabras construido
+desde el vocabulario del buscador difuso; los plurales regulares de sus
+palabras ("2 panes") se llevan a la forma del vocabulario antes de buscar.
+"""
+
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from app.ai.food_matcher import FoodMatcher, get_food_matcher, strip_accents
+from app.ai.nutrition_db import get_nutrition_db
+
+_TOKEN = re.compile(r"\d+(?:[.,]\d+)?(?:/\d+)?|[a-z]+")
+
+# Cantidades escritas con palabras (se multiplican: "media docena" = 6)
+NUMBER_WORDS = {
+    "un": 1, "uno": 1, "una": 1, "dos": 2, "tres": 3, "cuatro": 4, "cinco": 5,
+    "seis": 6, "siete": 7, "ocho": 8, "nueve": 9, "diez": 10,
+    "medio": 0.5, "media": 0.5, "cuarto": 0.25, "docena": 12,
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "half": 0.5, "dozen": 12
+}
+
+# Unidades: token → (clave de porción, gramos por unidad o None = porción del alimento)
+# Las claves coinciden con Food.common_portions ({"cup": 240, "slice": 30})
+UNITS: Dict[str, Tuple[str, Optional[float]]] = {}
+for _tokens, _unit in [
+    (("g", "gr", "grs", "gramo", "gramos", "gram", "grams"), ("g", 1)),
+    (("kg", "kilo", "kilos", "kilogramo", "kilogramos"), ("kg", 1000)),
+    (("ml", "mililitro", "mililitros"), ("ml", 1)),
+    (("l", "litro", "litros", "liter", "liters"), ("l", 1000)),
+    (("oz", "onza", "onzas"), ("oz", 28.35)),
+    (("taza", "tazas", "cup", "cups"), ("cup", 240)),
+    (("cucharada", "cucharadas", "tbsp"), ("tbsp", 15)),
+    (("cucharadita", "cucharaditas", "tsp"), ("tsp", 5)),
+    (("vaso", "vasos", "glass"), ("glass", 250)),
+    (("plato", "platos", "plate"), ("plate", 300)),
+    (("rebanada", "rebanadas", "tajada", "tajadas", "slice", "slices"), ("slice", 30)),
+    (("porcion", "porciones", "racion", "raciones", "serving", "servings"), ("serving", None)),
+    (("unidad", "unidades", "pieza", "piezas", "piece", "pieces"), ("piece", None)),
+]:
+    for _token in _tokens:
+        UNITS[_token] = _unit
+
+CONNECTORS = {"de", "del", "of"}
+
+# Palabras frecuentes que no se buscan de forma difusa
+STOPWORDS = {
+    "de", "del", "con", "y", "e", "o", "un", "una", "unos", "unas", "el", "la", "los", "las",
+    "a", "al", "en", "mi", "para", "por", "sin", "mas", "poco", "algo", "otro", "otra",
+    "comi", "tome", "desayune", "almorce", "cene", "hoy", "ayer", "manana", "tarde", "noche",
+    "desayuno", "almuerzo", "cena", "merienda",
+    "with", "and", "or", "of", "the", "some", "my", "for", "no", "ate", "had", "today"
+}
+
+# Longitud mínima de palabra para intentar búsqueda difusa
+FUZZY_MIN_LENGTH = 5
+
+_VOWELS = "aeiou"
+
+
+def plural_forms(word: str) -> List[str]:
+    """
+    Plurales regulares (español e inglés) de una palabra del vocabulario:
+    pan → panes, nuez → nueces, huevo → huevos, tomato → tomatoes,
+    strawberry → strawberries. Palabras cortas o ya en plural no generan formas
+    """
+    if len(word) < 3 or not word.isalpha() or word in STOPWORDS or word.endswith("s"):
+        return []
+    if word.endswith("z"):
+        return [word[:-1] + "ces"]
+    if word.endswith("y") and word[-2] not in _VOWELS:
+        return [word[:-1] + "ies", word + "s"]
+    if word[-1] in _VOWELS:
+        return [word + "s", word + "es"]
+    return [word + "es", word + "s"]
+
+
+@dataclass
+class ParsedFood:
+    """Alimento reconocido en el texto"""
+    name: str                 # Nombre canónico en la base nutricional
+    term: str                 # Frase del texto que coincidió
+    score: float              # 1.0 = frase exacta
+    quantity: float           # Cantidad (unidades o número de porciones)
+    unit: Optional[str]       # Clave de unidad ("g", "cup", ...) o None
+    grams: float              # Gramos estimados con porciones genéricas
+
+    def grams_for(self, portions: Optional[Dict[str, float]] = None) -> float:
+        """Gramos usando las porciones propias del alimento si definen la unidad"""
+        if self.unit and portions and self.unit in portions:
+            return round(self.quantity * portions[self.unit], 1)
+        return self.grams
+
+
+class MealTextParser:
+    """
+    Tokenizador + gramática simple: [cantidad] [unidad] [de] alimento [cantidad unidad]
+    """
+
+    def __init__(self, matcher: FoodMatcher, nutrition_db=None):
+        self.matcher = matcher
+        self.nutrition_db = nutrition_db or get_nutrition_db()
+
+        # Autómata Aho-Corasick sobre secuencias de palabras
+        self._goto: List[Dict[str, int]] = [{}]
+        self._output: List[Optional[Tuple[int, str, str]]] = [None]
+        for term, canonical in matcher.vocabulary().items():
+            node = 0
+            words = term.split()
+            for word in words:
+                next_node = self._goto[node].get(word)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][word] = next_node
+                    self._goto.append({})
+                    self._output.append(None)
+                node = next_node
+            self._output[node] = (len(words), canonical, term)
+
+        # Plurales → palabra del vocabulario, salvo los que ya son palabras propias
+        self._singular: Dict[str, str] = {}
+        vocabulary_words = {word for node in self._goto for word in node}
+        for word in sorted(vocabulary_words):
+            for form in plural_forms(word):
+                if form not in vocabulary_words:
+                    self._singular.setdefault(form, word)
+
+        self._fail = [0] * len(self._goto)
+        self._dict_link = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for word, child in self._goto[node].items():
+                fallback = self._fail[node]
+                while fallback and word not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(word, 0)
+                self._fail[child] = target if target != child else 0
+                failed = self._fail[child]
+                self._dict_link[child] = failed if self._output[failed] else self._dict_link[failed]
+                queue.append(child)
+
+    def tokenize(self, text: str) -> List[str]:
+        """Tokens en minúsculas y sin tildes: números (2, 1.5, 1/2) y palabras"""
+        return _TOKEN.findall(strip_accents(text))
+
+    def _scan(self, words: List[str]) -> List[Tuple[int, int, str, str]]:
+        """Todas las frases del vocabulario como (inicio, fin, nombre, término), con plurales"""
+        goto, fail, output, dict_link = self._goto, self._fail, self._output, self._dict_link
+        singular = self._singular
+        found = []
+        node = 0
+        for i, word in enumerate(words):
+            word = singular.get(word, word)
+            while node and word not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(word, 0)
+
+            hit = node if output[node] else dict_link[node]
+            while hit:
+                length, canonical, term = output[hit]
+                found.append((i - length + 1, i + 1, canonical, term))
+                hit = dict_link[hit]
+        return found
+
+    def _select(self, words: List[str], hits: List[Tuple[int, int, str, str]]):
+        """Coincidencias sin solapamiento (la más a la izquierda y más larga) + difusas"""
+        hits.sort(key=lambda h: (h[0], -(h[1] - h[0])))
+        selected = []
+        covered_until = 0
+        for start, end, canonical, term in hits:
+            if start >= covered_until:
+                selected.append((start, end, canonical, term, 1.0))
+                covered_until = end
+
+        covered = set()
+        for start, end, _, _, _ in selected:
+            covered.update(range(start, end))
+
+        for i, word in enumerate(words):
+            if (i in covered or word in STOPWORDS or word in UNITS or word in NUMBER_WORDS
+                    or len(word) < FUZZY_MIN_LENGTH or not word.isalpha()):
+                continue
+            match = self.matcher.best(word, min_score=0.75)
+            if match:
+                selected.append((i, i + 1, match.name, word, match.score))
+
+        selected.sort()
+        return selected
+
+    def _number(self, token: str) -> Optional[float]:
+        """Valor numérico de un token o None"""
+        if token in NUMBER_WORDS:
+            return NUMBER_WORDS[token]
+        if token[0].isdigit():
+            if "/" in token:
+                numerator, denominator = token.split("/")
+                return float(numerator) / float(denominator) if float(denominator) else None
+            return float(token.replace(",", "."))
+        return None
+
+    def _quantity_before(self, words: List[str], start: int, limit: int):
+        """Cantidad y unidad antes del alimento: [número...] [unidad] [de]"""
+        j = start - 1
+        if j >= limit and words[j] in CONNECTORS:
+            j -= 1
+        unit = None
+        if j >= limit and words[j] in UNITS:
+            unit = UNITS[words[j]]
+            j -= 1
+        quantity = None
+        while j >= limit:
+            value = self._number(words[j])
+            if value is None:
+                break
+            quantity = value * (quantity or 1)
+            j -= 1
+        return quantity, unit
+
+    def _quantity_after(self, words: List[str], end: int, limit: int):
+        """Cantidad y unidad después del alimento ("arroz 200 g"); devuelve tokens usados"""
+        if end + 1 < limit:
+            value = self._number(words[end])
+            unit = UNITS.get(words[end + 1])
+            # Si sigue "de", la cantidad pertenece al alimento siguiente
+            follows_connector = end + 2 < len(words) and words[end + 2] in CONNECTORS
+            if value is not None and unit and not follows_connector:
+                return value, unit, 2
+        return None, None, 0
+
+    def parse(self, text: str) -> List[ParsedFood]:
+        """
+        Reconoce los alimentos del texto con su cantidad en gramos
+
+        Sin cantidad se asume una porción típica; un número sin unidad
+        cuenta porciones ("2 huevos" = 2 × porción de huevo)
+        """
+        words = self.tokenize(text)
+        if not words:
+            return []
+
+        selected = self._select(words, self._scan(words))
+        parsed = []
+        limit = 0
+
+        for index, (start, end, canonical, term, score) in enumerate(selected):
+            next_start = selected[index + 1][0] if index + 1 < len(selected) else len(words)
+
+            quantity, unit = self._quantity_before(words, start, limit)
+            consumed = 0
+            if quantity is None and unit is None:
+                quantity, unit, consumed = self._quantity_after(words, end, next_start)
+            limit = end + consumed
+
+            serving = self.nutrition_db.serving_weight(canonical)
+            unit_key, unit_grams = unit if unit else (None, None)
+            amount = float(quantity) if quantity is not None else 1.0
+            grams = amount * (unit_grams if unit_grams is not None else serving)
+
+            parsed.append(ParsedFood(
+                name=canonical,
+                term=term,
+                score=score,
+                quantity=amount,
+                unit=unit_key,
+                grams=round(grams, 1)
+            ))
+
+        return parsed
+
+
+_meal_parser: Optional[MealTextParser] = None
+
+
+def get_meal_parser() -> MealTextParser:
+    """Obtener el parser del proceso (se construye bajo demanda)"""
+    global _meal_parser
+    if _meal_parser is None:
+        _meal_parser = MealTextParser(get_food_matcher())
+    return _meal_parser
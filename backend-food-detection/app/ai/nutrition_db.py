@@ -0,0 +1,273 @@
+"""
+Base de datos nutricional columnar
+Compila un CSV estilo USDA (valores por 100g) a un archivo binario con una
+columna float32 por nutriente y un índice nombre → fila. Cada worker mapea
+el archivo en memoria de solo lectura, así las páginas se comparten entre procesos.
+
+Formato del archivo:
+    MAGIC (8 bytes) | largo del encabezado (uint32) | encabezado JSON |
+    columnas float32 en el orden del encabezado, cada una alineada a 64 bytes
+"""
+
+import csv
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+DEFAULT_SOURCE = DATA_DIR / "foods.csv"
+
+MAGIC = b"NUTRDB1\x00"
+ALIGNMENT = 64
+
+# Columnas numéricas del CSV (por 100g, sodio en mg, porción típica en g)
+NUTRIENT_COLUMNS = ("calories", "protein", "carbs", "fat", "fiber", "sugar", "sodium", "serving_g")
+
+# Columnas que se devuelven como información nutricional
+NUTRITION_FIELDS = ("calories", "protein", "carbs", "fat", "fiber")
+
+
+def normalize_food_name(name: str) -> str:
+    """Normaliza un nombre de alimento a la clave del índice"""
+    return name.strip().lower().replace(" ", "_")
+
+
+def compile_nutrition_db(source_path: Path, output_path: Path) -> int:
+    """
+    Compila el CSV de alimentos al formato binario columnar
+
+    La escritura es atómica (archivo temporal + os.replace) para que varios
+    workers puedan compilar a la vez sin leer un archivo a medias
+
+    Returns:
+        Número de alimentos compilados
+    """
+    names: List[str] = []
+    aliases: Dict[str, int] = {}
+    categories: List[str] = []
+    columns: Dict[str, List[float]] = {column: [] for column in NUTRIENT_COLUMNS}
+
+    with open(source_path, newline="", encoding="utf-8") as source:
+        for record in csv.DictReader(source):
+            row = len(names)
+            names.append(normalize_food_name(record["name"]))
+            categories.append(record.get("category", ""))
+            # Nombre en español y sinónimos separados por "|"
+            synonyms = [record.get("name_es") or ""] + (record.get("aliases") or "").split("|")
+            for synonym in synonyms:
+                if synonym.strip():
+                    aliases.setdefault(normalize_food_name(synonym), row)
+            for column in NUTRIENT_COLUMNS:
+                value = record.get(column)
+                columns[column].append(float(value) if value not in (None, "") else 0.0)
+
+    rows = len(names)
+    column_bytes = {column: struct.pack(f"<{rows}f", *values) for column, values in columns.items()}
+
+    header = {
+        "version": 1,
+        "rows": rows,
+        "columns": list(NUTRIENT_COLUMNS),
+        "names": names,
+        "aliases": aliases,
+        "categories": categories
+    }
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=output_path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            out.write(MAGIC)
+            out.write(struct.pack("<I", len(header_bytes)))
+            out.write(header_bytes)
+            for column in NUTRIENT_COLUMNS:
+                out.write(b"\x00" * (_align(out.tell()) - out.tell()))
+                out.write(column_bytes[column])
+        os.replace(tmp_path, output_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    logger.info(f"Base nutricional compilada: {rows} alimentos → {output_path}")
+    return rows
+
+
+def _align(offset: int) -> int:
+    """Redondea un offset al múltiplo de ALIGNMENT siguiente"""
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+class NutritionDatabase:
+    """
+    Base nutricional mapeada en memoria (solo lectura)
+
+    Con NumPy las consultas por lote usan indexación vectorizada;
+    sin NumPy las columnas se leen como memoryview del mismo mapeo
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"Archivo de base nutricional inválido: {self.path}")
+
+        header_start = len(MAGIC) + 4
+        (header_len,) = struct.unpack("<I", self._mmap[len(MAGIC):header_start])
+        header = json.loads(self._mmap[header_start:header_start + header_len].decode("utf-8"))
+
+        self.rows: int = header["rows"]
+        self.names: List[str] = header["names"]
+        self.categories: List[str] = header["categories"]
+        self.aliases: Dict[str, int] = header["aliases"]
+        self._index: Dict[str, int] = {name: row for row, name in enumerate(self.names)}
+        for alias, row in self.aliases.items():
+            self._index.setdefault(alias, row)
+
+        self._columns = {}
+        offset = header_start + header_len
+        for column in header["columns"]:
+            offset = _align(offset)
+            if NUMPY_AVAILABLE:
+                self._columns[column] = np.frombuffer(self._mmap, dtype="<f4", count=self.rows, offset=offset)
+            else:
+                self._columns[column] = memoryview(self._mmap)[offset:offset + 4 * self.rows].cast("f")
+            offset += 4 * self.rows
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __contains__(self, name: str) -> bool:
+        return normalize_food_name(name) in self._index
+
+    def row_of(self, name: str) -> Optional[int]:
+        """Fila de un alimento por nombre (inglés, español o sinónimo) o None"""
+        return self._index.get(normalize_food_name(name))
+
+    def rows_of(self, names: Iterable[str]) -> List[int]:
+        """Filas de varios alimentos; -1 para los no encontrados"""
+        index = self._index
+        return [index.get(normalize_food_name(name), -1) for name in names]
+
+    def get(self, name: str) -> Optional[Dict[str, float]]:
+        """Información nutricional por 100g de un alimento"""
+        row = self.row_of(name)
+        if row is None:
+            return None
+        return {field: round(float(self._columns[field][row]), 2) for field in NUTRITION_FIELDS}
+
+    def serving_weight(self, name: str, default: float = 100) -> float:
+        """Peso de una porción típica en gramos"""
+        row = self.row_of(name)
+        if row is None:
+            return default
+        return float(self._columns["serving_g"][row])
+
+    def per_100g(self, names: Sequence[str], columns: Sequence[str] = NUTRITION_FIELDS):
+        """
+        Valores por 100g de muchos alimentos a la vez
+
+        Returns:
+            Con NumPy, matriz (len(names), len(columns)) con NaN en filas no encontradas;
+            sin NumPy, lista de listas con None en filas no encontradas
+        """
+        rows = self.rows_of(names)
+
+        if NUMPY_AVAILABLE:
+            row_idx = np.asarray(rows, dtype=np.intp)
+            safe_idx = np.maximum(row_idx, 0)
+            values = np.empty((len(rows), len(columns)), dtype=np.float64)
+            for i, column in enumerate(columns):
+                values[:, i] = self._columns[column][safe_idx]
+            values[row_idx < 0] = np.nan
+            return values
+
+        return [
+            [float(self._columns[c][row]) for c in columns] if row >= 0 else None
+            for row in rows
+        ]
+
+    def totals(self, names: Sequence[str], grams: Sequence[float],
+               columns: Sequence[str] = NUTRITION_FIELDS) -> Dict[str, float]:
+        """
+        Suma de nutrientes para una lista de alimentos y cantidades en gramos
+        Los alimentos no encontrados se ignoran
+        """
+        if NUMPY_AVAILABLE:
+            values = self.per_100g(names, columns)
+            factors = np.asarray(grams, dtype=np.float64)[:, None] / 100
+            sums = np.nansum(values * factors, axis=0)
+            return {column: round(float(total), 2) for column, total in zip(columns, sums)}
+
+        sums = [0.0] * len(columns)
+        for values, amount in zip(self.per_100g(names, columns), grams):
+            if values is None:
+                continue
+            for i, value in enumerate(values):
+                sums[i] += value * amount / 100
+        return {column: round(total, 2) for column, total in zip(columns, sums)}
+
+
+def _resolve_paths():
+    """Rutas del CSV fuente y del archivo compilado"""
+    source = Path(settings.NUTRITION_DB_SOURCE) if settings.NUTRITION_DB_SOURCE else DEFAULT_SOURCE
+    if settings.NUTRITION_DB_PATH:
+        return source, Path(settings.NUTRITION_DB_PATH)
+    return source, source.with_suffix(".nutdb")
+
+
+def _is_stale(source: Path, compiled: Path) -> bool:
+    """El archivo compilado falta o es más antiguo que el CSV"""
+    return not compiled.exists() or compiled.stat().st_mtime < source.stat().st_mtime
+
+
+_nutrition_db: Optional[NutritionDatabase] = None
+
+
+def get_nutrition_db() -> NutritionDatabase:
+    """
+    Obtener la base nutricional del proceso (se compila si falta o está desactualizada)
+    Si el directorio de datos es de solo lectura se compila en el directorio temporal
+    """
+    global _nutrition_db
+    if _nutrition_db is not None:
+        return _nutrition_db
+
+    source, compiled = _resolve_paths()
+    if _is_stale(source, compiled):
+        try:
+            compile_nutrition_db(source, compiled)
+        except OSError as e:
+            compiled = Path(tempfile.gettempdir()) / compiled.name
+            logger.warning(f"No se pudo escribir la base nutricional ({e}), usando {compiled}")
+            if _is_stale(source, compiled):
+                compile_nutrition_db(source, compiled)
+
+    _nutrition_db = NutritionDatabase(compiled)
+    return _nutrition_db
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    source_path, output_path = _resolve_paths()
+    count = compile_nutrition_db(source_path, output_path)
+    print(f"✅ {count} alimentos compilados en {output_path}")
@@ -0,0 +1,293 @@
+"""
+Motor local de recomendaciones nutricionales.
+Calcula necesidades calóricas, distribución de macronutrientes y horarios de comida
+a partir del análisis corporal y los datos del usuario, sin llamadas a Gemini.
+Las fórmulas base (Mifflin-St Jeor, multiplicadores de actividad y ajuste por objetivo)
+son las mismas que usa el motor adaptativo.
+"""
+
+import re
+import logging
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BMR = 1800.0  # Valor por defecto cuando faltan edad, altura o sexo
+DEFAULT_WEIGHT = 70.0  # Peso por defecto (kg)
+
+ACTIVITY_MULTIPLIERS = {
+    "sedentary": 1.2,
+    "light": 1.375,
+    "moderate": 1.55,
+    "active": 1.725,
+    "very_active": 1.9
+}
+
+GOAL_CALORIE_ADJUSTMENTS = {
+    "lose_weight": -500,    # Déficit de 500 cal (aprox 0.5kg/semana)
+    "maintain": 0,          # Mantenimiento
+    "gain_weight": 300,     # Superávit de 300 cal
+    "gain_muscle": 200      # Superávit moderado para ganancia muscular
+}
+
+# Proteína (g/kg) y porcentaje de grasa según objetivo
+PROTEIN_PER_KG = {
+    "lose_weight": 2.0,
+    "maintain": 1.6,
+    "gain_weight": 1.6,
+    "gain_muscle": 1.8
+}
+FAT_PERCENTAGE = {
+    "lose_weight": 0.25,
+    "maintain": 0.30,
+    "gain_weight": 0.30,
+    "gain_muscle": 0.25
+}
+
+# Valores del formulario (español) a claves internas
+GENDER_ALIASES = {
+    "male": "male", "masculino": "male", "hombre": "male", "m": "male",
+    "female": "female", "femenino": "female", "mujer": "female", "f": "female"
+}
+ACTIVITY_ALIASES = {
+    "sedentary": "sedentary", "sedentario": "sedentary",
+    "light": "light", "ligero": "light", "leve": "light",
+    "moderate": "moderate", "moderado": "moderate",
+    "active": "active", "activo": "active", "intenso": "active",
+    "very_active": "very_active", "muy activo": "very_active", "muy_activo": "very_active"
+}
+
+
+def mifflin_st_jeor_bmr(weight: float, height: Optional[float], age: Optional[int],
+                        gender: Optional[str]) -> float:
+    """Calcular BMR usando ecuación de Mifflin-St Jeor"""
+    if not age or not height or not gender:
+        return DEFAULT_BMR
+
+    if gender == "male":
+        return 10 * weight + 6.25 * height - 5 * age + 5
+    return 10 * weight + 6.25 * height - 5 * age - 161
+
+
+def katch_mcardle_bmr(weight: float, body_fat_percentage: float) -> float:
+    """Calcular BMR a partir de la masa magra (Katch-McArdle)"""
+    lean_mass = weight * (1 - body_fat_percentage / 100)
+    return 370 + 21.6 * lean_mass
+
+
+def activity_multiplier(activity_level: Optional[str]) -> float:
+    """Obtener multiplicador de actividad"""
+    return ACTIVITY_MULTIPLIERS.get(activity_level, 1.55)
+
+
+def adaptive_calorie_target(goal: Optional[str], estimated_tdee: float) -> float:
+    """Calcular calorías objetivo según el objetivo, con límites de seguridad"""
+    adjustment = GOAL_CALORIE_ADJUSTMENTS.get(goal, 0)
+    calories = estimated_tdee + adjustment
+
+    min_calories = max(1200, estimated_tdee * 0.7)  # No menos del 70% del TDEE
+    max_calories = estimated_tdee * 1.3  # No más del 130% del TDEE
+
+    return round(max(min_calories, min(calories, max_calories)))
+
+
+def parse_body_fat(value) -> Optional[float]:
+    """
+    Extrae el porcentaje de grasa de textos como '15-20%' o '18 (simulación)'
+    Devuelve el punto medio del rango o None si no hay números
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+
+    numbers = [float(n) for n in re.findall(r"\d+(?:[.,]\d+)?", value.replace(",", "."))]
+    numbers = [n for n in numbers if 3 <= n <= 60]
+    if not numbers:
+        return None
+    return sum(numbers[:2]) / len(numbers[:2])
+
+
+class NutritionRecommendationEngine:
+    """
+    Motor determinista de recomendaciones nutricionales
+    Produce la misma estructura que antes generaba Gemini en una segunda llamada
+    """
+
+    def recommend(self, body_analysis: Dict, user_info: Dict = None) -> Dict:
+        """
+        Genera recomendaciones nutricionales a partir del análisis corporal
+
+        Args:
+            body_analysis: Resultado de BodyAnalyzer (clave 'analysis')
+            user_info: Datos del formulario (edad, altura, peso, sexo, actividad)
+
+        Returns:
+            Recomendaciones con necesidades calóricas, macros y horarios
+        """
+        user_info = user_info or {}
+        composition = (body_analysis or {}).get("body_composition", {})
+        assumptions = []
+
+        weight = user_info.get("weight")
+        height = user_info.get("height")
+        age = user_info.get("age")
+        gender = GENDER_ALIASES.get(str(user_info.get("gender", "")).strip().lower())
+        activity = ACTIVITY_ALIASES.get(str(user_info.get("activity_level", "")).strip().lower())
+
+        if not weight:
+            if height:
+                weight = round(22 * (height / 100) ** 2, 1)  # Peso con IMC 22
+                assumptions.append("Peso estimado a partir de la altura (IMC 22)")
+            else:
+                weight = DEFAULT_WEIGHT
+                assumptions.append(f"Peso no proporcionado, se asumen {DEFAULT_WEIGHT:.0f} kg")
+        if not activity:
+            activity = "moderate"
+            assumptions.append("Nivel de actividad no indicado, se asume moderado")
+
+        body_fat = parse_body_fat(composition.get("estimated_body_fat_percentage"))
+
+        # BMR: masa magra si hay estimación de grasa, Mifflin-St Jeor si no
+        if body_fat is not None:
+            bmr = katch_mcardle_bmr(weight, body_fat)
+            bmr_method = "katch_mcardle"
+        elif not age or not height or not gender:
+            bmr = DEFAULT_BMR
+            bmr_method = "default"
+            assumptions.append("Faltan edad, altura o sexo; BMR por defecto")
+        else:
+            bmr = mifflin_st_jeor_bmr(weight, height, age, gender)
+            bmr_method = "mifflin_st_jeor"
+
+        tdee = bmr * activity_multiplier(activity)
+        goal = self._determine_goal(composition, body_fat, gender)
+        daily_calories = adaptive_calorie_target(goal, tdee)
+
+        macros = self._macro_split(daily_calories, weight, goal)
+        meal_timing = self._meal_timing(daily_calories, weight, activity)
+
+        return {
+            "caloric_needs": {
+                "daily_calories": f"{daily_calories:.0f}",
+                "bmr_estimate": f"{bmr:.0f}",
+                "activity_calories": f"{tdee - bmr:.0f}",
+                "maintenance_calories": f"{tdee:.0f}"
+            },
+            "macronutrient_distribution": macros,
+            "meal_timing": meal_timing,
+            "targets": {
+                "calories": daily_calories,
+                "protein_g": macros["proteins"]["grams"],
+                "carbs_g": macros["carbohydrates"]["grams"],
+                "fat_g": macros["fats"]["grams"],
+                "goal": goal
+            },
+            "specific_recommendations": self._specific_recommendations(goal, macros),
+            "foods_to_prioritize": [
+                "Quinua (superalimento peruano)",
+                "Pescados del Pacífico",
+                "Legumbres (lentejas, frejoles, pallares)",
+                "Verduras de estación"
+            ],
+            "foods_to_limit": [
+                "Alimentos ultraprocesados",
+                "Bebidas azucaradas",
+                "Frituras excesivas"
+            ],
+            "supplements_consideration": [
+                "Vitamina D (consultar médico)",
+                "Omega-3 si no consume pescado regularmente"
+            ],
+            "weekly_goals": self._weekly_goals(goal),
+            "calculation": {
+                "source": "local_engine",
+                "bmr_method": bmr_method,
+                "activity_level": activity,
+                "activity_multiplier": activity_multiplier(activity),
+                "weight_used": weight,
+                "body_fat_used": body_fat,
+                "assumptions": assumptions
+            }
+        }
+
+    def _determine_goal(self, composition: Dict, body_fat: Optional[float],
+                        gender: Optional[str]) -> str:
+        """Determinar el objetivo a partir de la composición corporal"""
+        muscle_level = str(composition.get("muscle_mass_level", "")).lower()
+
+        if body_fat is not None:
+            high_fat = 32 if gender == "female" else 25
+            if body_fat >= high_fat:
+                return "lose_weight"
+        if "bajo" in muscle_level or "low" in muscle_level:
+            return "gain_muscle"
+        return "maintain"
+
+    def _macro_split(self, calories: float, weight: float, goal: str) -> Dict:
+        """Distribución de macronutrientes: proteína por kg, grasa por %, resto carbohidratos"""
+        protein_g = PROTEIN_PER_KG[goal] * weight
+        # La proteína no debe superar el 35% de las calorías
+        protein_g = min(protein_g, calories * 0.35 / 4)
+        fat_g = calories * FAT_PERCENTAGE[goal] / 9
+        carbs_g = max(0.0, (calories - protein_g * 4 - fat_g * 9) / 4)
+
+        def block(grams: float, kcal_per_g: int, sources: list) -> Dict:
+            return {
+                "percentage": f"{grams * kcal_per_g / calories * 100:.0f}%",
+                "grams_per_day": f"{grams:.0f}g",
+                "grams": round(grams),
+                "sources": sources
+            }
+
+        return {
+            "proteins": block(protein_g, 4, ["pollo", "pescado", "huevos", "quinua", "legumbres"]),
+            "carbohydrates": block(carbs_g, 4, ["arroz integral", "quinua", "camote", "avena", "frutas"]),
+            "fats": block(fat_g, 9, ["palta", "frutos secos", "aceite de oliva", "pescado graso"])
+        }
+
+    def _meal_timing(self, calories: float, weight: float, activity: str) -> Dict:
+        """Frecuencia de comidas, timing alrededor del entrenamiento e hidratación"""
+        meals = "3-4 comidas" if calories < 1800 else "4-5 comidas"
+        water_l = weight * 0.035 + (0.5 if activity in ("active", "very_active") else 0)
+
+        return {
+            "meals_per_day": meals,
+            "pre_workout": "Carbohidratos de fácil digestión 30-60 min antes",
+            "post_workout": f"{max(20, round(weight * 0.3))}g de proteína + carbohidratos dentro de 2 horas",
+            "hydration": f"{water_l:.1f} litros de agua diarios"
+        }
+
+    def _specific_recommendations(self, goal: str, macros: Dict) -> list:
+        """Recomendaciones concretas según objetivo"""
+        protein_meal = round(macros["proteins"]["grams"] / 4)
+        recommendations = [
+            f"Incluir unos {protein_meal}g de proteína en cada comida principal",
+            "Consumir 5 porciones de frutas y verduras",
+            "Elegir carbohidratos integrales"
+        ]
+        if goal == "lose_weight":
+            recommendations.append("Priorizar alimentos saciantes y con alta fibra")
+        elif goal == "gain_muscle":
+            recommendations.append("Combinar el superávit calórico con entrenamiento de fuerza")
+        else:
+            recommendations.append("Mantener horarios regulares de comida")
+        return recommendations
+
+    def _weekly_goals(self, goal: str) -> list:
+        """Objetivos semanales medibles"""
+        weight_goal = {
+            "lose_weight": "Perder entre 0.3 y 0.7 kg por semana",
+            "gain_muscle": "Ganar entre 0.1 y 0.25 kg por semana",
+            "gain_weight": "Ganar entre 0.25 y 0.5 kg por semana",
+            "maintain": "Mantener el peso dentro de ±0.5 kg"
+        }[goal]
+        return [
+            weight_goal,
+            "Preparar comidas saludables 5 días a la semana",
+            "Incluir 3 porciones de pescado semanales"
+        ]
+
+
+# Instancia global del motor de recomendaciones
+nutrition_engine = NutritionRecommendationEngine()
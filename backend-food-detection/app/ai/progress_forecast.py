@@ -0,0 +1,168 @@
+"""
+Pronóstico de peso
+Ajusta una recta robusta (Huber por mínimos cuadrados reponderados) a la
+tendencia de peso de las últimas semanas y la combina con un balance
+energético: el gasto estimado es la ingesta media menos la pendiente en
+calorías (1 kg ≈ KCAL_PER_KG kcal), así que otra ingesta planificada cambia
+la pendiente en (ingesta planificada - ingesta media) / KCAL_PER_KG.
+
+Las bandas de confianza de todos los horizontes y niveles salen de una sola
+operación sobre arreglos (niveles × horizontes).
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+# Calorías por kg de peso corporal (balance energético)
+KCAL_PER_KG = 7700
+
+# Constante de Huber (en desvíos robustos) e iteraciones de reponderación
+HUBER_K = 1.345
+ROBUST_ITERATIONS = 8
+
+# Registros mínimos para ajustar la recta
+MIN_FIT_POINTS = 5
+
+# Horizontes por defecto (días) y niveles de las bandas con su cuantil normal
+DEFAULT_HORIZONS = (7, 14, 28)
+MAX_HORIZON_DAYS = 365
+CONFIDENCE_LEVELS = {0.8: 1.2816, 0.95: 1.96}
+
+
+@dataclass
+class ForecastModel:
+    """Parámetros ajustados; el día 0 es el último registro (origin)"""
+    origin: int                 # día ordinal del último registro
+    level: float                # tendencia ajustada en el origen (kg)
+    slope: float                # kg por día
+    level_var: float
+    slope_var: float
+    covariance: float
+    noise: float                # varianza del peso alrededor de la tendencia (kg²)
+    points: int
+    avg_intake: Optional[float] = None
+    intake_days: int = 0
+
+    @property
+    def weekly_change(self) -> float:
+        return self.slope * 7
+
+    @property
+    def tdee(self) -> Optional[float]:
+        """Gasto estimado por balance energético"""
+        if self.avg_intake is None:
+            return None
+        return self.avg_intake - self.slope * KCAL_PER_KG
+
+    @property
+    def confidence(self) -> float:
+        """Certeza de la pendiente: cambio semanal / (cambio semanal + su error estándar)"""
+        slope_se = np.sqrt(max(self.slope_var, 0.0)) * 7
+        spread = abs(self.weekly_change) + slope_se
+        return float(abs(self.weekly_change) / spread) if spread > 0 else 0.0
+
+
+def _weighted_line(x: np.ndarray, y: np.ndarray, weights: np.ndarray):
+    """Mínimos cuadrados ponderados: (a, b, inversa de X'WX o None si es singular)"""
+    sw, swx, swy = weights.sum(), weights @ x, weights @ y
+    swxx, swxy = weights @ (x * x), weights @ (x * y)
+    det = sw * swxx - swx * swx
+    if det <= 0:
+        return float(swy / sw), 0.0, None
+    b = (sw * swxy - swx * swy) / det
+    a = (swy - b * swx) / sw
+    return float(a), float(b), np.array([[swxx, -swx], [-swx, sw]]) / det
+
+
+def robust_linear_fit(x: np.ndarray, y: np.ndarray):
+    """
+    Recta y = a + b·x con pesos de Huber
+
+    Returns:
+        (a, b, covarianza 2×2 de (a, b))
+    """
+    weights = np.ones(len(x))
+    a, b, inverse = _weighted_line(x, y, weights)
+    for _ in range(ROBUST_ITERATIONS):
+        if inverse is None:
+            break
+        residuals = y - a - b * x
+        scale = 1.4826 * np.median(np.abs(residuals - np.median(residuals)))
+        if scale <= 0:
+            break
+        new_weights = np.minimum(1.0, HUBER_K * scale / np.maximum(np.abs(residuals), 1e-12))
+        if np.allclose(new_weights, weights, atol=1e-6):
+            break
+        weights = new_weights
+        a, b, inverse = _weighted_line(x, y, weights)
+
+    if inverse is None:
+        return a, 0.0, np.zeros((2, 2))
+    residuals = y - a - b * x
+    sigma2 = float(weights @ (residuals * residuals)) / max(len(x) - 2, 1)
+    return a, b, sigma2 * inverse
+
+
+def fit_forecast(days: Sequence[int], trend_weights: Sequence[float], noise: float = 0.0,
+                 intakes: Optional[Sequence[float]] = None) -> Optional[ForecastModel]:
+    """
+    Ajustar el modelo a la tendencia de peso y la ingesta del período
+
+    Args:
+        days: día ordinal de cada valor de tendencia, en orden creciente
+        trend_weights: tendencia de peso en esos días
+        noise: varianza del peso medido alrededor de la tendencia
+        intakes: calorías de los días con comidas registradas
+    """
+    if len(trend_weights) < MIN_FIT_POINTS:
+        return None
+
+    origin = int(days[-1])
+    x = np.asarray(days, dtype=float) - origin
+    level, slope, covariance = robust_linear_fit(x, np.asarray(trend_weights, dtype=float))
+
+    intake_values = np.asarray(intakes if intakes is not None else (), dtype=float)
+    return ForecastModel(
+        origin=origin,
+        level=level,
+        slope=slope,
+        level_var=float(covariance[0, 0]),
+        slope_var=float(covariance[1, 1]),
+        covariance=float(covariance[0, 1]),
+        noise=max(float(noise or 0.0), 0.0),
+        points=len(x),
+        avg_intake=float(intake_values.mean()) if len(intake_values) else None,
+        intake_days=len(intake_values),
+    )
+
+
+def planned_slope(model: ForecastModel, planned_intake: Optional[float] = None) -> float:
+    """Pendiente (kg/día) con otra ingesta diaria: se corre en la diferencia con la media / KCAL_PER_KG"""
+    if planned_intake is None or model.avg_intake is None:
+        return model.slope
+    return model.slope + (planned_intake - model.avg_intake) / KCAL_PER_KG
+
+
+def project(model: ForecastModel, horizons: Sequence[int] = DEFAULT_HORIZONS,
+            planned_intake: Optional[float] = None) -> Dict[str, np.ndarray]:
+    """
+    Peso proyectado y bandas para varios horizontes
+
+    Args:
+        horizons: días desde el último registro
+        planned_intake: calorías diarias previstas (por defecto, la ingesta media)
+
+    Returns:
+        horizons, weight (por horizonte) y bands (niveles × 2 × horizontes:
+        límite inferior y superior de cada nivel de CONFIDENCE_LEVELS)
+    """
+    h = np.clip(np.asarray(horizons, dtype=float), 1, MAX_HORIZON_DAYS)
+    weight = model.level + planned_slope(model, planned_intake) * h
+    variance = model.level_var + h * h * model.slope_var + 2 * h * model.covariance + model.noise
+    spread = np.sqrt(np.maximum(variance, 0.0))
+
+    z = np.fromiter(CONFIDENCE_LEVELS.values(), dtype=float)
+    bands = weight + np.array([-1.0, 1.0])[None, :, None] * z[:, None, None] * spread[None, None, :]
+    return {"horizons": h.astype(int), "weight": weight, "bands": bands}
@@ -0,0 +1,199 @@
+"""
+Cohortes sintéticas para probar el TDEE adaptativo
+Genera usuarios con perfil realista (columnas de User) y un TDEE real que
+cambia con su peso (Mifflin-St Jeor × actividad real × metabolismo
+individual; la actividad declarada no siempre coincide con la real).
+La ingesta diaria varía alrededor del objetivo, con más calorías el fin de
+semana; se registra con subregistro, días sueltos sin registro y bloques de
+vacaciones. Los pesajes siguen el balance energético real con ruido de
+balanza y lecturas atípicas. Cada lote se genera con NumPy y guarda la
+verdad de cada usuario junto a sus registros.
+"""
+
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.ai.nutrition_engine import ACTIVITY_MULTIPLIERS, GOAL_CALORIE_ADJUSTMENTS
+from app.ai.tdee_core import CALORIES_PER_KG, IntakeDay, WeightPoint
+
+# Proporción de usuarios por nivel de actividad y por objetivo
+ACTIVITY_SHARES = {"sedentary": 0.3, "light": 0.3, "moderate": 0.25, "active": 0.1, "very_active": 0.05}
+GOAL_SHARES = {"lose_weight": 0.5, "maintain": 0.3, "gain_weight": 0.1, "gain_muscle": 0.1}
+
+# Variación del metabolismo entre personas con el mismo perfil
+METABOLISM_SD = 0.08
+
+# Usuarios cuya actividad real está un nivel por encima o por debajo de la declarada
+ACTIVITY_MISREPORT = 0.4
+
+# Variación diaria de lo que se come y exceso del fin de semana
+INTAKE_DAILY_SD = 0.15
+WEEKEND_EXTRA = 0.10
+
+# Subregistro de calorías por usuario (media y desvío)
+UNDERREPORT_MEAN = 0.05
+UNDERREPORT_SD = 0.07
+
+# Constancia del registro (Beta) y usuarios con un bloque de días sin registrar
+ADHERENCE_BETA = (8, 2)
+VACATION_SHARE = 0.2
+VACATION_DAYS = (3, 10)
+
+# Frecuencia de pesaje (probabilidad diaria) y proporción de usuarios de cada tipo
+WEIGH_IN_RATES = {0.9: 0.3, 0.5: 0.45, 0.2: 0.25}
+
+# Ruido de la balanza por usuario (kg) y lecturas atípicas
+SCALE_SD_RANGE = (0.3, 0.9)
+OUTLIER_RATE = 0.01
+OUTLIER_KG = 3.0
+
+
+@dataclass
+class SyntheticUser:
+    """Un usuario sintético: perfil, registros y verdad"""
+    profile: Dict[str, Any]  # columnas de User
+    true_tdee: float  # TDEE real el último día
+    true_weekly_change: float  # kg por semana reales en las últimas dos semanas
+    intake: List[IntakeDay]  # solo días con registro (calorías registradas)
+    weights: List[WeightPoint]  # pesajes de la balanza
+
+
+@dataclass
+class CohortBatch:
+    """Lote de usuarios como arreglos (usuarios × días) más sus perfiles"""
+    start: date
+    profiles: List[Dict[str, Any]]
+    true_tdee: np.ndarray
+    true_weight: np.ndarray
+    logged_intake: np.ndarray  # NaN sin registro
+    readings: np.ndarray  # NaN sin pesaje
+
+    @property
+    def days(self) -> List[date]:
+        return [self.start + timedelta(days=offset) for offset in range(self.true_tdee.shape[1])]
+
+    def weekly_change(self, window: int = 14) -> np.ndarray:
+        """Cambio de peso real (kg por semana) en las últimas `window` jornadas"""
+        window = min(window, self.true_weight.shape[1] - 1)
+        return (self.true_weight[:, -1] - self.true_weight[:, -1 - window]) / window * 7
+
+    def users(self) -> List[SyntheticUser]:
+        days = self.days
+        weekly = self.weekly_change()
+        users = []
+        for position, profile in enumerate(self.profiles):
+            intake_row = self.logged_intake[position]
+            weight_row = self.readings[position]
+            users.append(SyntheticUser(
+                profile=profile,
+                true_tdee=float(self.true_tdee[position, -1]),
+                true_weekly_change=float(weekly[position]),
+                intake=[IntakeDay(days[day], float(intake_row[day])) for day in np.flatnonzero(~np.isnan(intake_row))],
+                weights=[WeightPoint(days[day], float(weight_row[day])) for day in np.flatnonzero(~np.isnan(weight_row))],
+            ))
+        return users
+
+    def rows(self, first_id: int) -> Tuple[List[dict], List[dict], List[dict]]:
+        """Filas para users, daily_stats y weight_entries (ids desde first_id)"""
+        days = self.days
+        users, daily_stats, weight_entries = [], [], []
+        for position, profile in enumerate(self.profiles):
+            user_id = first_id + position
+            users.append({
+                "id": user_id, "email": f"synthetic{user_id}@example.com", "hashed_password": "-",
+                "full_name": f"Usuario sintético {user_id}", **profile
+            })
+            for day in np.flatnonzero(~np.isnan(self.logged_intake[position])):
+                daily_stats.append({
+                    "user_id": user_id, "date": days[day], "meal_count": 3,
+                    "consumed_calories": float(self.logged_intake[position, day]),
+                })
+            for day in np.flatnonzero(~np.isnan(self.readings[position])):
+                weight_entries.append({
+                    "user_id": user_id, "date": days[day], "weight": float(self.readings[position, day]),
+                    "source": "estimated",
+                })
+        return users, daily_stats, weight_entries
+
+
+def _choice(rng: np.random.Generator, shares: Dict[Any, float], size: int) -> np.ndarray:
+    keys = list(shares)
+    return np.array(keys, dtype=object)[rng.choice(len(keys), size, p=list(shares.values()))]
+
+
+def generate_batch(rng: np.random.Generator, size: int, days: int, end: date) -> CohortBatch:
+    """Un lote de `size` usuarios con `days` días de historial que termina en `end`"""
+    start = end - timedelta(days=days - 1)
+
+    # Perfiles
+    male = rng.random(size) < 0.5
+    age = rng.integers(18, 66, size)
+    height = np.where(male, rng.normal(176, 7, size), rng.normal(163, 6.5, size))
+    bmi = np.exp(rng.normal(np.log(26), 0.15, size))
+    weight = bmi * (height / 100) ** 2
+    activity = _choice(rng, ACTIVITY_SHARES, size)
+    goal = _choice(rng, GOAL_SHARES, size)
+    profiles = [
+        {
+            "age": int(age[position]), "gender": "male" if male[position] else "female",
+            "height": round(float(height[position]), 1), "activity_level": activity[position],
+            "goal": goal[position], "timezone": "UTC", "is_active": True,
+        }
+        for position in range(size)
+    ]
+
+    # TDEE real: Mifflin-St Jeor con el peso del día
+    levels = list(ACTIVITY_MULTIPLIERS)
+    declared = np.array([levels.index(level) for level in activity])
+    shift = np.where(rng.random(size) < ACTIVITY_MISREPORT, rng.choice([-1, 1], size), 0)
+    actual = np.clip(declared + shift, 0, len(levels) - 1)
+    multiplier = np.array([ACTIVITY_MULTIPLIERS[levels[level]] for level in actual]) * rng.normal(1.0, METABOLISM_SD, size)
+    bmr_offset = 6.25 * height - 5 * age + np.where(male, 5, -161)
+    adjustment = np.array([GOAL_CALORIE_ADJUSTMENTS[name] for name in goal], dtype=float)
+    weekend = np.array([(start + timedelta(days=offset)).weekday() >= 5 for offset in range(days)])
+
+    true_weight = np.empty((size, days))
+    true_tdee = np.empty((size, days))
+    eaten = np.empty((size, days))
+    for day in range(days):
+        true_weight[:, day] = weight
+        true_tdee[:, day] = (10 * weight + bmr_offset) * multiplier
+        eaten[:, day] = ((true_tdee[:, day] + adjustment) * (1 + rng.normal(0, INTAKE_DAILY_SD, size))
+                         * (1 + WEEKEND_EXTRA * weekend[day]))
+        weight = weight + (eaten[:, day] - true_tdee[:, day]) / CALORIES_PER_KG
+
+    # Registro: días sueltos sin registro, vacaciones y subregistro
+    logged = rng.random((size, days)) < rng.beta(*ADHERENCE_BETA, size)[:, None]
+    offsets = np.arange(days)
+    gap_start = rng.integers(0, days, size)
+    gap_end = gap_start + rng.integers(VACATION_DAYS[0], VACATION_DAYS[1] + 1, size)
+    vacation = (rng.random(size) < VACATION_SHARE)[:, None] & (offsets >= gap_start[:, None]) & (offsets < gap_end[:, None])
+    logged &= ~vacation
+    underreport = np.clip(rng.normal(UNDERREPORT_MEAN, UNDERREPORT_SD, size), -0.1, 0.3)
+    logged_intake = np.where(logged, eaten * (1 - underreport[:, None]), np.nan)
+
+    # Pesajes: frecuencia por usuario, ruido de balanza y lecturas atípicas
+    weighed = rng.random((size, days)) < _choice(rng, WEIGH_IN_RATES, size).astype(float)[:, None]
+    scale_sd = rng.uniform(*SCALE_SD_RANGE, size)
+    readings = true_weight + rng.normal(0, 1, (size, days)) * scale_sd[:, None]
+    readings += (rng.random((size, days)) < OUTLIER_RATE) * rng.choice([-OUTLIER_KG, OUTLIER_KG], (size, days))
+    readings = np.where(weighed, np.round(readings, 1), np.nan)
+
+    return CohortBatch(start, profiles, true_tdee, true_weight, logged_intake, readings)
+
+
+def generate_cohort(size: int, days: int = 60, seed: int = 0, batch_size: int = 1000,
+                    end: Optional[date] = None) -> Iterator[CohortBatch]:
+    """
+    Cohorte de `size` usuarios por lotes (la memoria depende del lote)
+
+    Args:
+        end: último día del historial (por defecto ayer)
+    """
+    rng = np.random.default_rng(seed)
+    end = end or date.today() - timedelta(days=1)
+    for offset in range(0, size, batch_size):
+        yield generate_batch(rng, min(batch_size, size - offset), days, end)
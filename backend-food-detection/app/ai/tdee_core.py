@@ -0,0 +1,99 @@
+"""
+Núcleo numérico del TDEE adaptativo
+Solo depende de NumPy: los registros son objetos con __slots__ (sin ORM ni
+DataFrame) y la pendiente y el R² del peso salen de fórmulas cerradas con
+sumas sobre arreglos, sin np.polyfit. Lo usan AdaptiveLearningEngine y los
+cálculos por lotes.
+"""
+
+from datetime import date
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+# 1 kg de peso corporal ≈ 7700 kcal
+CALORIES_PER_KG = 7700
+
+# Máximo cambio del TDEE respecto del anterior en un recálculo
+MAX_TDEE_CHANGE = 0.15
+
+
+class IntakeDay:
+    """Calorías consumidas en un día (fila mínima de DailyStats)"""
+    __slots__ = ("date", "consumed_calories")
+
+    def __init__(self, day: date, consumed_calories: float):
+        self.date = day
+        self.consumed_calories = consumed_calories
+
+
+class WeightPoint:
+    """Peso registrado en un día (fila mínima de WeightEntry)"""
+    __slots__ = ("date", "weight")
+
+    def __init__(self, day: date, weight: float):
+        self.date = day
+        self.weight = weight
+
+
+def linear_trend(days: np.ndarray, values: np.ndarray) -> Tuple[float, float]:
+    """
+    Pendiente por día y R² de la recta de mínimos cuadrados (forma cerrada)
+
+    Args:
+        days: día de cada valor (ordinal o desplazamiento)
+        values: valores medidos
+    """
+    n = len(values)
+    if n < 2:
+        return 0.0, 0.0
+    x = days - days.mean()
+    y = values - values.mean()
+    sxx = x @ x
+    if sxx <= 0:
+        return 0.0, 0.0
+    sxy = x @ y
+    syy = y @ y
+    slope = sxy / sxx
+    r2 = (sxy * sxy) / (sxx * syy) if syy > 0 else 0.0
+    return float(slope), float(r2)
+
+
+def linear_weight_trend(points: Sequence, days: int = 14) -> Tuple[float, float]:
+    """Cambio semanal (kg) y R² de los últimos `days` registros de peso"""
+    recent = points[-days:]
+    if len(recent) < 2:
+        return 0.0, 0.0
+    ordinals = np.fromiter((point.date.toordinal() for point in recent), dtype=float, count=len(recent))
+    weights = np.fromiter((point.weight for point in recent), dtype=float, count=len(recent))
+    slope, r2 = linear_trend(ordinals, weights)
+    return slope * 7, r2
+
+
+def intake_array(days: Sequence) -> np.ndarray:
+    """Calorías de los días como arreglo (None → 0)"""
+    return np.fromiter((day.consumed_calories or 0.0 for day in days), dtype=float, count=len(days))
+
+
+def energy_balance_tdee(calories: np.ndarray, weekly_trend: float) -> Tuple[float, float]:
+    """
+    TDEE por balance energético a partir de los días con consumo
+
+    Returns:
+        (TDEE estimado, coeficiente de variación de la ingesta)
+    """
+    mean = float(calories.mean())
+    variation = float(calories.std()) / mean if mean > 0 else 1.0
+    # Ingesta = TDEE + superávit: perder peso indica un gasto mayor que la ingesta
+    return mean - weekly_trend / 7 * CALORIES_PER_KG, variation
+
+
+def clamp_tdee_change(estimated: float, previous: Optional[float]) -> Tuple[float, bool]:
+    """Limitar el cambio a MAX_TDEE_CHANGE del TDEE anterior; indica si se recortó"""
+    if not previous:
+        return estimated, False
+    max_change = previous * MAX_TDEE_CHANGE
+    difference = estimated - previous
+    if abs(difference) <= max_change:
+        return estimated, False
+    return previous + (max_change if difference > 0 else -max_change), True
@@ -0,0 +1,184 @@
+"""
+Filtro de Kalman del TDEE
+El estado es (peso real, TDEE) con su covarianza 2×2. Cada día cerrado se
+procesa en O(1): el pesaje del día (si lo hay) corrige el estado y la
+ingesta registrada lo avanza al día siguiente por balance energético
+(peso += (ingesta - TDEE) / 7700). Un día sin comidas registradas solo suma
+incertidumbre al peso, sin informar el TDEE, y un pesaje muy alejado de lo
+esperado pesa menos (ruido de balanza inflado). La confianza sale de la
+varianza posterior del TDEE. filter_batch aplica los mismos pasos a un
+lote de usuarios a la vez, como operaciones sobre arreglos por día.
+"""
+
+import math
+from typing import Optional, Tuple
+
+import numpy as np
+
+from app.ai.tdee_core import CALORIES_PER_KG
+
+# Desvío de la balanza respecto del peso real (agua, hora del pesaje), kg
+SCALE_NOISE_KG = 0.6
+
+# Cambio diario del peso real no explicado por el balance energético, kg
+WEIGHT_PROCESS_KG = 0.05
+
+# Error relativo de las calorías registradas en un día con comidas
+INTAKE_LOG_ERROR = 0.15
+
+# Desvío de la ingesta respecto del TDEE en un día sin comidas registradas, kcal
+MISSING_INTAKE_KCAL = 600
+
+# Deriva diaria del TDEE (cambios de actividad o de composición), kcal
+TDEE_DRIFT_KCAL = 10
+
+# Incertidumbre del TDEE inicial (fórmula tradicional), kcal
+TDEE_PRIOR_KCAL = 400
+
+# Innovaciones más allá de este número de desvíos se tratan como lecturas atípicas
+OUTLIER_GATE = 3.0
+
+
+class FilterState:
+    """Estado del filtro: medias y covarianza (p_ww, p_we, p_ee)"""
+    __slots__ = ("weight", "tdee", "p_ww", "p_we", "p_ee")
+
+    def __init__(self, weight: float, tdee: float, p_ww: float, p_we: float, p_ee: float):
+        self.weight = weight
+        self.tdee = tdee
+        self.p_ww = p_ww
+        self.p_we = p_we
+        self.p_ee = p_ee
+
+    @property
+    def tdee_sd(self) -> float:
+        """Desvío posterior del TDEE (kcal)"""
+        return math.sqrt(max(self.p_ee, 0.0))
+
+    @property
+    def confidence(self) -> float:
+        """0 con la incertidumbre inicial, tiende a 1 a medida que se reduce"""
+        return max(0.0, min(1.0, 1.0 - self.tdee_sd / TDEE_PRIOR_KCAL))
+
+
+def initial_state(weight: float, tdee: float) -> FilterState:
+    """Estado inicial: primer pesaje y TDEE tradicional, sin correlación"""
+    return FilterState(weight, tdee, SCALE_NOISE_KG ** 2, 0.0, TDEE_PRIOR_KCAL ** 2)
+
+
+def predict(state: FilterState, intake: Optional[float]) -> FilterState:
+    """
+    Avanzar un día con la ingesta registrada (None si no hubo comidas)
+
+    Con ingesta: F = [[1, -1/7700], [0, 1]]; sin ella el peso sigue igual en
+    media y solo crece su varianza
+    """
+    if intake is not None:
+        k = 1.0 / CALORIES_PER_KG
+        state.weight += (intake - state.tdee) * k
+        state.p_ww += -2.0 * k * state.p_we + k * k * state.p_ee
+        state.p_we -= k * state.p_ee
+        intake_error = INTAKE_LOG_ERROR * intake * k
+    else:
+        intake_error = MISSING_INTAKE_KCAL / CALORIES_PER_KG
+    state.p_ww += WEIGHT_PROCESS_KG ** 2 + intake_error ** 2
+    state.p_ee += TDEE_DRIFT_KCAL ** 2
+    return state
+
+
+def update(state: FilterState, measured_weight: float) -> FilterState:
+    """Corregir con un pesaje (observa solo el peso)"""
+    innovation = measured_weight - state.weight
+    noise = SCALE_NOISE_KG ** 2
+    spread = state.p_ww + noise
+    # Lectura atípica: se amplía el ruido hasta que quede en el umbral
+    excess = innovation * innovation / (OUTLIER_GATE ** 2 * spread)
+    if excess > 1.0:
+        noise *= excess
+        spread = state.p_ww + noise
+
+    gain_w = state.p_ww / spread
+    gain_e = state.p_we / spread
+    state.weight += gain_w * innovation
+    state.tdee += gain_e * innovation
+    state.p_ee -= gain_e * state.p_we
+    state.p_ww *= 1.0 - gain_w
+    state.p_we *= 1.0 - gain_w
+    return state
+
+
+def step(state: FilterState, intake: Optional[float], measured_weight: Optional[float]) -> FilterState:
+    """Un día cerrado: pesaje de la mañana (si hay) y luego la ingesta del día"""
+    if measured_weight is not None:
+        update(state, measured_weight)
+    return predict(state, intake)
+
+
+def filter_batch(state: np.ndarray, prior: np.ndarray, intakes: np.ndarray, weights: np.ndarray,
+                 active: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Filtro de un lote de usuarios (una fila por usuario, una columna por día)
+
+    Args:
+        state: (usuarios, 5) peso, TDEE, p_ww, p_we, p_ee; NaN si el usuario
+            arranca de cero (empieza en su primer pesaje dentro de `active`)
+        prior: (usuarios,) TDEE inicial para los que arrancan de cero
+        intakes: (usuarios, días) calorías registradas, NaN sin comidas
+        weights: (usuarios, días) pesajes, NaN sin pesaje
+        active: (usuarios, días) días a procesar de cada usuario
+
+    Returns:
+        (estado final (usuarios, 5), días con comidas, pesajes) procesados
+    """
+    weight, tdee, p_ww, p_we, p_ee = (column.copy() for column in np.asarray(state, dtype=float).T)
+    intake_days = np.zeros(len(weight), dtype=np.int64)
+    weigh_ins = np.zeros(len(weight), dtype=np.int64)
+    k = 1.0 / CALORIES_PER_KG
+    scale = SCALE_NOISE_KG ** 2
+
+    for day in range(intakes.shape[1]):
+        measured = weights[:, day]
+        has_weight = ~np.isnan(measured)
+
+        start = active[:, day] & np.isnan(weight) & has_weight
+        if start.any():
+            weight[start] = measured[start]
+            tdee[start] = prior[start]
+            p_ww[start] = scale
+            p_we[start] = 0.0
+            p_ee[start] = TDEE_PRIOR_KCAL ** 2
+
+        ready = active[:, day] & ~np.isnan(weight)
+        if not ready.any():
+            continue
+
+        # Corrección con el pesaje del día
+        observed = ready & has_weight
+        innovation = np.where(observed, measured - weight, 0.0)
+        spread = p_ww + scale
+        noise = scale * np.maximum(1.0, innovation * innovation / (OUTLIER_GATE ** 2 * spread))
+        spread = p_ww + noise
+        gain_w = np.where(observed, p_ww / spread, 0.0)
+        gain_e = np.where(observed, p_we / spread, 0.0)
+        weight += gain_w * innovation
+        tdee += gain_e * innovation
+        p_ee -= gain_e * p_we
+        p_ww *= 1.0 - gain_w
+        p_we *= 1.0 - gain_w
+
+        # Predicción con la ingesta del día
+        intake = intakes[:, day]
+        logged = ready & ~np.isnan(intake)
+        step_k = np.where(logged, k, 0.0)
+        weight += np.where(logged, (intake - tdee) * k, 0.0)
+        p_ww += -2.0 * step_k * p_we + step_k * step_k * p_ee
+        p_we -= step_k * p_ee
+        intake_error = np.where(logged, INTAKE_LOG_ERROR * np.where(logged, intake, 0.0) * k,
+                                MISSING_INTAKE_KCAL / CALORIES_PER_KG)
+        p_ww += np.where(ready, WEIGHT_PROCESS_KG ** 2 + intake_error ** 2, 0.0)
+        p_ee += np.where(ready, TDEE_DRIFT_KCAL ** 2, 0.0)
+
+        intake_days += logged
+        weigh_ins += observed
+
+    return np.column_stack([weight, tdee, p_ww, p_we, p_ee]), intake_days, weigh_ins
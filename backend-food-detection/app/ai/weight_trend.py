@@ -0,0 +1,117 @@
+"""
+Tendencia de peso suavizada (media móvil exponencial)
+La tendencia filtra el ruido diario del peso (agua, sal, horario de la
+balanza): cada registro la acerca una fracción al valor medido. La pendiente
+es a su vez la media exponencial del cambio diario de la tendencia, y el
+ruido la media exponencial del cuadrado de la diferencia entre el peso y
+la tendencia anterior.
+
+Con registros irregulares la fracción depende de los días transcurridos:
+f = 1 - (1 - alpha) ** días, así dos registros separados por una semana
+pesan lo mismo que siete días seguidos.
+
+Un registro nuevo actualiza el estado en O(1) (trend_step); una serie
+completa se calcula vectorizada con NumPy (trend_series).
+"""
+
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+import numpy as np
+
+# Fracción diaria de acercamiento de la tendencia al peso medido
+TREND_ALPHA = 0.1
+
+# Fracción diaria de actualización de la pendiente y del ruido
+SLOPE_ALPHA = 0.1
+NOISE_ALPHA = 0.1
+
+# Registros por bloque en el cálculo vectorizado; con el decaimiento
+# acotado a MAX_LOG_DECAY por registro, exp() no se desborda dentro del bloque
+SERIES_BLOCK = 32
+MAX_LOG_DECAY = 20.0
+
+
+@dataclass
+class TrendPoint:
+    """Estado de la tendencia tras un registro"""
+    trend: float        # kg
+    slope: float        # kg por día
+    noise: float        # varianza del peso alrededor de la tendencia (kg²)
+
+    @property
+    def weekly_change(self) -> float:
+        return self.slope * 7
+
+    @property
+    def confidence(self) -> float:
+        """Señal frente a ruido: cambio semanal / (cambio semanal + desvío del ruido)"""
+        signal = abs(self.weekly_change)
+        spread = signal + float(np.sqrt(max(self.noise, 0.0)))
+        return signal / spread if spread > 0 else 0.0
+
+
+def smoothing_factor(alpha: float, gap_days):
+    """Fracción de actualización para un intervalo de días (escalar o arreglo)"""
+    return 1.0 - (1.0 - alpha) ** np.maximum(gap_days, 1)
+
+
+def trend_step(previous: Optional[TrendPoint], weight: float, gap_days: int) -> TrendPoint:
+    """Incorporar un registro nuevo a la tendencia (O(1))"""
+    if previous is None:
+        return TrendPoint(trend=weight, slope=0.0, noise=0.0)
+
+    gap_days = max(gap_days, 1)
+    trend = previous.trend + smoothing_factor(TREND_ALPHA, gap_days) * (weight - previous.trend)
+    daily_change = (trend - previous.trend) / gap_days
+    slope = previous.slope + smoothing_factor(SLOPE_ALPHA, gap_days) * (daily_change - previous.slope)
+    noise = previous.noise + smoothing_factor(NOISE_ALPHA, gap_days) * ((weight - previous.trend) ** 2 - previous.noise)
+    return TrendPoint(trend=float(trend), slope=float(slope), noise=float(noise))
+
+
+def ewma_series(values: np.ndarray, factors: np.ndarray, initial: float) -> np.ndarray:
+    """
+    Recurrencia s[t] = s[t-1] + f[t] * (x[t] - s[t-1]) sin bucle por elemento
+
+    Solución cerrada por bloques: con D[t] = prod(1 - f[:t+1]),
+    s[t] = D[t] * (s0 + sum(f[k] * x[k] / D[k])), con sumas y productos
+    acumulados en escala logarítmica
+    """
+    result = np.empty(len(values))
+    log_keep = np.log1p(-np.minimum(factors, 1.0 - np.exp(-MAX_LOG_DECAY)))
+    level = initial
+    for start in range(0, len(values), SERIES_BLOCK):
+        block = slice(start, start + SERIES_BLOCK)
+        decay = np.cumsum(log_keep[block])
+        weighted = np.cumsum(factors[block] * values[block] * np.exp(-decay))
+        result[block] = np.exp(decay) * (level + weighted)
+        level = result[block][-1]
+    return result
+
+
+def trend_series(days: Sequence[int], weights: Sequence[float]):
+    """
+    Tendencia, pendiente y ruido después de cada registro
+
+    Args:
+        days: día de cada registro (ordinal), en orden creciente
+        weights: peso de cada registro
+
+    Returns:
+        Tres arreglos (trend, slope, noise) del mismo largo que weights
+    """
+    weights = np.asarray(weights, dtype=float)
+    if not len(weights):
+        return np.empty(0), np.empty(0), np.empty(0)
+
+    gaps = np.maximum(np.diff(np.asarray(days, dtype=float), prepend=days[0]), 1.0)
+
+    trend = ewma_series(weights[1:], smoothing_factor(TREND_ALPHA, gaps[1:]), weights[0])
+    trend = np.concatenate(([weights[0]], trend))
+
+    daily_change = np.diff(trend) / gaps[1:]
+    slope = np.concatenate(([0.0], ewma_series(daily_change, smoothing_factor(SLOPE_ALPHA, gaps[1:]), 0.0)))
+
+    residuals = (weights[1:] - trend[:-1]) ** 2
+    noise = np.concatenate(([0.0], ewma_series(residuals, smoothing_factor(NOISE_ALPHA, gaps[1:]), 0.0)))
+    return trend, slope, noise
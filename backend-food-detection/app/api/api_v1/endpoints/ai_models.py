@@ -8,12 +8,16 @@ Incluye:
 - Recomendaciones nutricionales personalizadas
 """
 
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, WebSocket, WebSocketDisconnect
 from fastapi.responses import PlainTextResponse
 from typing import Dict, List, Optional
+import asyncio
 import logging
 
 from app.ai.food_detection import food_detector
+from app.ai.gs1 import classify_barcode
+from app.ai.barcode_detector import BARCODE_LIBS_AVAILABLE
+from app.ai.barcode_stream import BarcodeStreamSession
 from app.services.product_service import ProductAnalysisService
 from app.ai.body_analysis_service import body_analysis_service
 
@@ -427,10 +431,18 @@ async def analyze_barcode_manual(barcode: str = Form(...)):
     """
     try:
         # Validar formato del código de barras
-        if not barcode.isdigit() or len(barcode) not in [8, 12, 13, 14]:
+        if not barcode.isdigit() or len(barcode) not in [6, 7, 8, 12, 13, 14]:
             raise HTTPException(
                 status_code=400,
-                detail="El código de barras debe contener solo números y tener 8, 12, 13 o 14 dígitos"
+                detail="El código de barras debe contener solo números y tener 8, 12, 13 o 14 dígitos (o UPC-E)"
+            )
+        
+        # Validar dígito de control GS1 antes de cualquier consulta externa
+        barcode_info = classify_barcode(barcode)
+        if not barcode_info["valid"]:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Código de barras inválido: {barcode_info.get('error', 'dígito de control incorrecto')}"
             )
         
         # Analizar producto por código de barras manual
@@ -449,6 +461,64 @@ async def analyze_barcode_manual(barcode: str = Form(...)):
         logger.error(f"Error en análisis de código de barras manual: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.websocket("/barcode-live")
+async def scan_barcode_live(websocket: WebSocket):
+    """
+    Escaneo de códigos de barras en vivo desde la cámara.
+    El cliente envía fotogramas reducidos (JPEG) como mensajes binarios; los fotogramas
+    casi idénticos se descartan y el resto se decodifica en el pool de procesos.
+    En cuanto un fotograma produce un código válido se envía el análisis del producto
+    y se cierra la conexión.
+    """
+    await websocket.accept()
+    
+    if not BARCODE_LIBS_AVAILABLE:
+        await websocket.send_json({
+            "type": "error",
+            "message": "Detección de códigos de barras no disponible en este entorno",
+            "alternative": "Usa /barcode-manual para ingresar el código"
+        })
+        await websocket.close()
+        return
+    
+    session = BarcodeStreamSession(product_service)
+    scan_task = asyncio.create_task(session.scan(websocket.send_json))
+    await websocket.send_json({"type": "ready"})
+    
+    try:
+        while not scan_task.done():
+            receive_task = asyncio.create_task(websocket.receive_bytes())
+            done, _ = await asyncio.wait(
+                {receive_task, scan_task}, return_when=asyncio.FIRST_COMPLETED
+            )
+            
+            if receive_task not in done:
+                receive_task.cancel()
+                break
+            
+            status = await session.offer(receive_task.result())
+            if status != "queued":
+                await websocket.send_json({"type": "frame", "status": status})
+        
+        result = scan_task.result()
+        await websocket.send_json({
+            "type": "result",
+            "success": result.get("success", False),
+            "product_analysis": result,
+            "message": "Análisis de código de barras completado exitosamente"
+        })
+        await websocket.close()
+        
+    except WebSocketDisconnect:
+        logger.info("Cliente desconectado del escaneo en vivo")
+    except Exception as e:
+        logger.error(f"Error en escaneo de código de barras en vivo: {str(e)}")
+        await websocket.send_json({"type": "error", "message": str(e)})
+        await websocket.close(code=1011)
+    finally:
+        if not scan_task.done():
+            scan_task.cancel()
+
 @router.get("/barcode-info", response_model=Dict)
 async def get_barcode_info():
     """
@@ -460,8 +530,10 @@ async def get_barcode_info():
                 "EAN-13 (más común en Perú y el mundo)",
                 "EAN-8 (productos pequeños)",
                 "UPC-A (productos de Estados Unidos)",
-                "UPC-E (versión compacta de UPC-A)"
+                "UPC-E (versión compacta de UPC-A)",
+                "GTIN-14 (cajas y empaques agrupados)"
             ],
+            "validation": "Dígito de control GS1 verificado antes de consultar bases externas",
             "peru_specific": {
                 "country_code": "775",
                 "description": "Los productos fabricados en Perú tienen códigos que empiezan con 775",
@@ -519,7 +591,8 @@ async def analyze_body_photo(
     weight: Optional[float] = Form(None),
     gender: Optional[str] = Form(None),
     activity_level: Optional[str] = Form(None),
-    dietary_restrictions: Optional[str] = Form(None)
+    dietary_restrictions: Optional[str] = Form(None),
+    ai_advice: bool = Form(False)
 ):
     """
     Analiza una fotografía corporal para estimar composición corporal y generar recomendaciones nutricionales.
@@ -531,6 +604,7 @@ async def analyze_body_photo(
     - gender: Sexo (masculino/femenino)
     - activity_level: Nivel de actividad (sedentario/ligero/moderado/intenso)
     - dietary_restrictions: Restricciones dietéticas
+    - ai_advice: Solicitar consejos adicionales en texto libre a Gemini
     """
     try:
         # Validar tipo de archivo
@@ -559,7 +633,9 @@ async def analyze_body_photo(
             user_info["dietary_restrictions"] = dietary_restrictions
         
         # Realizar análisis corporal completo
-        result = body_analysis_service.analyze_body_photo(image_data, user_info)
+        result = await body_analysis_service.analyze_body_photo(
+            image_data, user_info, ai_advice=ai_advice
+        )
         
         return {
             "success": True,
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Dict, Any
 import json
 
@@ -10,6 +11,7 @@ from app.ai.adaptive_learning import AdaptiveLearningEngine
 from app.ai.food_detection import ImageAnalyzer
 from app.schemas.meal import ImageAnalysisResponse
 from app.schemas.progress import AdaptiveGoalsUpdate, AdaptiveGoalsHistory
+from app.services.dashboard_service import invalidate_dashboard_on_commit
 
 router = APIRouter()
 
@@ -18,7 +20,7 @@ async def analyze_food_image(
     file: UploadFile = File(...),
     confidence_threshold: float = 0.7,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Analizar imagen de comida con IA"""
     
@@ -53,7 +55,7 @@ async def analyze_food_image(
 @router.get("/adaptive-goals", response_model=Dict[str, Any])
 async def get_adaptive_goals(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Obtener objetivos adaptativos actuales"""
     
@@ -74,18 +76,18 @@ async def get_adaptive_goals(
 @router.post("/update-adaptive-goals")
 async def update_adaptive_goals(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Forzar actualización de objetivos adaptativos"""
     
     try:
         # Ejecutar actualización del sistema adaptativo
         adaptive_engine = AdaptiveLearningEngine()
-        updated = await adaptive_engine.update_user_goals(current_user.id, db)
+        updated = await adaptive_engine.update_user_goals(db, current_user)
         
         if updated:
             # Refrescar datos del usuario
-            db.refresh(current_user)
+            await db.refresh(current_user)
             
             return {
                 "message": "Objetivos adaptativos actualizados exitosamente",
@@ -110,7 +112,7 @@ async def update_adaptive_goals(
 async def update_adaptive_settings(
     settings_update: AdaptiveGoalsUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Actualizar configuración del sistema adaptativo"""
     
@@ -128,8 +130,8 @@ async def update_adaptive_settings(
         current_user.estimated_tdee = settings_update.manual_tdee
         current_user.tdee_confidence = 1.0  # Máxima confianza en valor manual
     
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    await db.refresh(current_user)
     
     return {
         "message": "Configuración adaptativa actualizada",
@@ -143,28 +145,26 @@ async def update_adaptive_settings(
 async def get_adaptive_history(
     days: int = 30,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Obtener historial de cambios en objetivos adaptativos"""
     
     from datetime import date, timedelta
-    from app.models.progress import DailyStats
+    from app.services.progress_rollups import ProgressRollupService
     
     end_date = date.today()
     start_date = end_date - timedelta(days=days)
     
-    # Obtener estadísticas diarias para ver evolución
-    daily_stats = db.query(DailyStats).filter(
-        DailyStats.user_id == current_user.id,
-        DailyStats.date >= start_date,
-        DailyStats.date <= end_date
-    ).order_by(DailyStats.date).all()
+    # Evolución semanal desde los resúmenes por período
+    summaries = await ProgressRollupService(db).get_summaries(
+        current_user.id, "week", start_date, end_date
+    )
     
     # Extraer datos históricos
-    dates = [stat.date for stat in daily_stats]
-    tdee_values = [stat.estimated_tdee for stat in daily_stats if stat.estimated_tdee]
-    calorie_targets = [stat.target_calories for stat in daily_stats if stat.target_calories]
-    confidence_values = [stat.tdee_confidence for stat in daily_stats if stat.tdee_confidence]
+    dates = [summary.start_date for summary in summaries]
+    tdee_values = [summary.tdee_end for summary in summaries if summary.tdee_end]
+    calorie_targets = [summary.avg_target_calories for summary in summaries if summary.avg_target_calories]
+    confidence_values = [summary.tdee_confidence for summary in summaries if summary.tdee_confidence]
     
     return AdaptiveGoalsHistory(
         period_days=days,
@@ -180,7 +180,7 @@ async def get_adaptive_history(
 @router.get("/nutrition-insights")
 async def get_nutrition_insights(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Obtener insights nutricionales basados en IA"""
     
@@ -191,10 +191,10 @@ async def get_nutrition_insights(
     end_date = date.today()
     start_date = end_date - timedelta(days=14)
     
-    daily_stats = db.query(DailyStats).filter(
+    daily_stats = (await db.scalars(select(DailyStats).where(
         DailyStats.user_id == current_user.id,
         DailyStats.date >= start_date
-    ).order_by(DailyStats.date).all()
+    ).order_by(DailyStats.date))).all()
     
     if not daily_stats:
         return {
@@ -240,16 +240,16 @@ async def get_nutrition_insights(
 @router.post("/recalculate-tdee")
 async def recalculate_tdee(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Recalcular TDEE basado en datos actuales"""
     
     try:
         # Obtener peso más reciente
         from app.models.progress import WeightEntry
-        latest_weight = db.query(WeightEntry).filter(
+        latest_weight = await db.scalar(select(WeightEntry).where(
             WeightEntry.user_id == current_user.id
-        ).order_by(WeightEntry.date.desc()).first()
+        ).order_by(WeightEntry.date.desc()).limit(1))
         
         if not latest_weight:
             raise HTTPException(
@@ -264,20 +264,24 @@ async def recalculate_tdee(
         )
         
         # Calcular TDEE adaptativo si hay suficientes datos
-        adaptive_tdee = adaptive_engine.calculate_adaptive_tdee(
-            current_user, latest_weight.weight, db
+        daily_stats, weight_entries, weight_trend, tdee_state = await adaptive_engine.load_user_history(db, current_user)
+        tdee_calc = adaptive_engine.calculate_adaptive_tdee(
+            current_user, daily_stats, weight_entries, weight_trend, tdee_state
         )
+        adaptive_tdee = tdee_calc.estimated_tdee if tdee_calc.method == "adaptive" else None
         
         # Usar el adaptativo si está disponible, sino el tradicional
         new_tdee = adaptive_tdee if adaptive_tdee else traditional_tdee
         
         # Actualizar usuario
         current_user.estimated_tdee = new_tdee
+        current_user.tdee_confidence = tdee_calc.confidence if adaptive_tdee else 0.3
         current_user.adaptive_calories = adaptive_engine.calculate_adaptive_calories(
             current_user, new_tdee
         )
         
-        db.commit()
+        invalidate_dashboard_on_commit(db, current_user.id)
+        await db.commit()
         
         return {
             "message": "TDEE recalculado exitosamente",
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 
 from app.core.database import get_db
@@ -14,16 +15,17 @@ from app.schemas.user import (
     Token, UserUpdate, GoalSetup
 )
 from app.core.config import settings
+from app.services.dashboard_service import invalidate_dashboard_on_commit
 
 router = APIRouter()
 security = HTTPBearer()
 
 @router.post("/register", response_model=LoginResponse)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     """Registrar nuevo usuario"""
     
     # Verificar si el email ya existe
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    existing_user = await db.scalar(select(User).where(User.email == user_data.email))
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -46,8 +48,8 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     )
     
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     
     # Crear token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -65,10 +67,10 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     return LoginResponse(user=user_profile, token=token)
 
 @router.post("/login", response_model=LoginResponse)
-async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
+async def login(login_data: LoginRequest, db: AsyncSession = Depends(get_db)):
     """Iniciar sesión"""
     
-    user = authenticate_user(db, login_data.email, login_data.password)
+    user = await authenticate_user(db, login_data.email, login_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -79,7 +81,7 @@ async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
     # Actualizar último login
     from datetime import datetime
     user.last_login = datetime.utcnow()
-    db.commit()
+    await db.commit()
     
     # Crear token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -105,7 +107,7 @@ async def get_current_user_profile(current_user: User = Depends(get_current_user
 async def update_profile(
     user_data: UserUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Actualizar perfil del usuario"""
     
@@ -113,8 +115,9 @@ async def update_profile(
     for field, value in user_data.dict(exclude_unset=True).items():
         setattr(current_user, field, value)
     
-    db.commit()
-    db.refresh(current_user)
+    invalidate_dashboard_on_commit(db, current_user.id)
+    await db.commit()
+    await db.refresh(current_user)
     
     return UserProfile.from_orm(current_user)
 
@@ -122,7 +125,7 @@ async def update_profile(
 async def setup_goals(
     goal_data: GoalSetup,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Configurar objetivos del usuario"""
     
@@ -162,8 +165,9 @@ async def setup_goals(
         if not goal_data.custom_fat:
             current_user.target_fat = (adaptive_calories * 0.30) / 9     # 9 cal/g grasa
     
-    db.commit()
-    db.refresh(current_user)
+    invalidate_dashboard_on_commit(db, current_user.id)
+    await db.commit()
+    await db.refresh(current_user)
     
     return UserProfile.from_orm(current_user)
 
@@ -184,12 +188,12 @@ async def refresh_token(current_user: User = Depends(get_current_user)):
 @router.delete("/me")
 async def delete_account(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Eliminar cuenta del usuario"""
     
     # Marcar como inactivo en lugar de eliminar completamente
     current_user.is_active = False
-    db.commit()
+    await db.commit()
     
     return {"message": "Cuenta desactivada exitosamente"}
\ No newline at end of file
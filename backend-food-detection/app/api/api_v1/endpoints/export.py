@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from datetime import date
+
+from app.core.database import AsyncSessionLocal
+from app.core.security import get_current_user
+from app.models.user import User
+from app.services.export_service import EXPORT_FORMATS, ExportService, validate_export
+
+router = APIRouter()
+
+@router.get("/{dataset}")
+async def export_history(
+    dataset: str,
+    format: str = Query("csv", description="csv, ndjson o parquet"),
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Exportar el historial completo del usuario (meals, daily-stats o weight)
+    
+    Se envía en streaming por lotes: la memoria usada no depende de cuántos
+    años de datos tenga la cuenta
+    """
+    
+    try:
+        validate_export(dataset, format)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    user_id = current_user.id
+    
+    async def content():
+        # Sesión propia: se mantiene abierta mientras dura el envío
+        async with AsyncSessionLocal() as session:
+            async for chunk in ExportService(session).stream(dataset, format, user_id, start_date, end_date):
+                yield chunk
+    
+    filename = f"{dataset}-{user_id}.{format}"
+    return StreamingResponse(
+        content(),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -1,75 +1,77 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 
 from app.core.database import get_db
 from app.core.security import get_current_user
 from app.models.user import User
 from app.models.meal import Food
+from app.services.food_search import FoodSearchService
+from app.services.food_autocomplete import get_food_autocomplete, update_autocomplete
 from app.schemas.meal import (
     Food as FoodSchema, FoodCreate, FoodUpdate, 
-    FoodSearchQuery, FoodSearchResult
+    FoodSearchQuery, FoodSearchItem, FoodSuggestion
 )
 
 router = APIRouter()
 
-@router.get("/search", response_model=List[FoodSearchResult])
+def _search_item(food: Food) -> FoodSearchItem:
+    """Convertir a formato de resultado de búsqueda"""
+    return FoodSearchItem(
+        id=food.id,
+        name=food.name,
+        brand=food.brand,
+        category=food.category,
+        calories_per_100g=food.calories_per_100g,
+        protein_per_100g=food.protein_per_100g,
+        carbs_per_100g=food.carbs_per_100g,
+        fat_per_100g=food.fat_per_100g,
+        fiber_per_100g=food.fiber_per_100g,
+        common_portions=food.common_portions,
+        verified=bool(food.verified),
+        popularity_score=food.popularity_score or 0
+    )
+
+@router.get("/search", response_model=List[FoodSearchItem])
 async def search_foods(
     q: str = Query(..., min_length=2, description="Término de búsqueda"),
     limit: int = Query(20, le=100, description="Límite de resultados"),
     category: Optional[str] = Query(None, description="Filtrar por categoría"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Buscar alimentos en la base de datos"""
     
-    query = db.query(Food)
+    # Índice de texto completo: sin tildes, por prefijo, categoría exacta
+    # y orden por relevancia, verificados y popularidad
+    foods = await FoodSearchService(db).search(q, limit=limit, category=category)
     
-    # Filtro de búsqueda por nombre
-    query = query.filter(Food.name.ilike(f"%{q}%"))
-    
-    # Filtro por categoría si se especifica
-    if category:
-        query = query.filter(Food.category == category)
+    return [_search_item(food) for food in foods]
+
+@router.get("/autocomplete", response_model=List[FoodSuggestion])
+async def autocomplete_foods(
+    q: str = Query(..., min_length=1, description="Texto escrito hasta ahora"),
+    limit: int = Query(10, le=20, description="Límite de sugerencias"),
+    category: Optional[str] = Query(None, description="Filtrar por categoría"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Sugerencias de alimentos mientras se escribe (índice en memoria)"""
     
-    # Ordenar por relevancia (nombre exacto primero, luego alfabético)
-    query = query.order_by(
-        Food.name.ilike(f"{q}%").desc(),  # Coincidencias al inicio primero
-        Food.name
-    )
+    completions = (await get_food_autocomplete(db)).complete(q, limit=limit, category=category)
     
-    foods = query.limit(limit).all()
-    
-    # Convertir a formato de resultado de búsqueda
-    results = []
-    for food in foods:
-        results.append(FoodSearchResult(
-            id=food.id,
-            name=food.name,
-            brand=food.brand,
-            category=food.category,
-            calories_per_100g=food.calories_per_100g,
-            protein_per_100g=food.protein_per_100g,
-            carbs_per_100g=food.carbs_per_100g,
-            fat_per_100g=food.fat_per_100g,
-            fiber_per_100g=food.fiber_per_100g,
-            serving_size=food.serving_size,
-            serving_unit=food.serving_unit,
-            verified=food.verified,
-            popularity_score=food.popularity_score or 0
-        ))
-    
-    return results
+    return [FoodSuggestion.from_orm(completion) for completion in completions]
 
 @router.get("/{food_id}", response_model=FoodSchema)
 async def get_food(
     food_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Obtener información detallada de un alimento"""
     
-    food = db.query(Food).filter(Food.id == food_id).first()
+    food = await db.get(Food, food_id)
     
     if not food:
         raise HTTPException(
@@ -83,7 +85,7 @@ async def get_food(
 async def create_food(
     food_data: FoodCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Crear nuevo alimento (solo usuarios verificados)"""
     
@@ -95,10 +97,10 @@ async def create_food(
         )
     
     # Verificar si ya existe un alimento con el mismo nombre y marca
-    existing_food = db.query(Food).filter(
+    existing_food = await db.scalar(select(Food).where(
         Food.name == food_data.name,
         Food.brand == food_data.brand
-    ).first()
+    ))
     
     if existing_food:
         raise HTTPException(
@@ -128,8 +130,10 @@ async def create_food(
     )
     
     db.add(food)
-    db.commit()
-    db.refresh(food)
+    await db.commit()
+    await db.refresh(food)
+    
+    update_autocomplete(food)
     
     return FoodSchema.from_orm(food)
 
@@ -138,11 +142,11 @@ async def update_food(
     food_id: int,
     food_data: FoodUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Actualizar alimento (solo el creador o admin)"""
     
-    food = db.query(Food).filter(Food.id == food_id).first()
+    food = await db.get(Food, food_id)
     
     if not food:
         raise HTTPException(
@@ -164,74 +168,58 @@ async def update_food(
     # Si se modifica, requiere nueva verificación
     food.verified = False
     
-    db.commit()
-    db.refresh(food)
+    await db.commit()
+    await db.refresh(food)
+    
+    update_autocomplete(food)
     
     return FoodSchema.from_orm(food)
 
 @router.get("/categories/list")
 async def get_food_categories(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Obtener lista de categorías de alimentos"""
     
-    categories = db.query(Food.category).distinct().filter(
+    categories = await db.scalars(select(Food.category).distinct().where(
         Food.category.isnot(None)
-    ).all()
+    ))
     
-    return [cat[0] for cat in categories if cat[0]]
+    return [category for category in categories if category]
 
-@router.get("/popular/list", response_model=List[FoodSearchResult])
+@router.get("/popular/list", response_model=List[FoodSearchItem])
 async def get_popular_foods(
     limit: int = Query(20, le=50, description="Límite de resultados"),
     category: Optional[str] = Query(None, description="Filtrar por categoría"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Obtener alimentos populares"""
     
-    query = db.query(Food).filter(Food.verified == True)
+    query = select(Food).where(Food.verified == True)
     
     if category:
-        query = query.filter(Food.category == category)
+        query = query.where(Food.category == category)
     
     # Ordenar por popularidad y luego por nombre
-    foods = query.order_by(
+    foods = await db.scalars(query.order_by(
         Food.popularity_score.desc().nullslast(),
         Food.name
-    ).limit(limit).all()
-    
-    results = []
-    for food in foods:
-        results.append(FoodSearchResult(
-            id=food.id,
-            name=food.name,
-            brand=food.brand,
-            category=food.category,
-            calories_per_100g=food.calories_per_100g,
-            protein_per_100g=food.protein_per_100g,
-            carbs_per_100g=food.carbs_per_100g,
-            fat_per_100g=food.fat_per_100g,
-            fiber_per_100g=food.fiber_per_100g,
-            serving_size=food.serving_size,
-            serving_unit=food.serving_unit,
-            verified=food.verified,
-            popularity_score=food.popularity_score or 0
-        ))
-    
-    return results
+    ).limit(limit))
+    
+    return [_search_item(food) for food in foods]
 
 @router.post("/{food_id}/report")
 async def report_food(
     food_id: int,
     reason: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Reportar problema con un alimento"""
     
-    food = db.query(Food).filter(Food.id == food_id).first()
+    food = await db.get(Food, food_id)
     
     if not food:
         raise HTTPException(
@@ -1,5 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import datetime, date
 import os
@@ -14,6 +14,7 @@ from app.schemas.meal import (
     ImageAnalysisResponse, MealTypeEnum
 )
 from app.services.dependencies import get_meal_service
+from app.services.meal_service import MAX_PAGE_SIZE
 from app.core.config import settings
 
 router = APIRouter()
@@ -22,44 +23,57 @@ router = APIRouter()
 async def create_meal(
     meal_data: MealCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Crear nueva comida"""
     
     meal_service = get_meal_service(db)
     
     try:
-        meal = meal_service.create_meal(current_user.id, meal_data)
+        meal = await meal_service.create_meal(current_user.id, meal_data)
         return meal
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 @router.get("/", response_model=List[Meal])
 async def get_meals(
+    response: Response,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
-    limit: int = 50,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Cursor X-Next-Cursor de la página anterior"),
+    include_analysis: bool = Query(False, description="Incluir el análisis de imagen completo"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Obtener comidas del usuario"""
+    """Obtener comidas del usuario (paginado por cursor)"""
     
     meal_service = get_meal_service(db)
-    meals = meal_service.get_user_meals(
-        current_user.id, start_date, end_date, limit
-    )
-    return meals
+    
+    try:
+        page = await meal_service.get_meal_page(
+            current_user.id, start_date, end_date, limit,
+            cursor=cursor, include_analysis=include_analysis
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    # La página siguiente se pide con ?cursor=<X-Next-Cursor>
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    
+    return page.meals
 
 @router.get("/{meal_id}", response_model=Meal)
 async def get_meal(
     meal_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Obtener comida específica"""
     
     meal_service = get_meal_service(db)
-    meal = meal_service.get_meal_by_id(meal_id, current_user.id)
+    meal = await meal_service.get_meal_by_id(meal_id, current_user.id)
     
     if not meal:
         raise HTTPException(
@@ -74,12 +88,12 @@ async def update_meal(
     meal_id: int,
     meal_data: MealUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Actualizar comida"""
     
     meal_service = get_meal_service(db)
-    meal = meal_service.update_meal(meal_id, current_user.id, meal_data)
+    meal = await meal_service.update_meal(meal_id, current_user.id, meal_data)
     
     if not meal:
         raise HTTPException(
@@ -93,12 +107,12 @@ async def update_meal(
 async def delete_meal(
     meal_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Eliminar comida"""
     
     meal_service = get_meal_service(db)
-    success = meal_service.delete_meal(meal_id, current_user.id)
+    success = await meal_service.delete_meal(meal_id, current_user.id)
     
     if not success:
         raise HTTPException(
@@ -113,7 +127,7 @@ async def upload_meal_image(
     file: UploadFile = File(...),
     confidence_threshold: float = 0.7,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Subir y analizar imagen de comida"""
     
@@ -165,7 +179,7 @@ async def create_meal_from_image(
     meal_type: MealTypeEnum = Form(...),
     eaten_at: Optional[datetime] = Form(None),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Crear comida directamente desde imagen"""
     
@@ -211,7 +225,7 @@ async def create_meal_from_image(
 async def quick_meal_entry(
     entry_data: QuickMealEntry,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Entrada rápida de comida por texto"""
     
@@ -229,7 +243,7 @@ async def quick_meal_entry(
 @router.get("/today/summary")
 async def get_today_summary(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Obtener resumen de comidas del día actual"""
     
@@ -237,7 +251,7 @@ async def get_today_summary(
     meal_service = get_meal_service(db)
     
     # Obtener comidas del día
-    meals = meal_service.get_user_meals(
+    meals = await meal_service.get_user_meals(
         current_user.id, start_date=today, end_date=today
     )
     
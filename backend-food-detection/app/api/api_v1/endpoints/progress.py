@@ -1,65 +1,91 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import datetime, date, timedelta
 
 from app.core.database import get_db
 from app.core.security import get_current_user
+from app.core.time_ranges import day_range, local_today
 from app.models.user import User
 from app.models.progress import WeightEntry, DailyStats, ProgressSummary
 from app.schemas.progress import (
     WeightEntry as WeightEntrySchema, WeightEntryCreate, WeightEntryUpdate,
     DailyStats as DailyStatsSchema, DailyStatsCreate,
     ProgressSummary as ProgressSummarySchema,
-    ProgressAnalysisRequest, ProgressAnalysisResponse,
+    ProgressAnalysisRequest, ProgressAnalysisResponse, ProgressAnalysisSummary,
+    ProgressTrends, TrendData,
     DashboardStats, WeeklyOverview, PeriodTypeEnum
 )
 from app.ai.adaptive_learning import adaptive_engine
+from app.services.dashboard_service import DashboardService, invalidate_dashboard_on_commit
+from app.services.forecast_service import ForecastService
+from app.services.streak_service import StreakService
+from app.services.weight_trend_service import WeightTrendService
+from app.services.tdee_filter_service import TDEEFilterService
+from app.services.progress_rollups import (
+    PERIOD_TYPES, ProgressRollupService, combine_summaries, period_bounds
+)
 
 router = APIRouter()
 
+async def _weight_changed(db: AsyncSession, user_id: int, day: date, weight: Optional[float],
+                          previous_date: Optional[date] = None):
+    """
+    Efectos de un registro de peso guardado (o eliminado si weight es None), sin commit:
+    tendencia, resúmenes y filtro de TDEE del día (y de previous_date si cambió) y dashboard
+    """
+    if weight is None:
+        await WeightTrendService(db).entry_deleted(user_id, day)
+    else:
+        await WeightTrendService(db).entry_saved(user_id, day, weight, previous_date=previous_date)
+    
+    rollups = ProgressRollupService(db)
+    tdee_filter = TDEEFilterService(db)
+    for changed_date in {day, previous_date or day}:
+        await rollups.day_changed(user_id, changed_date)
+        await tdee_filter.day_changed(user_id, changed_date)
+    invalidate_dashboard_on_commit(db, user_id)
+
 @router.post("/weight", response_model=WeightEntrySchema)
 async def log_weight(
     weight_data: WeightEntryCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Registrar peso"""
+    """Registrar peso (reemplaza el registro del mismo día si existe)"""
     
     # Verificar si ya existe entrada para esta fecha
-    existing_entry = db.query(WeightEntry).filter(
+    weight_entry = await db.scalar(select(WeightEntry).where(
         WeightEntry.user_id == current_user.id,
         WeightEntry.date == weight_data.date
-    ).first()
+    ))
     
-    if existing_entry:
+    if weight_entry:
         # Actualizar entrada existente
-        existing_entry.weight = weight_data.weight
-        existing_entry.body_fat_percentage = weight_data.body_fat_percentage
-        existing_entry.muscle_mass = weight_data.muscle_mass
-        existing_entry.notes = weight_data.notes
-        db.commit()
-        db.refresh(existing_entry)
-        return WeightEntrySchema.from_orm(existing_entry)
+        weight_entry.weight = weight_data.weight
+        weight_entry.source = weight_data.source.value
+        weight_entry.notes = weight_data.notes
     else:
         # Crear nueva entrada
         weight_entry = WeightEntry(
             user_id=current_user.id,
             date=weight_data.date,
             weight=weight_data.weight,
-            body_fat_percentage=weight_data.body_fat_percentage,
-            muscle_mass=weight_data.muscle_mass,
+            source=weight_data.source.value,
             notes=weight_data.notes
         )
-        
         db.add(weight_entry)
-        db.commit()
-        db.refresh(weight_entry)
-        
-        # Actualizar sistema adaptativo
-        await adaptive_engine.update_user_goals(current_user.id, db)
-        
-        return WeightEntrySchema.from_orm(weight_entry)
+    
+    await db.flush()
+    await _weight_changed(db, current_user.id, weight_data.date, weight_data.weight)
+    await db.commit()
+    await db.refresh(weight_entry)
+    
+    # Actualizar sistema adaptativo
+    await adaptive_engine.update_user_goals(db, current_user)
+    
+    return WeightEntrySchema.from_orm(weight_entry)
 
 @router.get("/weight", response_model=List[WeightEntrySchema])
 async def get_weight_history(
@@ -67,18 +93,16 @@ async def get_weight_history(
     end_date: Optional[date] = Query(None),
     limit: int = Query(100, le=365),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Obtener historial de peso"""
     
-    query = db.query(WeightEntry).filter(WeightEntry.user_id == current_user.id)
-    
-    if start_date:
-        query = query.filter(WeightEntry.date >= start_date)
-    if end_date:
-        query = query.filter(WeightEntry.date <= end_date)
+    query = select(WeightEntry).where(
+        WeightEntry.user_id == current_user.id,
+        *day_range(WeightEntry.date, start_date, end_date)
+    )
     
-    weight_entries = query.order_by(WeightEntry.date.desc()).limit(limit).all()
+    weight_entries = await db.scalars(query.order_by(WeightEntry.date.desc()).limit(limit))
     
     return [WeightEntrySchema.from_orm(entry) for entry in weight_entries]
 
@@ -87,14 +111,14 @@ async def update_weight_entry(
     entry_id: int,
     weight_data: WeightEntryUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Actualizar entrada de peso"""
     
-    weight_entry = db.query(WeightEntry).filter(
+    weight_entry = await db.scalar(select(WeightEntry).where(
         WeightEntry.id == entry_id,
         WeightEntry.user_id == current_user.id
-    ).first()
+    ))
     
     if not weight_entry:
         raise HTTPException(
@@ -103,11 +127,14 @@ async def update_weight_entry(
         )
     
     # Actualizar campos
+    old_date = weight_entry.date
     for field, value in weight_data.dict(exclude_unset=True).items():
         setattr(weight_entry, field, value)
     
-    db.commit()
-    db.refresh(weight_entry)
+    await db.flush()
+    await _weight_changed(db, current_user.id, weight_entry.date, weight_entry.weight, previous_date=old_date)
+    await db.commit()
+    await db.refresh(weight_entry)
     
     return WeightEntrySchema.from_orm(weight_entry)
 
@@ -115,14 +142,14 @@ async def update_weight_entry(
 async def delete_weight_entry(
     entry_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Eliminar entrada de peso"""
     
-    weight_entry = db.query(WeightEntry).filter(
+    weight_entry = await db.scalar(select(WeightEntry).where(
         WeightEntry.id == entry_id,
         WeightEntry.user_id == current_user.id
-    ).first()
+    ))
     
     if not weight_entry:
         raise HTTPException(
@@ -130,8 +157,10 @@ async def delete_weight_entry(
             detail="Entrada de peso no encontrada"
         )
     
-    db.delete(weight_entry)
-    db.commit()
+    await db.delete(weight_entry)
+    await db.flush()
+    await _weight_changed(db, current_user.id, weight_entry.date, None)
+    await db.commit()
     
     return {"message": "Entrada de peso eliminada exitosamente"}
 
@@ -141,188 +170,177 @@ async def get_daily_stats(
     end_date: Optional[date] = Query(None),
     limit: int = Query(30, le=365),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Obtener estadísticas diarias"""
     
-    query = db.query(DailyStats).filter(DailyStats.user_id == current_user.id)
-    
-    if start_date:
-        query = query.filter(DailyStats.date >= start_date)
-    if end_date:
-        query = query.filter(DailyStats.date <= end_date)
+    query = select(DailyStats).where(
+        DailyStats.user_id == current_user.id,
+        *day_range(DailyStats.date, start_date, end_date)
+    )
     
-    daily_stats = query.order_by(DailyStats.date.desc()).limit(limit).all()
+    daily_stats = await db.scalars(query.order_by(DailyStats.date.desc()).limit(limit))
     
     return [DailyStatsSchema.from_orm(stat) for stat in daily_stats]
 
 @router.get("/dashboard", response_model=DashboardStats)
 async def get_dashboard_stats(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Obtener estadísticas para el dashboard"""
-    
-    today = date.today()
-    week_ago = today - timedelta(days=7)
-    month_ago = today - timedelta(days=30)
+    """Obtener estadísticas para el dashboard (una consulta; las aperturas repetidas salen de memoria)"""
     
-    # Estadísticas de hoy
-    today_stats = db.query(DailyStats).filter(
-        DailyStats.user_id == current_user.id,
-        DailyStats.date == today
-    ).first()
+    stats = await DashboardService(db).get_stats(current_user)
     
-    # Peso actual
-    latest_weight = db.query(WeightEntry).filter(
-        WeightEntry.user_id == current_user.id
-    ).order_by(WeightEntry.date.desc()).first()
+    return DashboardStats(**stats)
+
+@router.get("/streak")
+async def get_streak(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Obtener racha de registro actual y mejor racha"""
     
-    # Promedio semanal
-    weekly_stats = db.query(DailyStats).filter(
-        DailyStats.user_id == current_user.id,
-        DailyStats.date >= week_ago
-    ).all()
+    return await StreakService(db).get_streak(current_user)
+
+@router.get("/summaries", response_model=List[ProgressSummarySchema])
+async def get_progress_summaries(
+    period_type: PeriodTypeEnum = Query(PeriodTypeEnum.week),
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Obtener resúmenes por semana, mes o trimestre (días cerrados)"""
     
-    # Calcular promedios
-    if weekly_stats:
-        avg_calories = sum(s.consumed_calories for s in weekly_stats) / len(weekly_stats)
-        avg_adherence = sum(s.calorie_adherence for s in weekly_stats if s.calorie_adherence) / len([s for s in weekly_stats if s.calorie_adherence])
-    else:
-        avg_calories = 0
-        avg_adherence = 0
+    if period_type.value not in PERIOD_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Tipo de período no soportado: {period_type.value}"
+        )
     
-    # Tendencia de peso (últimos 7 días)
-    recent_weights = db.query(WeightEntry).filter(
-        WeightEntry.user_id == current_user.id,
-        WeightEntry.date >= week_ago
-    ).order_by(WeightEntry.date).all()
-    
-    weight_trend = "stable"
-    if len(recent_weights) >= 2:
-        weight_change = recent_weights[-1].weight - recent_weights[0].weight
-        if weight_change > 0.5:
-            weight_trend = "increasing"
-        elif weight_change < -0.5:
-            weight_trend = "decreasing"
-    
-    return DashboardStats(
-        current_weight=latest_weight.weight if latest_weight else None,
-        weight_trend=weight_trend,
-        today_calories=today_stats.consumed_calories if today_stats else 0,
-        today_adherence=today_stats.calorie_adherence if today_stats else 0,
-        weekly_avg_calories=avg_calories,
-        weekly_avg_adherence=avg_adherence,
-        current_tdee=current_user.estimated_tdee,
-        adaptive_calories=current_user.adaptive_calories,
-        streak_days=0,  # Implementar lógica de racha
-        total_meals_logged=db.query(DailyStats).filter(
-            DailyStats.user_id == current_user.id
-        ).count()
+    summaries = await ProgressRollupService(db).get_summaries(
+        current_user.id, period_type.value, start_date, end_date
     )
+    
+    return [ProgressSummarySchema.from_orm(summary) for summary in summaries]
 
 @router.get("/weekly-overview", response_model=WeeklyOverview)
 async def get_weekly_overview(
     week_offset: int = Query(0, description="Semanas hacia atrás (0 = semana actual)"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Obtener resumen semanal"""
-    
-    # Calcular fechas de la semana
-    today = date.today()
-    days_since_monday = today.weekday()
-    monday = today - timedelta(days=days_since_monday + (week_offset * 7))
-    sunday = monday + timedelta(days=6)
-    
-    # Obtener estadísticas de la semana
-    weekly_stats = db.query(DailyStats).filter(
-        DailyStats.user_id == current_user.id,
-        DailyStats.date >= monday,
-        DailyStats.date <= sunday
-    ).order_by(DailyStats.date).all()
-    
-    # Obtener pesos de la semana
-    weekly_weights = db.query(WeightEntry).filter(
-        WeightEntry.user_id == current_user.id,
-        WeightEntry.date >= monday,
-        WeightEntry.date <= sunday
-    ).order_by(WeightEntry.date).all()
+    """Obtener resumen semanal (promedios del resumen de la semana; el día en curso aún no cuenta)"""
     
-    # Calcular totales y promedios
-    total_calories = sum(s.consumed_calories for s in weekly_stats)
-    avg_calories = total_calories / 7 if weekly_stats else 0
+    # Calcular fechas de la semana (en la zona horaria del usuario)
+    today = local_today(current_user.timezone)
+    monday, sunday = period_bounds("week", today - timedelta(days=week_offset * 7))
     
-    adherence_values = [s.calorie_adherence for s in weekly_stats if s.calorie_adherence is not None]
-    avg_adherence = sum(adherence_values) / len(adherence_values) if adherence_values else 0
+    summary = await ProgressRollupService(db).get_summary(current_user.id, "week", monday)
+    if summary is None:
+        summary = ProgressSummary(days_logged=0)
     
-    # Cambio de peso
-    weight_change = None
-    if len(weekly_weights) >= 2:
-        weight_change = weekly_weights[-1].weight - weekly_weights[0].weight
+    # Días de la semana (a lo sumo 7 filas por el índice (user_id, date))
+    days = await db.scalars(select(DailyStats).where(
+        DailyStats.user_id == current_user.id,
+        *day_range(DailyStats.date, monday, sunday)
+    ).order_by(DailyStats.date))
+    
+    weekly_avg = {
+        field: getattr(summary, f"avg_{field}") or 0.0
+        for field in ("calories", "protein", "carbs", "fat", "calorie_adherence")
+    }
+    
+    insights = [f"Días registrados: {summary.days_logged}/7"]
+    if summary.weight_change is not None:
+        insights.append(f"Cambio de peso: {summary.weight_change:+.1f} kg")
+    if summary.days_logged and current_user.target_calories:
+        insights.append(
+            f"Promedio de {weekly_avg['calories']:.0f} kcal con un objetivo de {current_user.target_calories:.0f} kcal"
+        )
     
     return WeeklyOverview(
         week_start=monday,
         week_end=sunday,
-        daily_stats=weekly_stats,
-        weight_entries=weekly_weights,
-        total_calories=total_calories,
-        avg_calories=avg_calories,
-        avg_adherence=avg_adherence,
-        weight_change=weight_change,
-        days_logged=len(weekly_stats),
-        target_calories=current_user.target_calories
+        days=[DailyStatsSchema.from_orm(day) for day in days],
+        weekly_avg=weekly_avg,
+        adherence_score=weekly_avg["calorie_adherence"],
+        weight_change=summary.weight_change,
+        insights=insights
     )
 
 @router.post("/analysis", response_model=ProgressAnalysisResponse)
 async def analyze_progress(
     analysis_request: ProgressAnalysisRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Analizar progreso del usuario"""
     
-    # Obtener datos del período solicitado
-    stats = db.query(DailyStats).filter(
-        DailyStats.user_id == current_user.id,
-        DailyStats.date >= analysis_request.start_date,
-        DailyStats.date <= analysis_request.end_date
-    ).order_by(DailyStats.date).all()
+    # Semanas para rangos cortos, meses o trimestres para los largos
+    period_days = (analysis_request.end_date - analysis_request.start_date).days + 1
+    period_type = "week" if period_days <= 62 else "month" if period_days <= 366 else "quarter"
     
-    weights = db.query(WeightEntry).filter(
-        WeightEntry.user_id == current_user.id,
-        WeightEntry.date >= analysis_request.start_date,
-        WeightEntry.date <= analysis_request.end_date
-    ).order_by(WeightEntry.date).all()
+    # Períodos cortados por el rango: solo sus días dentro del rango
+    summaries = await ProgressRollupService(db).range_summaries(
+        current_user.id, period_type, analysis_request.start_date, analysis_request.end_date
+    )
     
-    if not stats and not weights:
+    if not summaries:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No hay datos suficientes para el análisis"
         )
     
-    # Aquí implementarías la lógica de análisis
-    # Por ahora retornamos un análisis básico
+    totals = combine_summaries(summaries)
+    avg_adherence = totals["avg_calorie_adherence"]
+    
+    # Una serie por período: fecha de cierre y su valor
+    def series(value_field: str, trend_field: Optional[str] = None, confidence_field: Optional[str] = None):
+        if not analysis_request.include_trends:
+            return []
+        return [
+            TrendData(
+                date=s.end_date,
+                value=getattr(s, value_field),
+                trend=getattr(s, trend_field) if trend_field else None,
+                confidence=getattr(s, confidence_field) if confidence_field else None
+            )
+            for s in summaries if getattr(s, value_field) is not None
+        ]
+    
+    # Proyección con el modelo ajustado del usuario (guardado hasta que haya datos nuevos)
+    predictions = None
+    if analysis_request.include_predictions:
+        predictions = await ForecastService(db).predictions(current_user, analysis_request.horizons)
+    
+    insights = [f"Días registrados: {totals['days_logged']}/{totals['total_days']}"]
+    if avg_adherence is not None:
+        insights.append(f"Promedio de adherencia: {avg_adherence:.1%}")
+    if totals["weight_change"] is not None:
+        insights.append(f"Cambio de peso: {totals['weight_change']:+.1f} kg")
+    
+    recommendations = []
+    if totals["logging_consistency"] < 0.7:
+        recommendations.append("Registra tus comidas más días por semana para afinar el análisis")
+    if avg_adherence is not None and abs(avg_adherence - 1) > 0.1:
+        recommendations.append("Acerca tu ingesta diaria a tu objetivo calórico")
+    if predictions and abs(predictions["recommended_calorie_adjustment"]) >= 100:
+        recommendations.append(
+            f"Ajusta tu objetivo en {predictions['recommended_calorie_adjustment']:+.0f} kcal/día según tu gasto estimado"
+        )
     
     return ProgressAnalysisResponse(
-        period_start=analysis_request.start_date,
-        period_end=analysis_request.end_date,
-        total_days=len(stats),
-        avg_calories=sum(s.consumed_calories for s in stats) / len(stats) if stats else 0,
-        avg_adherence=sum(s.calorie_adherence for s in stats if s.calorie_adherence) / len([s for s in stats if s.calorie_adherence]) if stats else 0,
-        weight_change=weights[-1].weight - weights[0].weight if len(weights) >= 2 else 0,
-        trends={
-            "calories": [s.consumed_calories for s in stats],
-            "weight": [w.weight for w in weights],
-            "adherence": [s.calorie_adherence for s in stats if s.calorie_adherence]
-        },
-        predictions={
-            "estimated_weight_next_week": weights[-1].weight if weights else current_user.current_weight,
-            "recommended_calorie_adjustment": 0
-        },
-        insights=[
-            "Análisis de progreso generado exitosamente",
-            f"Datos analizados de {len(stats)} días",
-            f"Promedio de adherencia: {sum(s.calorie_adherence for s in stats if s.calorie_adherence) / len([s for s in stats if s.calorie_adherence]):.1%}" if stats else "Sin datos de adherencia"
-        ]
-    )
\ No newline at end of file
+        period={"start_date": analysis_request.start_date, "end_date": analysis_request.end_date},
+        summary=ProgressAnalysisSummary(period_type=period_type, **totals),
+        trends=ProgressTrends(
+            weight_trend=series("weight_end", trend_field="weight_trend"),
+            calorie_trend=series("avg_calories"),
+            adherence_trend=series("avg_calorie_adherence"),
+            tdee_trend=series("tdee_end", confidence_field="tdee_confidence")
+        ),
+        predictions=predictions,
+        insights=insights,
+        recommendations=recommendations
+    )
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Dict, Any
 from datetime import datetime
 import json
@@ -8,6 +9,7 @@ from app.core.database import get_db
 from app.core.security import get_current_user
 from app.models.user import User
 from app.models.sync import SyncData, SyncSession
+from app.services.sync_service import SyncService
 from app.schemas.sync import (
     SyncDataCreate, SyncDataUpdate, SyncData as SyncDataSchema,
     SyncSessionCreate, SyncSession as SyncSessionSchema,
@@ -20,24 +22,24 @@ router = APIRouter()
 async def create_sync_session(
     session_data: SyncSessionCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Crear nueva sesión de sincronización"""
     
     # Verificar si ya existe una sesión activa para este dispositivo
-    existing_session = db.query(SyncSession).filter(
+    existing_session = await db.scalar(select(SyncSession).where(
         SyncSession.user_id == current_user.id,
         SyncSession.device_id == session_data.device_id,
         SyncSession.is_active == True
-    ).first()
+    ))
     
     if existing_session:
         # Actualizar sesión existente
         existing_session.last_sync = datetime.utcnow()
         existing_session.app_version = session_data.app_version
         existing_session.platform = session_data.platform
-        db.commit()
-        db.refresh(existing_session)
+        await db.commit()
+        await db.refresh(existing_session)
         return SyncSessionSchema.from_orm(existing_session)
     
     # Crear nueva sesión
@@ -53,8 +55,8 @@ async def create_sync_session(
     )
     
     db.add(sync_session)
-    db.commit()
-    db.refresh(sync_session)
+    await db.commit()
+    await db.refresh(sync_session)
     
     return SyncSessionSchema.from_orm(sync_session)
 
@@ -62,16 +64,16 @@ async def create_sync_session(
 async def upload_sync_data(
     sync_request: SyncRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Subir datos para sincronización"""
     
     # Verificar sesión de sincronización
-    sync_session = db.query(SyncSession).filter(
+    sync_session = await db.scalar(select(SyncSession).where(
         SyncSession.sync_token == sync_request.sync_token,
         SyncSession.user_id == current_user.id,
         SyncSession.is_active == True
-    ).first()
+    ))
     
     if not sync_session:
         raise HTTPException(
@@ -79,67 +81,16 @@ async def upload_sync_data(
             detail="Token de sincronización inválido"
         )
     
-    uploaded_count = 0
-    conflicts = []
-    
-    # Procesar cada elemento de datos
-    for data_item in sync_request.data:
-        try:
-            # Verificar si ya existe
-            existing_data = db.query(SyncData).filter(
-                SyncData.user_id == current_user.id,
-                SyncData.entity_type == data_item.entity_type,
-                SyncData.entity_id == data_item.entity_id,
-                SyncData.device_id == sync_session.device_id
-            ).first()
-            
-            if existing_data:
-                # Verificar conflicto por timestamp
-                if existing_data.client_timestamp != data_item.client_timestamp:
-                    conflicts.append({
-                        "entity_type": data_item.entity_type,
-                        "entity_id": data_item.entity_id,
-                        "server_timestamp": existing_data.server_timestamp,
-                        "client_timestamp": data_item.client_timestamp,
-                        "conflict_type": "timestamp_mismatch"
-                    })
-                    continue
-                
-                # Actualizar datos existentes
-                existing_data.data = data_item.data
-                existing_data.action = data_item.action
-                existing_data.server_timestamp = datetime.utcnow()
-                existing_data.sync_status = "synced"
-            else:
-                # Crear nuevo registro
-                sync_data = SyncData(
-                    user_id=current_user.id,
-                    device_id=sync_session.device_id,
-                    entity_type=data_item.entity_type,
-                    entity_id=data_item.entity_id,
-                    action=data_item.action,
-                    data=data_item.data,
-                    client_timestamp=data_item.client_timestamp,
-                    server_timestamp=datetime.utcnow(),
-                    sync_status="synced"
-                )
-                db.add(sync_data)
-            
-            uploaded_count += 1
-            
-        except Exception as e:
-            conflicts.append({
-                "entity_type": data_item.entity_type,
-                "entity_id": data_item.entity_id,
-                "error": str(e),
-                "conflict_type": "processing_error"
-            })
+    # Cambios del dispositivo por tramos (una consulta y escrituras masivas por tramo)
+    uploaded_count, conflicts = await SyncService(db).upload(
+        current_user.id, sync_session.device_id, sync_request.data
+    )
     
     # Actualizar sesión
     sync_session.last_sync = datetime.utcnow()
     sync_session.items_synced += uploaded_count
     
-    db.commit()
+    await db.commit()
     
     return {
         "uploaded_count": uploaded_count,
@@ -153,16 +104,16 @@ async def download_sync_data(
     sync_token: str,
     last_sync: datetime = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Descargar datos sincronizados"""
     
     # Verificar sesión
-    sync_session = db.query(SyncSession).filter(
+    sync_session = await db.scalar(select(SyncSession).where(
         SyncSession.sync_token == sync_token,
         SyncSession.user_id == current_user.id,
         SyncSession.is_active == True
-    ).first()
+    ))
     
     if not sync_session:
         raise HTTPException(
@@ -171,18 +122,18 @@ async def download_sync_data(
         )
     
     # Obtener datos modificados desde la última sincronización
-    query = db.query(SyncData).filter(
+    query = select(SyncData).where(
         SyncData.user_id == current_user.id,
         SyncData.sync_status == "synced"
     )
     
     if last_sync:
-        query = query.filter(SyncData.server_timestamp > last_sync)
+        query = query.where(SyncData.server_timestamp > last_sync)
     
     # Excluir datos del mismo dispositivo para evitar loops
-    query = query.filter(SyncData.device_id != sync_session.device_id)
+    query = query.where(SyncData.device_id != sync_session.device_id)
     
-    sync_data = query.order_by(SyncData.server_timestamp).all()
+    sync_data = await db.scalars(query.order_by(SyncData.server_timestamp))
     
     # Convertir a formato de respuesta
     data_items = []
@@ -207,16 +158,16 @@ async def download_sync_data(
 async def resolve_conflict(
     resolution: ConflictResolution,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Resolver conflicto de sincronización"""
     
     # Buscar el dato en conflicto
-    sync_data = db.query(SyncData).filter(
+    sync_data = await db.scalar(select(SyncData).where(
         SyncData.user_id == current_user.id,
         SyncData.entity_type == resolution.entity_type,
         SyncData.entity_id == resolution.entity_id
-    ).first()
+    ))
     
     if not sync_data:
         raise HTTPException(
@@ -240,7 +191,7 @@ async def resolve_conflict(
         sync_data.sync_status = "synced"
         sync_data.server_timestamp = datetime.utcnow()
     
-    db.commit()
+    await db.commit()
     
     return {
         "message": "Conflicto resuelto exitosamente",
@@ -252,27 +203,27 @@ async def resolve_conflict(
 @router.get("/status")
 async def get_sync_status(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Obtener estado de sincronización"""
     
     # Obtener sesiones activas
-    active_sessions = db.query(SyncSession).filter(
+    active_sessions = (await db.scalars(select(SyncSession).where(
         SyncSession.user_id == current_user.id,
         SyncSession.is_active == True
-    ).all()
+    ))).all()
     
     # Obtener datos pendientes de sincronización
-    pending_data = db.query(SyncData).filter(
+    pending_data = await db.scalar(select(func.count(SyncData.id)).where(
         SyncData.user_id == current_user.id,
         SyncData.sync_status == "pending"
-    ).count()
+    ))
     
     # Obtener conflictos sin resolver
-    conflicts = db.query(SyncData).filter(
+    conflicts = await db.scalar(select(func.count(SyncData.id)).where(
         SyncData.user_id == current_user.id,
         SyncData.sync_status == "conflict"
-    ).count()
+    ))
     
     return {
         "active_sessions": len(active_sessions),
@@ -294,15 +245,15 @@ async def get_sync_status(
 async def deactivate_sync_session(
     device_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Desactivar sesión de sincronización"""
     
-    sync_session = db.query(SyncSession).filter(
+    sync_session = await db.scalar(select(SyncSession).where(
         SyncSession.user_id == current_user.id,
         SyncSession.device_id == device_id,
         SyncSession.is_active == True
-    ).first()
+    ))
     
     if not sync_session:
         raise HTTPException(
@@ -311,7 +262,7 @@ async def deactivate_sync_session(
         )
     
     sync_session.is_active = False
-    db.commit()
+    await db.commit()
     
     return {"message": "Sesión de sincronización desactivada"}
 
@@ -319,26 +270,26 @@ async def deactivate_sync_session(
 async def force_full_sync(
     device_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Forzar sincronización completa"""
     
     # Marcar todos los datos como pendientes de sincronización
-    db.query(SyncData).filter(
+    await db.execute(update(SyncData).where(
         SyncData.user_id == current_user.id
-    ).update({"sync_status": "pending"})
+    ).values(sync_status="pending"))
     
     # Actualizar timestamp de sesión
-    sync_session = db.query(SyncSession).filter(
+    sync_session = await db.scalar(select(SyncSession).where(
         SyncSession.user_id == current_user.id,
         SyncSession.device_id == device_id,
         SyncSession.is_active == True
-    ).first()
+    ))
     
     if sync_session:
         sync_session.last_sync = datetime.utcnow()
     
-    db.commit()
+    await db.commit()
     
     return {
         "message": "Sincronización completa iniciada",
@@ -18,11 +18,29 @@ class Settings(BaseModel):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     
+    # 🗄️ Base de datos (motor asíncrono: asyncpg / aiosqlite)
+    DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./food_detection.db")
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))  # Conexiones abiertas por worker
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))  # Conexiones extra en picos
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # Segundos esperando una conexión libre
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # Renovar conexiones cada N segundos
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"  # Descartar conexiones caídas
+    DB_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000"))  # Cancelar consultas lentas
+
     # 📁 File Upload
     UPLOAD_DIR: str = "uploads"
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
     ALLOWED_EXTENSIONS: str = ".jpg,.jpeg,.png,.gif,.webp"
     
+    # 📷 Escaneo de códigos de barras en vivo (WebSocket)
+    BARCODE_DECODE_WORKERS: int = int(os.getenv("BARCODE_DECODE_WORKERS", "2"))
+    BARCODE_FRAME_MAX_BYTES: int = 512 * 1024  # Fotogramas reducidos, no fotos completas
+    BARCODE_FRAME_HASH_DISTANCE: int = 4  # Bits de diferencia para considerar fotogramas iguales
+    
+    # 🥗 Base nutricional local (CSV compilado a formato columnar mapeado en memoria)
+    NUTRITION_DB_SOURCE: Optional[str] = os.getenv("NUTRITION_DB_SOURCE")  # Por defecto app/data/foods.csv
+    NUTRITION_DB_PATH: Optional[str] = os.getenv("NUTRITION_DB_PATH")  # Por defecto junto al CSV (.nutdb)
+    
     # 🌐 CORS
     CORS_ORIGINS: str = os.getenv("CORS_ORIGINS", "*")  # Permisivo para aplicaciones móviles
     
@@ -0,0 +1,95 @@
+"""
+Conexión a la base de datos
+Los endpoints usan el motor asíncrono (AsyncSession por petición): mientras una
+consulta espera a la base, el worker sigue atendiendo otras peticiones. El motor
+síncrono queda para migraciones y tareas de consola (cron).
+
+El tamaño del pool, el pre-ping y el timeout por sentencia se configuran en
+Settings (DB_*).
+"""
+
+from typing import AsyncIterator, Dict, Any
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from app.core.config import settings
+
+Base = declarative_base()
+
+# Driver asíncrono y síncrono de cada motor
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+SYNC_DRIVERS = {"postgresql": "psycopg2", "sqlite": "pysqlite"}
+
+
+def _database_url(url: str, drivers: Dict[str, str]) -> URL:
+    """URL con el driver indicado para el motor (acepta el alias postgres://)"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "postgres":
+        backend = "postgresql"
+    if backend in drivers:
+        parsed = parsed.set(drivername=f"{backend}+{drivers[backend]}")
+    return parsed
+
+
+def async_database_url(url: str = settings.DATABASE_URL) -> URL:
+    return _database_url(url, ASYNC_DRIVERS)
+
+
+def sync_database_url(url: str = settings.DATABASE_URL) -> URL:
+    return _database_url(url, SYNC_DRIVERS)
+
+
+def engine_options(url: URL) -> Dict[str, Any]:
+    """Pool y timeouts según el motor y el driver"""
+    options: Dict[str, Any] = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    timeout_ms = settings.DB_STATEMENT_TIMEOUT_MS
+
+    if url.get_backend_name() == "sqlite":
+        # SQLite no tiene timeout por sentencia: se usa como espera máxima por bloqueos
+        options["connect_args"] = {"timeout": timeout_ms / 1000}
+        return options
+
+    options.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+    if url.get_driver_name() == "asyncpg":
+        options["connect_args"] = {"server_settings": {"statement_timeout": str(timeout_ms)}}
+    elif url.get_driver_name() == "psycopg2":
+        options["connect_args"] = {"options": f"-c statement_timeout={timeout_ms}"}
+    return options
+
+
+# Motor asíncrono (endpoints)
+_async_url = async_database_url()
+async_engine = create_async_engine(_async_url, **engine_options(_async_url))
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, expire_on_commit=False
+)
+
+# Motor síncrono (migraciones y tareas de consola)
+_sync_url = sync_database_url()
+engine = create_engine(_sync_url, **engine_options(_sync_url))
+SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+
+async def get_db() -> AsyncIterator[AsyncSession]:
+    """
+    Sesión asíncrona por petición (dependencia de FastAPI)
+    expire_on_commit=False: los objetos siguen legibles tras el commit sin
+    volver a consultar (en asyncio no hay carga perezosa implícita)
+    """
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+async def dispose_engines():
+    """Cerrar las conexiones del pool (al apagar el worker)"""
+    await async_engine.dispose()
+    engine.dispose()
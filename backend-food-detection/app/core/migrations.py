@@ -0,0 +1,227 @@
+"""
+Migraciones de esquema
+Cada migración es idempotente: se puede ejecutar al desplegar sobre una base
+nueva (donde create_all ya creó todo) o sobre una existente.
+
+Uso:
+    python -m app.core.migrations
+"""
+
+import logging
+from datetime import timedelta
+from typing import Callable, List, Tuple
+
+from sqlalchemy import delete, func, inspect, select, update
+from sqlalchemy.engine import Engine
+
+from app.core.time_ranges import day_range, local_day
+
+from app.models.meal import Food, Meal, MealFood
+from app.models.progress import DailyStats, ProgressSummary, TDEEState, UserStreak, WeightEntry, WeightTrend
+from app.models.sync import SyncData
+from app.models.user import User
+from app.services.daily_stats_service import DAILY_FIELDS, MAX_CALORIE_ADHERENCE
+from app.services.food_search import create_search_index
+
+logger = logging.getLogger(__name__)
+
+
+def add_user_time_indexes(engine: Engine) -> List[str]:
+    """
+    Índices compuestos (user_id, fecha) para las tablas de series de tiempo
+    por usuario: meals, weight_entries, daily_stats y sync_data (más el de
+    entidades por dispositivo de sync_data). Los únicos los crea su propia
+    migración, que primero resuelve los duplicados
+    """
+    created = []
+    inspector = inspect(engine)
+    for model in (Meal, WeightEntry, DailyStats, SyncData):
+        table = model.__table__
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if len(index.columns) < 2 or index.unique or index.name in existing:
+                continue
+            index.create(bind=engine)
+            created.append(index.name)
+            logger.info(f"Índice creado: {index.name}")
+    return created
+
+
+def add_food_popularity(engine: Engine) -> List[str]:
+    """Columna foods.popularity_score usada para ordenar búsquedas"""
+    columns = {column["name"] for column in inspect(engine).get_columns(Food.__tablename__)}
+    if "popularity_score" in columns:
+        return []
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ALTER TABLE foods ADD COLUMN popularity_score FLOAT DEFAULT 0")
+    return ["foods.popularity_score"]
+
+
+def add_progress_rollups(engine: Engine) -> List[str]:
+    """
+    Columnas nuevas de progress_summaries y el índice único
+    (user_id, period_type, start_date) que usan los resúmenes por período
+    """
+    created = []
+    inspector = inspect(engine)
+    table = ProgressSummary.__table__
+    columns = {column["name"] for column in inspector.get_columns(table.name)}
+    with engine.begin() as conn:
+        for name, ddl in (("avg_target_calories", "FLOAT"), ("updated_at", "TIMESTAMP")):
+            if name not in columns:
+                conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {name} {ddl}")
+                created.append(f"{table.name}.{name}")
+
+    existing = {index["name"] for index in inspector.get_indexes(table.name)}
+    for index in table.indexes:
+        if index.name not in existing:
+            index.create(bind=engine)
+            created.append(index.name)
+            logger.info(f"Índice creado: {index.name}")
+    return created
+
+
+def add_user_streaks(engine: Engine) -> List[str]:
+    """Tabla user_streaks (estado de rachas por usuario)"""
+    table = UserStreak.__table__
+    if inspect(engine).has_table(table.name):
+        return []
+    table.create(bind=engine)
+    return [table.name]
+
+
+def add_weight_trends(engine: Engine) -> List[str]:
+    """Tabla weight_trends (tendencia de peso suavizada por usuario)"""
+    table = WeightTrend.__table__
+    if inspect(engine).has_table(table.name):
+        return []
+    table.create(bind=engine)
+    return [table.name]
+
+
+def add_meal_food_index(engine: Engine) -> List[str]:
+    """Índice meal_foods.meal_id (alimentos de cada comida sin recorrer la tabla)"""
+    table = MealFood.__table__
+    existing = {index["name"] for index in inspect(engine).get_indexes(table.name)}
+    created = []
+    for index in table.indexes:
+        if index.name not in existing:
+            index.create(bind=engine)
+            created.append(index.name)
+            logger.info(f"Índice creado: {index.name}")
+    return created
+
+
+def add_tdee_states(engine: Engine) -> List[str]:
+    """Tabla tdee_states (estado del filtro de Kalman del TDEE por usuario)"""
+    table = TDEEState.__table__
+    if inspect(engine).has_table(table.name):
+        return []
+    table.create(bind=engine)
+    return [table.name]
+
+
+def unique_daily_stats(engine: Engine) -> List[str]:
+    """
+    Índice único (user_id, date) de daily_stats
+
+    Antes era un índice simple y dos altas concurrentes del primer registro
+    del día podían crear dos filas. Cada grupo repetido se funde en la fila
+    de menor id con los totales recalculados desde las comidas (con la misma
+    regla de día que DailyStatsService) y el filtro del TDEE de esos usuarios
+    se marca para reconstruir desde el día afectado
+    """
+    table = DailyStats.__table__
+    index = next(index for index in table.indexes if index.name == "ix_daily_stats_user_id_date")
+    existing = {item["name"]: item for item in inspect(engine).get_indexes(table.name)}
+    if existing.get(index.name, {}).get("unique"):
+        return []
+
+    with engine.begin() as conn:
+        groups = conn.execute(
+            select(DailyStats.user_id, DailyStats.date)
+            .group_by(DailyStats.user_id, DailyStats.date)
+            .having(func.count() > 1)
+        ).all()
+        for user_id, day in groups:
+            user = conn.execute(
+                select(User.timezone, User.target_calories).where(User.id == user_id)
+            ).one_or_none()
+            timezone_name, target = user if user else (None, None)
+            totals = {field: 0.0 for field in DAILY_FIELDS}
+            meal_count = 0
+            meals = conn.execute(
+                select(Meal.eaten_at, *[getattr(Meal, f"total_{field}") for field in totals])
+                .where(Meal.user_id == user_id,
+                       *day_range(Meal.eaten_at, day - timedelta(days=1), day + timedelta(days=1)))
+            ).all()
+            for eaten_at, *values in meals:
+                if local_day(eaten_at, timezone_name) != day:
+                    continue
+                for field, value in zip(totals, values):
+                    totals[field] += value or 0.0
+                meal_count += 1
+
+            rows = conn.execute(
+                select(DailyStats.id, DailyStats.weight, DailyStats.complete_day)
+                .where(DailyStats.user_id == user_id, DailyStats.date == day)
+                .order_by(DailyStats.id)
+            ).all()
+            keep = rows[0].id
+            conn.execute(update(DailyStats).where(DailyStats.id == keep).values(
+                meal_count=meal_count,
+                calorie_adherence=min(totals["calories"] / target, MAX_CALORIE_ADHERENCE) if target else None,
+                weight=next((row.weight for row in rows if row.weight is not None), None),
+                complete_day=any(row.complete_day for row in rows),
+                **{f"consumed_{field}": value for field, value in totals.items()}
+            ))
+            conn.execute(delete(DailyStats).where(
+                DailyStats.user_id == user_id, DailyStats.date == day, DailyStats.id != keep
+            ))
+            conn.execute(update(TDEEState).where(
+                TDEEState.user_id == user_id, TDEEState.last_date >= day
+            ).values(last_date=None))
+
+        if groups:
+            users = sorted({user_id for user_id, _ in groups})
+            logger.warning(
+                f"daily_stats: {len(groups)} días repetidos fusionados (usuarios {users}); "
+                "recalcular rachas y resúmenes: python -m app.services.streak_service, "
+                "python -m app.services.progress_rollups backfill"
+            )
+        if index.name in existing:
+            conn.exec_driver_sql(f"DROP INDEX {index.name}")
+    index.create(bind=engine)
+    logger.info(f"Índice creado: {index.name}")
+    return [index.name]
+
+
+# Migraciones en orden de aplicación
+MIGRATIONS: List[Tuple[str, Callable[[Engine], List[str]]]] = [
+    ("001_user_time_indexes", add_user_time_indexes),
+    ("002_food_popularity", add_food_popularity),
+    ("003_food_search_index", create_search_index),
+    ("004_progress_rollups", add_progress_rollups),
+    ("005_user_streaks", add_user_streaks),
+    ("006_weight_trends", add_weight_trends),
+    ("007_meal_food_index", add_meal_food_index),
+    ("008_tdee_states", add_tdee_states),
+    ("009_unique_daily_stats", unique_daily_stats),
+]
+
+
+def run_migrations(engine: Engine) -> List[str]:
+    """Aplicar todas las migraciones; devuelve los objetos creados"""
+    created = []
+    for name, migration in MIGRATIONS:
+        logger.info(f"Aplicando migración {name}")
+        created.extend(migration(engine))
+    return created
+
+
+if __name__ == "__main__":
+    from app.core.database import engine
+
+    logging.basicConfig(level=logging.INFO)
+    applied = run_migrations(engine)
+    print(f"✅ Migraciones aplicadas ({len(applied)} objetos nuevos)")
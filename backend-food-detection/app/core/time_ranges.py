@@ -0,0 +1,86 @@
+"""
+Rangos de fechas para consultas
+Los filtros se expresan como intervalos semiabiertos [inicio, fin) sobre la
+columna tal cual (sin DATE() ni conversiones), así el motor puede recorrer
+los índices compuestos (user_id, fecha) en lugar de escanear la tabla.
+"""
+
+from datetime import date, datetime, time, timedelta, timezone, tzinfo
+from typing import List, Optional, Union
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from sqlalchemy import DateTime
+
+DateLike = Union[date, datetime]
+
+
+def day_start(value: DateLike) -> datetime:
+    """Medianoche del día (un datetime se deja igual)"""
+    if isinstance(value, datetime):
+        return value
+    return datetime.combine(value, time.min)
+
+
+def user_zone(timezone_name: Optional[str] = None) -> tzinfo:
+    """Zona horaria del usuario (UTC si no tiene o no es válida)"""
+    try:
+        return ZoneInfo(timezone_name) if timezone_name else timezone.utc
+    except (ZoneInfoNotFoundError, ValueError):
+        return timezone.utc
+
+
+def local_today(timezone_name: Optional[str] = None) -> date:
+    """Fecha actual en la zona horaria del usuario (UTC si no tiene o no es válida)"""
+    return datetime.now(user_zone(timezone_name)).date()
+
+
+def utc_naive(moment: datetime) -> datetime:
+    """
+    Instante en UTC sin zona, como se guarda (SQLite descarta el desfase de
+    un datetime con zona y guardaría la hora local tal cual)
+    """
+    if moment.tzinfo is None:
+        return moment
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def local_day(moment: datetime, timezone_name: Optional[str] = None) -> date:
+    """
+    Día del usuario al que pertenece un instante (sin zona se toma como UTC)
+    Única regla para asignar comidas a DailyStats: altas, bajas, cambios y conciliación
+    """
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(user_zone(timezone_name)).date()
+
+
+def day_range(column, start: Optional[DateLike] = None, end: Optional[DateLike] = None) -> List:
+    """
+    Predicados para filtrar una columna Date o DateTime por días
+
+    Args:
+        column: columna del modelo (Meal.eaten_at, DailyStats.date, ...)
+        start: primer día incluido
+        end: último día incluido (una fecha incluye el día completo)
+
+    Returns:
+        Lista de condiciones para query.filter(*day_range(...))
+    """
+    is_datetime = isinstance(column.type, DateTime)
+    predicates = []
+
+    if start is not None:
+        if is_datetime:
+            predicates.append(column >= day_start(start))
+        else:
+            predicates.append(column >= (start.date() if isinstance(start, datetime) else start))
+
+    if end is not None:
+        if isinstance(end, datetime):
+            # Un instante exacto se mantiene como cota inclusiva
+            predicates.append(column <= (end if is_datetime else end.date()))
+        else:
+            next_day = end + timedelta(days=1)
+            predicates.append(column < (day_start(next_day) if is_datetime else next_day))
+
+    return predicates
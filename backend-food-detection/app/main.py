@@ -6,6 +6,7 @@ import logging
 
 from app.core.config import settings
 from app.api.api_v1.api import api_router
+from app.ai.barcode_stream import shutdown_decode_pool
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -55,6 +56,11 @@ async def startup_event():
     logger.info("Backend especializado en IA para detección de alimentos")
     logger.info("Base de datos: Manejada por el frontend con Firebase")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Eventos de cierre de la aplicación"""
+    shutdown_decode_pool()
+
 @app.options("/{full_path:path}")
 async def options_handler(full_path: str):
     """Manejar solicitudes OPTIONS para CORS preflight"""
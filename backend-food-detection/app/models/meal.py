@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text, ForeignKey, JSON, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -23,6 +23,7 @@ class Food(Base):
     category = Column(String)  # 'protein', 'vegetable', 'fruit', 'grain', etc.
     barcode = Column(String, unique=True, index=True)
     verified = Column(Boolean, default=False)
+    popularity_score = Column(Float, default=0.0)  # Veces que se registró en comidas
     
     # Datos de IA
     ai_confidence = Column(Float)  # Confianza de detección por IA
@@ -76,6 +77,11 @@ class Meal(Base):
     user = relationship("User", back_populates="meals")
     foods = relationship("MealFood", back_populates="meal", cascade="all, delete-orphan")
     
+    # Consultas por usuario y rango de fechas
+    __table_args__ = (
+        Index("ix_meals_user_id_eaten_at", "user_id", "eaten_at"),
+    )
+    
     def __repr__(self):
         return f"<Meal(id={self.id}, user_id={self.user_id}, type='{self.meal_type}', calories={self.total_calories})>"
 
@@ -108,5 +114,10 @@ class MealFood(Base):
     meal = relationship("Meal", back_populates="foods")
     food = relationship("Food", back_populates="meal_foods")
     
+    # Alimentos de una comida (carga de Meal.foods y exportación)
+    __table_args__ = (
+        Index("ix_meal_foods_meal_id", "meal_id"),
+    )
+    
     def __repr__(self):
         return f"<MealFood(meal_id={self.meal_id}, food_id={self.food_id}, quantity={self.quantity}g)>"
\ No newline at end of file
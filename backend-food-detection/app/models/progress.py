@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Date, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Date, ForeignKey, JSON, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -21,6 +21,11 @@ class WeightEntry(Base):
     # Relaciones
     user = relationship("User", back_populates="weight_entries")
     
+    # Consultas por usuario y rango de fechas
+    __table_args__ = (
+        Index("ix_weight_entries_user_id_date", "user_id", "date"),
+    )
+    
     def __repr__(self):
         return f"<WeightEntry(user_id={self.user_id}, weight={self.weight}kg, date={self.date})>"
 
@@ -67,6 +72,11 @@ class DailyStats(Base):
     # Relaciones
     user = relationship("User", back_populates="daily_stats")
     
+    # Consultas por usuario y rango de fechas; una sola fila por usuario y día
+    __table_args__ = (
+        Index("ix_daily_stats_user_id_date", "user_id", "date", unique=True),
+    )
+    
     def __repr__(self):
         return f"<DailyStats(user_id={self.user_id}, date={self.date}, calories={self.consumed_calories})>"
 
@@ -90,6 +100,7 @@ class ProgressSummary(Base):
     # Adherencia promedio
     avg_calorie_adherence = Column(Float)
     avg_macro_adherence = Column(Float)
+    avg_target_calories = Column(Float)
     
     # Cambios en peso
     weight_start = Column(Float)
@@ -108,6 +119,75 @@ class ProgressSummary(Base):
     logging_consistency = Column(Float)  # % de días con registro
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    # Un resumen por usuario y período; lectura por rango de fechas
+    __table_args__ = (
+        Index("ux_progress_summaries_user_period_start", "user_id", "period_type", "start_date", unique=True),
+    )
+    
+    def __repr__(self):
+        return f"<ProgressSummary(user_id={self.user_id}, period={self.period_type}, start={self.start_date})>"
+
+class UserStreak(Base):
+    __tablename__ = "user_streaks"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    
+    # Racha actual (días consecutivos con comidas hasta last_logged_date)
+    current_streak = Column(Integer, default=0, nullable=False)
+    streak_start = Column(Date)
+    last_logged_date = Column(Date)
+    
+    # Mejor racha histórica
+    longest_streak = Column(Integer, default=0, nullable=False)
+    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    def __repr__(self):
+        return f"<UserStreak(user_id={self.user_id}, current={self.current_streak}, longest={self.longest_streak})>"
+
+class WeightTrend(Base):
+    __tablename__ = "weight_trends"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    
+    # Tendencia tras el último registro de peso (app/ai/weight_trend.py)
+    last_date = Column(Date)
+    trend_weight = Column(Float)  # kg
+    slope = Column(Float)  # kg por día
+    noise = Column(Float)  # varianza alrededor de la tendencia (kg²)
+    entry_count = Column(Integer, default=0, nullable=False)
+    
+    # Estado anterior al último registro: editar ese registro no recorre la serie
+    prev_date = Column(Date)
+    prev_trend_weight = Column(Float)
+    prev_slope = Column(Float)
+    prev_noise = Column(Float)
+    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    def __repr__(self):
+        return f"<WeightTrend(user_id={self.user_id}, trend={self.trend_weight}kg, slope={self.slope})>"
+
+class TDEEState(Base):
+    __tablename__ = "tdee_states"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    
+    # Filtro de Kalman tras el último día cerrado (app/ai/tdee_filter.py);
+    # last_date vacío: un día ya procesado cambió y el filtro se reconstruye
+    last_date = Column(Date)
+    weight = Column(Float)  # peso real estimado (kg)
+    tdee = Column(Float)  # kcal/día
+    p_ww = Column(Float)  # covarianza posterior (kg², kg·kcal, kcal²)
+    p_we = Column(Float)
+    p_ee = Column(Float)
+    
+    intake_days = Column(Integer, default=0, nullable=False)  # días con comidas procesados
+    weigh_ins = Column(Integer, default=0, nullable=False)  # pesajes procesados
+    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     def __repr__(self):
-        return f"<ProgressSummary(user_id={self.user_id}, period={self.period_type}, start={self.start_date})>"
\ No newline at end of file
+        return f"<TDEEState(user_id={self.user_id}, tdee={self.tdee}, last_date={self.last_date})>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, JSON, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, JSON, Boolean, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -41,6 +41,13 @@ class SyncData(Base):
     # Relaciones
     user = relationship("User", back_populates="sync_data")
     
+    # Descarga de cambios por usuario desde la última sincronización y
+    # búsqueda de las entidades de un dispositivo al subir cambios
+    __table_args__ = (
+        Index("ix_sync_data_user_id_server_timestamp", "user_id", "server_timestamp"),
+        Index("ix_sync_data_user_id_device_id_entity", "user_id", "device_id", "entity_type", "entity_id"),
+    )
+    
     def __repr__(self):
         return f"<SyncData(user_id={self.user_id}, type='{self.entity_type}', status='{self.sync_status}')>"
 
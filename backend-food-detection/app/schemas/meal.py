@@ -155,11 +155,36 @@ class FoodSearchQuery(BaseModel):
     verified_only: bool = False
     limit: int = Field(default=20, le=100)
 
+class FoodSearchItem(BaseModel):
+    """Alimento en una lista de resultados (búsqueda, populares)"""
+    id: int
+    name: str
+    brand: Optional[str] = None
+    category: Optional[str] = None
+    calories_per_100g: float
+    protein_per_100g: float
+    carbs_per_100g: float
+    fat_per_100g: float
+    fiber_per_100g: Optional[float] = None
+    common_portions: Optional[Dict[str, float]] = None
+    verified: bool = False
+    popularity_score: float = 0.0
+
 class FoodSearchResult(BaseModel):
     foods: List[Food]
     total_count: int
     query: str
 
+class FoodSuggestion(BaseModel):
+    id: int
+    name: str
+    brand: Optional[str] = None
+    category: Optional[str] = None
+    verified: bool = False
+
+    class Config:
+        from_attributes = True
+
 # Esquemas para entrada rápida de comidas
 class QuickMealEntry(BaseModel):
     text_description: str = Field(..., min_length=3)
@@ -97,6 +97,7 @@ class ProgressSummary(ProgressSummaryBase):
     avg_fat: Optional[float] = None
     avg_calorie_adherence: Optional[float] = None
     avg_macro_adherence: Optional[float] = None
+    avg_target_calories: Optional[float] = None
     weight_start: Optional[float] = None
     weight_end: Optional[float] = None
     weight_change: Optional[float] = None
@@ -108,6 +109,7 @@ class ProgressSummary(ProgressSummaryBase):
     total_days: int
     logging_consistency: float
     created_at: datetime
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -118,6 +120,7 @@ class ProgressAnalysisRequest(BaseModel):
     end_date: date
     include_predictions: bool = True
     include_trends: bool = True
+    horizons: List[int] = Field(default=[7, 14, 28], max_length=12)  # días desde hoy a proyectar
 
 class TrendData(BaseModel):
     date: date
@@ -131,15 +134,37 @@ class ProgressTrends(BaseModel):
     adherence_trend: List[TrendData]
     tdee_trend: List[TrendData]
 
+class WeightForecast(BaseModel):
+    days: int  # días desde hoy
+    weight: float
+    low_80: float
+    high_80: float
+    low_95: float
+    high_95: float
+
 class ProgressPredictions(BaseModel):
     predicted_weight_change: float  # kg en próximas 4 semanas
-    predicted_tdee: float
+    predicted_tdee: Optional[float] = None  # sin ingesta registrada no hay balance energético
     confidence: float
     factors: List[str]  # Factores que influyen en la predicción
+    recommended_calorie_adjustment: float = 0.0
+    horizons: List[WeightForecast] = []
+
+class ProgressAnalysisSummary(BaseModel):
+    """Agregado de los resúmenes del período analizado"""
+    period_type: PeriodTypeEnum  # granularidad de los resúmenes combinados
+    avg_calories: Optional[float] = None
+    avg_calorie_adherence: Optional[float] = None
+    weight_start: Optional[float] = None
+    weight_end: Optional[float] = None
+    weight_change: Optional[float] = None
+    days_logged: int
+    total_days: int
+    logging_consistency: float
 
 class ProgressAnalysisResponse(BaseModel):
     period: Dict[str, date]  # start_date, end_date
-    summary: ProgressSummary
+    summary: ProgressAnalysisSummary
     trends: ProgressTrends
     predictions: Optional[ProgressPredictions] = None
     insights: List[str]  # Insights automáticos
@@ -147,13 +172,18 @@ class ProgressAnalysisResponse(BaseModel):
 
 # Esquemas para dashboard
 class DashboardStats(BaseModel):
-    today: DailyStats
-    week_summary: Dict[str, Any]
-    month_summary: Dict[str, Any]
-    current_streak: int  # días consecutivos con registro
+    current_weight: Optional[float] = None
+    weight_trend: str  # 'increasing', 'decreasing' o 'stable'
+    trend_weight: Optional[float] = None  # peso suavizado
+    today_calories: float
+    today_adherence: float
+    weekly_avg_calories: float
+    weekly_avg_adherence: float
+    current_tdee: Optional[float] = None
+    adaptive_calories: Optional[float] = None
     total_days_logged: int
-    weight_progress: Dict[str, Any]
-    adherence_score: float
+    current_streak: int  # días consecutivos con registro
+    longest_streak: int
 
 class WeeklyOverview(BaseModel):
     week_start: date
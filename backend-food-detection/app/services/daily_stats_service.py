@@ -0,0 +1,273 @@
+"""
+Servicio de estadísticas diarias
+Mantiene DailyStats de forma incremental: cada alta, edición o baja de una
+comida aplica solo su aporte (delta) en la misma transacción, con una
+sentencia atómica sobre la fila única del día (y los resúmenes de sus
+períodos si el día ya pasó). La conciliación periódica recalcula los días desde las comidas y
+corrige cualquier desviación acumulada.
+
+El día de una comida es siempre el de su eaten_at (UTC) en la zona horaria
+del usuario (local_day): la misma regla para sumar, restar, mover y conciliar.
+"""
+
+import argparse
+import asyncio
+import logging
+from datetime import date, timedelta
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import and_, case, func, null, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.time_ranges import day_range, local_day
+from app.models.meal import Meal
+from app.models.progress import DailyStats
+from app.models.user import User
+from app.services.dashboard_service import invalidate_dashboard_on_commit
+from app.services.progress_rollups import ProgressRollupService
+from app.services.streak_service import StreakService
+from app.services.tdee_filter_service import TDEEFilterService
+
+logger = logging.getLogger(__name__)
+
+# Macronutrientes acumulados por día (Meal.total_* → DailyStats.consumed_*)
+DAILY_FIELDS = ("calories", "protein", "carbs", "fat", "fiber")
+
+# Tope de la adherencia calórica (igual que el cálculo completo)
+MAX_CALORIE_ADHERENCE = 2.0
+
+# INSERT con ON CONFLICT DO UPDATE por motor (los de app.core.database)
+UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+# Diferencia mínima que la conciliación considera desviación
+RECONCILE_TOLERANCE = 0.01
+
+
+def meal_totals(meal: Meal) -> Dict[str, float]:
+    """Aporte de una comida a su día"""
+    return {field: getattr(meal, f"total_{field}") or 0.0 for field in DAILY_FIELDS}
+
+
+class DailyStatsService:
+    """Mantenimiento incremental y conciliación de DailyStats"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.rollups = ProgressRollupService(db)
+        self.streaks = StreakService(db)
+        self.tdee = TDEEFilterService(db)
+
+    async def meal_day(self, meal: Meal) -> date:
+        """Día del usuario al que pertenece la comida (zona horaria leída una vez por usuario)"""
+        return local_day(meal.eaten_at, await self.rollups.user_timezone(meal.user_id))
+
+    def _adherence(self, user_id: int, consumed_calories, current):
+        """
+        Expresión SQL de la adherencia calórica con el objetivo del usuario
+        (subconsulta escalar, sin cargar el User); sin objetivo se conserva el valor actual
+        """
+        target = select(User.target_calories).where(User.id == user_id).scalar_subquery()
+        ratio = consumed_calories / target
+        return case(
+            (target > 0, case((ratio > MAX_CALORIE_ADHERENCE, MAX_CALORIE_ADHERENCE), else_=ratio)),
+            else_=current
+        )
+
+    async def apply_delta(self, user_id: int, target_date: date, totals: Dict[str, float], meal_count: int):
+        """
+        Sumar (o restar) el aporte de comidas al día, sin commit
+
+        Una sola sentencia relativa (consumed = consumed + delta) mantiene el
+        costo constante sin importar cuántas comidas tenga el día. Al sumar es
+        un INSERT ... ON CONFLICT (user_id, date) DO UPDATE sobre el índice
+        único, así dos altas concurrentes del primer registro del día terminan
+        en la misma fila; al restar basta un UPDATE (sin fila no hay qué restar).
+        La sentencia devuelve las comidas del día (RETURNING) para saber si es
+        la primera, que es cuando avanza la racha
+
+        Args:
+            totals: delta por macronutriente (negativo al quitar una comida)
+            meal_count: +1 al agregar, -1 al quitar
+        """
+        invalidate_dashboard_on_commit(self.db, user_id)
+        values = {
+            f"consumed_{field}": func.coalesce(getattr(DailyStats, f"consumed_{field}"), 0.0) + totals.get(field, 0.0)
+            for field in DAILY_FIELDS
+        }
+        values["meal_count"] = func.coalesce(DailyStats.meal_count, 0) + meal_count
+        values["calorie_adherence"] = self._adherence(
+            user_id, values["consumed_calories"], DailyStats.calorie_adherence
+        )
+
+        if meal_count > 0:
+            upsert = UPSERT_INSERTS[self.db.get_bind().dialect.name](DailyStats).values(
+                user_id=user_id,
+                date=target_date,
+                meal_count=meal_count,
+                calorie_adherence=self._adherence(user_id, totals.get("calories", 0.0), null()),
+                **{f"consumed_{field}": totals.get(field, 0.0) for field in DAILY_FIELDS}
+            )
+            statement = upsert.on_conflict_do_update(index_elements=["user_id", "date"], set_=values)
+        else:
+            statement = (
+                update(DailyStats)
+                .where(and_(DailyStats.user_id == user_id, DailyStats.date == target_date))
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+        day_meals = (await self.db.execute(statement.returning(DailyStats.meal_count))).scalar()
+        if day_meals is None:
+            logger.warning(f"DailyStats sin fila para restar: usuario {user_id}, día {target_date}")
+            return
+
+        # Rachas: primera comida del día o día que se queda sin comidas
+        if meal_count > 0 and day_meals == meal_count:
+            await self.streaks.record_day(user_id, target_date)
+        elif meal_count < 0 and day_meals <= 0:
+            await self.streaks.day_cleared(user_id, target_date)
+
+    async def add_meal(self, meal: Meal):
+        """Sumar una comida nueva a su día"""
+        day = await self.meal_day(meal)
+        await self.apply_delta(meal.user_id, day, meal_totals(meal), 1)
+        await self.rollups.day_changed(meal.user_id, day)
+        await self.tdee.day_changed(meal.user_id, day)
+
+    async def remove_meal(self, meal: Meal, eaten_date: Optional[date] = None):
+        """Restar una comida de su día (o del día indicado, p. ej. antes de moverla)"""
+        day = eaten_date or await self.meal_day(meal)
+        totals = {field: -value for field, value in meal_totals(meal).items()}
+        await self.apply_delta(meal.user_id, day, totals, -1)
+        await self.rollups.day_changed(meal.user_id, day)
+        await self.tdee.day_changed(meal.user_id, day)
+
+    async def move_meal(self, meal: Meal, old_date: date):
+        """Pasar el aporte de una comida de un día a otro (old_date: meal_day antes del cambio)"""
+        if await self.meal_day(meal) == old_date:
+            return
+        await self.remove_meal(meal, old_date)
+        await self.add_meal(meal)
+
+    async def reconcile(self, start_date: date, end_date: Optional[date] = None,
+                  user_id: Optional[int] = None) -> Dict[str, int]:
+        """
+        Recalcular los días del rango desde las comidas y corregir desviaciones
+
+        Pensado como tarea periódica (cron): una consulta por las comidas del
+        rango (con un día de margen a cada lado, porque el día local puede
+        caer antes o después del día UTC) y otra para las filas existentes;
+        las comidas se agrupan por local_day, la misma regla que los deltas,
+        y solo se escriben los días que no coinciden
+
+        Returns:
+            Conteo de días revisados, corregidos y creados
+        """
+        end_date = end_date or date.today()
+
+        query = select(
+            Meal.user_id,
+            Meal.eaten_at,
+            User.timezone,
+            *[getattr(Meal, f"total_{field}").label(field) for field in DAILY_FIELDS]
+        ).join(User, User.id == Meal.user_id).where(
+            *day_range(Meal.eaten_at, start_date - timedelta(days=1), end_date + timedelta(days=1))
+        )
+        if user_id is not None:
+            query = query.where(Meal.user_id == user_id)
+
+        actual: Dict[Tuple[int, date], Dict[str, float]] = {}
+        for row in await self.db.execute(query):
+            row_date = local_day(row.eaten_at, row.timezone)
+            if not start_date <= row_date <= end_date:
+                continue
+            day_totals = actual.setdefault(
+                (row.user_id, row_date), {**{field: 0.0 for field in DAILY_FIELDS}, "meal_count": 0}
+            )
+            for field in DAILY_FIELDS:
+                day_totals[field] += getattr(row, field) or 0.0
+            day_totals["meal_count"] += 1
+
+        stats_query = select(DailyStats).where(*day_range(DailyStats.date, start_date, end_date))
+        if user_id is not None:
+            stats_query = stats_query.where(DailyStats.user_id == user_id)
+        existing = {(stat.user_id, stat.date): stat for stat in await self.db.scalars(stats_query)}
+
+        empty = {**{field: 0.0 for field in DAILY_FIELDS}, "meal_count": 0}
+        changed = []
+        created = 0
+        streak_users = set()
+        for key in set(actual) | set(existing):
+            expected = actual.get(key, empty)
+            stat = existing.get(key)
+            if stat is None:
+                if not expected["meal_count"]:
+                    continue
+                stat = DailyStats(user_id=key[0], date=key[1])
+                self.db.add(stat)
+                created += 1
+            elif (stat.meal_count or 0) == expected["meal_count"] and all(
+                abs((getattr(stat, f"consumed_{field}") or 0.0) - expected[field]) <= RECONCILE_TOLERANCE
+                for field in DAILY_FIELDS
+            ):
+                continue
+
+            for field in DAILY_FIELDS:
+                setattr(stat, f"consumed_{field}", expected[field])
+            if ((stat.meal_count or 0) > 0) != (expected["meal_count"] > 0):
+                streak_users.add(stat.user_id)
+            stat.meal_count = expected["meal_count"]
+            changed.append(stat)
+
+        # Adherencia con los objetivos actuales (una consulta para todos los usuarios)
+        if changed:
+            targets = dict((await self.db.execute(
+                select(User.id, User.target_calories).where(User.id.in_({stat.user_id for stat in changed}))
+            )).all())
+            for stat in changed:
+                target = targets.get(stat.user_id)
+                if target:
+                    stat.calorie_adherence = min(stat.consumed_calories / target, MAX_CALORIE_ADHERENCE)
+
+        # Días que ganaron o perdieron todas sus comidas cambian las rachas
+        if streak_users:
+            await self.streaks.recompute(sorted(streak_users))
+
+        # Los días ya cerrados corregidos actualizan sus resúmenes por período y el filtro del TDEE
+        for stat in changed:
+            invalidate_dashboard_on_commit(self.db, stat.user_id)
+            await self.tdee.day_changed(stat.user_id, stat.date)
+            if stat.complete_day:
+                await self.rollups.refresh_day(stat.user_id, stat.date)
+
+        await self.db.commit()
+
+        summary = {"checked": len(set(actual) | set(existing)), "corrected": len(changed) - created, "created": created}
+        if changed:
+            logger.warning(f"Conciliación de DailyStats {start_date}..{end_date}: {summary}")
+        return summary
+
+
+async def _reconcile_recent(days: int, user_id: Optional[int] = None) -> Dict[str, int]:
+    from app.core.database import AsyncSessionLocal, async_engine
+    import app.models.base  # noqa: F401 (registrar todos los modelos)
+
+    try:
+        async with AsyncSessionLocal() as session:
+            return await DailyStatsService(session).reconcile(
+                date.today() - timedelta(days=days), user_id=user_id
+            )
+    finally:
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    # Uso (cron): python -m app.services.daily_stats_service --days 7
+    parser = argparse.ArgumentParser(description="Conciliar DailyStats con las comidas registradas")
+    parser.add_argument("--days", type=int, default=7, help="Días hacia atrás a revisar")
+    parser.add_argument("--user-id", type=int, default=None, help="Solo un usuario")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    result = asyncio.run(_reconcile_recent(args.days, args.user_id))
+    print(f"✅ DailyStats conciliado: {result}")
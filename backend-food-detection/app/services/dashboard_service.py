@@ -0,0 +1,188 @@
+"""
+Dashboard de progreso
+Todos los indicadores salen de una sola sentencia SQL (CTE de la última
+semana + subconsultas escalares por índice + estados por usuario) y se guardan en memoria por
+usuario. Las escrituras de comidas, peso y objetivos invalidan la entrada
+del usuario al hacer commit; los cambios hechos en otros workers se ven
+al vencer la entrada (DASHBOARD_CACHE_SECONDS).
+"""
+
+import itertools
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import case, event, func, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.time_ranges import day_range, local_today
+from app.models.progress import DailyStats, UserStreak, WeightEntry, WeightTrend
+from app.models.user import User
+from app.services.streak_service import active_streak
+
+# Usuarios con dashboard guardado por proceso
+DASHBOARD_CACHE_SIZE = 10000
+
+# Vigencia de una entrada (escrituras hechas en otros workers)
+DASHBOARD_CACHE_SECONDS = 60
+
+# Cambio de peso semanal (kg) a partir del cual hay tendencia
+WEIGHT_TREND_THRESHOLD = 0.5
+
+# Clave en Session.info con los usuarios a invalidar al hacer commit
+_PENDING_KEY = "dashboard_invalidate"
+
+# user_id → (día, momento de carga, indicadores)
+_dashboard_cache: "OrderedDict[int, Tuple[date, float, Dict[str, Any]]]" = OrderedDict()
+# user_id → versión de sus datos, tomada de un contador que nunca repite valores:
+# descartar la de un usuario (al invalidar o al salir de la caché) solo provoca
+# fallos de caché, y una lectura que empezó antes de una escritura no se guarda
+_versions = itertools.count(1)
+_generations: "OrderedDict[int, int]" = OrderedDict()
+
+
+def dashboard_statement(user_id: int, today: date):
+    """
+    Indicadores del dashboard en una sola consulta
+
+    La CTE recorre solo los días de la última semana (índice (user_id, date)) y
+    resuelve también los valores de hoy; el total de días y el último peso son
+    subconsultas escalares sobre los mismos índices, y la racha y la tendencia
+    de peso se leen de UserStreak y WeightTrend por clave primaria
+    """
+    week_ago = today - timedelta(days=7)
+
+    week = select(
+        func.avg(DailyStats.consumed_calories).label("weekly_avg_calories"),
+        func.avg(DailyStats.calorie_adherence).label("weekly_avg_adherence"),
+        func.max(case((DailyStats.date == today, DailyStats.consumed_calories))).label("today_calories"),
+        func.max(case((DailyStats.date == today, DailyStats.calorie_adherence))).label("today_adherence"),
+    ).where(
+        DailyStats.user_id == user_id, *day_range(DailyStats.date, week_ago)
+    ).cte("week_stats")
+
+    streak = select(UserStreak).where(UserStreak.user_id == user_id).subquery("streak")
+    trend = select(WeightTrend).where(WeightTrend.user_id == user_id).subquery("trend")
+
+    return select(
+        week.c.weekly_avg_calories,
+        week.c.weekly_avg_adherence,
+        week.c.today_calories,
+        week.c.today_adherence,
+        select(func.count(DailyStats.id)).where(DailyStats.user_id == user_id)
+        .scalar_subquery().label("total_days_logged"),
+        select(WeightEntry.weight).where(WeightEntry.user_id == user_id)
+        .order_by(WeightEntry.date.desc()).limit(1).scalar_subquery().label("current_weight"),
+        streak.c.current_streak,
+        streak.c.longest_streak,
+        streak.c.last_logged_date,
+        trend.c.trend_weight,
+        trend.c.slope.label("weight_slope"),
+    ).select_from(week).outerjoin(streak, true()).outerjoin(trend, true())
+
+
+def weight_trend(row) -> str:
+    """Dirección del peso según la pendiente suavizada (cambio semanal)"""
+    if row.weight_slope is None:
+        return "stable"
+    change = row.weight_slope * 7
+    if change > WEIGHT_TREND_THRESHOLD:
+        return "increasing"
+    if change < -WEIGHT_TREND_THRESHOLD:
+        return "decreasing"
+    return "stable"
+
+
+def invalidate_dashboard(user_id: int):
+    """Descartar el dashboard guardado del usuario (y su versión: la próxima será nueva)"""
+    _generations.pop(user_id, None)
+    _dashboard_cache.pop(user_id, None)
+
+
+def data_version(user_id: int) -> int:
+    """
+    Versión de los datos del usuario en este proceso: cambia con cada commit
+    que invalida su dashboard (otros cachés por usuario la usan como clave).
+    Sin versión guardada se asigna una nueva, distinta de todas las anteriores:
+    cuenta como fallo para cualquier caché. Se guardan a lo sumo
+    DASHBOARD_CACHE_SIZE versiones (las menos usadas se descartan)
+    """
+    version = _generations.get(user_id)
+    if version is not None:
+        _generations.move_to_end(user_id)
+        return version
+    version = _generations[user_id] = next(_versions)
+    if len(_generations) > DASHBOARD_CACHE_SIZE:
+        _generations.popitem(last=False)
+    return version
+
+
+def invalidate_dashboard_on_commit(db: AsyncSession, user_id: int):
+    """
+    Invalidar el dashboard del usuario cuando la transacción haga commit
+    (antes, otra petición podría volver a guardar los datos sin la escritura)
+    """
+    db.sync_session.info.setdefault(_PENDING_KEY, set()).add(user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session: Session):
+    for user_id in session.info.pop(_PENDING_KEY, ()):
+        invalidate_dashboard(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+class DashboardService:
+    """Indicadores del dashboard con caché por usuario"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_stats(self, user: User) -> Dict[str, Any]:
+        today = local_today(user.timezone)
+        cached = self._cached(user.id, today)
+        if cached is not None:
+            return cached
+
+        generation = data_version(user.id)
+        row = (await self.db.execute(dashboard_statement(user.id, today))).one()
+        stats = {
+            "current_weight": row.current_weight,
+            "weight_trend": weight_trend(row),
+            "trend_weight": row.trend_weight,
+            "today_calories": row.today_calories or 0,
+            "today_adherence": row.today_adherence or 0,
+            "weekly_avg_calories": row.weekly_avg_calories or 0,
+            "weekly_avg_adherence": row.weekly_avg_adherence or 0,
+            "current_tdee": user.estimated_tdee,
+            "adaptive_calories": user.adaptive_calories,
+            "total_days_logged": row.total_days_logged,
+            "current_streak": active_streak(row, today),
+            "longest_streak": row.longest_streak or 0,
+        }
+
+        if _generations.get(user.id) == generation:
+            _dashboard_cache[user.id] = (today, time.monotonic(), stats)
+            _dashboard_cache.move_to_end(user.id)
+            if len(_dashboard_cache) > DASHBOARD_CACHE_SIZE:
+                evicted, _ = _dashboard_cache.popitem(last=False)
+                _generations.pop(evicted, None)
+        return stats
+
+    @staticmethod
+    def _cached(user_id: int, today: date) -> Optional[Dict[str, Any]]:
+        entry = _dashboard_cache.get(user_id)
+        if entry is None:
+            return None
+        day, loaded_at, stats = entry
+        if day != today or time.monotonic() - loaded_at >= DASHBOARD_CACHE_SECONDS:
+            del _dashboard_cache[user_id]
+            return None
+        _dashboard_cache.move_to_end(user_id)
+        return stats
@@ -3,16 +3,12 @@ from app.ai.food_detection import ImageAnalyzer
 from app.ai.adaptive_learning import AdaptiveLearningEngine
 
 # Instancias globales
-_meal_service = None
 _image_analyzer = None
 _adaptive_engine = None
 
 def get_meal_service(db):
-    """Obtener instancia del servicio de comidas"""
-    global _meal_service
-    if _meal_service is None:
-        _meal_service = MealService(db)
-    return _meal_service
+    """Obtener servicio de comidas para la sesión de la petición (no se comparte entre peticiones)"""
+    return MealService(db)
 
 def get_image_analyzer():
     """Obtener instancia del analizador de imágenes"""
@@ -0,0 +1,236 @@
+"""
+Exportación del historial de un usuario
+Cada conjunto (comidas con sus alimentos, estadísticas diarias, peso) se lee
+con un cursor del servidor en lotes de EXPORT_BATCH_SIZE filas (solo
+columnas, sin objetos ORM) y se codifica lote a lote como CSV, NDJSON o
+grupos de filas Parquet. La memoria usada depende del tamaño del lote, no
+del historial.
+"""
+
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import AsyncIterator, List, Optional, Tuple
+
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.time_ranges import day_range
+from app.models.meal import Food, Meal, MealFood
+from app.models.progress import DailyStats, WeightEntry
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    pa = None
+    pq = None
+    PARQUET_AVAILABLE = False
+
+# Filas por lote leído de la base (y por grupo de filas Parquet)
+EXPORT_BATCH_SIZE = 1000
+
+# Formato → tipo de contenido
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def _meal_columns():
+    # Una fila por alimento de cada comida; las comidas sin alimentos salen con una fila
+    return [
+        ("meal_id", Meal.id), ("eaten_at", Meal.eaten_at), ("meal_type", Meal.meal_type),
+        ("meal_name", Meal.name), ("meal_calories", Meal.total_calories),
+        ("meal_protein", Meal.total_protein), ("meal_carbs", Meal.total_carbs),
+        ("meal_fat", Meal.total_fat), ("meal_fiber", Meal.total_fiber), ("notes", Meal.notes),
+        ("food_id", MealFood.food_id), ("food_name", Food.name), ("quantity_g", MealFood.quantity),
+        ("portion", MealFood.portion_description), ("calories", MealFood.calories),
+        ("protein", MealFood.protein), ("carbs", MealFood.carbs), ("fat", MealFood.fat),
+        ("fiber", MealFood.fiber), ("ai_detected", MealFood.ai_detected),
+    ]
+
+
+def _daily_stats_columns():
+    return [
+        ("date", DailyStats.date), ("meal_count", DailyStats.meal_count),
+        ("consumed_calories", DailyStats.consumed_calories), ("consumed_protein", DailyStats.consumed_protein),
+        ("consumed_carbs", DailyStats.consumed_carbs), ("consumed_fat", DailyStats.consumed_fat),
+        ("consumed_fiber", DailyStats.consumed_fiber), ("target_calories", DailyStats.target_calories),
+        ("calorie_adherence", DailyStats.calorie_adherence), ("weight", DailyStats.weight),
+        ("weight_trend", DailyStats.weight_trend),
+    ]
+
+
+def _weight_columns():
+    return [
+        ("date", WeightEntry.date), ("weight", WeightEntry.weight),
+        ("source", WeightEntry.source), ("notes", WeightEntry.notes),
+    ]
+
+
+# Conjunto → columnas exportadas (nombre, columna del modelo)
+EXPORT_DATASETS = {
+    "meals": _meal_columns,
+    "daily-stats": _daily_stats_columns,
+    "weight": _weight_columns,
+}
+
+
+def validate_export(dataset: str, export_format: str):
+    """Rechazar antes de empezar a enviar (ValueError)"""
+    if dataset not in EXPORT_DATASETS:
+        raise ValueError(f"Conjunto no válido: {dataset}")
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Formato no válido: {export_format}")
+    if export_format == "parquet" and not PARQUET_AVAILABLE:
+        raise ValueError("La exportación Parquet requiere pyarrow")
+
+
+def export_statement(dataset: str, user_id: int, start_date: Optional[date] = None,
+                     end_date: Optional[date] = None) -> Tuple[list, object]:
+    """
+    Columnas y consulta del conjunto, en orden cronológico por el índice
+    (user_id, fecha)
+    """
+    columns = EXPORT_DATASETS[dataset]()
+    query = select(*[column.label(name) for name, column in columns])
+
+    if dataset == "meals":
+        query = (
+            query.select_from(Meal)
+            .outerjoin(MealFood, MealFood.meal_id == Meal.id)
+            .outerjoin(Food, Food.id == MealFood.food_id)
+            .where(Meal.user_id == user_id, *day_range(Meal.eaten_at, start_date, end_date))
+            .order_by(Meal.eaten_at, Meal.id, MealFood.id)
+        )
+    else:
+        model = DailyStats if dataset == "daily-stats" else WeightEntry
+        query = query.where(
+            model.user_id == user_id, *day_range(model.date, start_date, end_date)
+        ).order_by(model.date)
+
+    return columns, query.execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+
+def _plain(value):
+    """Valor apto para CSV/JSON (fechas en ISO 8601)"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _encode_csv(names: List[str], batch, header: bool) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(names)
+    writer.writerows([_plain(value) for value in row] for row in batch)
+    return buffer.getvalue().encode("utf-8")
+
+
+def _encode_ndjson(names: List[str], batch) -> bytes:
+    lines = [
+        json.dumps({name: _plain(value) for name, value in zip(names, row)}, ensure_ascii=False)
+        for row in batch
+    ]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Archivo de solo escritura que entrega lo escrito en cada drain() (Parquet)"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _arrow_schema(columns) -> "pa.Schema":
+    """Esquema Parquet desde los tipos de las columnas (no depende de los valores del lote)"""
+    fields = []
+    for name, column in columns:
+        column_type = column.type
+        if isinstance(column_type, Boolean):
+            arrow_type = pa.bool_()
+        elif isinstance(column_type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(column_type, Float):
+            arrow_type = pa.float64()
+        elif isinstance(column_type, DateTime):
+            arrow_type = pa.timestamp("us", tz="UTC")
+        elif isinstance(column_type, Date):
+            arrow_type = pa.date32()
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(name, arrow_type))
+    return pa.schema(fields)
+
+
+def _parquet_batch(schema: "pa.Schema", batch) -> "pa.RecordBatch":
+    columns = list(zip(*batch)) if batch else [() for _ in schema]
+    return pa.RecordBatch.from_arrays(
+        [pa.array(list(values), type=field.type) for values, field in zip(columns, schema)], schema=schema
+    )
+
+
+class ExportService:
+    """Exportación en streaming de los datos de un usuario"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def stream(self, dataset: str, export_format: str, user_id: int,
+                     start_date: Optional[date] = None, end_date: Optional[date] = None) -> AsyncIterator[bytes]:
+        """Bytes del archivo exportado, un fragmento por lote (validar antes con validate_export)"""
+        columns, statement = export_statement(dataset, user_id, start_date, end_date)
+        names = [name for name, _ in columns]
+        batches = self._batches(statement)
+
+        if export_format == "csv":
+            header = True
+            async for batch in batches:
+                yield _encode_csv(names, batch, header)
+                header = False
+            if header:
+                yield _encode_csv(names, [], True)
+            return
+
+        if export_format == "ndjson":
+            async for batch in batches:
+                yield _encode_ndjson(names, batch)
+            return
+
+        # Parquet: cada lote es un grupo de filas; el pie se escribe al cerrar
+        schema = _arrow_schema(columns)
+        sink = _ChunkSink()
+        writer = pq.ParquetWriter(sink, schema)
+        async for batch in batches:
+            writer.write_batch(_parquet_batch(schema, batch))
+            yield sink.drain()
+        writer.close()
+        yield sink.drain()
+
+    async def _batches(self, statement) -> AsyncIterator[list]:
+        result = await self.db.stream(statement)
+        async for partition in result.partitions(EXPORT_BATCH_SIZE):
+            yield partition
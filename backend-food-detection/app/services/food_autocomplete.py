@@ -0,0 +1,276 @@
+"""
+Autocompletado de alimentos en memoria
+Índice de prefijos ordenado sobre nombres y marcas normalizados (sin tildes):
+cada palabra del nombre o la marca es un punto de entrada, así "asa" encuentra
+"Pollo asado". El puntaje (verificado + popularidad) se calcula al indexar,
+los prefijos de 1-2 letras tienen su top-K precalculado y el resto se guarda
+en una caché LRU que se invalida al cambiar el catálogo.
+"""
+
+import asyncio
+import heapq
+import logging
+import time
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.ai.food_matcher import fold_text
+from app.models.meal import Food
+from app.services.food_search import POPULARITY_BOOST, POPULARITY_HALF, VERIFIED_BOOST
+
+logger = logging.getLogger(__name__)
+
+# Máximo de sugerencias por prefijo (límite del endpoint)
+TOP_K = 20
+
+# Prefijos con top-K precalculado (los que más filas abarcan)
+SHORT_PREFIX_LENGTH = 2
+
+# Prefijos largos que se guardan por proceso
+COMPLETION_CACHE_SIZE = 2048
+
+# Bonificación cuando el prefijo coincide con el inicio del nombre
+NAME_START_BONUS = 1.0
+
+# Cada cuánto se traen del catálogo los alimentos creados o editados por otros workers
+REFRESH_SECONDS = 60
+
+
+@dataclass
+class Completion:
+    """Sugerencia de autocompletado"""
+    id: int
+    name: str
+    brand: Optional[str]
+    category: Optional[str]
+    verified: bool
+    rank: float         # Verificado + popularidad
+
+    @classmethod
+    def from_food(cls, food) -> "Completion":
+        popularity = food.popularity_score or 0.0
+        rank = (VERIFIED_BOOST if food.verified else 0.0) + POPULARITY_BOOST * popularity / (popularity + POPULARITY_HALF)
+        return cls(
+            id=food.id,
+            name=food.name,
+            brand=food.brand,
+            category=food.category,
+            verified=bool(food.verified),
+            rank=rank
+        )
+
+
+def completion_keys(completion: Completion) -> List[Tuple[str, float]]:
+    """Claves de un alimento: el texto desde cada palabra del nombre y de la marca, con su puntaje"""
+    keys = {}
+    for text, bonus in ((completion.name, NAME_START_BONUS), (completion.brand, 0.0)):
+        if not text:
+            continue
+        words = fold_text(text).split()
+        for i in range(len(words)):
+            key = " ".join(words[i:])
+            score = completion.rank + (bonus if i == 0 else 0.0)
+            keys[key] = max(score, keys.get(key, score))
+    return list(keys.items())
+
+
+class FoodCompletionIndex:
+    """
+    Arreglos paralelos ordenados por clave (clave, id, puntaje)
+    Un prefijo corresponde a un rango contiguo que se encuentra con bisect
+    """
+
+    def __init__(self, completions: Iterable[Completion] = ()):
+        self._foods: Dict[int, Completion] = {}
+        entries = []
+        for completion in completions:
+            self._foods[completion.id] = completion
+            entries.extend((key, completion.id, score) for key, score in completion_keys(completion))
+        entries.sort()
+
+        self._keys: List[str] = [entry[0] for entry in entries]
+        self._ids: List[int] = [entry[1] for entry in entries]
+        self._scores: List[float] = [entry[2] for entry in entries]
+        # Prefijo corto → top-K como (puntaje, -largo del nombre, id)
+        self._short: Dict[str, List[Tuple[float, int, int]]] = {}
+        self._cache: "OrderedDict[Tuple[str, Optional[str]], List[int]]" = OrderedDict()
+        self._build_short_prefixes()
+
+    def __len__(self) -> int:
+        return len(self._foods)
+
+    def _build_short_prefixes(self):
+        """
+        Top-K de cada prefijo corto en una sola pasada sobre las claves
+        Los prefijos más cortos se arman con los top-K de sus hijos: el mejor puntaje
+        de un alimento bajo "p" está en el top-K de algún hijo ("po", "pl", ...)
+        """
+        keys = self._keys
+        self._short = {}
+        exact: Dict[str, List[Tuple[float, int, int]]] = {}
+        i = 0
+        while i < len(keys):
+            prefix = keys[i][:SHORT_PREFIX_LENGTH]
+            if len(prefix) < SHORT_PREFIX_LENGTH:
+                # Clave más corta que el prefijo ("a"): solo cuenta para sus padres
+                end = bisect_right(keys, prefix, i)
+                exact[prefix] = self._top(self._best_between(i, end))
+            else:
+                end = bisect_left(keys, prefix + "\uffff", i)
+                self._short[prefix] = self._top(self._best_between(i, end))
+            i = end
+
+        for length in range(SHORT_PREFIX_LENGTH - 1, 0, -1):
+            children: Dict[str, List[Tuple[float, int, int]]] = {}
+            for prefix, top in list(self._short.items()) + list(exact.items()):
+                if len(prefix) > length or (len(prefix) == length and prefix in exact):
+                    children.setdefault(prefix[:length], []).extend(top)
+            for parent, entries in children.items():
+                best: Dict[int, float] = {}
+                for score, _, food_id in entries:
+                    best[food_id] = max(score, best.get(food_id, score))
+                self._short[parent] = self._top(best)
+
+    def _top(self, scores: Dict[int, float]) -> List[Tuple[float, int, int]]:
+        """Mejores K por puntaje; ante empate, el nombre más corto"""
+        return heapq.nlargest(TOP_K, (
+            (score, -len(self._foods[food_id].name), food_id) for food_id, score in scores.items()
+        ))
+
+    def _best_in_range(self, prefix: str, category: Optional[str] = None) -> Dict[int, float]:
+        """Mejor puntaje de cada alimento con alguna clave que empieza con el prefijo"""
+        lo, hi = bisect_left(self._keys, prefix), bisect_left(self._keys, prefix + "\uffff")
+        return self._best_between(lo, hi, category)
+
+    def _best_between(self, lo: int, hi: int, category: Optional[str] = None) -> Dict[int, float]:
+        """Mejor puntaje de cada alimento en las posiciones [lo, hi)"""
+        best: Dict[int, float] = {}
+        for i in range(lo, hi):
+            food_id = self._ids[i]
+            if category and self._foods[food_id].category != category:
+                continue
+            if self._scores[i] > best.get(food_id, float("-inf")):
+                best[food_id] = self._scores[i]
+        return best
+
+    def complete(self, prefix: str, limit: int = 10, category: Optional[str] = None) -> List[Completion]:
+        """Sugerencias para lo que el usuario lleva escrito"""
+        folded = fold_text(prefix)
+        if not folded:
+            return []
+
+        if len(folded) <= SHORT_PREFIX_LENGTH and not category:
+            food_ids = [food_id for _, _, food_id in self._short.get(folded, [])]
+        else:
+            key = (folded, category)
+            food_ids = self._cache.get(key)
+            if food_ids is not None:
+                self._cache.move_to_end(key)
+            else:
+                food_ids = [food_id for _, _, food_id in self._top(self._best_in_range(folded, category))]
+                self._cache[key] = food_ids
+                if len(self._cache) > COMPLETION_CACHE_SIZE:
+                    self._cache.popitem(last=False)
+
+        return [self._foods[food_id] for food_id in food_ids[:limit]]
+
+    def remove(self, food_id: int):
+        """Quitar un alimento del índice"""
+        completion = self._foods.pop(food_id, None)
+        if completion is None:
+            return
+
+        keys = completion_keys(completion)
+        for key, _ in keys:
+            lo, hi = bisect_left(self._keys, key), bisect_right(self._keys, key)
+            for i in range(lo, hi):
+                if self._ids[i] == food_id:
+                    del self._keys[i], self._ids[i], self._scores[i]
+                    break
+
+        for prefix in self._short_prefixes_of(keys):
+            if any(entry[2] == food_id for entry in self._short.get(prefix, [])):
+                self._short[prefix] = self._top(self._best_in_range(prefix))
+        self._invalidate(keys)
+
+    def upsert(self, completion: Completion):
+        """Agregar o actualizar un alimento sin reconstruir el índice"""
+        self.remove(completion.id)
+        self._foods[completion.id] = completion
+
+        keys = completion_keys(completion)
+        for key, score in keys:
+            i = bisect_right(self._keys, key)
+            self._keys.insert(i, key)
+            self._ids.insert(i, completion.id)
+            self._scores.insert(i, score)
+
+        for prefix in self._short_prefixes_of(keys):
+            score = max(score for key, score in keys if key.startswith(prefix))
+            top = [entry for entry in self._short.get(prefix, []) if entry[2] != completion.id]
+            top.append((score, -len(completion.name), completion.id))
+            self._short[prefix] = heapq.nlargest(TOP_K, top)
+        self._invalidate(keys)
+
+    @staticmethod
+    def _short_prefixes_of(keys: List[Tuple[str, float]]) -> set:
+        return {key[:length] for key, _ in keys for length in range(1, min(SHORT_PREFIX_LENGTH, len(key)) + 1)}
+
+    def _invalidate(self, keys: List[Tuple[str, float]]):
+        """Descartar de la caché los prefijos que abarcan alguna de las claves"""
+        stale = [cached for cached in self._cache if any(key.startswith(cached[0]) for key, _ in keys)]
+        for cached in stale:
+            del self._cache[cached]
+
+
+_food_autocomplete: Optional[FoodCompletionIndex] = None
+_synced_at: Optional[float] = None
+# Una sola carga a la vez aunque lleguen varias peticiones mientras se espera a la base
+_sync_lock = asyncio.Lock()
+
+
+async def _load_completions(db: AsyncSession, since=None) -> List[Completion]:
+    query = select(Food.id, Food.name, Food.brand, Food.category, Food.verified, Food.popularity_score)
+    if since is not None:
+        query = query.where(or_(Food.created_at >= since, Food.updated_at >= since))
+    rows = await db.stream(query.execution_options(yield_per=10000))
+    return [Completion.from_food(row) async for row in rows]
+
+
+async def get_food_autocomplete(db: AsyncSession) -> FoodCompletionIndex:
+    """
+    Obtener el índice del proceso (se construye bajo demanda)
+    Cada REFRESH_SECONDS trae los alimentos creados o editados desde la última
+    sincronización, para ver los cambios hechos en otros workers
+    """
+    global _food_autocomplete, _synced_at
+    if _food_autocomplete is not None and time.time() - _synced_at < REFRESH_SECONDS:
+        return _food_autocomplete
+
+    async with _sync_lock:
+        now = time.time()
+        if _food_autocomplete is None:
+            started = time.perf_counter()
+            _food_autocomplete = FoodCompletionIndex(await _load_completions(db))
+            _synced_at = now
+            logger.info(f"Índice de autocompletado: {len(_food_autocomplete)} alimentos en {time.perf_counter() - started:.2f}s")
+        elif now - _synced_at >= REFRESH_SECONDS:
+            since = _synced_at - REFRESH_SECONDS  # margen por relojes y transacciones en curso
+            for completion in await _load_completions(db, since=datetime.fromtimestamp(since, tz=timezone.utc)):
+                _food_autocomplete.upsert(completion)
+            _synced_at = now
+
+    return _food_autocomplete
+
+
+def update_autocomplete(food: Food):
+    """Reflejar en el índice un alimento creado o editado en este proceso"""
+    if _food_autocomplete is not None:
+        _food_autocomplete.upsert(Completion.from_food(food))
+
@@ -0,0 +1,255 @@
+"""
+Búsqueda de alimentos con índice de texto completo
+SQLite usa una tabla virtual FTS5 (sin tildes ni mayúsculas, con índice de
+prefijos) mantenida por triggers, con la categoría comparada en foods;
+PostgreSQL usa tsvector + pg_trgm sobre unaccent, con la categoría dentro
+del mismo índice GIN (btree_gin).
+El orden combina relevancia de texto, alimentos verificados y popularidad.
+"""
+
+import logging
+import re
+from typing import List, Optional
+
+from sqlalchemy import select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.ai.food_matcher import fold_text, strip_accents
+from app.models.meal import Food
+
+logger = logging.getLogger(__name__)
+
+# Relevancia de texto por término: palabra exacta o prefijo, en nombre o marca
+NAME_EXACT_SCORE = 3.0
+NAME_PREFIX_SCORE = 2.0
+BRAND_SCORE = 1.0
+
+# Bonificaciones de orden: verificado y popularidad (saturada: p / (p + mitad))
+VERIFIED_BOOST = 1.0
+POPULARITY_BOOST = 2.0
+POPULARITY_HALF = 50.0
+
+# Mínimo de caracteres de un término para buscarlo por prefijo
+MIN_TERM_LENGTH = 2
+
+# Coincidencias (las mejores por bm25 y bonificación) que se puntúan en Python;
+# acota prefijos muy cortos ("ch") que en catálogos grandes devuelven cientos
+# de miles de filas
+CANDIDATE_LIMIT = 500
+
+FTS_TABLE = "foods_fts"
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+# Bases (URL) donde ya se comprobó que existe la tabla FTS
+_indexed_databases = set()
+
+
+def _boost_sql(row: str) -> str:
+    """Expresión SQL de la bonificación de una fila (new, old o foods)"""
+    popularity = f"COALESCE({row}.popularity_score, 0)"
+    return (
+        f"(CASE WHEN {row}.verified THEN {VERIFIED_BOOST} ELSE 0 END"
+        f" + {POPULARITY_BOOST} * {popularity} / ({popularity} + {POPULARITY_HALF}))"
+    )
+
+
+def _fts_row_sql(row: str) -> str:
+    return (
+        f"{row}.id, {row}.name, COALESCE({row}.brand, ''), "
+        f"COALESCE({row}.category, ''), {_boost_sql(row)}"
+    )
+
+
+SQLITE_INDEX = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, brand, category, boost UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON foods BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, brand, category, boost) VALUES ({_fts_row_sql('new')});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON foods BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+        AFTER UPDATE OF name, brand, category, verified, popularity_score ON foods BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        INSERT INTO {FTS_TABLE}(rowid, name, brand, category, boost) VALUES ({_fts_row_sql('new')});
+    END""",
+]
+
+POSTGRES_INDEX = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    "CREATE EXTENSION IF NOT EXISTS btree_gin",
+    # unaccent() no es IMMUTABLE; el envoltorio permite usarlo en índices
+    """CREATE OR REPLACE FUNCTION food_search_text(name text, brand text) RETURNS text AS $$
+        SELECT lower(public.unaccent('public.unaccent', coalesce(name, '') || ' ' || coalesce(brand, '')))
+    $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE""",
+    """CREATE INDEX IF NOT EXISTS ix_foods_search_trgm
+        ON foods USING gin (category, food_search_text(name, brand) gin_trgm_ops)""",
+    """CREATE INDEX IF NOT EXISTS ix_foods_search_tsv
+        ON foods USING gin (category, to_tsvector('simple', food_search_text(name, brand)))""",
+]
+
+
+def create_search_index(engine: Engine) -> List[str]:
+    """
+    Crear el índice de búsqueda del motor (idempotente)
+    En SQLite, si la tabla FTS es nueva se llena con los alimentos existentes
+    """
+    with engine.begin() as conn:
+        if conn.dialect.name == "sqlite":
+            existed = _sqlite_index_exists(conn)
+            for statement in SQLITE_INDEX:
+                conn.exec_driver_sql(statement)
+            if not existed:
+                rebuild_search_index(conn)
+                return [FTS_TABLE]
+        elif conn.dialect.name == "postgresql":
+            for statement in POSTGRES_INDEX:
+                conn.exec_driver_sql(statement)
+            return ["ix_foods_search_trgm", "ix_foods_search_tsv"]
+    return []
+
+
+def rebuild_search_index(conn: Connection):
+    """Volver a llenar la tabla FTS de SQLite desde foods"""
+    conn.exec_driver_sql(f"DELETE FROM {FTS_TABLE}")
+    conn.exec_driver_sql(
+        f"INSERT INTO {FTS_TABLE}(rowid, name, brand, category, boost) "
+        f"SELECT {_fts_row_sql('foods')} FROM foods"
+    )
+
+
+def _sqlite_index_exists(conn: Connection) -> bool:
+    return conn.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)
+    ).first() is not None
+
+
+def search_terms(query: str) -> List[str]:
+    """Términos de búsqueda en minúsculas, sin tildes ni signos"""
+    return [term for term in fold_text(query).split() if len(term) >= MIN_TERM_LENGTH]
+
+
+def _words(text: str) -> List[str]:
+    """Palabras sin tildes (el caso ASCII evita la normalización Unicode)"""
+    text = text.lower()
+    if not text.isascii():
+        text = strip_accents(text)
+    return _WORD.findall(text)
+
+
+def text_score(terms: List[str], name: str, brand: str = "") -> float:
+    """
+    Relevancia de un alimento para los términos (0-3 por término)
+    Los nombres más cortos ganan ante el mismo puntaje: "pollo" antes que "pollo al horno con papas"
+    """
+    name_words = _words(name)
+    brand_words = _words(brand) if brand else []
+    score = 0.0
+    for term in terms:
+        if term in name_words:
+            score += NAME_EXACT_SCORE
+        elif any(word.startswith(term) for word in name_words):
+            score += NAME_PREFIX_SCORE
+        elif any(word.startswith(term) for word in brand_words):
+            score += BRAND_SCORE
+    return score / len(terms) + 1.0 / (1 + len(name_words))
+
+
+class FoodSearchService:
+    """Búsqueda de alimentos según el motor de la sesión"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.dialect = db.get_bind().dialect.name
+
+    async def search(self, query: str, limit: int = 20, category: Optional[str] = None) -> List[Food]:
+        """Alimentos que coinciden con el texto, del más al menos relevante"""
+        terms = search_terms(query)
+        if not terms:
+            return []
+
+        if self.dialect == "sqlite" and await self._has_fts_index():
+            food_ids = await self._search_sqlite(terms, limit, category)
+        elif self.dialect == "postgresql":
+            food_ids = await self._search_postgres(terms, limit, category)
+        else:
+            return await self._search_like(query, limit, category)
+
+        if not food_ids:
+            return []
+        foods = {food.id: food for food in await self.db.scalars(select(Food).where(Food.id.in_(food_ids)))}
+        return [foods[food_id] for food_id in food_ids if food_id in foods]
+
+    async def _has_fts_index(self) -> bool:
+        """La tabla FTS existe (se comprueba una vez por proceso)"""
+        url = str(self.db.get_bind().url)
+        if url not in _indexed_databases and await self.db.run_sync(
+            lambda session: _sqlite_index_exists(session.connection())
+        ):
+            _indexed_databases.add(url)
+        return url in _indexed_databases
+
+    async def _search_sqlite(self, terms: List[str], limit: int, category: Optional[str]) -> List[int]:
+        """
+        FTS5: todos los términos por prefijo en nombre o marca
+
+        La consulta ordena por bm25 (nombre con más peso que la marca) menos la
+        bonificación antes del LIMIT, así un prefijo corto no recorta los
+        verificados o populares; los CANDIDATE_LIMIT primeros se reordenan en
+        Python con text_score. La categoría se compara completa en foods
+        ("frutas" no incluye "frutas secas")
+        """
+        match = "{name brand} : (" + " ".join(f'"{term}"*' for term in terms) + ")"
+        rows = (await self.db.execute(
+            text(
+                f"SELECT {FTS_TABLE}.rowid, {FTS_TABLE}.name, {FTS_TABLE}.brand, {FTS_TABLE}.boost "
+                f"FROM {FTS_TABLE} "
+                + (f"JOIN foods ON foods.id = {FTS_TABLE}.rowid AND foods.category = :category " if category else "")
+                + f"WHERE {FTS_TABLE} MATCH :match "
+                f"ORDER BY bm25({FTS_TABLE}, {NAME_EXACT_SCORE}, {BRAND_SCORE}, 0) - {FTS_TABLE}.boost "
+                "LIMIT :candidates"
+            ),
+            {"match": match, "category": category, "candidates": CANDIDATE_LIMIT}
+        )).all()
+        ranked = sorted(rows, key=lambda row: text_score(terms, row.name, row.brand) + row.boost, reverse=True)
+        return [row.rowid for row in ranked[:limit]]
+
+    async def _search_postgres(self, terms: List[str], limit: int, category: Optional[str]) -> List[int]:
+        """tsvector por prefijo o similitud de trigramas (tolera errores de escritura)"""
+        document = "food_search_text(name, brand)"
+        vector = f"to_tsvector('simple', {document})"
+        rows = await self.db.execute(
+            text(
+                "SELECT id FROM foods "
+                f"WHERE ({vector} @@ to_tsquery('simple', :tsquery) OR {document} % :query) "
+                + ("AND category = :category " if category else "")
+                + f"ORDER BY ts_rank({vector}, to_tsquery('simple', :tsquery)) "
+                f"+ similarity({document}, :query) + {_boost_sql('foods')} DESC "
+                "LIMIT :limit"
+            ),
+            {
+                "tsquery": " & ".join(f"{term}:*" for term in terms),
+                "query": " ".join(terms),
+                "category": category,
+                "limit": limit
+            }
+        )
+        return [row[0] for row in rows]
+
+    async def _search_like(self, query: str, limit: int, category: Optional[str]) -> List[Food]:
+        """Respaldo sin índice de texto (otros motores o SQLite sin migrar)"""
+        foods = select(Food).where(Food.name.ilike(f"%{query}%"))
+        if category:
+            foods = foods.where(Food.category == category)
+        return (await self.db.scalars(foods.order_by(
+            Food.name.ilike(f"{query}%").desc(),
+            Food.verified.desc(),
+            Food.popularity_score.desc().nullslast(),
+            Food.name
+        ).limit(limit))).all()
@@ -0,0 +1,145 @@
+"""
+Pronóstico de progreso por usuario
+Carga la tendencia de peso y la ingesta de las últimas FORECAST_WINDOW_DAYS
+(dos consultas por índice), ajusta el modelo de app/ai/progress_forecast.py
+y guarda los parámetros en memoria por usuario. La entrada se descarta
+cuando llega un dato nuevo del usuario (misma versión que el dashboard) o
+al vencer FORECAST_CACHE_SECONDS (escrituras hechas en otros workers).
+"""
+
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.ai.nutrition_engine import adaptive_calorie_target
+from app.ai.progress_forecast import (
+    CONFIDENCE_LEVELS, DEFAULT_HORIZONS, ForecastModel, fit_forecast, planned_slope, project
+)
+from app.ai.weight_trend import trend_series
+from app.core.time_ranges import day_range, local_today
+from app.models.progress import DailyStats, WeightEntry, WeightTrend
+from app.models.user import User
+from app.services.dashboard_service import data_version
+
+# Días de historial que entran en el ajuste
+FORECAST_WINDOW_DAYS = 56
+
+# Días previos a la ventana para que la tendencia arranque estabilizada
+TREND_WARMUP_DAYS = 28
+
+# Días del cambio de peso previsto (ProgressPredictions.predicted_weight_change)
+PREDICTION_DAYS = 28
+
+# Usuarios con modelo guardado por proceso y vigencia de cada entrada
+FORECAST_CACHE_SIZE = 10000
+FORECAST_CACHE_SECONDS = 300
+
+# user_id → (versión de datos, día, momento de ajuste, modelo)
+_forecast_cache: "OrderedDict[int, Tuple[int, date, float, Optional[ForecastModel]]]" = OrderedDict()
+
+
+class ForecastService:
+    """Ajuste y proyección del peso con caché por usuario"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_model(self, user: User) -> Optional[ForecastModel]:
+        """Modelo ajustado del usuario (None si no hay registros suficientes)"""
+        today = local_today(user.timezone)
+        version = data_version(user.id)
+        entry = _forecast_cache.get(user.id)
+        if entry is not None:
+            cached_version, day, fitted_at, model = entry
+            if cached_version == version and day == today and time.monotonic() - fitted_at < FORECAST_CACHE_SECONDS:
+                _forecast_cache.move_to_end(user.id)
+                return model
+
+        model = await self._fit(user.id, today)
+        if data_version(user.id) == version:
+            _forecast_cache[user.id] = (version, today, time.monotonic(), model)
+            _forecast_cache.move_to_end(user.id)
+            if len(_forecast_cache) > FORECAST_CACHE_SIZE:
+                _forecast_cache.popitem(last=False)
+        return model
+
+    async def _fit(self, user_id: int, today: date) -> Optional[ForecastModel]:
+        window_start = today - timedelta(days=FORECAST_WINDOW_DAYS)
+
+        weights = (await self.db.execute(
+            select(WeightEntry.date, WeightEntry.weight).where(
+                WeightEntry.user_id == user_id,
+                *day_range(WeightEntry.date, window_start - timedelta(days=TREND_WARMUP_DAYS))
+            ).order_by(WeightEntry.date)
+        )).all()
+        if not weights:
+            return None
+
+        days = [row.date.toordinal() for row in weights]
+        trend, _, _ = trend_series(days, [row.weight for row in weights])
+        in_window = [index for index, row in enumerate(weights) if row.date >= window_start]
+
+        intakes = (await self.db.scalars(
+            select(DailyStats.consumed_calories).where(
+                DailyStats.user_id == user_id,
+                *day_range(DailyStats.date, window_start),
+                DailyStats.meal_count > 0
+            )
+        )).all()
+
+        state = await self.db.get(WeightTrend, user_id)
+        return fit_forecast(
+            [days[index] for index in in_window],
+            trend[in_window],
+            noise=state.noise if state else 0.0,
+            intakes=[calories for calories in intakes if calories]
+        )
+
+    async def predictions(self, user: User, horizons: Sequence[int] = DEFAULT_HORIZONS) -> Optional[Dict[str, Any]]:
+        """
+        Campos de ProgressPredictions: peso proyectado con bandas por horizonte
+        (días desde hoy), cambio en PREDICTION_DAYS días y ajuste calórico
+        recomendado según el objetivo (None si hay pocos registros para ajustar)
+        """
+        model = await self.get_model(user)
+        if model is None:
+            return None
+
+        horizons = list(horizons) or list(DEFAULT_HORIZONS)
+        offset = local_today(user.timezone).toordinal() - model.origin
+        planned_intake = user.target_calories or model.avg_intake
+        projection = project(model, [days + offset for days in horizons], planned_intake)
+
+        points = []
+        for position, days in enumerate(horizons):
+            point = {"days": days, "weight": round(float(projection["weight"][position]), 2)}
+            for level_index, level in enumerate(CONFIDENCE_LEVELS):
+                low, high = projection["bands"][level_index, :, position]
+                point[f"low_{int(level * 100)}"] = round(float(low), 2)
+                point[f"high_{int(level * 100)}"] = round(float(high), 2)
+            points.append(point)
+
+        recommended = 0
+        if model.tdee is not None and planned_intake:
+            recommended = round(adaptive_calorie_target(user.goal, model.tdee) - planned_intake)
+
+        factors = [f"Tendencia de peso: {model.weekly_change:+.2f} kg/semana ({model.points} registros)"]
+        if model.avg_intake is None:
+            factors.append("Sin comidas registradas: la proyección sigue solo la tendencia de peso")
+        else:
+            factors.append(f"Ingesta media: {model.avg_intake:.0f} kcal/día ({model.intake_days} días)")
+            if user.target_calories:
+                factors.append(f"Proyección con la ingesta objetivo: {user.target_calories:.0f} kcal/día")
+
+        return {
+            "predicted_weight_change": round(planned_slope(model, planned_intake) * PREDICTION_DAYS, 2),
+            "predicted_tdee": round(model.tdee) if model.tdee is not None else None,
+            "confidence": round(model.confidence, 3),
+            "factors": factors,
+            "recommended_calorie_adjustment": recommended,
+            "horizons": points,
+        }
@@ -1,7 +1,11 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, func, desc
-from typing import List, Optional, Dict, Any
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import and_, func, desc, insert, select, tuple_
+from typing import List, Optional, Dict, Any, Tuple
+from dataclasses import dataclass
 from datetime import datetime, date, timedelta
+import base64
 import uuid
 import os
 from pathlib import Path
@@ -14,18 +18,59 @@ from app.schemas.meal import (
     ImageAnalysisResponse, QuickMealEntry, QuickMealResponse
 )
 from app.ai.food_detection import ImageAnalyzer
+from app.ai.food_matcher import get_food_matcher
+from app.ai.meal_parser import get_meal_parser
+from app.services.daily_stats_service import DailyStatsService
 from app.core.config import settings
+from app.core.time_ranges import day_range, utc_naive
 import logging
 
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# Macronutrientes que se calculan por porción y se acumulan por comida
+MACRO_FIELDS = ("calories", "protein", "carbs", "fat", "fiber")
+
+# Tamaño máximo de una página del historial de comidas
+MAX_PAGE_SIZE = 200
+
+
+def encode_meal_cursor(meal: Meal) -> str:
+    """Cursor opaco con la posición (eaten_at, id) de la última comida de una página"""
+    raw = f"{meal.eaten_at.isoformat()}|{meal.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_meal_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Posición (eaten_at, id) de un cursor; ValueError si no es válido"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        eaten_at, meal_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(eaten_at), int(meal_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Cursor de paginación inválido")
+
+
+@dataclass
+class MealPage:
+    """Página del historial de comidas"""
+    meals: List[Meal]
+    next_cursor: Optional[str]  # None en la última página
+
 class MealService:
     """Servicio para gestión de comidas"""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
+        self.daily_stats = DailyStatsService(db)
     
-    def create_meal(self, user_id: int, meal_data: MealCreate) -> Meal:
+    async def create_meal(self, user_id: int, meal_data: MealCreate) -> Meal:
         """Crear nueva comida"""
         
         # Crear meal
@@ -34,120 +79,176 @@ class MealService:
             name=meal_data.name,
             meal_type=meal_data.meal_type,
             notes=meal_data.notes,
-            eaten_at=meal_data.eaten_at,
+            eaten_at=utc_naive(meal_data.eaten_at),
             local_id=meal_data.local_id
         )
         
-        self.db.add(meal)
-        self.db.flush()  # Para obtener el ID
-        
-        # Agregar alimentos
-        total_calories = 0
-        total_protein = 0
-        total_carbs = 0
-        total_fat = 0
-        total_fiber = 0
-        
-        for food_data in meal_data.foods:
-            meal_food = self._create_meal_food(meal.id, food_data)
-            meal.foods.append(meal_food)
-            
-            total_calories += meal_food.calories
-            total_protein += meal_food.protein
-            total_carbs += meal_food.carbs
-            total_fat += meal_food.fat
-            total_fiber += meal_food.fiber
+        # Agregar alimentos (una consulta para todos los Food, inserción en lote)
+        await self._add_meal_foods(meal, meal_data.foods)
         
-        # Actualizar totales
-        meal.total_calories = total_calories
-        meal.total_protein = total_protein
-        meal.total_carbs = total_carbs
-        meal.total_fat = total_fat
-        meal.total_fiber = total_fiber
+        # Sumar la comida a las estadísticas del día (misma transacción)
+        await self.daily_stats.add_meal(meal)
         
-        self.db.commit()
+        await self.db.commit()
         
-        # Actualizar estadísticas diarias
-        self._update_daily_stats(user_id, meal.eaten_at.date())
+        return await self._reload_meal(meal)
+    
+    async def _load_foods(self, food_ids: List[int]) -> Dict[int, Food]:
+        """Cargar todos los alimentos referenciados con una sola consulta IN"""
+        unique_ids = set(food_ids)
+        if not unique_ids:
+            return {}
+        
+        foods = {
+            food.id: food
+            for food in await self.db.scalars(select(Food).where(Food.id.in_(unique_ids)))
+        }
         
-        return meal
+        for food_id in food_ids:
+            if food_id not in foods:
+                raise ValueError(f"Alimento con ID {food_id} no encontrado")
+        
+        return foods
     
-    def _create_meal_food(self, meal_id: int, food_data: MealFoodCreate) -> MealFood:
-        """Crear relación meal-food"""
-        
-        # Obtener información del alimento
-        food = self.db.query(Food).filter(Food.id == food_data.food_id).first()
-        if not food:
-            raise ValueError(f"Alimento con ID {food_data.food_id} no encontrado")
-        
-        # Calcular macronutrientes para la cantidad específica
-        multiplier = food_data.quantity / 100.0
-        
-        meal_food = MealFood(
-            meal_id=meal_id,
-            food_id=food_data.food_id,
-            quantity=food_data.quantity,
-            portion_description=food_data.portion_description,
-            calories=food.calories_per_100g * multiplier,
-            protein=food.protein_per_100g * multiplier,
-            carbs=food.carbs_per_100g * multiplier,
-            fat=food.fat_per_100g * multiplier,
-            fiber=food.fiber_per_100g * multiplier
-        )
+    async def _add_meal_foods(self, meal: Meal, foods_data: List[MealFoodCreate],
+                        extra_fields: Optional[List[Dict[str, Any]]] = None):
+        """
+        Agregar la comida y sus alimentos
+        Calcula los macronutrientes de cada porción y los totales en una pasada
+        e inserta todos los MealFood con un solo INSERT en lote
+        """
+        foods = await self._load_foods([food_data.food_id for food_data in foods_data])
+        
+        # Matriz alimentos × macronutrientes (por 100g) y multiplicadores por cantidad
+        per_100g = [
+            [getattr(foods[food_data.food_id], f"{field}_per_100g") or 0.0 for field in MACRO_FIELDS]
+            for food_data in foods_data
+        ]
+        multipliers = [food_data.quantity / 100.0 for food_data in foods_data]
+        
+        if NUMPY_AVAILABLE and foods_data:
+            portions = np.asarray(per_100g, dtype=float) * np.asarray(multipliers)[:, None]
+            rows = portions.tolist()
+            totals = portions.sum(axis=0).tolist()
+        else:
+            rows = [[value * multiplier for value in values] for values, multiplier in zip(per_100g, multipliers)]
+            totals = [sum(column) for column in zip(*rows)] or [0.0] * len(MACRO_FIELDS)
+        
+        # Actualizar totales
+        for field, total in zip(MACRO_FIELDS, totals):
+            setattr(meal, f"total_{field}", total)
         
-        return meal_food
+        self.db.add(meal)
+        await self.db.flush()  # Para obtener el ID
+        
+        if foods_data:
+            await self.db.execute(insert(MealFood), [
+                {
+                    "meal_id": meal.id,
+                    "food_id": food_data.food_id,
+                    "quantity": food_data.quantity,
+                    "portion_description": food_data.portion_description,
+                    **dict(zip(MACRO_FIELDS, macros)),
+                    **(extra_fields[index] if extra_fields else {})
+                }
+                for index, (food_data, macros) in enumerate(zip(foods_data, rows))
+            ])
+    
+    def _meal_query(self):
+        """Comidas con sus alimentos (con AsyncSession no hay carga perezosa de relaciones)"""
+        return select(Meal).options(selectinload(Meal.foods).selectinload(MealFood.food))
     
-    def get_user_meals(self, user_id: int, start_date: Optional[date] = None,
+    async def _reload_meal(self, meal: Meal) -> Meal:
+        """Volver a leer una comida recién escrita con sus alimentos y valores del servidor"""
+        return await self.db.scalar(
+            self._meal_query().where(Meal.id == meal.id).execution_options(populate_existing=True)
+        )
+    
+    async def get_user_meals(self, user_id: int, start_date: Optional[date] = None,
                       end_date: Optional[date] = None, limit: int = 50) -> List[Meal]:
         """Obtener comidas del usuario"""
-        
-        query = self.db.query(Meal).filter(Meal.user_id == user_id)
-        
-        if start_date:
-            query = query.filter(Meal.eaten_at >= start_date)
-        if end_date:
-            query = query.filter(Meal.eaten_at <= end_date)
-        
-        return query.order_by(desc(Meal.eaten_at)).limit(limit).all()
+        page = await self.get_meal_page(user_id, start_date, end_date, limit)
+        return page.meals
+    
+    async def get_meal_page(self, user_id: int, start_date: Optional[date] = None,
+                            end_date: Optional[date] = None, limit: int = 50,
+                            cursor: Optional[str] = None,
+                            include_analysis: bool = False) -> MealPage:
+        """
+        Página del historial de comidas, de la más reciente a la más antigua
+        
+        Paginación por keyset sobre (eaten_at, id): la página siguiente empieza
+        justo después de la última comida vista, así que cualquier página recorre
+        el índice (user_id, eaten_at) desde su posición y cuesta lo mismo que la
+        primera. Los alimentos se cargan con selectinload (3 consultas por página)
+        y el JSON de image_analysis solo se lee si se pide
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        
+        query = self._meal_query().where(
+            Meal.user_id == user_id,
+            *day_range(Meal.eaten_at, start_date, end_date)
+        )
+        if cursor:
+            query = query.where(tuple_(Meal.eaten_at, Meal.id) < decode_meal_cursor(cursor))
+        if not include_analysis:
+            query = query.options(defer(Meal.image_analysis))
+        
+        # Una fila extra indica si hay página siguiente
+        meals = list(await self.db.scalars(
+            query.order_by(desc(Meal.eaten_at), desc(Meal.id)).limit(limit + 1)
+        ))
+        has_more = len(meals) > limit
+        meals = meals[:limit]
+        
+        if not include_analysis:
+            # Sin carga perezosa en asyncio: la respuesta lleva image_analysis vacío
+            for meal in meals:
+                if "image_analysis" not in meal.__dict__:
+                    set_committed_value(meal, "image_analysis", None)
+        
+        return MealPage(meals=meals, next_cursor=encode_meal_cursor(meals[-1]) if has_more else None)
     
-    def get_meal_by_id(self, meal_id: int, user_id: int) -> Optional[Meal]:
+    async def get_meal_by_id(self, meal_id: int, user_id: int) -> Optional[Meal]:
         """Obtener comida por ID"""
-        return self.db.query(Meal).filter(
+        return await self.db.scalar(self._meal_query().where(
             and_(Meal.id == meal_id, Meal.user_id == user_id)
-        ).first()
+        ))
     
-    def update_meal(self, meal_id: int, user_id: int, meal_data: MealUpdate) -> Optional[Meal]:
+    async def update_meal(self, meal_id: int, user_id: int, meal_data: MealUpdate) -> Optional[Meal]:
         """Actualizar comida"""
         
-        meal = self.get_meal_by_id(meal_id, user_id)
+        meal = await self.get_meal_by_id(meal_id, user_id)
         if not meal:
             return None
         
-        # Actualizar campos
+        old_date = await self.daily_stats.meal_day(meal)
+        
+        # Actualizar campos (eaten_at siempre en UTC, como al crear)
         for field, value in meal_data.dict(exclude_unset=True).items():
+            if field == "eaten_at" and value is not None:
+                value = utc_naive(value)
             setattr(meal, field, value)
         
-        self.db.commit()
+        # Si cambió la fecha, mover el aporte de la comida al nuevo día
+        await self.daily_stats.move_meal(meal, old_date)
         
-        # Actualizar estadísticas diarias si cambió la fecha
-        self._update_daily_stats(user_id, meal.eaten_at.date())
+        await self.db.commit()
         
         return meal
     
-    def delete_meal(self, meal_id: int, user_id: int) -> bool:
+    async def delete_meal(self, meal_id: int, user_id: int) -> bool:
         """Eliminar comida"""
         
-        meal = self.get_meal_by_id(meal_id, user_id)
+        meal = await self.get_meal_by_id(meal_id, user_id)
         if not meal:
             return False
         
-        eaten_date = meal.eaten_at.date()
-        
-        self.db.delete(meal)
-        self.db.commit()
+        # Restar la comida de las estadísticas del día (misma transacción)
+        await self.daily_stats.remove_meal(meal)
         
-        # Actualizar estadísticas diarias
-        self._update_daily_stats(user_id, eaten_date)
+        await self.db.delete(meal)
+        await self.db.commit()
         
         return True
     
@@ -160,8 +261,9 @@ class MealService:
             analysis = await image_analyzer.analyze_food_image(image_path, confidence_threshold)
             
             # Buscar alimentos en la base de datos y sugerir IDs
+            foods = await self._find_similar_foods([f.food_name for f in analysis.detected_foods])
             for detected_food in analysis.detected_foods:
-                food = self._find_similar_food(detected_food.food_name)
+                food = foods.get(detected_food.food_name)
                 if food:
                     detected_food.suggested_food_id = food.id
             
@@ -171,23 +273,51 @@ class MealService:
             logger.error(f"Error analizando imagen: {e}")
             raise
     
-    def _find_similar_food(self, food_name: str) -> Optional[Food]:
+    async def _find_similar_food(self, food_name: str) -> Optional[Food]:
         """Buscar alimento similar en la base de datos"""
-        
-        # Búsqueda exacta
-        food = self.db.query(Food).filter(
-            func.lower(Food.name) == food_name.lower()
-        ).first()
-        
-        if food:
-            return food
-        
-        # Búsqueda parcial
-        food = self.db.query(Food).filter(
-            Food.name.ilike(f"%{food_name}%")
-        ).first()
-        
-        return food
+        return (await self._find_similar_foods([food_name])).get(food_name)
+    
+    async def _find_similar_foods(self, food_names: List[str]) -> Dict[str, Food]:
+        """
+        Buscar alimentos similares para varios nombres con una sola consulta
+        Los candidatos y sus sinónimos se resuelven en memoria con el buscador difuso;
+        los nombres que no se encuentran así prueban una coincidencia parcial (ILIKE)
+        """
+        matcher = get_food_matcher()
+        ranks: Dict[str, Dict[str, int]] = {}
+        for food_name in food_names:
+            rank = {food_name.lower(): 0}
+            for position, match in enumerate(matcher.match(food_name, limit=3), start=1):
+                for term in [match.name] + matcher.synonyms(match.name):
+                    rank.setdefault(term.lower(), position)
+            ranks[food_name] = rank
+        
+        terms = set()
+        for rank in ranks.values():
+            terms.update(rank)
+        if not terms:
+            return {}
+        
+        foods = (await self.db.scalars(select(Food).where(
+            func.lower(Food.name).in_(list(terms))
+        ))).all()
+        
+        result = {}
+        for food_name, rank in ranks.items():
+            candidates = [food for food in foods if food.name.lower() in rank]
+            if candidates:
+                result[food_name] = min(candidates, key=lambda food: rank[food.name.lower()])
+        
+        # Sin nombre exacto ni sinónimo: coincidencia parcial, el nombre más corto que lo contiene
+        for food_name in food_names:
+            if food_name not in result and food_name.strip():
+                food = await self.db.scalar(
+                    select(Food).where(Food.name.ilike(f"%{food_name.strip()}%"))
+                    .order_by(func.length(Food.name), Food.id).limit(1)
+                )
+                if food is not None:
+                    result[food_name] = food
+        return result
     
     async def create_meal_from_image(self, user_id: int, image_path: str,
                                    meal_type: str, eaten_at: datetime) -> Meal:
@@ -200,62 +330,38 @@ class MealService:
         meal = Meal(
             user_id=user_id,
             meal_type=meal_type,
-            eaten_at=eaten_at,
+            eaten_at=utc_naive(eaten_at),
             image_path=image_path,
             image_analysis=analysis.dict(),
             confidence_score=analysis.overall_confidence
         )
         
-        self.db.add(meal)
-        self.db.flush()
-        
-        # Agregar alimentos detectados
-        total_calories = 0
-        total_protein = 0
-        total_carbs = 0
-        total_fat = 0
-        total_fiber = 0
-        
-        for detected_food in analysis.detected_foods:
-            if detected_food.suggested_food_id:
-                # Crear MealFood con el alimento sugerido
-                food_data = MealFoodCreate(
-                    food_id=detected_food.suggested_food_id,
-                    quantity=detected_food.estimated_quantity
-                )
-                
-                meal_food = self._create_meal_food(meal.id, food_data)
-                meal_food.ai_detected = True
-                meal_food.ai_confidence = detected_food.confidence
-                meal_food.bounding_box = detected_food.bounding_box
-                
-                meal.foods.append(meal_food)
-                
-                total_calories += meal_food.calories
-                total_protein += meal_food.protein
-                total_carbs += meal_food.carbs
-                total_fat += meal_food.fat
-                total_fiber += meal_food.fiber
-        
-        # Actualizar totales
-        meal.total_calories = total_calories
-        meal.total_protein = total_protein
-        meal.total_carbs = total_carbs
-        meal.total_fat = total_fat
-        meal.total_fiber = total_fiber
+        # Agregar alimentos detectados con un alimento sugerido
+        suggested = [f for f in analysis.detected_foods if f.suggested_food_id]
+        await self._add_meal_foods(
+            meal,
+            [
+                MealFoodCreate(food_id=f.suggested_food_id, quantity=f.estimated_quantity)
+                for f in suggested
+            ],
+            extra_fields=[
+                {"ai_detected": True, "ai_confidence": f.confidence, "bounding_box": f.bounding_box}
+                for f in suggested
+            ]
+        )
         
-        self.db.commit()
+        # Sumar la comida a las estadísticas del día (misma transacción)
+        await self.daily_stats.add_meal(meal)
         
-        # Actualizar estadísticas diarias
-        self._update_daily_stats(user_id, meal.eaten_at.date())
+        await self.db.commit()
         
-        return meal
+        return await self._reload_meal(meal)
     
     async def quick_meal_entry(self, user_id: int, entry_data: QuickMealEntry) -> QuickMealResponse:
         """Entrada rápida de comida por texto"""
         
         # Procesar texto con IA (simplificado)
-        suggested_foods = self._parse_meal_text(entry_data.text_description)
+        suggested_foods = await self._parse_meal_text(entry_data.text_description)
         
         # Calcular confianza general
         confidence = sum(food.confidence for food in suggested_foods) / len(suggested_foods) if suggested_foods else 0.0
@@ -266,88 +372,36 @@ class MealService:
             original_text=entry_data.text_description
         )
     
-    def _parse_meal_text(self, text: str) -> List:
-        """Parsear texto de comida (implementación simplificada)"""
-        # En producción, esto usaría NLP más avanzado
-        
-        # Palabras clave básicas
-        food_keywords = {
-            "manzana": {"name": "apple", "quantity": 150},
-            "plátano": {"name": "banana", "quantity": 120},
-            "pollo": {"name": "chicken", "quantity": 100},
-            "arroz": {"name": "rice", "quantity": 200},
-            "pan": {"name": "bread", "quantity": 50},
-            "huevo": {"name": "egg", "quantity": 50}
-        }
+    async def _parse_meal_text(self, text: str) -> List:
+        """Parsear texto de comida: alimentos, cantidades y unidades"""
+        parsed_foods = get_meal_parser().parse(text)
         
-        detected_foods = []
-        text_lower = text.lower()
+        # Buscar todos los alimentos en BD con una sola consulta
+        foods = await self._find_similar_foods([item.name for item in parsed_foods])
         
-        for keyword, info in food_keywords.items():
-            if keyword in text_lower:
-                # Buscar alimento en BD
-                food = self._find_similar_food(info["name"])
-                if food:
-                    from app.schemas.meal import DetectedFood
-                    detected_food = DetectedFood(
-                        food_name=info["name"],
-                        confidence=0.8,
-                        estimated_quantity=info["quantity"],
-                        bounding_box={"x": 0, "y": 0, "width": 1, "height": 1},
-                        suggested_food_id=food.id,
-                        nutrition_estimate={
-                            "calories": food.calories_per_100g * (info["quantity"] / 100),
-                            "protein": food.protein_per_100g * (info["quantity"] / 100),
-                            "carbs": food.carbs_per_100g * (info["quantity"] / 100),
-                            "fat": food.fat_per_100g * (info["quantity"] / 100)
-                        }
-                    )
-                    detected_foods.append(detected_food)
+        detected_foods = []
+        for item in parsed_foods:
+            food = foods.get(item.name)
+            if food:
+                from app.schemas.meal import DetectedFood
+                quantity = item.grams_for(food.common_portions)
+                detected_food = DetectedFood(
+                    food_name=item.name,
+                    confidence=round(0.8 * item.score, 2),
+                    estimated_quantity=quantity,
+                    bounding_box={"x": 0, "y": 0, "width": 1, "height": 1},
+                    suggested_food_id=food.id,
+                    nutrition_estimate={
+                        "calories": food.calories_per_100g * (quantity / 100),
+                        "protein": food.protein_per_100g * (quantity / 100),
+                        "carbs": food.carbs_per_100g * (quantity / 100),
+                        "fat": food.fat_per_100g * (quantity / 100)
+                    }
+                )
+                detected_foods.append(detected_food)
         
         return detected_foods
     
-    def _update_daily_stats(self, user_id: int, target_date: date):
-        """Actualizar estadísticas diarias"""
-        
-        # Calcular totales del día
-        daily_totals = self.db.query(
-            func.sum(Meal.total_calories).label('calories'),
-            func.sum(Meal.total_protein).label('protein'),
-            func.sum(Meal.total_carbs).label('carbs'),
-            func.sum(Meal.total_fat).label('fat'),
-            func.sum(Meal.total_fiber).label('fiber'),
-            func.count(Meal.id).label('meal_count')
-        ).filter(
-            and_(
-                Meal.user_id == user_id,
-                func.date(Meal.eaten_at) == target_date
-            )
-        ).first()
-        
-        # Buscar o crear DailyStats
-        daily_stat = self.db.query(DailyStats).filter(
-            and_(DailyStats.user_id == user_id, DailyStats.date == target_date)
-        ).first()
-        
-        if not daily_stat:
-            daily_stat = DailyStats(user_id=user_id, date=target_date)
-            self.db.add(daily_stat)
-        
-        # Actualizar valores
-        daily_stat.consumed_calories = daily_totals.calories or 0
-        daily_stat.consumed_protein = daily_totals.protein or 0
-        daily_stat.consumed_carbs = daily_totals.carbs or 0
-        daily_stat.consumed_fat = daily_totals.fat or 0
-        daily_stat.consumed_fiber = daily_totals.fiber or 0
-        daily_stat.meal_count = daily_totals.meal_count or 0
-        
-        # Calcular adherencia si hay objetivos
-        user = self.db.query(User).filter(User.id == user_id).first()
-        if user and user.target_calories:
-            daily_stat.calorie_adherence = min(daily_stat.consumed_calories / user.target_calories, 2.0)
-        
-        self.db.commit()
-
-def get_meal_service(db: Session) -> MealService:
+def get_meal_service(db: AsyncSession) -> MealService:
     """Factory function para obtener instancia del servicio"""
     return MealService(db)
\ No newline at end of file
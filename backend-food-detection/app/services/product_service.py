@@ -461,6 +461,16 @@ class ProductAnalysisService:
         """
         Crea respuesta para productos no encontrados
         """
+        if product_info.get("valid") is False:
+            return {
+                "success": False,
+                "barcode": barcode,
+                "message": "Código de barras inválido",
+                "error": product_info.get("error"),
+                "suggestion": product_info.get("suggestion"),
+                "barcode_info": self.barcode_detector.analyze_barcode_format(barcode)
+            }
+        
         return {
             "success": False,
             "barcode": barcode,
@@ -0,0 +1,439 @@
+"""
+Resúmenes de progreso por período (ProgressSummary)
+Cada usuario tiene una fila por semana, mes y trimestre con promedios,
+adherencia, peso y TDEE de sus días cerrados (DailyStats.complete_day).
+Al cerrar o corregir un día solo se recalculan los tres períodos que lo
+contienen; el historial se completa por lotes de usuarios. Los endpoints
+de períodos leen estas filas con una sola consulta por el índice
+(user_id, period_type, start_date). "Hoy" es siempre el día en la zona
+horaria de cada usuario (local_today).
+"""
+
+import argparse
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.time_ranges import day_range, local_today
+from app.models.progress import DailyStats, ProgressSummary, WeightEntry
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+PERIOD_TYPES = ("week", "month", "quarter")
+
+# Usuarios por lote al completar el historial o cerrar días
+BACKFILL_BATCH_SIZE = 200
+
+# Columnas de DailyStats que necesita un resumen
+_DAY_COLUMNS = (
+    DailyStats.user_id, DailyStats.date, DailyStats.meal_count,
+    DailyStats.consumed_calories, DailyStats.consumed_protein,
+    DailyStats.consumed_carbs, DailyStats.consumed_fat,
+    DailyStats.calorie_adherence, DailyStats.macro_adherence,
+    DailyStats.target_calories, DailyStats.estimated_expenditure
+)
+
+PeriodKey = Tuple[int, str, date]  # (user_id, period_type, start_date)
+
+
+@lru_cache(maxsize=8192)
+def period_bounds(period_type: str, day: date) -> Tuple[date, date]:
+    """Primer y último día del período que contiene la fecha (semanas de lunes a domingo)"""
+    if period_type == "week":
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=6)
+    if period_type == "month":
+        start = day.replace(day=1)
+    elif period_type == "quarter":
+        start = date(day.year, 3 * ((day.month - 1) // 3) + 1, 1)
+    else:
+        raise ValueError(f"Tipo de período no soportado: {period_type}")
+
+    months = 1 if period_type == "month" else 3
+    year, month = divmod(start.month - 1 + months, 12)
+    return start, date(start.year + year, month + 1, 1) - timedelta(days=1)
+
+
+def periods_between(period_type: str, start: date, end: date) -> List[Tuple[date, date]]:
+    """Períodos que se cruzan con el rango [start, end]"""
+    periods = []
+    day = start
+    while day <= end:
+        bounds = period_bounds(period_type, day)
+        periods.append(bounds)
+        day = bounds[1] + timedelta(days=1)
+    return periods
+
+
+def _mean(values: Iterable[Optional[float]]) -> Optional[float]:
+    values = [value for value in values if value is not None]
+    return sum(values) / len(values) if values else None
+
+
+def summarize_period(days: Sequence, weights: Sequence, start: date, end: date) -> Dict[str, Any]:
+    """
+    Valores de un ProgressSummary a partir de los días cerrados y los pesos del período
+
+    Args:
+        days: filas de DailyStats cerradas del período, ordenadas por fecha
+        weights: filas (date, weight) ordenadas por fecha
+    """
+    logged = [day for day in days if (day.meal_count or 0) > 0]
+    total_days = (end - start).days + 1
+
+    values = {
+        "end_date": end,
+        **{f"avg_{field}": _mean(getattr(day, f"consumed_{field}") for day in logged)
+           for field in ("calories", "protein", "carbs", "fat")},
+        "avg_calorie_adherence": _mean(day.calorie_adherence for day in logged),
+        "avg_macro_adherence": _mean(day.macro_adherence for day in logged),
+        "avg_target_calories": _mean(day.target_calories for day in days),
+        "weight_start": None, "weight_end": None, "weight_change": None, "weight_trend": None,
+        "days_logged": len(logged),
+        "total_days": total_days,
+        "logging_consistency": len(logged) / total_days,
+    }
+
+    if weights:
+        first, last = weights[0], weights[-1]
+        values["weight_start"] = first.weight
+        values["weight_end"] = last.weight
+        if len(weights) >= 2:
+            values["weight_change"] = last.weight - first.weight
+            # kg por semana entre el primer y el último registro
+            values["weight_trend"] = values["weight_change"] / max((last.date - first.date).days, 1) * 7
+
+    expenditures = [day.estimated_expenditure for day in days if day.estimated_expenditure]
+    values["tdee_start"] = expenditures[0] if expenditures else None
+    values["tdee_end"] = expenditures[-1] if expenditures else None
+    return values
+
+
+def combine_summaries(summaries: Sequence[ProgressSummary]) -> Dict[str, Any]:
+    """
+    Agregado de varios períodos consecutivos (promedios ponderados por días registrados)
+    """
+    def weighted(field: str) -> Optional[float]:
+        pairs = [(getattr(s, field), s.days_logged or 0) for s in summaries if getattr(s, field) is not None]
+        total = sum(weight for _, weight in pairs)
+        return sum(value * weight for value, weight in pairs) / total if total else None
+
+    with_weight = [s for s in summaries if s.weight_start is not None]
+    days_logged = sum(s.days_logged or 0 for s in summaries)
+    total_days = sum(s.total_days or 0 for s in summaries)
+    return {
+        "avg_calories": weighted("avg_calories"),
+        "avg_calorie_adherence": weighted("avg_calorie_adherence"),
+        "weight_start": with_weight[0].weight_start if with_weight else None,
+        "weight_end": with_weight[-1].weight_end if with_weight else None,
+        "weight_change": with_weight[-1].weight_end - with_weight[0].weight_start if with_weight else None,
+        "days_logged": days_logged,
+        "total_days": total_days,
+        "logging_consistency": days_logged / total_days if total_days else 0.0,
+    }
+
+
+class ProgressRollupService:
+    """Mantenimiento y lectura de ProgressSummary"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self._timezones: Dict[int, Optional[str]] = {}
+
+    async def user_timezone(self, user_id: int) -> Optional[str]:
+        """Zona horaria del usuario (una consulta por usuario y sesión)"""
+        if user_id not in self._timezones:
+            self._timezones[user_id] = await self.db.scalar(select(User.timezone).where(User.id == user_id))
+        return self._timezones[user_id]
+
+    async def _timezones_of(self, user_ids: Iterable[int]) -> Dict[int, Optional[str]]:
+        """Zonas horarias de varios usuarios (una consulta por lote)"""
+        missing = sorted(set(user_ids) - set(self._timezones))
+        for i in range(0, len(missing), BACKFILL_BATCH_SIZE):
+            self._timezones.update((await self.db.execute(
+                select(User.id, User.timezone).where(User.id.in_(missing[i:i + BACKFILL_BATCH_SIZE]))
+            )).all())
+        return self._timezones
+
+    async def get_summaries(self, user_id: int, period_type: str,
+                            start_date: Optional[date] = None,
+                            end_date: Optional[date] = None) -> List[ProgressSummary]:
+        """Resúmenes de los períodos que se cruzan con el rango, del más antiguo al más reciente"""
+        query = select(ProgressSummary).where(
+            ProgressSummary.user_id == user_id,
+            ProgressSummary.period_type == period_type
+        )
+        if start_date is not None:
+            query = query.where(ProgressSummary.start_date >= period_bounds(period_type, start_date)[0])
+        if end_date is not None:
+            query = query.where(ProgressSummary.start_date <= end_date)
+        return (await self.db.scalars(query.order_by(ProgressSummary.start_date))).all()
+
+    async def range_summaries(self, user_id: int, period_type: str,
+                              start_date: date, end_date: date) -> List[ProgressSummary]:
+        """
+        Resúmenes limitados exactamente al rango: los períodos completos salen
+        de sus filas y los que el rango corta en los bordes (a lo sumo dos) se
+        recalculan con los días cerrados y los pesos de la parte incluida,
+        sin guardarlos
+        """
+        summaries = []
+        for summary in await self.get_summaries(user_id, period_type, start_date, end_date):
+            if summary.start_date >= start_date and summary.end_date <= end_date:
+                summaries.append(summary)
+                continue
+
+            first, last = max(summary.start_date, start_date), min(summary.end_date, end_date)
+            days = (await self.db.execute(
+                select(*_DAY_COLUMNS).where(
+                    DailyStats.user_id == user_id,
+                    DailyStats.complete_day.is_(True),
+                    *day_range(DailyStats.date, first, last)
+                ).order_by(DailyStats.date)
+            )).all()
+            if not days:
+                continue
+            # Pesos hasta el último día cerrado, como en _rollup
+            weights = (await self.db.execute(
+                select(WeightEntry.date, WeightEntry.weight).where(
+                    WeightEntry.user_id == user_id, *day_range(WeightEntry.date, first, days[-1].date)
+                ).order_by(WeightEntry.date)
+            )).all()
+            summaries.append(ProgressSummary(
+                user_id=user_id, period_type=period_type, start_date=first,
+                **summarize_period(days, weights, first, last)
+            ))
+        return summaries
+
+    async def get_summary(self, user_id: int, period_type: str, day: date) -> Optional[ProgressSummary]:
+        """Resumen del período que contiene la fecha"""
+        return await self.db.scalar(select(ProgressSummary).where(
+            ProgressSummary.user_id == user_id,
+            ProgressSummary.period_type == period_type,
+            ProgressSummary.start_date == period_bounds(period_type, day)[0]
+        ))
+
+    async def close_day(self, user_id: int, day: date):
+        """Cerrar un día del usuario y actualizar sus períodos, sin commit"""
+        await self.db.execute(
+            update(DailyStats)
+            .where(and_(DailyStats.user_id == user_id, DailyStats.date == day))
+            .values(complete_day=True)
+            .execution_options(synchronize_session=False)
+        )
+        await self.refresh_day(user_id, day)
+
+    async def day_changed(self, user_id: int, day: date):
+        """
+        Corrección de un día pasado (comida o peso), sin commit
+        Un día anterior al hoy local ya terminó: se cierra (la fila puede ser
+        nueva, p. ej. la primera comida cargada días después, y close_days
+        solo cierra el ayer). El día de hoy no toca ningún resumen
+        """
+        if day < local_today(await self.user_timezone(user_id)):
+            await self.close_day(user_id, day)
+
+    async def refresh_day(self, user_id: int, day: date):
+        """Recalcular la semana, el mes y el trimestre que contienen el día"""
+        await self._rollup([user_id], day, day)
+
+    async def close_days(self, day: Optional[date] = None,
+                         batch_size: int = BACKFILL_BATCH_SIZE) -> Dict[str, int]:
+        """
+        Cerrar un día para todos los usuarios con registro (tarea nocturna)
+        Sin fecha, cada usuario cierra su ayer local (quien aún no llegó a
+        medianoche lo cierra en la corrida siguiente). Los resúmenes se
+        recalculan por lotes de usuarios con commit por lote
+        """
+        open_day = or_(DailyStats.complete_day.is_(False), DailyStats.complete_day.is_(None))
+        if day is not None:
+            user_ids = (await self.db.scalars(select(DailyStats.user_id).where(DailyStats.date == day, open_day))).all()
+            days = {day: user_ids}
+        else:
+            # Ayer local de cualquier zona (UTC-12 a UTC+14) cae en estos tres días
+            today = date.today()
+            rows = (await self.db.execute(select(DailyStats.user_id, DailyStats.date).where(
+                open_day, *day_range(DailyStats.date, today - timedelta(days=2), today)
+            ))).all()
+            timezones = await self._timezones_of(row.user_id for row in rows)
+            days = defaultdict(list)
+            for row in rows:
+                if row.date == local_today(timezones.get(row.user_id)) - timedelta(days=1):
+                    days[row.date].append(row.user_id)
+
+        written = 0
+        for closed_day, user_ids in sorted(days.items()):
+            for i in range(0, len(user_ids), batch_size):
+                batch = user_ids[i:i + batch_size]
+                await self.db.execute(
+                    update(DailyStats)
+                    .where(DailyStats.user_id.in_(batch), DailyStats.date == closed_day)
+                    .values(complete_day=True)
+                    .execution_options(synchronize_session=False)
+                )
+                written += await self._rollup(batch, closed_day, closed_day)
+                await self.db.commit()
+
+        return {"users": sum(len(user_ids) for user_ids in days.values()), "summaries": written}
+
+    async def backfill(self, before: Optional[date] = None, user_id: Optional[int] = None,
+                       batch_size: int = BACKFILL_BATCH_SIZE) -> Dict[str, int]:
+        """
+        Cerrar los días anteriores a `before` (el hoy local de cada usuario por
+        defecto) y generar todos sus resúmenes, por lotes de usuarios con
+        commit por lote
+
+        Returns:
+            Conteo de usuarios procesados y resúmenes escritos
+        """
+        users_query = select(DailyStats.user_id).distinct()
+        if user_id is not None:
+            users_query = users_query.where(DailyStats.user_id == user_id)
+        user_ids = sorted((await self.db.scalars(users_query)).all())
+
+        # Usuarios agrupados por su corte (a lo sumo dos o tres fechas distintas)
+        cutoffs: Dict[date, List[int]] = defaultdict(list)
+        timezones = await self._timezones_of(user_ids) if before is None else {}
+        for uid in user_ids:
+            cutoffs[before or local_today(timezones.get(uid))].append(uid)
+
+        written = 0
+        processed = 0
+        for cutoff, cutoff_users in sorted(cutoffs.items()):
+            for i in range(0, len(cutoff_users), batch_size):
+                batch = cutoff_users[i:i + batch_size]
+                first_day = await self.db.scalar(
+                    select(DailyStats.date)
+                    .where(DailyStats.user_id.in_(batch), DailyStats.date < cutoff)
+                    .order_by(DailyStats.date).limit(1)
+                )
+                if first_day is not None:
+                    await self.db.execute(
+                        update(DailyStats)
+                        .where(DailyStats.user_id.in_(batch), DailyStats.date < cutoff)
+                        .values(complete_day=True)
+                        .execution_options(synchronize_session=False)
+                    )
+                    written += await self._rollup(batch, first_day, cutoff - timedelta(days=1))
+                    await self.db.commit()
+                processed += len(batch)
+                logger.info(f"Resúmenes de progreso: {processed}/{len(user_ids)} usuarios")
+
+        return {"users": len(user_ids), "summaries": written}
+
+    async def _rollup(self, user_ids: List[int], first_day: date, last_day: date) -> int:
+        """
+        Recalcular todos los períodos de los usuarios que se cruzan con [first_day, last_day]
+
+        Lee los días cerrados y los pesos del rango cubierto por esos períodos
+        (dos consultas por el índice (user_id, fecha)) y escribe solo los
+        resúmenes que cambian; los períodos sin días cerrados se eliminan
+
+        Returns:
+            Resúmenes creados o actualizados
+        """
+        periods = {
+            period_type: periods_between(period_type, first_day, last_day) for period_type in PERIOD_TYPES
+        }
+        range_start = min(bounds[0][0] for bounds in periods.values())
+        range_end = max(bounds[-1][1] for bounds in periods.values())
+
+        # Filas agrupadas por período: una pasada, sin recorrer los días por cada período
+        days: Dict[PeriodKey, List] = defaultdict(list)
+        for row in await self.db.execute(
+            select(*_DAY_COLUMNS).where(
+                DailyStats.user_id.in_(user_ids),
+                DailyStats.complete_day.is_(True),
+                *day_range(DailyStats.date, range_start, range_end)
+            ).order_by(DailyStats.user_id, DailyStats.date)
+        ):
+            for period_type in PERIOD_TYPES:
+                days[(row.user_id, period_type, period_bounds(period_type, row.date)[0])].append(row)
+
+        weights: Dict[PeriodKey, List] = defaultdict(list)
+        for row in await self.db.execute(
+            select(WeightEntry.user_id, WeightEntry.date, WeightEntry.weight).where(
+                WeightEntry.user_id.in_(user_ids),
+                *day_range(WeightEntry.date, range_start, range_end)
+            ).order_by(WeightEntry.user_id, WeightEntry.date)
+        ):
+            for period_type in PERIOD_TYPES:
+                weights[(row.user_id, period_type, period_bounds(period_type, row.date)[0])].append(row)
+
+        existing: Dict[PeriodKey, ProgressSummary] = {
+            (summary.user_id, summary.period_type, summary.start_date): summary
+            for summary in await self.db.scalars(select(ProgressSummary).where(
+                ProgressSummary.user_id.in_(user_ids),
+                *day_range(ProgressSummary.start_date, range_start, range_end)
+            ))
+        }
+
+        written = 0
+        created: List[Dict[str, Any]] = []
+        for user_id in user_ids:
+            for period_type, bounds in periods.items():
+                for start, end in bounds:
+                    key = (user_id, period_type, start)
+                    period_days = days.get(key)
+                    summary = existing.get(key)
+                    if not period_days:
+                        if summary is not None:
+                            await self.db.delete(summary)
+                        continue
+
+                    # Pesos hasta el último día cerrado del período
+                    closed_until = period_days[-1].date
+                    period_weights = [entry for entry in weights.get(key, []) if entry.date <= closed_until]
+                    values = summarize_period(period_days, period_weights, start, end)
+
+                    if summary is None:
+                        created.append({"user_id": user_id, "period_type": period_type, "start_date": start, **values})
+                        continue
+                    if all(getattr(summary, field) == value for field, value in values.items()):
+                        continue
+                    for field, value in values.items():
+                        setattr(summary, field, value)
+                    written += 1
+
+        # Los resúmenes nuevos (casi todos al completar el historial) en un solo INSERT de varias filas
+        if created:
+            await self.db.execute(insert(ProgressSummary), created)
+        await self.db.flush()
+        return written + len(created)
+
+
+async def _run(command: str, day: Optional[date] = None, user_id: Optional[int] = None) -> Dict[str, int]:
+    from app.core.database import AsyncSessionLocal, async_engine
+    import app.models.base  # noqa: F401 (registrar todos los modelos)
+
+    try:
+        async with AsyncSessionLocal() as session:
+            service = ProgressRollupService(session)
+            if command == "close":
+                return await service.close_days(day)
+            return await service.backfill(before=day, user_id=user_id)
+    finally:
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    # Uso (cron, cada noche): python -m app.services.progress_rollups close
+    # Historial completo (una vez): python -m app.services.progress_rollups backfill
+    parser = argparse.ArgumentParser(description="Mantener los resúmenes de progreso por período")
+    parser.add_argument("command", choices=["close", "backfill"], help="Cerrar un día o completar el historial")
+    parser.add_argument("--date", type=date.fromisoformat, default=None,
+                        help="close: día a cerrar (el ayer local de cada usuario por defecto); "
+                             "backfill: cerrar los días anteriores (a su hoy local por defecto)")
+    parser.add_argument("--user-id", type=int, default=None, help="Solo un usuario (backfill)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    result = asyncio.run(_run(args.command, args.date, args.user_id))
+    print(f"✅ Resúmenes de progreso: {result}")
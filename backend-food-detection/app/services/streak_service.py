@@ -0,0 +1,204 @@
+"""
+Rachas de registro
+Una racha es una serie de días consecutivos con comidas (DailyStats.meal_count > 0).
+El historial se calcula con una consulta de "gaps and islands": dentro de una
+racha, fecha - número de fila es constante, así que agrupar por esa diferencia
+da cada racha con su inicio, fin y largo. UserStreak guarda el estado por
+usuario y se actualiza en O(1) con la primera comida de cada día; solo un día
+anterior a la racha o un día que queda vacío obligan a recalcular al usuario.
+La racha sigue viva si el último día registrado es hoy o ayer en la zona
+horaria del usuario.
+"""
+
+import argparse
+import asyncio
+import logging
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, func, insert, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.time_ranges import local_today
+from app.models.progress import DailyStats, UserStreak
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+# Filas por INSERT al recalcular todos los usuarios
+STREAK_BATCH_SIZE = 5000
+
+
+def _day_number(column, dialect: str):
+    """Fecha como número de día (para restarle el número de fila)"""
+    if dialect == "sqlite":
+        return func.julianday(column)
+    return column - literal(date(1970, 1, 1))
+
+
+def streaks_statement(dialect: str, user_ids: Optional[List[int]] = None):
+    """
+    Racha actual y mejor racha de cada usuario (gaps and islands)
+
+    Devuelve una fila por usuario con días registrados: inicio, fin y largo de
+    su última racha y el largo de la más larga
+    """
+    logged = select(
+        DailyStats.user_id,
+        DailyStats.date,
+        (_day_number(DailyStats.date, dialect) - func.row_number().over(
+            partition_by=DailyStats.user_id, order_by=DailyStats.date
+        )).label("island")
+    ).where(DailyStats.meal_count > 0)
+    if user_ids is not None:
+        logged = logged.where(DailyStats.user_id.in_(user_ids))
+    logged = logged.cte("logged_days")
+
+    islands = select(
+        logged.c.user_id,
+        func.min(logged.c.date).label("start"),
+        func.max(logged.c.date).label("end"),
+        func.count().label("length")
+    ).group_by(logged.c.user_id, logged.c.island).cte("islands")
+
+    ranked = select(
+        islands,
+        func.max(islands.c.length).over(partition_by=islands.c.user_id).label("longest"),
+        func.row_number().over(partition_by=islands.c.user_id, order_by=islands.c.end.desc()).label("recency")
+    ).subquery("ranked")
+
+    return select(
+        ranked.c.user_id,
+        ranked.c.start.label("streak_start"),
+        ranked.c.end.label("last_logged_date"),
+        ranked.c.length.label("current_streak"),
+        ranked.c.longest.label("longest_streak")
+    ).where(ranked.c.recency == 1)
+
+
+def _as_date(value) -> date:
+    # SQLite devuelve MIN()/MAX() de una fecha como texto
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def active_streak(state, today: date) -> int:
+    """
+    Racha vigente: se corta si el último día registrado es anterior a ayer
+
+    Args:
+        state: UserStreak o fila con last_logged_date y current_streak
+        today: fecha actual en la zona horaria del usuario
+    """
+    if state is None or state.last_logged_date is None:
+        return 0
+    if _as_date(state.last_logged_date) < today - timedelta(days=1):
+        return 0
+    return state.current_streak
+
+
+class StreakService:
+    """Cálculo y mantenimiento de UserStreak"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.dialect = db.get_bind().dialect.name
+
+    async def get_streak(self, user: User) -> Dict[str, object]:
+        """Racha vigente y mejor racha del usuario"""
+        state = await self.db.get(UserStreak, user.id)
+        return {
+            "current_streak": active_streak(state, local_today(user.timezone)),
+            "longest_streak": state.longest_streak if state else 0,
+            "last_logged_date": state.last_logged_date if state else None,
+        }
+
+    async def record_day(self, user_id: int, day: date):
+        """
+        Primera comida de un día, sin commit
+
+        Extender la racha (día siguiente al último) o empezar una nueva es O(1);
+        un día anterior al último registrado puede unir rachas y se recalcula
+        """
+        state = await self.db.get(UserStreak, user_id)
+        if state is None or state.last_logged_date is None or day < state.last_logged_date:
+            await self.recompute([user_id])
+            return
+        if day == state.last_logged_date:
+            return
+
+        if day == state.last_logged_date + timedelta(days=1):
+            state.current_streak += 1
+        else:
+            state.current_streak = 1
+            state.streak_start = day
+        state.last_logged_date = day
+        state.longest_streak = max(state.longest_streak or 0, state.current_streak)
+
+    async def day_cleared(self, user_id: int, day: date):
+        """Un día se quedó sin comidas: puede partir una racha, se recalcula el usuario"""
+        await self.recompute([user_id])
+
+    async def recompute(self, user_ids: Optional[List[int]] = None) -> int:
+        """
+        Recalcular las rachas desde DailyStats, sin commit
+
+        Sin usuarios recalcula a todos en una sola pasada: una consulta y
+        escrituras en lotes de STREAK_BATCH_SIZE filas
+
+        Returns:
+            Usuarios con racha escrita
+        """
+        remove = delete(UserStreak).execution_options(synchronize_session=False)
+        if user_ids is not None:
+            remove = remove.where(UserStreak.user_id.in_(user_ids))
+        await self.db.execute(remove)
+
+        # Los estados ya cargados en la sesión quedarían con valores viejos
+        for state in [obj for obj in self.db.identity_map.values() if isinstance(obj, UserStreak)]:
+            self.db.expunge(state)
+
+        written = 0
+        batch = []
+        rows = await self.db.stream(
+            streaks_statement(self.dialect, user_ids).execution_options(yield_per=STREAK_BATCH_SIZE)
+        )
+        async for row in rows:
+            batch.append({
+                "user_id": row.user_id,
+                "current_streak": row.current_streak,
+                "longest_streak": row.longest_streak,
+                "streak_start": _as_date(row.streak_start),
+                "last_logged_date": _as_date(row.last_logged_date),
+            })
+            if len(batch) >= STREAK_BATCH_SIZE:
+                await self.db.execute(insert(UserStreak), batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            await self.db.execute(insert(UserStreak), batch)
+            written += len(batch)
+        return written
+
+
+async def _backfill(user_id: Optional[int] = None) -> int:
+    from app.core.database import AsyncSessionLocal, async_engine
+    import app.models.base  # noqa: F401 (registrar todos los modelos)
+
+    try:
+        async with AsyncSessionLocal() as session:
+            written = await StreakService(session).recompute([user_id] if user_id is not None else None)
+            await session.commit()
+            return written
+    finally:
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    # Uso (una vez, o tras importar datos): python -m app.services.streak_service
+    parser = argparse.ArgumentParser(description="Recalcular las rachas de registro desde DailyStats")
+    parser.add_argument("--user-id", type=int, default=None, help="Solo un usuario")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    result = asyncio.run(_backfill(args.user_id))
+    print(f"✅ Rachas recalculadas: {result} usuarios")
@@ -0,0 +1,143 @@
+"""
+Servicio de sincronización
+Subida de cambios de un dispositivo por conjuntos: cada tramo de hasta
+SYNC_UPLOAD_CHUNK elementos lee sus filas existentes con una sola consulta
+por el índice (user_id, device_id, entity_type, entity_id), detecta los
+conflictos en memoria y escribe altas y actualizaciones con un INSERT y un
+UPDATE masivos (por clave primaria). El resultado por elemento (subido o
+conflicto) es el mismo que procesándolos de a uno y en orden.
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Sequence, Tuple
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.sync import SyncData
+from app.schemas.sync import SyncDataCreate
+
+logger = logging.getLogger(__name__)
+
+# Elementos por tramo (una consulta y hasta dos escrituras masivas por tramo)
+SYNC_UPLOAD_CHUNK = 500
+
+
+class SyncService:
+    """Subida de datos de sincronización"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def upload(self, user_id: int, device_id: str,
+                     items: Sequence[SyncDataCreate]) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Guardar los cambios de un dispositivo, sin commit
+
+        Returns:
+            (elementos subidos, conflictos por elemento)
+        """
+        uploaded_count = 0
+        conflicts = []
+        for offset in range(0, len(items), SYNC_UPLOAD_CHUNK):
+            chunk_uploaded, chunk_conflicts = await self._upload_chunk(
+                user_id, device_id, items[offset:offset + SYNC_UPLOAD_CHUNK]
+            )
+            uploaded_count += chunk_uploaded
+            conflicts.extend(chunk_conflicts)
+        return uploaded_count, conflicts
+
+    async def _existing(self, user_id: int, device_id: str, keys) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """
+        Filas ya guardadas del tramo por (entity_type, entity_id)
+        Tipos e ids van en dos IN (el índice busca por las cuatro columnas, no
+        así con IN de tuplas) y los pares que no son del tramo se descartan.
+        Si una entidad tiene filas repetidas vale la de menor id (la que
+        encontraría la consulta de a uno); se elige en memoria porque un
+        ORDER BY id haría elegir ix_sync_data_device_id
+        """
+        rows = (await self.db.execute(
+            select(SyncData.id, SyncData.entity_type, SyncData.entity_id,
+                   SyncData.client_timestamp, SyncData.server_timestamp)
+            .where(
+                SyncData.user_id == user_id,
+                SyncData.device_id == device_id,
+                SyncData.entity_type.in_({entity_type for entity_type, _ in keys}),
+                SyncData.entity_id.in_({entity_id for _, entity_id in keys})
+            )
+        )).all()
+        existing = {}
+        for row in rows:
+            key = (row.entity_type, row.entity_id)
+            if key in keys and (key not in existing or row.id < existing[key]["id"]):
+                existing[key] = dict(row._mapping)
+        return existing
+
+    async def _upload_chunk(self, user_id: int, device_id: str,
+                            items: Sequence[SyncDataCreate]) -> Tuple[int, List[Dict[str, Any]]]:
+        keys = {(item.entity_type, item.entity_id) for item in items}
+        existing = await self._existing(user_id, device_id, keys)
+        now = datetime.utcnow()
+        inserts, updates = [], {}
+        uploaded_count = 0
+        conflicts = []
+
+        for data_item in items:
+            key = (data_item.entity_type, data_item.entity_id)
+            try:
+                current = existing.get(key)
+                if current is not None:
+                    # Verificar conflicto por timestamp
+                    if current["client_timestamp"] != data_item.client_timestamp:
+                        conflicts.append({
+                            "entity_type": data_item.entity_type,
+                            "entity_id": data_item.entity_id,
+                            "server_timestamp": current["server_timestamp"],
+                            "client_timestamp": data_item.client_timestamp,
+                            "conflict_type": "timestamp_mismatch"
+                        })
+                        continue
+
+                    # Actualizar datos existentes (o el alta pendiente de este mismo tramo)
+                    current.update(entity_data=data_item.data, action=data_item.action,
+                                   server_timestamp=now, sync_status="synced")
+                    if "id" in current:
+                        updates[current["id"]] = current
+                else:
+                    # Crear nuevo registro
+                    current = {
+                        "user_id": user_id,
+                        "device_id": device_id,
+                        "entity_type": data_item.entity_type,
+                        "entity_id": data_item.entity_id,
+                        "action": data_item.action,
+                        "entity_data": data_item.data,
+                        "client_timestamp": data_item.client_timestamp,
+                        "server_timestamp": now,
+                        "sync_status": "synced"
+                    }
+                    existing[key] = current
+                    inserts.append(current)
+
+                uploaded_count += 1
+
+            except Exception as e:
+                conflicts.append({
+                    "entity_type": data_item.entity_type,
+                    "entity_id": data_item.entity_id,
+                    "error": str(e),
+                    "conflict_type": "processing_error"
+                })
+
+        if inserts:
+            await self.db.execute(insert(SyncData), inserts)
+        if updates:
+            await self.db.execute(update(SyncData), [
+                {
+                    "id": row["id"], "entity_data": row["entity_data"], "action": row["action"],
+                    "server_timestamp": row["server_timestamp"], "sync_status": row["sync_status"]
+                }
+                for row in updates.values()
+            ])
+        return uploaded_count, conflicts
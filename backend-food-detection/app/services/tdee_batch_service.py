@@ -0,0 +1,264 @@
+"""
+Recálculo nocturno del TDEE de todos los usuarios
+Recorre los usuarios activos por lotes (paginación por id). Por cada lote,
+los estados del filtro, la ingesta y los pesajes de los días pendientes se
+leen con pocas consultas por conjunto (user_id IN lote) y se arman matrices
+usuario × día. filter_batch (app/ai/tdee_filter.py) las procesa en un pool
+de procesos mientras se carga el lote siguiente. Los estados y los objetivos
+(estimated_tdee, tdee_confidence, adaptive_calories) se escriben con INSERT y
+UPDATE masivos por clave primaria, con commit por lote, con las mismas reglas
+que AdaptiveLearningEngine.update_user_goals.
+"""
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.ai.adaptive_learning import adaptive_engine
+from app.ai.tdee_filter import FilterState, filter_batch
+from app.core.time_ranges import day_range, local_today
+from app.models.progress import DailyStats, TDEEState, WeightEntry
+from app.models.user import User
+from app.services.tdee_filter_service import advance_start, prior_tdee
+
+logger = logging.getLogger(__name__)
+
+# Usuarios por lote (una matriz usuario × día y un commit por lote)
+TDEE_BATCH_SIZE = 2000
+
+# Procesos del pool (0 o 1: en el mismo proceso)
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+_USER_COLUMNS = (
+    User.id, User.timezone, User.height, User.age, User.gender, User.activity_level,
+    User.goal, User.estimated_tdee, User.target_calories,
+)
+
+_STATE_COLUMNS = (
+    TDEEState.user_id, TDEEState.last_date, TDEEState.weight, TDEEState.tdee,
+    TDEEState.p_ww, TDEEState.p_we, TDEEState.p_ee, TDEEState.intake_days, TDEEState.weigh_ins,
+)
+
+
+@dataclass
+class _Chunk:
+    """Usuarios de un lote con días pendientes y sus matrices para filter_batch"""
+    users: list
+    states: list  # fila de TDEEState o None
+    rebuild: np.ndarray
+    through: List[date]
+    state: np.ndarray
+    prior: np.ndarray
+    intakes: np.ndarray
+    weights: np.ndarray
+    active: np.ndarray
+
+
+class TDEEBatchService:
+    """Filtro del TDEE y objetivos adaptativos de todos los usuarios activos"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self._yesterday: Dict[Optional[str], date] = {}
+
+    def _through(self, timezone_name: Optional[str]) -> date:
+        """Último día cerrado en la zona del usuario (una vez por zona)"""
+        if timezone_name not in self._yesterday:
+            self._yesterday[timezone_name] = local_today(timezone_name) - timedelta(days=1)
+        return self._yesterday[timezone_name]
+
+    async def run(self, workers: int = DEFAULT_WORKERS, batch_size: int = TDEE_BATCH_SIZE) -> Dict[str, int]:
+        """
+        Procesar todos los usuarios activos
+
+        Hasta `workers` lotes se calculan a la vez; cada uno se escribe y se
+        confirma en orden apenas termina su cálculo
+        """
+        loop = asyncio.get_running_loop()
+        executor = None
+        if workers > 1:
+            executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+        summary = {"users": 0, "advanced": 0, "updated": 0}
+        pending = deque()
+        last_id = 0
+        try:
+            while True:
+                users = (await self.db.execute(
+                    select(*_USER_COLUMNS)
+                    .where(User.id > last_id, User.is_active.is_(True))
+                    .order_by(User.id)
+                    .limit(batch_size)
+                )).all()
+                if not users:
+                    break
+                last_id = users[-1].id
+                summary["users"] += len(users)
+
+                chunk = await self._load(users)
+                if chunk is not None:
+                    pending.append((chunk, loop.run_in_executor(
+                        executor, filter_batch, chunk.state, chunk.prior, chunk.intakes, chunk.weights, chunk.active
+                    )))
+                while len(pending) >= max(workers, 1):
+                    await self._write(*pending.popleft(), summary)
+            while pending:
+                await self._write(*pending.popleft(), summary)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        return summary
+
+    async def _load(self, users) -> Optional[_Chunk]:
+        """Estados, ingesta y pesajes de los días pendientes del lote"""
+        states = {row.user_id: row for row in (await self.db.execute(
+            select(*_STATE_COLUMNS).where(TDEEState.user_id.in_([user.id for user in users]))
+        )).all()}
+
+        selected, starts, through, rebuild = [], [], [], []
+        for user in users:
+            user_through = self._through(user.timezone)
+            start, from_scratch = advance_start(states.get(user.id), user_through)
+            if start is None:
+                continue
+            selected.append(user)
+            starts.append(start)
+            through.append(user_through)
+            rebuild.append(from_scratch)
+        if not selected:
+            return None
+
+        first_day = min(starts)
+        days = (max(through) - first_day).days + 1
+        index = {user.id: position for position, user in enumerate(selected)}
+        intakes = np.full((len(selected), days), np.nan)
+        weights = np.full((len(selected), days), np.nan)
+
+        # Una consulta por tabla y grupo (reconstrucción / incremental), desde el primer día del grupo
+        for group in (True, False):
+            ids = [user.id for user, flag in zip(selected, rebuild) if flag == group]
+            if not ids:
+                continue
+            group_start = min(start for start, flag in zip(starts, rebuild) if flag == group)
+            for model, column, target, extra in (
+                (DailyStats, DailyStats.consumed_calories, intakes, (DailyStats.meal_count > 0,)),
+                (WeightEntry, WeightEntry.weight, weights, ()),
+            ):
+                rows = (await self.db.execute(
+                    select(model.user_id, model.date, column).where(
+                        model.user_id.in_(ids), *day_range(model.date, group_start, max(through)), *extra
+                    )
+                )).all()
+                if rows:
+                    user_ids, row_days, values = zip(*rows)
+                    target[[index[user_id] for user_id in user_ids],
+                           [(day - first_day).days for day in row_days]] = values
+
+        offsets = np.arange(days)
+        start_offsets = np.array([(start - first_day).days for start in starts])
+        end_offsets = np.array([(day - first_day).days for day in through])
+        active = (offsets >= start_offsets[:, None]) & (offsets <= end_offsets[:, None])
+
+        rebuild = np.array(rebuild)
+        state = np.full((len(selected), 5), np.nan)
+        prior = np.full(len(selected), np.nan)
+        for position, user in enumerate(selected):
+            if not rebuild[position]:
+                row = states[user.id]
+                state[position] = (row.weight, row.tdee, row.p_ww, row.p_we, row.p_ee)
+                continue
+            # TDEE inicial con el primer pesaje de la ventana
+            weighed = np.flatnonzero(active[position] & ~np.isnan(weights[position]))
+            if len(weighed):
+                prior[position] = prior_tdee(user, weights[position, weighed[0]])
+
+        return _Chunk(
+            users=selected, states=[states.get(user.id) for user in selected], rebuild=rebuild,
+            through=through, state=state, prior=prior, intakes=intakes, weights=weights, active=active,
+        )
+
+    async def _write(self, chunk: _Chunk, future, summary: Dict[str, int]):
+        """Estados y objetivos del lote con INSERT/UPDATE masivos, y commit"""
+        final, intake_days, weigh_ins = await future
+        state_inserts, state_updates, user_updates = [], [], []
+
+        for position, user in enumerate(chunk.users):
+            if np.isnan(final[position, 0]):
+                continue  # sin pesajes en la ventana
+            previous = chunk.states[position]
+            values = dict(zip(("weight", "tdee", "p_ww", "p_we", "p_ee"), map(float, final[position])))
+            values["user_id"] = user.id
+            values["last_date"] = chunk.through[position]
+            values["intake_days"] = int(intake_days[position])
+            values["weigh_ins"] = int(weigh_ins[position])
+            if not chunk.rebuild[position]:
+                values["intake_days"] += previous.intake_days
+                values["weigh_ins"] += previous.weigh_ins
+            (state_updates if previous is not None else state_inserts).append(values)
+
+            if values["intake_days"] < adaptive_engine.min_data_days or values["weigh_ins"] < 2:
+                continue
+            posterior = FilterState(*final[position])
+            new_tdee = round(posterior.tdee)
+            if not adaptive_engine.should_update_goals(user, new_tdee, posterior.confidence):
+                continue
+            new_calories = adaptive_engine.calculate_adaptive_calories(user, new_tdee)
+            target = user.target_calories
+            if not target or abs(target - new_calories) < 50:
+                target = new_calories
+            user_updates.append({
+                "id": user.id,
+                "estimated_tdee": new_tdee,
+                "tdee_confidence": posterior.confidence,
+                "adaptive_calories": new_calories,
+                "target_calories": target,
+            })
+
+        if state_inserts:
+            await self.db.execute(insert(TDEEState), state_inserts)
+        if state_updates:
+            await self.db.execute(update(TDEEState), state_updates)
+        if user_updates:
+            await self.db.execute(update(User), user_updates)
+        await self.db.commit()
+        summary["advanced"] += len(state_inserts) + len(state_updates)
+        summary["updated"] += len(user_updates)
+
+
+async def _run(workers: int, batch_size: int, rebuild: bool = False) -> Dict[str, int]:
+    from app.core.database import AsyncSessionLocal, async_engine
+    import app.models.base  # noqa: F401 (registrar todos los modelos)
+
+    try:
+        async with AsyncSessionLocal() as session:
+            if rebuild:
+                await session.execute(update(TDEEState).values(last_date=None))
+                await session.commit()
+            return await TDEEBatchService(session).run(workers, batch_size)
+    finally:
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    # Uso (cada noche con cron, tras cerrar el día): python -m app.services.tdee_batch_service
+    parser = argparse.ArgumentParser(description="Avanzar el filtro del TDEE y los objetivos de todos los usuarios")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Procesos del pool")
+    parser.add_argument("--batch-size", type=int, default=TDEE_BATCH_SIZE, help="Usuarios por lote")
+    parser.add_argument("--rebuild", action="store_true", help="Reconstruir todos los filtros desde cero")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    started = time.perf_counter()
+    result = asyncio.run(_run(args.workers, args.batch_size, args.rebuild))
+    print(f"✅ TDEE recalculado en {time.perf_counter() - started:.1f}s: {result}")
@@ -0,0 +1,129 @@
+"""
+TDEE por usuario con el filtro de Kalman
+TDEEState guarda el estado del filtro (app/ai/tdee_filter.py) tras el último
+día cerrado. advance() procesa solo los días cerrados desde entonces, cada
+uno en O(1), con la ingesta de DailyStats y los pesajes de WeightEntry de
+esos días (dos consultas por índice). Corregir comidas o peso de un día ya
+procesado marca el estado y la próxima vez se reconstruye con los últimos
+REBUILD_DAYS días. La tarea nocturna para todos los usuarios está en
+app/services/tdee_batch_service.py.
+"""
+
+import logging
+from datetime import date, timedelta
+from typing import Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.ai.nutrition_engine import activity_multiplier, mifflin_st_jeor_bmr
+from app.ai.tdee_filter import FilterState, initial_state, step
+from app.core.time_ranges import day_range, local_today
+from app.models.progress import DailyStats, TDEEState, WeightEntry
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+# Días de historial con los que se reconstruye el filtro
+REBUILD_DAYS = 180
+
+
+def filter_state(state: Optional[TDEEState]) -> Optional[FilterState]:
+    """Estado guardado como FilterState (None si aún no se procesó ningún día)"""
+    if state is None or state.last_date is None:
+        return None
+    return FilterState(state.weight, state.tdee, state.p_ww, state.p_we, state.p_ee)
+
+
+def prior_tdee(user: User, weight: float) -> float:
+    """TDEE inicial del filtro: Mifflin-St Jeor por el nivel de actividad"""
+    bmr = mifflin_st_jeor_bmr(weight, user.height, user.age, user.gender)
+    return bmr * activity_multiplier(user.activity_level or "moderate")
+
+
+def advance_start(state: Optional[TDEEState], through: date) -> Tuple[Optional[date], bool]:
+    """
+    Primer día a procesar hasta `through` (None si el estado está al día) y si
+    el filtro arranca de cero: sin estado, o tras más de REBUILD_DAYS sin
+    avanzar, se reconstruye con la ventana
+    """
+    window_start = through - timedelta(days=REBUILD_DAYS - 1)
+    if state is None or state.last_date is None or state.last_date < window_start - timedelta(days=1):
+        return window_start, True
+    if state.last_date >= through:
+        return None, False
+    return state.last_date + timedelta(days=1), False
+
+
+class TDEEFilterService:
+    """Mantenimiento de TDEEState"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def advance(self, user: User, through: Optional[date] = None) -> Optional[TDEEState]:
+        """
+        Procesar los días cerrados pendientes, sin commit
+
+        Args:
+            through: último día a procesar (por defecto ayer en la zona del usuario)
+        """
+        through = through or local_today(user.timezone) - timedelta(days=1)
+        state = await self.db.get(TDEEState, user.id)
+        start, rebuild = advance_start(state, through)
+        if start is None:
+            return state
+        current = None if rebuild else filter_state(state)
+
+        intakes = dict((await self.db.execute(
+            select(DailyStats.date, DailyStats.consumed_calories).where(
+                DailyStats.user_id == user.id,
+                *day_range(DailyStats.date, start, through),
+                DailyStats.meal_count > 0
+            )
+        )).all())
+        weights = dict((await self.db.execute(
+            select(WeightEntry.date, WeightEntry.weight).where(
+                WeightEntry.user_id == user.id, *day_range(WeightEntry.date, start, through)
+            )
+        )).all())
+
+        if current is None:
+            # Reconstrucción: arranca en el primer pesaje de la ventana
+            if not weights:
+                return state
+            start = min(weights)
+            current = initial_state(weights[start], prior_tdee(user, weights[start]))
+            if state is None:
+                state = TDEEState(user_id=user.id)
+                self.db.add(state)
+            state.intake_days = 0
+            state.weigh_ins = 0
+
+        day = start
+        while day <= through:
+            intake = intakes.get(day)
+            weight = weights.get(day)
+            step(current, intake, weight)
+            state.intake_days += intake is not None
+            state.weigh_ins += weight is not None
+            day += timedelta(days=1)
+
+        state.last_date = through
+        state.weight = current.weight
+        state.tdee = current.tdee
+        state.p_ww = current.p_ww
+        state.p_we = current.p_we
+        state.p_ee = current.p_ee
+        return state
+
+    async def day_changed(self, user_id: int, day: date):
+        """
+        Corrección de comidas o peso de un día, sin commit
+        Si el filtro ya lo procesó se marca para reconstruir (un UPDATE por clave primaria)
+        """
+        await self.db.execute(
+            update(TDEEState)
+            .where(TDEEState.user_id == user_id, TDEEState.last_date >= day)
+            .values(last_date=None)
+        )
@@ -0,0 +1,250 @@
+"""
+Tendencia de peso por usuario
+WeightTrend guarda la tendencia suavizada, la pendiente y el ruido tras el
+último registro (app/ai/weight_trend.py) junto con el estado anterior a ese
+registro. Un registro posterior al último avanza el estado en O(1) y corregir
+el último registro vuelve a aplicar el paso desde el estado anterior; solo un
+registro atrasado, movido o eliminado obliga a recalcular la serie del
+usuario, en una pasada vectorizada. DailyStats.weight y weight_trend de los
+días con fila se escriben en la misma transacción.
+"""
+
+import argparse
+import asyncio
+import logging
+from datetime import date
+from typing import List, Optional
+
+from sqlalchemy import and_, bindparam, delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.ai.weight_trend import TrendPoint, trend_series, trend_step
+from app.models.progress import DailyStats, WeightEntry, WeightTrend
+
+logger = logging.getLogger(__name__)
+
+# Filas por INSERT/UPDATE al recalcular todos los usuarios
+TREND_BATCH_SIZE = 5000
+
+
+def trend_point(state: Optional[WeightTrend]) -> Optional[TrendPoint]:
+    """Estado guardado como TrendPoint (None si el usuario no tiene registros)"""
+    if state is None or state.last_date is None:
+        return None
+    return TrendPoint(trend=state.trend_weight, slope=state.slope or 0.0, noise=state.noise or 0.0)
+
+
+def _state_values(days: List[date], trend, slope, noise) -> dict:
+    """Columnas de WeightTrend a partir de la serie completa de un usuario"""
+    values = {
+        "last_date": days[-1],
+        "trend_weight": float(trend[-1]),
+        "slope": float(slope[-1]),
+        "noise": float(noise[-1]),
+        "entry_count": len(days),
+        "prev_date": None,
+        "prev_trend_weight": None,
+        "prev_slope": None,
+        "prev_noise": None,
+    }
+    if len(days) > 1:
+        values.update(
+            prev_date=days[-2],
+            prev_trend_weight=float(trend[-2]),
+            prev_slope=float(slope[-2]),
+            prev_noise=float(noise[-2]),
+        )
+    return values
+
+
+# UPDATE por (usuario, día) para escribir muchos días en un solo executemany
+_daily_weight_update = (
+    update(DailyStats.__table__)
+    .where(and_(
+        DailyStats.__table__.c.user_id == bindparam("b_user_id"),
+        DailyStats.__table__.c.date == bindparam("b_date"),
+    ))
+    .values(weight=bindparam("b_weight"), weight_trend=bindparam("b_trend"))
+)
+
+
+class WeightTrendService:
+    """Mantenimiento de WeightTrend y de la tendencia diaria en DailyStats"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def entry_saved(self, user_id: int, entry_date: date, weight: float,
+                          previous_date: Optional[date] = None):
+        """
+        Registro de peso creado o editado, sin commit
+
+        Args:
+            previous_date: fecha anterior del registro si la edición la cambió
+        """
+        if previous_date is not None and previous_date != entry_date:
+            await self._write_days(user_id, [(previous_date, None, None)])
+            await self.recompute(user_id, since=min(previous_date, entry_date))
+            return
+
+        state = await self.db.get(WeightTrend, user_id)
+        if state is None or state.last_date is None or entry_date < state.last_date:
+            await self.recompute(user_id, since=entry_date)
+            return
+
+        if entry_date == state.last_date:
+            # Corrección del último registro: mismo paso desde el estado anterior
+            previous = None
+            if state.prev_date is not None:
+                previous = TrendPoint(state.prev_trend_weight, state.prev_slope, state.prev_noise)
+            point = trend_step(previous, weight, (entry_date - state.prev_date).days if previous else 1)
+        else:
+            point = trend_step(trend_point(state), weight, (entry_date - state.last_date).days)
+            state.prev_date = state.last_date
+            state.prev_trend_weight = state.trend_weight
+            state.prev_slope = state.slope
+            state.prev_noise = state.noise
+            state.last_date = entry_date
+            state.entry_count = (state.entry_count or 0) + 1
+
+        state.trend_weight = point.trend
+        state.slope = point.slope
+        state.noise = point.noise
+        await self._write_days(user_id, [(entry_date, weight, point.trend)])
+
+    async def entry_deleted(self, user_id: int, entry_date: date):
+        """Registro de peso eliminado, sin commit (recalcula desde su fecha)"""
+        await self._write_days(user_id, [(entry_date, None, None)])
+        await self.recompute(user_id, since=entry_date)
+
+    async def recompute(self, user_id: int, since: Optional[date] = None) -> Optional[WeightTrend]:
+        """
+        Recalcular la tendencia del usuario desde sus registros, sin commit
+
+        La serie se calcula completa (la tendencia depende de todo el historial)
+        pero DailyStats solo se reescribe desde `since`
+        """
+        rows = (await self.db.execute(
+            select(WeightEntry.date, WeightEntry.weight)
+            .where(WeightEntry.user_id == user_id)
+            .order_by(WeightEntry.date)
+        )).all()
+
+        state = await self.db.get(WeightTrend, user_id)
+        if not rows:
+            if state is not None:
+                await self.db.delete(state)
+            return None
+
+        days = [row.date for row in rows]
+        trend, slope, noise = trend_series([day.toordinal() for day in days], [row.weight for row in rows])
+
+        if state is None:
+            state = WeightTrend(user_id=user_id)
+            self.db.add(state)
+        for field, value in _state_values(days, trend, slope, noise).items():
+            setattr(state, field, value)
+
+        await self._write_days(user_id, [
+            (day, row.weight, float(value))
+            for day, row, value in zip(days, rows, trend)
+            if since is None or day >= since
+        ])
+        return state
+
+    async def _write_days(self, user_id: int, days):
+        """Peso y tendencia de los días que ya tienen DailyStats (un executemany)"""
+        if not days:
+            return
+        await self.db.execute(_daily_weight_update, [
+            {"b_user_id": user_id, "b_date": day, "b_weight": weight, "b_trend": trend}
+            for day, weight, trend in days
+        ])
+
+    async def recompute_all(self) -> int:
+        """
+        Recalcular la tendencia de todos los usuarios en una pasada, sin commit
+
+        Los registros se leen ordenados por (user_id, date) en lotes, junto con
+        el id de su DailyStats si existe, y cada usuario se calcula al terminar
+        su serie; los días se escriben por clave primaria
+
+        Returns:
+            Usuarios con tendencia escrita
+        """
+        await self.db.execute(delete(WeightTrend).execution_options(synchronize_session=False))
+        for state in [obj for obj in self.db.identity_map.values() if isinstance(obj, WeightTrend)]:
+            self.db.expunge(state)
+
+        states, days_batch = [], []
+        written = 0
+
+        async def flush(force: bool = False):
+            nonlocal states, days_batch, written
+            if states and (force or len(states) >= TREND_BATCH_SIZE):
+                await self.db.execute(insert(WeightTrend), states)
+                written += len(states)
+                states = []
+            if days_batch and (force or len(days_batch) >= TREND_BATCH_SIZE):
+                await self.db.execute(update(DailyStats), days_batch)
+                days_batch = []
+
+        async def finish(user_id: int, days: List[date], weights: List[float], stats_ids: List[Optional[int]]):
+            trend, slope, noise = trend_series([day.toordinal() for day in days], weights)
+            states.append({"user_id": user_id, **_state_values(days, trend, slope, noise)})
+            days_batch.extend(
+                {"id": stats_id, "weight": weight, "weight_trend": float(value)}
+                for stats_id, weight, value in zip(stats_ids, weights, trend)
+                if stats_id is not None
+            )
+            await flush()
+
+        current_user, days, weights, stats_ids = None, [], [], []
+        rows = await self.db.stream(
+            select(WeightEntry.user_id, WeightEntry.date, WeightEntry.weight, DailyStats.id.label("stats_id"))
+            .outerjoin(DailyStats, and_(
+                DailyStats.user_id == WeightEntry.user_id, DailyStats.date == WeightEntry.date
+            ))
+            .order_by(WeightEntry.user_id, WeightEntry.date)
+            .execution_options(yield_per=TREND_BATCH_SIZE)
+        )
+        async for row in rows:
+            if row.user_id != current_user:
+                if days:
+                    await finish(current_user, days, weights, stats_ids)
+                current_user, days, weights, stats_ids = row.user_id, [], [], []
+            days.append(row.date)
+            weights.append(row.weight)
+            stats_ids.append(row.stats_id)
+        if days:
+            await finish(current_user, days, weights, stats_ids)
+        await flush(force=True)
+        return written
+
+
+async def _backfill(user_id: Optional[int] = None) -> int:
+    from app.core.database import AsyncSessionLocal, async_engine
+    import app.models.base  # noqa: F401 (registrar todos los modelos)
+
+    try:
+        async with AsyncSessionLocal() as session:
+            service = WeightTrendService(session)
+            if user_id is not None:
+                written = 1 if await service.recompute(user_id) is not None else 0
+            else:
+                written = await service.recompute_all()
+            await session.commit()
+            return written
+    finally:
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    # Uso (una vez, o tras importar datos): python -m app.services.weight_trend_service
+    parser = argparse.ArgumentParser(description="Recalcular la tendencia de peso desde weight_entries")
+    parser.add_argument("--user-id", type=int, default=None, help="Solo un usuario")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    result = asyncio.run(_backfill(args.user_id))
+    print(f"✅ Tendencias de peso recalculadas: {result} usuarios")
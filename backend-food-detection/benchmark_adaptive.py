@@ -0,0 +1,215 @@
+"""
+Benchmark del motor adaptativo con cohortes sintéticas
+Genera usuarios con app/ai/synthetic_cohort.py (la verdad de cada usuario es
+conocida) y mide para cada tamaño de cohorte:
+- error del TDEE estimado (tradicional, balance energético, filtro de
+  Kalman) y del cambio semanal de peso (recta, tendencia suavizada)
+- usuarios por segundo de calculate_adaptive_tdee y analyze_weight_trend
+- usuarios por segundo de update_user_goals sobre una base SQLite temporal,
+  con los primeros --goal-users usuarios de la cohorte
+
+Uso:
+    python benchmark_adaptive.py
+    python benchmark_adaptive.py --sizes 1000 10000 --days 90 --goal-users 500
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from collections import defaultdict
+
+# Base temporal propia: el benchmark nunca escribe en la base configurada
+WORKDIR = tempfile.mkdtemp(prefix="benchmark_adaptive_")
+os.environ["DATABASE_URL"] = f"sqlite:///{WORKDIR}/benchmark.db"
+
+import numpy as np  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from app.ai.adaptive_learning import AdaptiveLearningEngine  # noqa: E402
+from app.ai.synthetic_cohort import generate_cohort  # noqa: E402
+from app.ai.tdee_filter import filter_batch  # noqa: E402
+from app.ai.weight_trend import trend_series  # noqa: E402
+from app.core.database import AsyncSessionLocal, Base, async_engine, engine  # noqa: E402
+from app.models.base import User  # noqa: E402
+from app.models.progress import DailyStats, TDEEState, WeightEntry, WeightTrend  # noqa: E402
+from app.services.tdee_filter_service import prior_tdee  # noqa: E402
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+DEFAULT_GOAL_USERS = 2000
+
+
+class Meter:
+    """Tiempo acumulado y errores por caso"""
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.errors = defaultdict(list)
+        self.relative = defaultdict(list)
+        self.confidence = defaultdict(list)
+
+    def run(self, name: str, function, items):
+        started = time.perf_counter()
+        results = [function(item) for item in items]
+        self.seconds[name] += time.perf_counter() - started
+        self.calls[name] += len(items)
+        return results
+
+    def throughput(self, name: str) -> float:
+        return self.calls[name] / self.seconds[name] if self.seconds[name] else 0.0
+
+
+def kalman_states(batch, users, profiles) -> list:
+    """TDEEState de cada usuario tras su historial (como lo deja la tarea nocturna)"""
+    prior = np.array([
+        prior_tdee(profile, user.weights[0].weight) if user.weights else np.nan
+        for user, profile in zip(users, profiles)
+    ])
+    active = np.ones(batch.readings.shape, dtype=bool)
+    state = np.full((len(users), 5), np.nan)
+    final, intake_days, weigh_ins = filter_batch(state, prior, batch.logged_intake, batch.readings, active)
+    last_day = batch.days[-1]
+    return [
+        TDEEState(last_date=last_day if not np.isnan(row[0]) else None,
+                  weight=row[0], tdee=row[1], p_ww=row[2], p_we=row[3], p_ee=row[4],
+                  intake_days=int(logged), weigh_ins=int(weighed))
+        for row, logged, weighed in zip(final, intake_days, weigh_ins)
+    ]
+
+
+def weight_trends(users) -> list:
+    """WeightTrend de cada usuario tras su último pesaje"""
+    states = []
+    for user in users:
+        if not user.weights:
+            states.append(None)
+            continue
+        trend, slope, noise = trend_series([point.date.toordinal() for point in user.weights],
+                                           [point.weight for point in user.weights])
+        states.append(WeightTrend(last_date=user.weights[-1].date, trend_weight=float(trend[-1]),
+                                  slope=float(slope[-1]), noise=float(noise[-1])))
+    return states
+
+
+def evaluate_batch(meter: Meter, adaptive: AdaptiveLearningEngine, batch):
+    users = batch.users()
+    profiles = [User(**user.profile) for user in users]
+    true_tdee = np.array([user.true_tdee for user in users])
+    true_change = np.array([user.true_weekly_change for user in users])
+
+    started = time.perf_counter()
+    states = kalman_states(batch, users, profiles)
+    meter.seconds["filtro de Kalman por lotes"] += time.perf_counter() - started
+    meter.calls["filtro de Kalman por lotes"] += len(users)
+    trends = weight_trends(users)
+    cases = list(zip(users, profiles, trends, states))
+
+    # Tendencia semanal
+    for name, use_trend in (("analyze_weight_trend (recta)", False), ("analyze_weight_trend (tendencia)", True)):
+        results = meter.run(name, lambda case: adaptive.analyze_weight_trend(
+            case[0].weights, weight_trend=case[2] if use_trend else None
+        ), cases)
+        meter.errors[name].append(np.array([change for change, _ in results]) - true_change)
+
+    # TDEE
+    traditional = meter.run("calculate_traditional_tdee", lambda case: adaptive.calculate_traditional_tdee(
+        case[1], case[0].weights[-1].weight if case[0].weights else 70.0
+    ), cases)
+    meter.errors["calculate_traditional_tdee"].append(np.array(traditional) - true_tdee)
+    meter.relative["calculate_traditional_tdee"].append(meter.errors["calculate_traditional_tdee"][-1] / true_tdee)
+
+    for name, with_state in (("calculate_adaptive_tdee (balance)", False), ("calculate_adaptive_tdee (Kalman)", True)):
+        results = meter.run(name, lambda case: adaptive.calculate_adaptive_tdee(
+            case[1], case[0].intake, case[0].weights,
+            case[2] if with_state else None, case[3] if with_state else None
+        ), cases)
+        meter.errors[name].append(np.array([result.estimated_tdee for result in results]) - true_tdee)
+        meter.relative[name].append(meter.errors[name][-1] / true_tdee)
+        meter.confidence[name].append(np.array([result.confidence for result in results]))
+
+
+async def goals_throughput(adaptive: AdaptiveLearningEngine, user_ids) -> tuple:
+    """update_user_goals de cada usuario en su propia sesión (como una petición)"""
+    updated = 0
+    started = time.perf_counter()
+    try:
+        for user_id in user_ids:
+            async with AsyncSessionLocal() as session:
+                user = await session.get(User, user_id)
+                updated += await adaptive.update_user_goals(session, user) is not None
+        return len(user_ids) / (time.perf_counter() - started), updated
+    finally:
+        await async_engine.dispose()
+
+
+def load_database(batches_rows):
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        for users, daily_stats, weight_entries in batches_rows:
+            connection.execute(insert(User), users)
+            if daily_stats:
+                connection.execute(insert(DailyStats), daily_stats)
+            if weight_entries:
+                connection.execute(insert(WeightEntry), weight_entries)
+
+
+def report(size: int, meter: Meter, goals):
+    print(f"\n👥 {size} usuarios")
+    print("   TDEE estimado vs real          error medio   sesgo    ±10%   confianza")
+    for name in ("calculate_traditional_tdee", "calculate_adaptive_tdee (balance)", "calculate_adaptive_tdee (Kalman)"):
+        errors = np.concatenate(meter.errors[name])
+        within = np.mean(np.abs(np.concatenate(meter.relative[name])) <= 0.1)
+        confidence = np.concatenate(meter.confidence[name]).mean() if meter.confidence[name] else float("nan")
+        print(f"   {name:32} {np.abs(errors).mean():7.0f} kcal {errors.mean():+6.0f}  "
+              f"{within:6.1%}   {confidence:5.2f}")
+    print("   Cambio semanal vs real          error medio")
+    for name in ("analyze_weight_trend (recta)", "analyze_weight_trend (tendencia)"):
+        errors = np.concatenate(meter.errors[name])
+        print(f"   {name:32} {np.abs(errors).mean():7.3f} kg")
+
+    print("   Rendimiento                     usuarios/s")
+    for name in meter.calls:
+        print(f"   {name:32} {meter.throughput(name):10.0f}")
+    if goals is not None:
+        rate, updated, count = goals
+        print(f"   {'update_user_goals (SQLite)':32} {rate:10.0f}   ({count} usuarios, {updated} actualizados)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del motor adaptativo con cohortes sintéticas")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="Usuarios por cohorte")
+    parser.add_argument("--days", type=int, default=60, help="Días de historial por usuario")
+    parser.add_argument("--goal-users", type=int, default=DEFAULT_GOAL_USERS,
+                        help="Usuarios de cada cohorte para update_user_goals (0: omitir)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print("⏱️  Benchmark del motor adaptativo (cohortes sintéticas)")
+    adaptive = AdaptiveLearningEngine()
+    try:
+        for size in args.sizes:
+            meter = Meter()
+            goal_rows = []
+            first_id = 1
+            for batch in generate_cohort(size, args.days, args.seed):
+                evaluate_batch(meter, adaptive, batch)
+                if first_id <= args.goal_users:
+                    goal_rows.append(batch.rows(first_id))
+                first_id += len(batch.profiles)
+
+            goals = None
+            if goal_rows:
+                load_database(goal_rows)
+                user_ids = [row["id"] for users, _, _ in goal_rows for row in users][:args.goal_users]
+                rate, updated = asyncio.run(goals_throughput(adaptive, user_ids))
+                goals = (rate, updated, len(user_ids))
+            report(size, meter, goals)
+    finally:
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
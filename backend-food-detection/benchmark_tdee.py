@@ -0,0 +1,103 @@
+"""
+Benchmark del TDEE adaptativo
+Compara el cálculo anterior (DataFrame de pandas + np.polyfit + np.corrcoef
+sobre objetos ORM) con el núcleo de app/ai/tdee_core.py (registros con
+__slots__ y fórmulas cerradas sobre arreglos):
+- tiempo y memoria de importación en un proceso nuevo
+- latencia por llamada del análisis de peso y de calorías
+
+Uso:
+    python benchmark_tdee.py
+"""
+import random
+import subprocess
+import sys
+import timeit
+from datetime import date, timedelta
+
+import numpy as np
+
+from app.ai.tdee_core import IntakeDay, WeightPoint, energy_balance_tdee, intake_array, linear_weight_trend
+
+CALLS = 2000
+
+IMPORT_PROBE = (
+    "import resource, time; start = time.perf_counter(); import {module}; "
+    "print(time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+)
+
+
+def import_cost(module: str):
+    """Segundos y memoria máxima (MB) de importar un módulo en un proceso nuevo"""
+    result = subprocess.run([sys.executable, "-c", IMPORT_PROBE.format(module=module)],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    seconds, max_rss = result.stdout.split()
+    return float(seconds), int(max_rss) / 1024
+
+
+def reference_weight_trend(entries, days: int = 14):
+    """Cálculo anterior: DataFrame ordenado + polyfit + corrcoef (sin pandas, lista ordenada)"""
+    recent = entries[-days:]
+    try:
+        import pandas as pd
+        df = pd.DataFrame([{"date": entry.date, "weight": entry.weight} for entry in recent]).sort_values("date")
+        y = df["weight"].values
+    except ImportError:
+        y = np.array([entry.weight for entry in sorted(recent, key=lambda entry: entry.date)])
+    x = np.arange(len(y))
+    slope = np.polyfit(x, y, 1)[0]
+    correlation = np.corrcoef(x, y)[0, 1]
+    return slope * 7, abs(correlation) ** 2
+
+
+def reference_intake(stats):
+    """Cálculo anterior: listas de objetos filtradas y np.mean/np.std por separado"""
+    valid_days = [stat for stat in stats if stat.consumed_calories > 0]
+    avg_calories = np.mean([stat.consumed_calories for stat in valid_days])
+    calorie_std = np.std([stat.consumed_calories for stat in valid_days])
+    return avg_calories, calorie_std / avg_calories
+
+
+def core_intake(stats, weekly_trend):
+    calories = intake_array(stats)
+    return energy_balance_tdee(calories[calories > 0], weekly_trend)
+
+
+def main():
+    print("⏱️  Benchmark del TDEE adaptativo")
+
+    print("\n📦 Importación (proceso nuevo):")
+    for module in ("numpy", "pandas", "app.ai.tdee_core", "app.ai.adaptive_learning"):
+        cost = import_cost(module)
+        if cost is None:
+            print(f"   {module:28} no disponible")
+        else:
+            print(f"   {module:28} {cost[0] * 1000:8.1f} ms   {cost[1]:6.1f} MB máx.")
+
+    random.seed(7)
+    start = date(2026, 1, 1)
+    stats = [IntakeDay(start + timedelta(days=day), random.gauss(2200, 250)) for day in range(30)]
+    weights = [WeightPoint(start + timedelta(days=day), 80 - 0.05 * day + random.gauss(0, 0.4))
+               for day in range(30) if random.random() < 0.8]
+
+    print(f"\n⚙️  Latencia por llamada ({len(stats)} días, {len(weights)} pesos, {CALLS} llamadas):")
+    cases = (
+        ("tendencia de peso (anterior)", lambda: reference_weight_trend(weights)),
+        ("tendencia de peso (núcleo)", lambda: linear_weight_trend(weights)),
+        ("calorías (anterior)", lambda: reference_intake(stats)),
+        ("calorías (núcleo)", lambda: core_intake(stats, -0.35)),
+    )
+    for name, call in cases:
+        seconds = min(timeit.repeat(call, number=CALLS, repeat=3)) / CALLS
+        print(f"   {name:30} {seconds * 1e6:8.1f} µs")
+
+    old_trend, old_r2 = reference_weight_trend(weights)
+    new_trend, new_r2 = linear_weight_trend(weights)
+    print(f"\n🔍 Tendencia semanal: anterior {old_trend:+.3f} kg (R² {old_r2:.2f}), "
+          f"núcleo {new_trend:+.3f} kg (R² {new_r2:.2f}; usa las fechas reales, no la posición)")
+
+
+if __name__ == "__main__":
+    main()
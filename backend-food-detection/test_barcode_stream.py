@@ -0,0 +1,65 @@
+"""
+Test del escaneo en vivo (app/ai/barcode_stream.py)
+Los fotogramas casi idénticos se descartan mientras su toma se decodifica,
+pero tras una decodificación sin código (foto movida) la misma toma nítida
+vuelve a aceptarse. El hash y la decodificación se sustituyen por tablas
+para no depender de OpenCV ni de zbar
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from app.ai import barcode_stream
+from app.ai.barcode_stream import BarcodeStreamSession
+
+# Fotograma → dHash: la toma movida y la nítida difieren en un bit
+HASHES = {b"blurry": 0b1010_0000, b"blurry-again": 0b1010_0000, b"sharp": 0b1010_0001}
+
+# Fotograma → códigos decodificados
+DECODED = {b"blurry": [], b"blurry-again": [], b"sharp": ["7501055363513"]}
+
+
+class _ProductService:
+    def analyze_product_by_barcode(self, barcode):
+        return {"success": True, "barcode": barcode}
+
+
+def test_sharp_retake_after_blurry_frame():
+    """Duplicado mientras la toma está en vuelo; aceptado después de 'no_barcode'"""
+    async def run():
+        pool = ThreadPoolExecutor(max_workers=1)
+        originals = (barcode_stream.frame_dhash, barcode_stream._decode_frame, barcode_stream.get_decode_pool)
+        barcode_stream.frame_dhash = HASHES.get
+        barcode_stream._decode_frame = DECODED.get
+        barcode_stream.get_decode_pool = lambda: pool
+        try:
+            session = BarcodeStreamSession(_ProductService(), hash_distance=4)
+            assert await session.offer(b"blurry") == "queued"
+            assert await session.offer(b"blurry-again") == "duplicate"
+
+            messages = []
+            no_barcode = asyncio.Event()
+
+            async def notify(message):
+                messages.append(message)
+                if message.get("status") == "no_barcode":
+                    no_barcode.set()
+
+            scan = asyncio.create_task(session.scan(notify))
+            await asyncio.wait_for(no_barcode.wait(), 5)
+
+            assert await session.offer(b"sharp") == "queued"
+            analysis = await asyncio.wait_for(scan, 5)
+            assert analysis["barcode"] == "7501055363513"
+            assert [message["type"] for message in messages] == ["frame", "detected"]
+            assert (session.stats["frames_duplicated"], session.stats["frames_decoded"]) == (1, 2)
+        finally:
+            barcode_stream.frame_dhash, barcode_stream._decode_frame, barcode_stream.get_decode_pool = originals
+            pool.shutdown()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    print("🔍 Verificando escaneo en vivo...")
+    test_sharp_retake_after_blurry_frame()
+    print("✅ La toma nítida tras una movida se decodifica")
@@ -0,0 +1,175 @@
+"""
+Test de DailyStats incremental (app/services/daily_stats_service.py)
+Una comida se asigna a un día con una sola regla (local_day) al crearla,
+moverla, borrarla y al conciliar, así la conciliación no encuentra desvíos;
+cada usuario tiene una sola fila por día (índice único y upsert)
+"""
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, inspect, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+
+from app.core.migrations import unique_daily_stats
+from app.core.time_ranges import local_day, utc_naive
+from app.models.base import Base
+from app.models.meal import Food, Meal
+from app.models.progress import DailyStats, TDEEState
+from app.models.user import User
+from app.schemas.meal import MealCreate, MealFoodCreate, MealUpdate
+from app.services.daily_stats_service import DailyStatsService
+from app.services.meal_service import MealService
+
+LIMA = timezone(timedelta(hours=-5))
+
+
+async def _async_session():
+    """Sesión asíncrona como la de los endpoints (aiosqlite en memoria)"""
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return engine, async_sessionmaker(engine, expire_on_commit=False)()
+
+
+async def _seed(db):
+    """Usuario en Lima y un alimento de 200 kcal/100 g"""
+    db.add(User(id=1, email="ana@example.com", hashed_password="x", full_name="Ana",
+                timezone="America/Lima", target_calories=2000))
+    db.add(Food(id=1, name="arroz", calories_per_100g=200, protein_per_100g=4,
+                carbs_per_100g=44, fat_per_100g=0.5, fiber_per_100g=1))
+    await db.commit()
+
+
+async def _days(db):
+    rows = await db.scalars(select(DailyStats).where(DailyStats.user_id == 1).order_by(DailyStats.date))
+    return {stat.date: (stat.meal_count, round(stat.consumed_calories, 3)) for stat in rows}
+
+
+def test_day_helpers():
+    """Instantes con y sin zona caen en el mismo día local"""
+    late_dinner = datetime(2026, 1, 5, 21, 30, tzinfo=LIMA)
+    assert utc_naive(late_dinner) == datetime(2026, 1, 6, 2, 30)
+    assert utc_naive(datetime(2026, 1, 6, 2, 30)) == datetime(2026, 1, 6, 2, 30)
+    assert local_day(late_dinner, "America/Lima") == date(2026, 1, 5)
+    assert local_day(utc_naive(late_dinner), "America/Lima") == date(2026, 1, 5)
+    assert local_day(utc_naive(late_dinner), None) == date(2026, 1, 6)
+    assert local_day(utc_naive(late_dinner), "Zona/Inexistente") == date(2026, 1, 6)
+
+
+def test_meal_days_match_reconcile():
+    """Alta, cambio de hora y baja usan el mismo día que la conciliación"""
+    async def run():
+        engine, db = await _async_session()
+        await _seed(db)
+        service = MealService(db)
+
+        # Cena a las 21:30 en Lima: 02:30 UTC del día siguiente
+        meal = await service.create_meal(1, MealCreate(
+            meal_type="dinner", eaten_at=datetime(2026, 1, 5, 21, 30, tzinfo=LIMA),
+            foods=[MealFoodCreate(food_id=1, quantity=100)]
+        ))
+        assert meal.eaten_at.replace(tzinfo=None) == datetime(2026, 1, 6, 2, 30)
+        assert await _days(db) == {date(2026, 1, 5): (1, 200.0)}
+
+        reconcile = service.daily_stats.reconcile
+        assert await reconcile(date(2026, 1, 1), date(2026, 1, 10)) == {"checked": 1, "corrected": 0, "created": 0}
+
+        # Misma hora UTC de otro día: el aporte pasa al nuevo día local
+        await service.update_meal(meal.id, 1, MealUpdate(eaten_at=datetime(2026, 1, 7, 2, 30, tzinfo=timezone.utc)))
+        assert await _days(db) == {date(2026, 1, 5): (0, 0.0), date(2026, 1, 6): (1, 200.0)}
+        assert (await reconcile(date(2026, 1, 1), date(2026, 1, 10)))["corrected"] == 0
+
+        # Cambiar solo el nombre no mueve la comida
+        await service.update_meal(meal.id, 1, MealUpdate(name="Cena"))
+        assert await _days(db) == {date(2026, 1, 5): (0, 0.0), date(2026, 1, 6): (1, 200.0)}
+
+        assert await service.delete_meal(meal.id, 1)
+        assert await _days(db) == {date(2026, 1, 5): (0, 0.0), date(2026, 1, 6): (0, 0.0)}
+        assert (await reconcile(date(2026, 1, 1), date(2026, 1, 10)))["corrected"] == 0
+
+        await db.close()
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_one_row_per_day():
+    """Las altas del mismo día suman sobre una sola fila; una segunda fila viola el índice único"""
+    async def run():
+        engine, db = await _async_session()
+        await _seed(db)
+        service = DailyStatsService(db)
+
+        await service.apply_delta(1, date(2026, 1, 5), {"calories": 300.0}, 1)
+        await service.apply_delta(1, date(2026, 1, 5), {"calories": 200.0}, 1)
+        await service.apply_delta(1, date(2026, 1, 5), {"calories": -300.0}, -1)
+        await db.commit()
+        stat = await db.scalar(select(DailyStats).where(DailyStats.user_id == 1))
+        assert (stat.meal_count, stat.consumed_calories, stat.calorie_adherence) == (1, 200.0, 0.1)
+
+        # Restar de un día sin fila no crea nada
+        await service.apply_delta(1, date(2026, 1, 6), {"calories": -300.0}, -1)
+        assert await _days(db) == {date(2026, 1, 5): (1, 200.0)}
+
+        try:
+            await db.execute(insert(DailyStats).values(user_id=1, date=date(2026, 1, 5)))
+        except IntegrityError:
+            await db.rollback()
+        else:
+            raise AssertionError("Se aceptó una segunda fila para el mismo día")
+
+        await db.close()
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_unique_migration_merges_duplicates():
+    """009: funde los días repetidos con los totales de las comidas y crea el índice único"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP INDEX ix_daily_stats_user_id_date")
+        conn.exec_driver_sql("CREATE INDEX ix_daily_stats_user_id_date ON daily_stats (user_id, date)")
+
+    with Session(engine) as db:
+        db.add(User(id=1, email="ana@example.com", hashed_password="x", full_name="Ana",
+                    timezone="America/Lima", target_calories=2000))
+        # Dos comidas del 5 de enero en Lima (una ya es 6 en UTC) y una del 6
+        for hour, calories in ((13, 500.0), (22, 700.0), (40, 900.0)):
+            db.add(Meal(user_id=1, meal_type="lunch", total_calories=calories,
+                        eaten_at=datetime(2026, 1, 5, 5) + timedelta(hours=hour)))
+        # Carrera de dos primeras altas: cada fila tiene solo una parte del día
+        db.add_all([
+            DailyStats(id=10, user_id=1, date=date(2026, 1, 5), meal_count=1, consumed_calories=500.0),
+            DailyStats(id=11, user_id=1, date=date(2026, 1, 5), meal_count=1, consumed_calories=700.0, weight=70.0),
+            DailyStats(id=12, user_id=1, date=date(2026, 1, 6), meal_count=1, consumed_calories=900.0),
+        ])
+        db.add(TDEEState(user_id=1, last_date=date(2026, 1, 8)))
+        db.commit()
+
+    assert unique_daily_stats(engine) == ["ix_daily_stats_user_id_date"]
+    assert unique_daily_stats(engine) == []
+    assert next(
+        index for index in inspect(engine).get_indexes("daily_stats") if index["name"] == "ix_daily_stats_user_id_date"
+    )["unique"]
+
+    with Session(engine) as db:
+        rows = db.scalars(select(DailyStats).order_by(DailyStats.date)).all()
+        assert [(row.id, row.date, row.meal_count, row.consumed_calories, row.weight) for row in rows] == [
+            (10, date(2026, 1, 5), 2, 1200.0, 70.0),
+            (12, date(2026, 1, 6), 1, 900.0, None),
+        ]
+        assert rows[0].calorie_adherence == 0.6
+        assert db.get(TDEEState, 1).last_date is None
+
+
+if __name__ == "__main__":
+    print("🔍 Verificando DailyStats incremental...")
+    test_day_helpers()
+    test_meal_days_match_reconcile()
+    test_one_row_per_day()
+    test_unique_migration_merges_duplicates()
+    print("✅ Comidas, cambios y conciliación usan el mismo día")
@@ -0,0 +1,72 @@
+"""
+Test de la caché del dashboard (app/services/dashboard_service.py)
+Las versiones por usuario nunca se repiten y su cantidad está acotada:
+al salir de la caché o al invalidar, la próxima lectura es un fallo
+"""
+import asyncio
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.models.base import Base
+from app.models.user import User
+from app.services import dashboard_service
+from app.services.dashboard_service import (
+    DashboardService, _dashboard_cache, _generations, data_version, invalidate_dashboard
+)
+
+
+def test_versions_never_repeat():
+    """Invalidar descarta la versión y la siguiente es nueva"""
+    first = data_version(101)
+    assert data_version(101) == first
+    invalidate_dashboard(101)
+    assert 101 not in _generations
+    second = data_version(101)
+    assert second != first
+    invalidate_dashboard(101)
+    assert data_version(101) not in (first, second)
+
+
+def test_versions_are_bounded():
+    """Con la caché llena se descartan la entrada y la versión del usuario menos usado"""
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        db = async_sessionmaker(engine, expire_on_commit=False)()
+        users = [User(id=user_id, email=f"u{user_id}@example.com", hashed_password="x",
+                      full_name=f"Usuario {user_id}") for user_id in (1, 2, 3)]
+        db.add_all(users)
+        await db.commit()
+
+        _dashboard_cache.clear()
+        _generations.clear()
+        size = dashboard_service.DASHBOARD_CACHE_SIZE
+        dashboard_service.DASHBOARD_CACHE_SIZE = 2
+        try:
+            service = DashboardService(db)
+            for user in users:
+                await service.get_stats(user)
+            assert list(_dashboard_cache) == [2, 3]
+            assert 1 not in _generations and len(_generations) <= 2
+
+            # Versiones pedidas por otras cachés (pronóstico) también quedan acotadas
+            for user_id in range(10, 20):
+                data_version(user_id)
+            assert len(_generations) == 2
+        finally:
+            dashboard_service.DASHBOARD_CACHE_SIZE = size
+            _dashboard_cache.clear()
+            _generations.clear()
+
+        await db.close()
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    print("🔍 Verificando caché del dashboard...")
+    test_versions_never_repeat()
+    test_versions_are_bounded()
+    print("✅ La caché del dashboard está acotada")
@@ -0,0 +1,166 @@
+"""
+Test del autocompletado de alimentos (app/services/food_autocomplete.py)
+Orden por prefijo contra una búsqueda por fuerza bruta, top-K precalculado de
+los prefijos cortos y upsert/remove: un alimento nuevo o renombrado aparece y
+desaparece bajo los prefijos correctos y las listas en caché se refrescan
+"""
+import random
+from types import SimpleNamespace
+
+from app.ai.food_matcher import fold_text
+from app.services import food_autocomplete
+from app.services.food_autocomplete import Completion, FoodCompletionIndex, completion_keys
+
+WORDS = ["pollo", "pavo", "pan", "papa", "palta", "asado", "arroz", "avena", "integral", "frito", "a"]
+BRANDS = [None, None, "Pampa", "Ideal", "Soprole"]
+
+
+def _completion(food_id, name, brand=None, rank=0.0, category="general"):
+    return Completion(id=food_id, name=name, brand=brand, category=category, verified=False, rank=rank)
+
+
+def _expected(foods, prefix, limit=10, category=None):
+    """Fuerza bruta: mejor puntaje entre las claves con el prefijo; empate → nombre más corto"""
+    folded = fold_text(prefix)
+    ranked = []
+    for completion in foods.values():
+        if category and completion.category != category:
+            continue
+        scores = [score for key, score in completion_keys(completion) if key.startswith(folded)]
+        if scores:
+            ranked.append((max(scores), -len(completion.name), completion.id))
+    ranked.sort(reverse=True)
+    return [food_id for _, _, food_id in ranked[:min(limit, food_autocomplete.TOP_K)]]
+
+
+def _ids(index, prefix, limit=10, category=None):
+    return [completion.id for completion in index.complete(prefix, limit=limit, category=category)]
+
+
+def _random_catalog(rng, size):
+    return {
+        food_id: _completion(
+            food_id,
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3))).capitalize(),
+            brand=rng.choice(BRANDS),
+            rank=round(rng.random() * 3, 1),
+            category=rng.choice(["carnes", "panaderia"])
+        )
+        for food_id in range(1, size + 1)
+    }
+
+
+PREFIXES = ["p", "pa", "po", "a", "as", "i", "pan", "pollo a", "ideal", "zz", "Á"]
+
+
+def test_ranking_matches_brute_force():
+    """Prefijos cortos (top-K precalculado) y largos coinciden con la fuerza bruta"""
+    rng = random.Random(11)
+    foods = _random_catalog(rng, 200)
+    index = FoodCompletionIndex(foods.values())
+    assert len(index) == 200
+    for prefix in PREFIXES:
+        for limit in (3, 10):
+            assert _ids(index, prefix, limit) == _expected(foods, prefix, limit), prefix
+        assert _ids(index, prefix, category="carnes") == _expected(foods, prefix, category="carnes")
+
+
+def test_name_start_and_brand_keys():
+    """Cualquier palabra del nombre o la marca es entrada; el inicio del nombre puntúa más"""
+    index = FoodCompletionIndex([
+        _completion(1, "Pollo asado"),
+        _completion(2, "Asado de tira"),
+        _completion(3, "Leche entera", brand="Soprole"),
+    ])
+    assert _ids(index, "asa") == [2, 1]
+    assert _ids(index, "sopr") == [3]
+    assert _ids(index, "") == []
+
+
+def test_upsert_and_remove():
+    """Nuevo, renombrado y quitado: aparece y desaparece bajo sus prefijos, con caché refrescada"""
+    index = FoodCompletionIndex([
+        _completion(1, "Pollo asado", rank=1.0),
+        _completion(2, "Pan integral", rank=0.5),
+        _completion(3, "Palta", rank=0.2),
+    ])
+    # Llenar la caché de prefijos largos y leer el top-K de los cortos
+    assert _ids(index, "pollo") == [1]
+    assert _ids(index, "pa") == [2, 3]
+    assert _ids(index, "pav") == []
+
+    index.upsert(_completion(4, "Pavo asado", rank=2.0))
+    assert _ids(index, "pa") == [4, 2, 3]
+    assert _ids(index, "pav") == [4]
+    assert _ids(index, "asa") == [4, 1]
+
+    # Renombrar: sale de "po"/"pollo" y entra en "pe"
+    index.upsert(_completion(1, "Pechuga asada", rank=1.0))
+    assert (_ids(index, "po"), _ids(index, "pollo")) == ([], [])
+    assert _ids(index, "pe") == [1]
+    assert _ids(index, "asa") == [4, 1]
+
+    # Bajar el puntaje reordena el top-K precalculado
+    index.upsert(_completion(4, "Pavo asado", rank=0.0))
+    assert _ids(index, "pa") == [2, 3, 4]
+
+    index.remove(4)
+    index.remove(99)
+    assert (_ids(index, "pa"), _ids(index, "pav"), _ids(index, "asa")) == ([2, 3], [], [1])
+    assert len(index) == 3
+
+
+def test_short_prefix_refills_after_remove():
+    """Al quitar un alimento del top-K de un prefijo corto entra el siguiente"""
+    top_k = food_autocomplete.TOP_K
+    food_autocomplete.TOP_K = 2
+    try:
+        index = FoodCompletionIndex([_completion(food_id, f"Pan {food_id}", rank=food_id) for food_id in range(1, 5)])
+        assert _ids(index, "p") == [4, 3]
+        index.remove(4)
+        assert _ids(index, "p") == _ids(index, "pa") == [3, 2]
+    finally:
+        food_autocomplete.TOP_K = top_k
+
+
+def test_random_updates_match_rebuild():
+    """Tras muchos upsert/remove el índice responde igual que uno reconstruido"""
+    rng = random.Random(7)
+    foods = _random_catalog(rng, 80)
+    index = FoodCompletionIndex(foods.values())
+    for step in range(300):
+        food_id = rng.randint(1, 100)
+        if rng.random() < 0.3:
+            foods.pop(food_id, None)
+            index.remove(food_id)
+        else:
+            foods[food_id] = _random_catalog(rng, 1)[1]
+            foods[food_id].id = food_id
+            index.upsert(foods[food_id])
+        if step % 25 == 0:
+            for prefix in PREFIXES:
+                assert _ids(index, prefix) == _expected(foods, prefix), (step, prefix)
+
+    rebuilt = FoodCompletionIndex(foods.values())
+    for prefix in PREFIXES:
+        assert _ids(index, prefix) == _ids(rebuilt, prefix) == _expected(foods, prefix)
+
+
+def test_rank_from_food():
+    """Verificado y popularidad se suman al puntaje"""
+    plain = Completion.from_food(SimpleNamespace(id=1, name="Pan", brand=None, category=None,
+                                                 verified=False, popularity_score=None))
+    popular = Completion.from_food(SimpleNamespace(id=2, name="Pan", brand=None, category=None,
+                                                   verified=True, popularity_score=50.0))
+    assert plain.rank == 0.0 and popular.rank > 0.0 and popular.verified
+
+
+if __name__ == "__main__":
+    print("🔍 Verificando autocompletado de alimentos...")
+    test_ranking_matches_brute_force()
+    test_name_start_and_brand_keys()
+    test_upsert_and_remove()
+    test_short_prefix_refills_after_remove()
+    test_random_updates_match_rebuild()
+    test_rank_from_food()
+    print("✅ El autocompletado coincide con la búsqueda por fuerza bruta")
@@ -0,0 +1,130 @@
+"""
+Test del buscador difuso de alimentos (app/ai/food_matcher.py)
+Distancia de Myers contra la programación dinámica clásica, BK-tree contra
+fuerza bruta, coincidencias con tildes, errores de escritura y sinónimos,
+caché LRU y la búsqueda de alimentos de MealService
+"""
+import asyncio
+import random
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.ai import food_matcher
+from app.ai.food_matcher import BKTree, FoodMatcher, fold_text, get_food_matcher, levenshtein, trigrams
+from app.models.base import Base
+from app.models.meal import Food
+from app.services.meal_service import MealService
+
+
+def _dp_levenshtein(a: str, b: str) -> int:
+    """Distancia de edición por programación dinámica (referencia)"""
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        for j, char_b in enumerate(b, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def test_levenshtein_matches_dp():
+    """Myers bit-paralelo == DP, incluso con patrones de más de 64 caracteres"""
+    rng = random.Random(3)
+    pairs = [("", ""), ("", "abc"), ("abc", ""), ("kitten", "sitting"), ("platano", "platanos")]
+    for _ in range(500):
+        pairs.append(tuple(
+            "".join(rng.choice("abcde ") for _ in range(rng.randint(1, 12))) for _ in range(2)
+        ))
+    pairs.append(("a" * 70 + "b", "a" * 65 + "c" * 6))
+    for a, b in pairs:
+        assert levenshtein(a, b) == _dp_levenshtein(a, b), (a, b)
+
+
+def test_bktree_matches_brute_force():
+    """search() devuelve exactamente los términos a distancia <= d"""
+    rng = random.Random(5)
+    terms = {"".join(rng.choice("abcdef") for _ in range(rng.randint(3, 8))) for _ in range(300)}
+    tree = BKTree()
+    for term in terms:
+        tree.add(term)
+    for query in ["abcd", "fedcba", "aaa", "bcdefa"]:
+        for max_distance in (1, 2):
+            expected = sorted((_dp_levenshtein(query, term), term) for term in terms
+                              if _dp_levenshtein(query, term) <= max_distance)
+            assert sorted(tree.search(query, max_distance)) == expected
+
+
+def test_fold_and_trigrams():
+    """Texto plegado sin tildes ni signos y trigramas con relleno por palabra"""
+    assert fold_text("  Plátano-Macho, ÑANDÚ ") == "platano macho nandu"
+    assert trigrams("pan") == {"  p", " pa", "pan", "an "}
+
+
+def test_matches_accents_typos_and_synonyms():
+    """Sin tildes, con errores de escritura y por sinónimos bilingües"""
+    matcher = FoodMatcher({
+        "chicken": "chicken", "pollo": "chicken", "banana": "banana", "plátano": "banana",
+        "rice": "rice", "arroz": "rice", "chicken breast": "chicken_breast",
+    })
+    assert matcher.lookup("PLATANO") == "banana"
+    assert matcher.match("plátano")[0].score == 1.0
+    assert matcher.best("bananna").name == "banana"
+    assert matcher.best("aroz").name == "rice"
+    assert matcher.best("pollp").name == "chicken"
+    assert [m.name for m in matcher.match("chiken breast", limit=2)][0] == "chicken_breast"
+    assert matcher.best("zzzz") is None
+    assert sorted(matcher.synonyms("banana")) == ["banana", "plátano"]
+
+    # Base nutricional local: sinónimos en español
+    local = get_food_matcher()
+    assert local.lookup("plátano") == "banana"
+    assert (local.best("platno").name, local.best("manzanna").name) == ("banana", "apple")
+
+
+def test_match_cache_is_bounded():
+    """La caché LRU guarda copias y descarta la consulta menos usada"""
+    matcher = FoodMatcher({"banana": "banana", "rice": "rice", "chicken": "chicken"})
+    size = food_matcher.MATCH_CACHE_SIZE
+    food_matcher.MATCH_CACHE_SIZE = 2
+    try:
+        first = matcher.match("banan")
+        first.clear()
+        assert matcher.match("banan")[0].name == "banana"
+        matcher.match("rics")
+        matcher.match("chiken")
+        assert [key[0] for key in matcher._cache] == ["rics", "chiken"]
+    finally:
+        food_matcher.MATCH_CACHE_SIZE = size
+
+
+def test_find_similar_foods():
+    """Nombre exacto, sinónimo y, si nada coincide, el nombre más corto que lo contiene"""
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        db = async_sessionmaker(engine, expire_on_commit=False)()
+        for name in ("Plátano", "Pollo", "Yogur griego natural", "Yogur griego"):
+            db.add(Food(name=name, calories_per_100g=100.0, protein_per_100g=1.0,
+                        carbs_per_100g=1.0, fat_per_100g=1.0))
+        await db.commit()
+
+        found = await MealService(db)._find_similar_foods(["banana", "pollo", "griego", "xyz"])
+        assert {name: food.name for name, food in found.items()} == {
+            "banana": "Plátano", "pollo": "Pollo", "griego": "Yogur griego"
+        }
+        await db.close()
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    print("🔍 Verificando buscador difuso de alimentos...")
+    test_levenshtein_matches_dp()
+    test_bktree_matches_brute_force()
+    test_fold_and_trigrams()
+    test_matches_accents_typos_and_synonyms()
+    test_match_cache_is_bounded()
+    test_find_similar_foods()
+    print("✅ El buscador difuso coincide con la referencia")
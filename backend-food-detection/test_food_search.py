@@ -0,0 +1,128 @@
+"""
+Test de la búsqueda de alimentos (app/services/food_search.py y /api/v1/foods)
+Peticiones reales con TestClient contra una base SQLite temporal con el
+índice FTS5: sin tildes, por prefijo, categoría exacta y orden por relevancia,
+verificados y popularidad
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from app.api.api_v1.endpoints import foods
+from app.core.database import get_db
+from app.core.security import get_current_user
+from app.models.base import Base
+from app.models.meal import Food
+from app.models.user import User
+from app.services import food_search
+from app.services.food_search import create_search_index
+
+
+def _food(name, category="frutas", verified=False, popularity=0.0, brand=None):
+    return Food(name=name, brand=brand, category=category, calories_per_100g=50.0, protein_per_100g=1.0,
+                carbs_per_100g=10.0, fat_per_100g=0.5, verified=verified, popularity_score=popularity)
+
+
+@contextmanager
+def _client(seed):
+    """Cliente HTTP del router de alimentos con un usuario y la base temporal"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "test.db")
+        sync_engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(sync_engine)
+        create_search_index(sync_engine)
+        with Session(sync_engine) as db:
+            db.add(User(id=1, email="ana@example.com", hashed_password="x", full_name="Ana"))
+            seed(db)
+            db.commit()
+        sync_engine.dispose()
+
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+        sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+        async def _get_db():
+            async with sessions() as session:
+                yield session
+
+        async def _current_user(db=Depends(get_db)):
+            return await db.get(User, 1)
+
+        app = FastAPI()
+        app.include_router(foods.router, prefix="/api/v1/foods")
+        app.dependency_overrides[get_db] = _get_db
+        app.dependency_overrides[get_current_user] = _current_user
+        with TestClient(app) as client:
+            yield client
+
+
+def test_search_endpoint():
+    """GET /search y /popular/list responden con su esquema"""
+    def seed(db):
+        db.add_all([
+            _food("Plátano", verified=True, popularity=10.0),
+            _food("Plátano macho frito"),
+            _food("Pan de plátano", category="panadería"),
+            _food("Manzana"),
+        ])
+
+    with _client(seed) as client:
+        response = client.get("/api/v1/foods/search", params={"q": "platano"})
+        assert response.status_code == 200, response.text
+        results = response.json()
+        assert [food["name"] for food in results] == ["Plátano", "Plátano macho frito", "Pan de plátano"]
+        assert (results[0]["verified"], results[0]["popularity_score"]) == (True, 10.0)
+        assert set(results[0]) >= {"id", "category", "calories_per_100g", "common_portions"}
+
+        response = client.get("/api/v1/foods/search", params={"q": "zz"})
+        assert (response.status_code, response.json()) == (200, [])
+
+        response = client.get("/api/v1/foods/popular/list")
+        assert response.status_code == 200, response.text
+        assert [food["name"] for food in response.json()] == ["Plátano"]
+
+
+def test_candidates_keep_best_ranked():
+    """Con más coincidencias que CANDIDATE_LIMIT, el verificado y popular sigue entrando"""
+    def seed(db):
+        db.add_all([_food(f"Pollo relleno {index}") for index in range(20)])
+        db.add(_food("Pollo", verified=True, popularity=80.0))
+
+    candidates = food_search.CANDIDATE_LIMIT
+    food_search.CANDIDATE_LIMIT = 5
+    try:
+        with _client(seed) as client:
+            response = client.get("/api/v1/foods/search", params={"q": "po", "limit": 3})
+            assert response.status_code == 200, response.text
+            assert response.json()[0]["name"] == "Pollo"
+    finally:
+        food_search.CANDIDATE_LIMIT = candidates
+
+
+def test_category_is_exact():
+    """La categoría se compara completa: 'frutas' no incluye 'frutas secas'"""
+    def seed(db):
+        db.add_all([
+            _food("Nuez", category="frutas secas"),
+            _food("Nuez de coco", category="frutas"),
+        ])
+
+    with _client(seed) as client:
+        response = client.get("/api/v1/foods/search", params={"q": "nuez", "category": "frutas"})
+        assert [food["name"] for food in response.json()] == ["Nuez de coco"]
+        response = client.get("/api/v1/foods/search", params={"q": "nuez", "category": "frutas secas"})
+        assert [food["name"] for food in response.json()] == ["Nuez"]
+
+
+if __name__ == "__main__":
+    print("🔍 Verificando búsqueda de alimentos...")
+    test_search_endpoint()
+    test_candidates_keep_best_ranked()
+    test_category_is_exact()
+    print("✅ La búsqueda de alimentos responde con su esquema")
@@ -0,0 +1,132 @@
+"""
+Test de validación GS1 (app/ai/gs1.py)
+Tablas de códigos conocidos, válidos e inválidos, para el dígito de control,
+la expansión de UPC-E y la clasificación por prefijo
+"""
+from app.ai.barcode_detector import BarcodeDetector
+from app.ai.gs1 import classify_barcode, compute_check_digit, expand_upce, lookup_prefix
+
+# (cuerpo sin dígito de control, dígito esperado)
+CHECK_DIGITS = [
+    ("400638133393", 1),   # EAN-13
+    ("03600029145", 2),    # UPC-A
+    ("9638507", 4),        # EAN-8
+    ("1001234567890", 2),  # GTIN-14
+    ("775018200236", 3),   # EAN-13 peruano
+]
+
+# (UPC-E, UPC-A esperado o None)
+UPCE_EXPANSIONS = [
+    ("04252614", "042100005264"),  # 8 dígitos, d6 en 0-2
+    ("0425261", "042100005264"),   # 7 dígitos: se calcula el control
+    ("425261", "042100005264"),    # 6 dígitos: sistema de numeración 0
+    ("0123453", "012300000451"),   # d6 = 3
+    ("0123454", "012340000053"),   # d6 = 4
+    ("0123455", "012345000058"),   # d6 en 5-9
+    ("1123450", "112000003452"),   # sistema de numeración 1
+    ("04252615", None),            # dígito de control incorrecto
+    ("2425261", None),             # sistema de numeración 2
+    ("42526", None),               # longitud
+    ("04a5261", None),             # no numérico
+]
+
+# (código, formato, válido, control verificado, país)
+CLASSIFICATIONS = [
+    ("4006381333931", "EAN-13", True, True, "Alemania"),
+    ("7750182002363", "EAN-13", True, True, "Perú"),
+    ("036000291452", "UPC-A", True, True, "Estados Unidos/Canadá"),
+    ("96385074", "EAN-8", True, True, "GS1 Reino Unido (GTIN-8)"),
+    ("10012345678902", "GTIN-14", True, True, "Estados Unidos/Canadá"),
+    ("04252614", "UPC-E", True, True, "Estados Unidos/Canadá"),
+    ("425261", "UPC-E", True, False, "Estados Unidos/Canadá"),
+    ("4006381333932", "EAN-13", False, False, "No identificado"),
+    ("036000291453", "UPC-A", False, False, "No identificado"),
+    ("96385075", "EAN-8", False, False, "No identificado"),
+    ("04252615", "EAN-8", False, False, "No identificado"),
+    ("12345", "Unknown", False, False, "No identificado"),
+    ("40063813339ab", "Unknown", False, False, "No identificado"),
+]
+
+
+def test_check_digits():
+    """Dígito de control módulo 10 con pesos 3/1 desde la derecha"""
+    for body, expected in CHECK_DIGITS:
+        assert compute_check_digit(body) == expected, body
+
+
+def test_expand_upce():
+    """Las cuatro formas de UPC-E y los códigos que no lo son"""
+    for code, expected in UPCE_EXPANSIONS:
+        assert expand_upce(code) == expected, code
+
+
+def test_classify_barcode():
+    """Formato, validez y país de códigos válidos e inválidos"""
+    for code, fmt, valid, verified, country in CLASSIFICATIONS:
+        info = classify_barcode(code)
+        assert (info["format"], info["valid"], info["check_digit_verified"], info["country"]) == (
+            fmt, valid, verified, country
+        ), (code, info)
+        if valid:
+            assert info["lookup_code"] == (info.get("expanded_upca") or code)
+    assert classify_barcode("7750182002363")["is_peruvian"]
+
+# 8 dígitos válidos como EAN-8 y como UPC-E: (simbología, formato, código de consulta, alternativo)
+AMBIGUOUS = "00123457"
+AMBIGUOUS_READS = [
+    (None, "EAN-8", "00123457", "001234000057"),
+    ("UPCE", "UPC-E", "001234000057", None),
+    ("EAN8", "EAN-8", "00123457", None),
+]
+
+
+def test_symbology_breaks_tie():
+    """La simbología del lector decide entre EAN-8 y UPC-E; sin ella se guarda la alternativa"""
+    for symbology, fmt, lookup_code, alternate in AMBIGUOUS_READS:
+        info = classify_barcode(AMBIGUOUS, symbology)
+        assert (info["format"], info["lookup_code"], info.get("alternate_lookup_code")) == (
+            fmt, lookup_code, alternate
+        ), symbology
+    assert classify_barcode("04252614", "UPCE")["lookup_code"] == "042100005264"
+    assert classify_barcode("04252614", "EAN8")["error"] == "Dígito de control inválido"
+    assert classify_barcode("96385074", "UPCE")["format"] == "UPC-E"
+    assert not classify_barcode("96385074", "UPCE")["valid"]
+
+
+def test_product_lookup_tries_expanded_upca():
+    """Un EAN-8 que también es UPC-E se consulta además con su UPC-A expandido"""
+    detector = BarcodeDetector()
+    detector.upc_api_key = None
+    requested = []
+
+    def openfoodfacts(barcode):
+        requested.append(barcode)
+        return {"found": barcode == "001234000057", "barcode": barcode}
+
+    detector._get_from_openfoodfacts = openfoodfacts
+    assert detector.get_product_info(AMBIGUOUS)["barcode"] == "001234000057"
+    assert requested == ["00123457", "001234000057"]
+
+    requested.clear()
+    detector.get_product_info(AMBIGUOUS, "UPCE")
+    detector.get_product_info("96385074")
+    assert requested == ["001234000057", "96385074"]
+
+
+def test_lookup_prefix():
+    """Índice de intervalos: extremos de un rango y prefijos sin asignar"""
+    assert lookup_prefix(400) == lookup_prefix(440) == ("Alemania", "country")
+    assert lookup_prefix(441) is None
+    assert lookup_prefix(775) == ("Perú", "country")
+    assert lookup_prefix(999) == ("Cupones", "coupon")
+
+
+if __name__ == "__main__":
+    print("🔍 Verificando validación GS1...")
+    test_check_digits()
+    test_expand_upce()
+    test_classify_barcode()
+    test_symbology_breaks_tie()
+    test_product_lookup_tries_expanded_upca()
+    test_lookup_prefix()
+    print("✅ Validación GS1 correcta")
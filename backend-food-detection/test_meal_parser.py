@@ -0,0 +1,54 @@
+"""
+Test del parser de comidas (app/ai/meal_parser.py)
+Tabla de frases con cantidades, unidades, fracciones y plurales contra los
+alimentos, cantidades y gramos esperados con la base nutricional local
+"""
+import pytest
+
+from app.ai.meal_parser import get_meal_parser, plural_forms
+
+# Texto → [(alimento, cantidad, unidad, gramos)]
+CASES = [
+    # Cantidades y unidades
+    ("200 g de arroz", [("rice", 200.0, "g", 200.0)]),
+    ("arroz 150 g y 2 tomates", [("rice", 150.0, "g", 150.0), ("tomato", 2.0, None, 240.0)]),
+    ("1.5 kg de papas", [("potato", 1.5, "kg", 1500.0)]),
+    ("1,5 tazas de leche", [("milk", 1.5, "cup", 360.0)]),
+    ("2 rebanadas de pan con queso", [("bread", 2.0, "slice", 60.0), ("cheese", 1.0, None, 30.0)]),
+    # Fracciones y números en palabras
+    ("media taza de avena", [("oats", 0.5, "cup", 120.0)]),
+    ("1/2 taza de fresas", [("strawberry", 0.5, "cup", 120.0)]),
+    ("una docena de huevos", [("egg", 12.0, None, 600.0)]),
+    ("two chicken breasts", [("chicken_breast", 2.0, None, 300.0)]),
+    # Plurales que no están en el vocabulario
+    ("2 panes", [("bread", 2.0, None, 60.0)]),
+    ("2 pechugas de pollo", [("chicken_breast", 2.0, None, 300.0)]),
+    ("3 nueces", [("walnuts", 3.0, None, 90.0)]),
+    ("3 limones", [("lime", 3.0, None, 90.0)]),
+    ("2 potatoes", [("potato", 2.0, None, 300.0)]),
+    ("strawberries", [("strawberry", 1.0, None, 15.0)]),
+]
+
+
+@pytest.mark.parametrize("text,expected", CASES)
+def test_parse(text, expected):
+    """Alimento, cantidad, unidad y gramos de cada frase"""
+    parsed = get_meal_parser().parse(text)
+    assert [(food.name, food.quantity, food.unit, food.grams) for food in parsed] == expected
+
+
+def test_plural_forms():
+    """Plurales regulares; las palabras cortas, vacías o ya en plural no generan formas"""
+    assert plural_forms("pan") == ["panes", "pans"]
+    assert plural_forms("nuez") == ["nueces"]
+    assert plural_forms("strawberry") == ["strawberries", "strawberrys"]
+    assert plural_forms("tomato") == ["tomatos", "tomatoes"]
+    assert plural_forms("de") == plural_forms("con") == plural_forms("huevos") == []
+
+
+if __name__ == "__main__":
+    print("🔍 Verificando parser de comidas...")
+    for text, expected in CASES:
+        test_parse(text, expected)
+    test_plural_forms()
+    print("✅ El parser reconoce cantidades, unidades y plurales")
@@ -0,0 +1,127 @@
+"""
+Test de la base nutricional columnar (app/ai/nutrition_db.py)
+Compila app/data/foods.csv a un .nutdb temporal, lo vuelve a abrir con el
+cargador mapeado en memoria y compara valores, encabezado y alineación de
+columnas con el CSV; también per_100g y totals, con y sin NumPy
+"""
+import csv
+import json
+import math
+import struct
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from app.ai import nutrition_db
+from app.ai.food_detection import SIMULATED_DETECTIONS, FoodDetectionSystem
+from app.ai.nutrition_db import (
+    ALIGNMENT, DEFAULT_SOURCE, MAGIC, NUTRIENT_COLUMNS, NutritionDatabase, compile_nutrition_db,
+    normalize_food_name
+)
+
+
+def _records():
+    with open(DEFAULT_SOURCE, newline="", encoding="utf-8") as source:
+        return list(csv.DictReader(source))
+
+
+def _float32(value):
+    return struct.unpack("<f", struct.pack("<f", float(value or 0)))[0]
+
+
+def _compiled(directory):
+    path = Path(directory) / "foods.nutdb"
+    assert compile_nutrition_db(DEFAULT_SOURCE, path) == len(_records())
+    return path
+
+
+def test_header_and_alignment():
+    """MAGIC, encabezado JSON y cada columna float32 alineada a 64 bytes con relleno en cero"""
+    records = _records()
+    with tempfile.TemporaryDirectory() as directory:
+        raw = _compiled(directory).read_bytes()
+
+    assert raw[:len(MAGIC)] == MAGIC
+    (header_len,) = struct.unpack("<I", raw[len(MAGIC):len(MAGIC) + 4])
+    header_start = len(MAGIC) + 4
+    header = json.loads(raw[header_start:header_start + header_len].decode("utf-8"))
+    assert (header["rows"], header["columns"]) == (len(records), list(NUTRIENT_COLUMNS))
+    assert header["names"] == [normalize_food_name(record["name"]) for record in records]
+
+    offset = header_start + header_len
+    for column in NUTRIENT_COLUMNS:
+        aligned = (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+        assert aligned % ALIGNMENT == 0
+        assert raw[offset:aligned] == b"\x00" * (aligned - offset)
+        values = struct.unpack(f"<{len(records)}f", raw[aligned:aligned + 4 * len(records)])
+        assert list(values) == [_float32(record[column]) for record in records]
+        offset = aligned + 4 * len(records)
+    assert len(raw) == offset
+
+
+def test_round_trip():
+    """El cargador mapeado devuelve los valores del CSV por nombre, nombre en español y sinónimo"""
+    records = _records()
+    with tempfile.TemporaryDirectory() as directory:
+        db = NutritionDatabase(_compiled(directory))
+        assert len(db) == len(records)
+        for row, record in enumerate(records):
+            assert db.row_of(record["name"]) == row
+            if record["name_es"]:
+                assert db.row_of(record["name_es"]) == row
+            assert db.get(record["name"]) == {
+                field: round(_float32(record[field]), 2) for field in nutrition_db.NUTRITION_FIELDS
+            }
+            assert db.serving_weight(record["name"]) == _float32(record["serving_g"])
+
+        assert db.row_of("Plátano") == db.row_of("guineo") == db.row_of("banana")
+        assert "manzanas" in db and "zzz" not in db
+        assert (db.get("zzz"), db.serving_weight("zzz", default=80)) == (None, 80)
+
+
+def test_per_100g_and_totals():
+    """Matriz por 100g con NaN en no encontrados y totales ponderados por gramos"""
+    with tempfile.TemporaryDirectory() as directory:
+        db = NutritionDatabase(_compiled(directory))
+        apple, rice = db.get("apple"), db.get("rice")
+
+        values = db.per_100g(["apple", "zzz", "arroz"], ("calories", "protein"))
+        assert values.shape == (3, 2)
+        assert np.allclose(values[[0, 2]], [[apple["calories"], apple["protein"]],
+                                            [rice["calories"], rice["protein"]]])
+        assert np.isnan(values[1]).all()
+
+        totals = db.totals(["apple", "zzz", "rice"], [150, 100, 200])
+        for field in nutrition_db.NUTRITION_FIELDS:
+            expected = apple[field] * 1.5 + rice[field] * 2
+            assert math.isclose(totals[field], expected, abs_tol=0.02), field
+
+        # Sin NumPy: memoryview del mismo mapeo y los mismos resultados
+        nutrition_db.NUMPY_AVAILABLE = False
+        try:
+            fallback = NutritionDatabase(Path(directory) / "foods.nutdb")
+            rows = fallback.per_100g(["apple", "zzz"], ("calories",))
+            assert rows == [[_float32(apple["calories"])], None]
+            assert fallback.totals(["apple", "zzz", "rice"], [150, 100, 200]) == totals
+        finally:
+            nutrition_db.NUMPY_AVAILABLE = True
+
+
+def test_simulated_detection_uses_portions():
+    """La detección simulada suma los nutrientes de cada porción estimada"""
+    db = nutrition_db.get_nutrition_db()
+    result = FoodDetectionSystem()._simulate_detection()
+    names = [name for _, name, _, _ in SIMULATED_DETECTIONS]
+    weights = [detection["estimated_weight"] for detection in result["detections"]]
+    assert weights == [db.serving_weight(name) for name in names]
+    assert result["meal_analysis"]["estimated_calories"] == round(db.totals(names, weights)["calories"])
+
+
+if __name__ == "__main__":
+    print("🔍 Verificando base nutricional...")
+    test_header_and_alignment()
+    test_round_trip()
+    test_per_100g_and_totals()
+    test_simulated_detection_uses_portions()
+    print("✅ La base nutricional compilada coincide con el CSV")
@@ -0,0 +1,289 @@
+"""
+Test de los endpoints de progreso (app/api/api_v1/endpoints/progress.py)
+Peticiones reales con TestClient contra una base SQLite temporal: las
+respuestas tienen que validar contra su response_model
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import timedelta
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from app.api.api_v1.endpoints import progress
+from app.core.database import get_db
+from app.core.security import get_current_user
+from app.core.time_ranges import local_today
+from app.models.base import Base
+from app.models.progress import DailyStats, ProgressSummary, UserStreak, WeightEntry, WeightTrend
+from app.models.user import User
+from app.services.dashboard_service import _dashboard_cache
+from app.services.forecast_service import _forecast_cache
+from app.services.progress_rollups import period_bounds
+
+# Zona muy adelantada: su "hoy" suele no ser el de UTC
+TIMEZONE = "Pacific/Kiritimati"
+
+
+@contextmanager
+def _client(seed=None):
+    """Cliente HTTP del router de progreso con un usuario y la base temporal"""
+    # Los cachés por usuario son del proceso: cada base nueva empieza sin ellos
+    _dashboard_cache.clear()
+    _forecast_cache.clear()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "test.db")
+        sync_engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(sync_engine)
+        with Session(sync_engine) as db:
+            db.add(User(id=1, email="ana@example.com", hashed_password="x", full_name="Ana",
+                        timezone=TIMEZONE, target_calories=2000, goal="maintain"))
+            if seed:
+                seed(db)
+            db.commit()
+        sync_engine.dispose()
+
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+        sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+        async def _get_db():
+            async with sessions() as session:
+                yield session
+
+        async def _current_user(db=Depends(get_db)):
+            return await db.get(User, 1)
+
+        app = FastAPI()
+        app.include_router(progress.router, prefix="/api/v1/progress")
+        app.dependency_overrides[get_db] = _get_db
+        app.dependency_overrides[get_current_user] = _current_user
+        with TestClient(app) as client:
+            yield client
+
+
+def test_weekly_overview():
+    """GET /weekly-overview: días de la semana local, promedios del resumen e insights"""
+    today = local_today(TIMEZONE)
+    monday = period_bounds("week", today)[0]
+    last_monday = monday - timedelta(days=7)
+
+    def seed(db):
+        for day in [last_monday + timedelta(days=offset) for offset in range(7 + today.weekday() + 1)]:
+            db.add(DailyStats(user_id=1, date=day, meal_count=2, consumed_calories=1800.0,
+                              calorie_adherence=0.9, complete_day=day < today))
+        db.add(ProgressSummary(user_id=1, period_type="week", start_date=last_monday,
+                               end_date=monday - timedelta(days=1), avg_calories=1800.0,
+                               avg_calorie_adherence=0.9, weight_change=-0.4,
+                               days_logged=7, total_days=7, logging_consistency=1.0))
+
+    with _client(seed) as client:
+        response = client.get("/api/v1/progress/weekly-overview", params={"week_offset": 1})
+        assert response.status_code == 200, response.text
+        body = response.json()
+        assert (body["week_start"], body["week_end"]) == (last_monday.isoformat(), (monday - timedelta(days=1)).isoformat())
+        assert len(body["days"]) == 7
+        assert body["weekly_avg"] == {"calories": 1800.0, "protein": 0.0, "carbs": 0.0, "fat": 0.0,
+                                      "calorie_adherence": 0.9}
+        assert (body["adherence_score"], body["weight_change"]) == (0.9, -0.4)
+        assert "Cambio de peso: -0.4 kg" in body["insights"]
+
+        # Semana en curso (local): días listados, sin resumen todavía
+        response = client.get("/api/v1/progress/weekly-overview")
+        assert response.status_code == 200, response.text
+        body = response.json()
+        assert body["week_start"] == monday.isoformat()
+        assert [day["date"] for day in body["days"]] == [
+            (monday + timedelta(days=offset)).isoformat() for offset in range(today.weekday() + 1)
+        ]
+        assert (body["adherence_score"], body["insights"]) == (0.0, ["Días registrados: 0/7"])
+
+
+def test_dashboard():
+    """GET /dashboard: una consulta validada contra DashboardStats"""
+    today = local_today(TIMEZONE)
+
+    def seed(db):
+        db.add(DailyStats(user_id=1, date=today - timedelta(days=1), meal_count=3,
+                          consumed_calories=2000.0, calorie_adherence=1.0))
+        db.add(DailyStats(user_id=1, date=today, meal_count=1, consumed_calories=1500.0, calorie_adherence=0.75))
+        db.add(WeightEntry(user_id=1, date=today, weight=70.2))
+        db.add(WeightTrend(user_id=1, last_date=today, trend_weight=70.5, slope=-0.1, noise=0.2, entry_count=9))
+        db.add(UserStreak(user_id=1, current_streak=2, longest_streak=5, last_logged_date=today))
+
+    with _client(seed) as client:
+        response = client.get("/api/v1/progress/dashboard")
+        assert response.status_code == 200, response.text
+        assert response.json() == {
+            "current_weight": 70.2,
+            "weight_trend": "decreasing",
+            "trend_weight": 70.5,
+            "today_calories": 1500.0,
+            "today_adherence": 0.75,
+            "weekly_avg_calories": 1750.0,
+            "weekly_avg_adherence": 0.875,
+            "current_tdee": None,
+            "adaptive_calories": None,
+            "total_days_logged": 2,
+            "current_streak": 2,
+            "longest_streak": 5,
+        }
+
+        # Segunda apertura desde la caché, misma respuesta
+        assert client.get("/api/v1/progress/dashboard").json() == response.json()
+
+
+def test_log_weight():
+    """
+    POST /weight crea el registro del día; uno nuevo para la misma fecha y PUT lo corrigen
+    Crear y reemplazar actualizan los objetivos adaptativos; DELETE lo quita
+    """
+    today = local_today(TIMEZONE)
+    engine = progress.adaptive_engine
+    update_user_goals = engine.update_user_goals
+    goal_updates = []
+
+    async def recording_update(db, user, *args, **kwargs):
+        goal_updates.append(user.id)
+        return await update_user_goals(db, user, *args, **kwargs)
+
+    engine.update_user_goals = recording_update
+    try:
+        _check_log_weight(today)
+    finally:
+        del engine.update_user_goals
+    assert goal_updates == [1, 1]
+
+
+def _check_log_weight(today):
+    with _client() as client:
+        response = client.post("/api/v1/progress/weight", json={
+            "weight": 71.0, "date": today.isoformat(), "source": "scale_sync", "notes": "mañana"
+        })
+        assert response.status_code == 200, response.text
+        created = response.json()
+        assert (created["weight"], created["source"], created["notes"]) == (71.0, "scale_sync", "mañana")
+        assert client.get("/api/v1/progress/dashboard").json()["current_weight"] == 71.0
+
+        # Corregir el último registro: misma fecha, otro valor
+        response = client.post("/api/v1/progress/weight", json={"weight": 70.6, "date": today.isoformat()})
+        assert response.status_code == 200, response.text
+        corrected = response.json()
+        assert corrected["id"] == created["id"]
+        assert (corrected["weight"], corrected["source"], corrected["notes"]) == (70.6, "manual", None)
+
+        response = client.put(f"/api/v1/progress/weight/{created['id']}", json={"notes": "corregido"})
+        assert response.status_code == 200, response.text
+        assert (response.json()["weight"], response.json()["notes"]) == (70.6, "corregido")
+
+        history = client.get("/api/v1/progress/weight").json()
+        assert [(entry["id"], entry["weight"]) for entry in history] == [(created["id"], 70.6)]
+        dashboard = client.get("/api/v1/progress/dashboard").json()
+        assert (dashboard["current_weight"], dashboard["trend_weight"]) == (70.6, 70.6)
+
+        response = client.delete(f"/api/v1/progress/weight/{created['id']}")
+        assert response.status_code == 200, response.text
+        assert client.get("/api/v1/progress/weight").json() == []
+        assert client.get("/api/v1/progress/dashboard").json()["current_weight"] is None
+
+
+def test_analysis():
+    """POST /analysis: resumen de los períodos, series, proyección y recomendaciones"""
+    today = local_today(TIMEZONE)
+    monday = period_bounds("week", today)[0]
+    weeks = [(monday - timedelta(days=14), 71.0, 70.6), (monday - timedelta(days=7), 70.6, 70.3)]
+
+    def seed(db):
+        for start, weight_start, weight_end in weeks:
+            db.add(ProgressSummary(user_id=1, period_type="week", start_date=start,
+                                   end_date=start + timedelta(days=6), avg_calories=1800.0,
+                                   avg_calorie_adherence=0.9, weight_start=weight_start,
+                                   weight_end=weight_end, weight_change=weight_end - weight_start,
+                                   weight_trend=weight_end, tdee_end=2200.0, tdee_confidence=0.6,
+                                   days_logged=7, total_days=7, logging_consistency=1.0))
+        for offset in range(21):
+            day = today - timedelta(days=offset)
+            db.add(WeightEntry(user_id=1, date=day, weight=70.0 + 0.05 * offset))
+            db.add(DailyStats(user_id=1, date=day, meal_count=3, consumed_calories=1800.0))
+
+    with _client(seed) as client:
+        response = client.post("/api/v1/progress/analysis", json={
+            "start_date": weeks[0][0].isoformat(), "end_date": (monday - timedelta(days=1)).isoformat(),
+            "horizons": [7, 28]
+        })
+        assert response.status_code == 200, response.text
+        body = response.json()
+        summary = body["summary"]
+        assert (summary["period_type"], summary["days_logged"], summary["total_days"]) == ("week", 14, 14)
+        assert round(summary["weight_change"], 2) == -0.7
+        trends = body["trends"]
+        assert [point["value"] for point in trends["weight_trend"]] == [70.6, 70.3]
+        assert [point["confidence"] for point in trends["tdee_trend"]] == [0.6, 0.6]
+
+        predictions = body["predictions"]
+        assert [point["days"] for point in predictions["horizons"]] == [7, 28]
+        assert predictions["predicted_weight_change"] < 0
+        assert predictions["predicted_tdee"] is not None
+        assert body["insights"][0] == "Días registrados: 14/14"
+        assert "Acerca tu ingesta diaria a tu objetivo calórico" not in body["recommendations"]
+
+        # Sin proyección ni series a pedido; sin resúmenes en el rango, 404
+        response = client.post("/api/v1/progress/analysis", json={
+            "start_date": weeks[0][0].isoformat(), "end_date": (monday - timedelta(days=1)).isoformat(),
+            "include_predictions": False, "include_trends": False
+        })
+        assert response.status_code == 200, response.text
+        assert response.json()["predictions"] is None
+        assert response.json()["trends"]["weight_trend"] == []
+        response = client.post("/api/v1/progress/analysis", json={
+            "start_date": (monday - timedelta(days=70)).isoformat(),
+            "end_date": (monday - timedelta(days=57)).isoformat()
+        })
+        assert response.status_code == 404
+
+
+def test_analysis_clips_partial_periods():
+    """POST /analysis con un rango que corta semanas: solo cuentan los días del rango"""
+    monday = period_bounds("week", local_today(TIMEZONE))[0]
+    first_week = monday - timedelta(days=14)
+    start, end = first_week + timedelta(days=3), first_week + timedelta(days=8)  # jueves a martes
+
+    def seed(db):
+        for week, calories in ((first_week, 1000.0), (first_week + timedelta(days=7), 2000.0)):
+            db.add(ProgressSummary(user_id=1, period_type="week", start_date=week,
+                                   end_date=week + timedelta(days=6), avg_calories=calories,
+                                   weight_start=80.0, weight_end=79.0, weight_change=-1.0,
+                                   days_logged=7, total_days=7, logging_consistency=1.0))
+            for offset in range(7):
+                day = week + timedelta(days=offset)
+                db.add(DailyStats(user_id=1, date=day, meal_count=2, consumed_calories=calories,
+                                  complete_day=True))
+                db.add(WeightEntry(user_id=1, date=day, weight=80.0 - 0.1 * (day - first_week).days))
+
+    with _client(seed) as client:
+        response = client.post("/api/v1/progress/analysis", json={
+            "start_date": start.isoformat(), "end_date": end.isoformat(), "include_predictions": False
+        })
+        assert response.status_code == 200, response.text
+        body = response.json()
+        summary = body["summary"]
+        assert (summary["days_logged"], summary["total_days"]) == (6, 6)
+        assert round(summary["avg_calories"], 2) == round((4 * 1000.0 + 2 * 2000.0) / 6, 2)
+        assert (summary["weight_start"], summary["weight_end"]) == (79.7, 79.2)
+        assert [point["date"] for point in body["trends"]["calorie_trend"]] == [
+            (first_week + timedelta(days=6)).isoformat(), end.isoformat()
+        ]
+
+
+if __name__ == "__main__":
+    print("🔍 Verificando endpoints de progreso...")
+    test_weekly_overview()
+    test_dashboard()
+    test_log_weight()
+    test_analysis()
+    test_analysis_clips_partial_periods()
+    print("✅ Los endpoints de progreso responden con su esquema")
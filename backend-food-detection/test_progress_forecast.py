@@ -0,0 +1,114 @@
+"""
+Test del pronóstico de peso (app/ai/progress_forecast.py y app/services/forecast_service.py)
+Bandas ordenadas por nivel, pendiente corrida por la ingesta planificada y
+modelo guardado por usuario hasta que cambian sus datos
+"""
+import asyncio
+from datetime import timedelta
+
+import numpy as np
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.ai.progress_forecast import KCAL_PER_KG, fit_forecast, project
+from app.core.time_ranges import local_today
+from app.models.base import Base
+from app.models.progress import DailyStats, WeightEntry
+from app.models.user import User
+from app.services import forecast_service
+from app.services.dashboard_service import invalidate_dashboard
+from app.services.forecast_service import ForecastService, _forecast_cache
+
+
+def _model(intake=2000.0):
+    """Modelo sobre 28 días de tendencia que baja 0.05 kg/día con ruido"""
+    rng = np.random.default_rng(7)
+    days = list(range(738000, 738028))
+    weights = 80.0 - 0.05 * np.arange(28) + rng.normal(0, 0.1, 28)
+    return fit_forecast(days, weights, noise=0.04, intakes=[intake] * 20)
+
+
+def test_bands_are_ordered():
+    """low_95 ≤ low_80 ≤ peso ≤ high_80 ≤ high_95 y las bandas se abren con el horizonte"""
+    projection = project(_model(), [1, 7, 28, 90])
+    low_80, high_80 = projection["bands"][0]
+    low_95, high_95 = projection["bands"][1]
+    weight = projection["weight"]
+    assert np.all(low_95 <= low_80) and np.all(low_80 <= weight)
+    assert np.all(weight <= high_80) and np.all(high_80 <= high_95)
+    assert np.all(np.diff(high_95 - low_95) > 0)
+
+
+def test_planned_intake_shifts_slope():
+    """Comer 500 kcal menos por día corre la pendiente en -500 / KCAL_PER_KG por día"""
+    model = _model()
+    horizons = [7, 28]
+    baseline = project(model, horizons)
+    planned = project(model, horizons, planned_intake=1500.0)
+    assert np.allclose(planned["weight"] - baseline["weight"], -500 / KCAL_PER_KG * np.array(horizons))
+    # Las bandas se mueven con el peso, su ancho no cambia
+    assert np.allclose(planned["bands"] - baseline["bands"], (planned["weight"] - baseline["weight"])[None, None, :])
+
+    # Sin ingesta registrada no hay balance energético: la pendiente no cambia
+    without_intake = fit_forecast(list(range(10)), 80.0 - 0.05 * np.arange(10))
+    assert without_intake.tdee is None
+    assert np.allclose(project(without_intake, horizons, planned_intake=1500.0)["weight"],
+                       project(without_intake, horizons)["weight"])
+
+
+def test_model_cache_invalidation():
+    """El modelo se reutiliza hasta invalidar los datos del usuario o vencer su vigencia"""
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        db = async_sessionmaker(engine, expire_on_commit=False)()
+        user = User(id=501, email="f@example.com", hashed_password="x", full_name="F",
+                    timezone="America/Lima", target_calories=1800, goal="lose_weight")
+        db.add(user)
+        today = local_today(user.timezone)
+        for offset in range(1, 15):
+            day = today - timedelta(days=offset)
+            db.add(WeightEntry(user_id=user.id, date=day, weight=75.0 + 0.04 * offset))
+            db.add(DailyStats(user_id=user.id, date=day, meal_count=3, consumed_calories=2100.0))
+        await db.commit()
+
+        _forecast_cache.clear()
+        invalidate_dashboard(user.id)
+        service = ForecastService(db)
+        model = await service.get_model(user)
+        assert model.points == 14
+        predictions = await service.predictions(user, [7])
+        assert predictions["predicted_weight_change"] < 0 and len(predictions["horizons"]) == 1
+
+        # Dato nuevo sin invalidar: sigue el modelo guardado
+        db.add(WeightEntry(user_id=user.id, date=today, weight=74.9))
+        await db.commit()
+        assert await service.get_model(user) is model
+
+        # Invalidar (lo que hace el commit de un endpoint) descarta el modelo
+        invalidate_dashboard(user.id)
+        refitted = await service.get_model(user)
+        assert refitted is not model and refitted.points == 15
+        assert await service.get_model(user) is refitted
+
+        # Vencida la vigencia también se vuelve a ajustar (escrituras de otros workers)
+        seconds = forecast_service.FORECAST_CACHE_SECONDS
+        forecast_service.FORECAST_CACHE_SECONDS = 0
+        try:
+            assert await service.get_model(user) is not refitted
+        finally:
+            forecast_service.FORECAST_CACHE_SECONDS = seconds
+            _forecast_cache.clear()
+
+        await db.close()
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    print("🔍 Verificando pronóstico de peso...")
+    test_bands_are_ordered()
+    test_planned_intake_shifts_slope()
+    test_model_cache_invalidation()
+    print("✅ El pronóstico respeta bandas, ingesta planificada y caché")
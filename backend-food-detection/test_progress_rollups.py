@@ -0,0 +1,143 @@
+"""
+Test de resúmenes por período (app/services/progress_rollups.py)
+"Hoy" es el día local de cada usuario: un día se cierra y se resume solo
+cuando ya terminó en su zona horaria
+"""
+import asyncio
+from datetime import timedelta
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.time_ranges import local_today
+from app.models.base import Base
+from app.models.progress import DailyStats
+from app.models.user import User
+from app.services.daily_stats_service import DailyStatsService
+from app.services.progress_rollups import ProgressRollupService
+
+# Zonas en los extremos: cuando en una ya es mañana, en la otra aún es ayer
+ZONES = {1: "Pacific/Kiritimati", 2: "Pacific/Pago_Pago"}
+
+
+async def _async_session():
+    """Sesión asíncrona como la de los endpoints (aiosqlite en memoria)"""
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return engine, async_sessionmaker(engine, expire_on_commit=False)()
+
+
+async def _seed(db):
+    """Cada usuario con comidas en su ayer y su hoy locales"""
+    for user_id, zone in ZONES.items():
+        db.add(User(id=user_id, email=f"u{user_id}@example.com", hashed_password="x",
+                    full_name=f"Usuario {user_id}", timezone=zone))
+        today = local_today(zone)
+        for day in (today - timedelta(days=1), today):
+            db.add(DailyStats(user_id=user_id, date=day, meal_count=1, consumed_calories=1800.0))
+    await db.commit()
+
+
+async def _closed(db):
+    rows = await db.execute(select(DailyStats.user_id, DailyStats.date).where(DailyStats.complete_day.is_(True)))
+    return sorted((row.user_id, row.date) for row in rows)
+
+
+def test_backfill_stops_at_local_today():
+    """backfill() cierra hasta el ayer local de cada usuario"""
+    async def run():
+        engine, db = await _async_session()
+        await _seed(db)
+
+        result = await ProgressRollupService(db).backfill()
+        assert result["users"] == 2
+        assert await _closed(db) == [
+            (user_id, local_today(zone) - timedelta(days=1)) for user_id, zone in ZONES.items()
+        ]
+        await db.close()
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_close_days_closes_local_yesterday():
+    """close_days() sin fecha cierra el ayer local de cada usuario"""
+    async def run():
+        engine, db = await _async_session()
+        await _seed(db)
+
+        result = await ProgressRollupService(db).close_days()
+        assert result["users"] == 2
+        assert await _closed(db) == [
+            (user_id, local_today(zone) - timedelta(days=1)) for user_id, zone in ZONES.items()
+        ]
+        await db.close()
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_day_changed_skips_local_today():
+    """Corregir el día en curso del usuario no toca sus resúmenes; uno pasado sí"""
+    async def run():
+        engine, db = await _async_session()
+        await _seed(db)
+        service = ProgressRollupService(db)
+        await service.backfill()
+
+        # Hoy marcado como cerrado: solo un recálculo lo incluiría en la semana
+        await db.execute(DailyStats.__table__.update().values(complete_day=True))
+        for user_id, zone in ZONES.items():
+            today = local_today(zone)
+            same_week = today.weekday() > 0
+
+            async def week_days_logged():
+                summary = await service.get_summary(user_id, "week", today)
+                return summary.days_logged if summary else 0
+
+            await service.day_changed(user_id, today)
+            assert await week_days_logged() == (1 if same_week else 0)
+
+            await service.day_changed(user_id, today - timedelta(days=1))
+            assert await week_days_logged() == (2 if same_week else 0)
+
+        await db.close()
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_back_dated_day_gets_summary():
+    """La primera comida de un día pasado lo cierra y lo resume sin esperar a close_days()"""
+    async def run():
+        engine, db = await _async_session()
+        await _seed(db)
+        zone = ZONES[1]
+        day = local_today(zone) - timedelta(days=4)
+
+        stats = DailyStatsService(db)
+        await stats.apply_delta(1, day, {"calories": 1500.0}, 1)
+        await stats.rollups.day_changed(1, day)
+        await db.commit()
+
+        assert (1, day) in await _closed(db)
+        summary = await ProgressRollupService(db).get_summary(1, "week", day)
+        assert summary is not None and summary.days_logged >= 1
+
+        # La tarea nocturna no lo necesita: solo cierra el ayer local
+        result = await ProgressRollupService(db).close_days()
+        assert (1, day) in await _closed(db) and result["users"] == 2
+        await db.close()
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    print("🔍 Verificando resúmenes de progreso...")
+    test_backfill_stops_at_local_today()
+    test_close_days_closes_local_yesterday()
+    test_day_changed_skips_local_today()
+    test_back_dated_day_gets_summary()
+    print("✅ Los resúmenes respetan el día local de cada usuario")
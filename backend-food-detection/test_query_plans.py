@@ -0,0 +1,335 @@
+"""
+Test de planes de consulta para las tablas de series de tiempo por usuario
+Verifica con EXPLAIN QUERY PLAN (SQLite en memoria) que las consultas de los
+endpoints más usados recorren los índices compuestos (user_id, fecha)
+"""
+import asyncio
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.base import Base
+from app.models.meal import Meal
+from app.models.progress import DailyStats, WeightEntry
+from app.models.user import User
+from app.models.sync import SyncData
+from app.schemas.sync import SyncDataCreate
+from app.core.migrations import run_migrations
+from app.core.time_ranges import day_range
+from app.services.daily_stats_service import DailyStatsService
+from app.services.dashboard_service import dashboard_statement
+from app.services.export_service import export_statement
+from app.services.meal_service import MealService, encode_meal_cursor
+from app.services.progress_rollups import ProgressRollupService
+from app.services.streak_service import streaks_statement
+from app.services.sync_service import SyncService
+from app.services.tdee_filter_service import TDEEFilterService
+from app.services.weight_trend_service import WeightTrendService
+
+
+def _session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    return engine, sessionmaker(bind=engine)()
+
+
+async def _async_session():
+    """Sesión asíncrona como la de los endpoints (aiosqlite en memoria)"""
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return engine, async_sessionmaker(engine)()
+
+
+async def _driver_plan(db, statement, parameters) -> str:
+    """Plan de SQLite para una sentencia capturada del driver"""
+    conn = await db.connection()
+    rows = (await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)).all()
+    return " | ".join(row[-1] for row in rows)
+
+
+def _plan(db, query) -> str:
+    """Plan de SQLite para una consulta ORM"""
+    compiled = query.statement.compile(db.get_bind(), compile_kwargs={"literal_binds": True})
+    rows = db.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+    return " | ".join(row[-1] for row in rows)
+
+
+def _assert_uses(plan: str, index_name: str, table: str):
+    print(f"   {plan}")
+    assert index_name in plan, f"No se usa {index_name}: {plan}"
+    assert f"SCAN {table}" not in plan, f"Escaneo completo de {table}: {plan}"
+
+
+def test_meal_history_plan():
+    """GET /meals: comidas del usuario por rango de fechas"""
+    async def run():
+        engine, db = await _async_session()
+        captured = []
+
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def _capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT"):
+                captured.append((statement, parameters))
+
+        await MealService(db).get_user_meals(1, date(2026, 1, 1), date(2026, 1, 31))
+        statement, parameters = captured[0]
+        _assert_uses(await _driver_plan(db, statement, parameters), "ix_meals_user_id_eaten_at", "meals")
+        await db.close()
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_meal_page_plan():
+    """GET /meals?cursor=...: la página siguiente sigue el índice desde el cursor"""
+    async def run():
+        engine, db = await _async_session()
+        captured = []
+
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def _capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT"):
+                captured.append((statement, parameters))
+
+        cursor = encode_meal_cursor(Meal(id=120, eaten_at=datetime(2026, 1, 20, 13)))
+        await MealService(db).get_meal_page(1, limit=50, cursor=cursor)
+        statement, parameters = captured[0]
+        assert "image_analysis" not in statement.split("FROM")[0], "image_analysis no se difiere"
+        plan = await _driver_plan(db, statement, parameters)
+        _assert_uses(plan, "ix_meals_user_id_eaten_at", "meals")
+        assert "TEMP B-TREE" not in plan, f"Orden en memoria: {plan}"
+        await db.close()
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_progress_plans():
+    """GET /progress/daily-stats y /progress/weight"""
+    _, db = _session()
+    start, end = date(2026, 1, 5), date(2026, 1, 11)
+
+    stats = db.query(DailyStats).filter(
+        DailyStats.user_id == 1, *day_range(DailyStats.date, start, end)
+    ).order_by(DailyStats.date)
+    _assert_uses(_plan(db, stats), "ix_daily_stats_user_id_date", "daily_stats")
+
+    weights = db.query(WeightEntry).filter(
+        WeightEntry.user_id == 1, *day_range(WeightEntry.date, start, end)
+    ).order_by(WeightEntry.date.desc())
+    _assert_uses(_plan(db, weights), "ix_weight_entries_user_id_date", "weight_entries")
+
+
+def test_progress_summary_plan():
+    """GET /progress/summaries, /progress/weekly-overview y /progress/analysis: una lectura por índice"""
+    async def run():
+        engine, db = await _async_session()
+        captured = []
+
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def _capture(conn, cursor, statement, parameters, context, executemany):
+            captured.append((statement, parameters))
+
+        await ProgressRollupService(db).get_summaries(1, "week", date(2026, 1, 1), date(2026, 3, 31))
+        assert len(captured) == 1, captured
+        statement, parameters = captured[0]
+        plan = await _driver_plan(db, statement, parameters)
+        _assert_uses(plan, "ux_progress_summaries_user_period_start", "progress_summaries")
+        assert "TEMP B-TREE" not in plan, f"Orden sin índice: {plan}"
+        await db.close()
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_dashboard_plan():
+    """GET /progress/dashboard: una sola sentencia, cada parte por su índice"""
+    async def run():
+        engine, db = await _async_session()
+        statement = dashboard_statement(1, date(2026, 1, 11)).compile(
+            engine.sync_engine, compile_kwargs={"literal_binds": True}
+        )
+        plan = await _driver_plan(db, str(statement), ())
+        print(f"   {plan}")
+        for index_name in ("ix_daily_stats_user_id_date", "ix_weight_entries_user_id_date"):
+            assert index_name in plan, f"No se usa {index_name}: {plan}"
+        assert "SCAN daily_stats" not in plan and "SCAN weight_entries" not in plan, plan
+        await db.close()
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_streak_plan():
+    """Recalcular la racha de un usuario recorre solo sus días por índice"""
+    async def run():
+        engine, db = await _async_session()
+        statement = streaks_statement("sqlite", [1]).compile(
+            engine.sync_engine, compile_kwargs={"literal_binds": True}
+        )
+        _assert_uses(await _driver_plan(db, str(statement), ()), "ix_daily_stats_user_id_date", "daily_stats")
+        await db.close()
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_weight_trend_write_plan():
+    """Registrar peso: la tendencia del día se escribe en DailyStats por índice"""
+    async def run():
+        engine, db = await _async_session()
+        captured = []
+
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def _capture(conn, cursor, statement, parameters, context, executemany):
+            captured.append((statement, parameters))
+
+        db.add(WeightEntry(user_id=1, date=date(2026, 1, 5), weight=80.0))
+        await db.flush()
+        await WeightTrendService(db).entry_saved(1, date(2026, 1, 5), 80.0)
+        update_sql, update_params = next(c for c in captured if c[0].lstrip().startswith("UPDATE daily_stats"))
+        if isinstance(update_params, list):
+            update_params = update_params[0]
+        _assert_uses(await _driver_plan(db, update_sql, update_params), "ix_daily_stats_user_id_date", "daily_stats")
+        await db.close()
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_tdee_filter_plan():
+    """Avanzar el filtro del TDEE: ingesta y pesajes de los días pendientes por índice"""
+    async def run():
+        engine, db = await _async_session()
+        captured = []
+
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def _capture(conn, cursor, statement, parameters, context, executemany):
+            captured.append((statement, parameters))
+
+        user = User(id=1, email="plan@test", hashed_password="x", full_name="Plan", timezone="UTC")
+        db.add(user)
+        await db.flush()
+        await TDEEFilterService(db).advance(user, through=date(2026, 1, 31))
+        for table, index_name in (("daily_stats", "ix_daily_stats_user_id_date"),
+                                  ("weight_entries", "ix_weight_entries_user_id_date")):
+            select_sql, select_params = next(
+                c for c in captured if c[0].lstrip().startswith("SELECT") and f"FROM {table}" in c[0]
+            )
+            _assert_uses(await _driver_plan(db, select_sql, select_params), index_name, table)
+        await db.close()
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_export_plan():
+    """Exportación de comidas: comidas por (user_id, eaten_at) y sus alimentos por meal_id"""
+    async def run():
+        engine, db = await _async_session()
+        _, statement = export_statement("meals", 1, date(2026, 1, 1), date(2026, 1, 31))
+        compiled = statement.compile(engine.sync_engine, compile_kwargs={"literal_binds": True})
+        plan = await _driver_plan(db, str(compiled), ())
+        _assert_uses(plan, "ix_meals_user_id_eaten_at", "meals")
+        assert "ix_meal_foods_meal_id" in plan and "SCAN meal_foods" not in plan, plan
+        await db.close()
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_daily_stats_write_plans():
+    """Delta de DailyStats y conciliación por rango"""
+    async def run():
+        engine, db = await _async_session()
+        captured = []
+
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def _capture(conn, cursor, statement, parameters, context, executemany):
+            captured.append((statement, parameters))
+
+        service = DailyStatsService(db)
+        await service.apply_delta(1, date(2026, 1, 5), {"calories": 100.0}, 1)
+        assert any(c[0].lstrip().startswith("INSERT INTO daily_stats") and "ON CONFLICT" in c[0] for c in captured)
+        await service.apply_delta(1, date(2026, 1, 5), {"calories": -100.0}, -1)
+        update_sql, update_params = next(c for c in captured if c[0].lstrip().startswith("UPDATE daily_stats"))
+        _assert_uses(await _driver_plan(db, update_sql, update_params), "ix_daily_stats_user_id_date", "daily_stats")
+        await db.close()
+        await engine.dispose()
+
+    asyncio.run(run())
+
+    _, db = _session()
+    meals = db.query(Meal.id).filter(
+        Meal.user_id == 1, *day_range(Meal.eaten_at, date(2026, 1, 1), date(2026, 1, 7))
+    )
+    _assert_uses(_plan(db, meals), "ix_meals_user_id_eaten_at", "meals")
+
+
+def test_sync_download_plan():
+    """GET /sync/download: cambios del usuario desde la última sincronización"""
+    _, db = _session()
+    since = datetime(2026, 1, 1) - timedelta(hours=1)
+
+    changes = db.query(SyncData).filter(
+        SyncData.user_id == 1,
+        SyncData.sync_status == "synced",
+        SyncData.server_timestamp > since
+    ).order_by(SyncData.server_timestamp)
+    _assert_uses(_plan(db, changes), "ix_sync_data_user_id_server_timestamp", "sync_data")
+
+
+def test_sync_upload_plan():
+    """POST /sync/upload: filas existentes del tramo con una consulta por índice"""
+    async def run():
+        engine, db = await _async_session()
+        captured = []
+
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def _capture(conn, cursor, statement, parameters, context, executemany):
+            captured.append((statement, parameters))
+
+        items = [
+            SyncDataCreate(entity_type="meal", entity_id=str(number), action="create",
+                           data={"calories": number}, client_timestamp=datetime(2026, 1, 1))
+            for number in range(3)
+        ]
+        await SyncService(db).upload(1, "phone", items)
+        selects = [c for c in captured if c[0].lstrip().startswith("SELECT") and "FROM sync_data" in c[0]]
+        assert len(selects) == 1, selects
+        _assert_uses(await _driver_plan(db, *selects[0]), "ix_sync_data_user_id_device_id_entity", "sync_data")
+        await db.close()
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_migration_is_idempotent():
+    """La migración crea los índices en una base existente una sola vez"""
+    engine, _ = _session()
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP INDEX ix_meals_user_id_eaten_at")
+
+    assert "ix_meals_user_id_eaten_at" in run_migrations(engine)
+    assert run_migrations(engine) == []
+
+
+if __name__ == "__main__":
+    print("🔍 Verificando planes de consulta...")
+    test_meal_history_plan()
+    test_meal_page_plan()
+    test_progress_plans()
+    test_progress_summary_plan()
+    test_dashboard_plan()
+    test_streak_plan()
+    test_weight_trend_write_plan()
+    test_tdee_filter_plan()
+    test_export_plan()
+    test_daily_stats_write_plans()
+    test_sync_download_plan()
+    test_sync_upload_plan()
+    test_migration_is_idempotent()
+    print("✅ Todas las consultas usan los índices compuestos")
@@ -0,0 +1,183 @@
+"""
+Test de la subida de sincronización (app/services/sync_service.py)
+El resultado por conjuntos tiene que ser el mismo que procesando los
+elementos de a uno y en orden: claves repetidas en la subida, filas ya
+guardadas con otro timestamp y subidas de más de un tramo
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.models.base import Base
+from app.models.sync import SyncData
+from app.models.user import User
+from app.schemas.sync import SyncDataCreate
+from app.services import sync_service
+from app.services.sync_service import SyncService
+
+DEVICE = "phone-1"
+T0 = datetime(2026, 1, 1, 8, 0)
+
+
+async def _async_session(rows=()):
+    """Base en memoria con un usuario y filas de sincronización previas"""
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    db = async_sessionmaker(engine, expire_on_commit=False)()
+    db.add(User(id=1, email="s@example.com", hashed_password="x", full_name="S"))
+    for row in rows:
+        db.add(SyncData(user_id=1, device_id=DEVICE, action="create", server_timestamp=T0,
+                        sync_status="synced", **row))
+    await db.commit()
+    return engine, db
+
+
+def _item(entity_id, timestamp=T0, value=1, action="create", entity_type="meal"):
+    return SyncDataCreate(entity_type=entity_type, entity_id=entity_id, action=action,
+                          data={"value": value}, client_timestamp=timestamp)
+
+
+async def _rows(db):
+    rows = await db.execute(
+        select(SyncData.id, SyncData.entity_type, SyncData.entity_id, SyncData.action,
+               SyncData.entity_data, SyncData.client_timestamp).order_by(SyncData.id)
+    )
+    return [tuple(row) for row in rows]
+
+
+def test_repeated_key_in_one_upload():
+    """La segunda aparición actualiza el alta pendiente; otro timestamp es conflicto"""
+    async def run():
+        engine, db = await _async_session()
+        uploaded, conflicts = await SyncService(db).upload(1, DEVICE, [
+            _item("a", value=1),
+            _item("a", value=2, action="update"),
+            _item("a", T0 + timedelta(minutes=5), value=3),
+        ])
+        await db.commit()
+
+        assert uploaded == 2
+        assert [(c["entity_id"], c["conflict_type"]) for c in conflicts] == [("a", "timestamp_mismatch")]
+        assert conflicts[0]["client_timestamp"] == T0 + timedelta(minutes=5)
+        assert [row[2:5] for row in await _rows(db)] == [("a", "update", {"value": 2})]
+        await db.close()
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_existing_row_timestamp_mismatch():
+    """Fila guardada con otro timestamp: conflicto sin tocarla; con el mismo, se actualiza"""
+    async def run():
+        engine, db = await _async_session([
+            {"entity_type": "meal", "entity_id": "a", "entity_data": {"value": 0}, "client_timestamp": T0},
+        ])
+        service = SyncService(db)
+
+        later = T0 + timedelta(hours=1)
+        uploaded, conflicts = await service.upload(1, DEVICE, [_item("a", later, value=9)])
+        await db.commit()
+        assert uploaded == 0
+        assert conflicts == [{
+            "entity_type": "meal", "entity_id": "a", "server_timestamp": T0,
+            "client_timestamp": later, "conflict_type": "timestamp_mismatch"
+        }]
+        assert await _rows(db) == [(1, "meal", "a", "create", {"value": 0}, T0)]
+
+        uploaded, conflicts = await service.upload(1, DEVICE, [_item("a", value=5, action="update")])
+        await db.commit()
+        assert (uploaded, conflicts) == (1, [])
+        assert await _rows(db) == [(1, "meal", "a", "update", {"value": 5}, T0)]
+
+        # Misma entidad en otro tipo u otro dispositivo no cuenta como existente
+        uploaded, _ = await service.upload(1, DEVICE, [_item("a", later, entity_type="weight")])
+        uploaded_other, _ = await service.upload(1, "tablet-1", [_item("a", later)])
+        await db.commit()
+        assert (uploaded, uploaded_other) == (1, 1)
+        assert len(await _rows(db)) == 3
+        await db.close()
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_duplicate_rows_use_lowest_id():
+    """Con filas repetidas de una entidad se compara y actualiza la de menor id"""
+    async def run():
+        later = T0 + timedelta(hours=1)
+        engine, db = await _async_session([
+            {"id": 7, "entity_type": "meal", "entity_id": "a", "entity_data": {"value": 0}, "client_timestamp": later},
+            {"id": 3, "entity_type": "meal", "entity_id": "a", "entity_data": {"value": 0}, "client_timestamp": T0},
+        ])
+        service = SyncService(db)
+
+        uploaded, conflicts = await service.upload(1, DEVICE, [_item("a", later)])
+        assert (uploaded, conflicts[0]["conflict_type"]) == (0, "timestamp_mismatch")
+
+        uploaded, conflicts = await service.upload(1, DEVICE, [_item("a", value=4, action="update")])
+        await db.commit()
+        assert (uploaded, conflicts) == (1, [])
+        assert [(row[0], row[4]) for row in await _rows(db)] == [(3, {"value": 4}), (7, {"value": 0})]
+        await db.close()
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_upload_larger_than_chunk():
+    """Varios tramos dan lo mismo que tramos de un elemento (de a uno y en orden)"""
+    chunk = sync_service.SYNC_UPLOAD_CHUNK
+    items = [_item(f"m{index}", value=index) for index in range(chunk + 10)]
+    # Repetidas en el tramo siguiente: las primeras se actualizan, una choca por timestamp
+    items += [_item(f"m{index}", value=-index, action="update") for index in range(5)]
+    items.append(_item("m5", T0 + timedelta(minutes=1)))
+    items += [_item(f"n{index}", entity_type="weight") for index in range(chunk)]
+
+    async def upload():
+        engine, db = await _async_session([
+            {"entity_type": "meal", "entity_id": "m9", "entity_data": {"value": 0},
+             "client_timestamp": T0 - timedelta(days=1)},
+        ])
+        result = await SyncService(db).upload(1, DEVICE, items)
+        await db.commit()
+        rows = [row[1:] for row in await _rows(db)]
+        await db.close()
+        await engine.dispose()
+        return result, rows
+
+    async def run():
+        (uploaded, conflicts), rows = await upload()
+        sync_service.SYNC_UPLOAD_CHUNK = 1
+        try:
+            expected = await upload()
+        finally:
+            sync_service.SYNC_UPLOAD_CHUNK = chunk
+
+        assert len(items) > 2 * chunk
+        assert uploaded == len(items) - 2
+        assert [(c["entity_id"], c["conflict_type"]) for c in conflicts] == [
+            ("m9", "timestamp_mismatch"), ("m5", "timestamp_mismatch")
+        ]
+        # server_timestamp de las altas pendientes es la hora de cada subida
+        def comparable(conflicts):
+            return [{**c, "server_timestamp": None} if c["entity_id"] == "m5" else c for c in conflicts]
+
+        (expected_uploaded, expected_conflicts), expected_rows = expected
+        assert (uploaded, comparable(conflicts)) == (expected_uploaded, comparable(expected_conflicts))
+        assert sorted(rows) == sorted(expected_rows)
+        assert len(rows) == 1 + chunk + 9 + chunk
+        assert ("meal", "m0", "update", {"value": 0}, T0) in rows
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    print("🔍 Verificando subida de sincronización...")
+    test_repeated_key_in_one_upload()
+    test_existing_row_timestamp_mismatch()
+    test_duplicate_rows_use_lowest_id()
+    test_upload_larger_than_chunk()
+    print("✅ La subida por tramos coincide con la de a uno")
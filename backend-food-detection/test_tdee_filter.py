@@ -0,0 +1,211 @@
+"""
+Test del filtro de Kalman del TDEE (app/ai/tdee_filter.py y app/services/tdee_filter_service.py)
+Pasos de predicción y corrección, umbral de lecturas atípicas, avance
+incremental o reconstrucción del estado guardado y lote == paso a paso
+"""
+import asyncio
+import math
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.ai.tdee_core import CALORIES_PER_KG
+from app.ai.tdee_filter import (
+    INTAKE_LOG_ERROR, MISSING_INTAKE_KCAL, OUTLIER_GATE, SCALE_NOISE_KG, TDEE_DRIFT_KCAL,
+    TDEE_PRIOR_KCAL, WEIGHT_PROCESS_KG, FilterState, filter_batch, initial_state, predict, step, update
+)
+from app.models.base import Base
+from app.models.progress import DailyStats, TDEEState, WeightEntry
+from app.models.user import User
+from app.services.tdee_filter_service import (
+    REBUILD_DAYS, TDEEFilterService, advance_start, prior_tdee
+)
+
+THROUGH = date(2024, 3, 31)
+
+
+def _copy(state: FilterState) -> FilterState:
+    return FilterState(state.weight, state.tdee, state.p_ww, state.p_we, state.p_ee)
+
+
+def test_predict():
+    """Con ingesta el peso sigue el balance energético; sin ella solo crece su varianza"""
+    state = predict(initial_state(80.0, 2500.0), 1730.0)
+    k = 1.0 / CALORIES_PER_KG
+    assert math.isclose(state.weight, 80.0 - 770.0 * k)
+    assert math.isclose(state.p_we, -k * TDEE_PRIOR_KCAL ** 2)
+    assert math.isclose(state.p_ww, SCALE_NOISE_KG ** 2 + k * k * TDEE_PRIOR_KCAL ** 2
+                        + WEIGHT_PROCESS_KG ** 2 + (INTAKE_LOG_ERROR * 1730.0 * k) ** 2)
+    assert math.isclose(state.p_ee, TDEE_PRIOR_KCAL ** 2 + TDEE_DRIFT_KCAL ** 2)
+
+    missing = predict(initial_state(80.0, 2500.0), None)
+    assert (missing.weight, missing.tdee, missing.p_we) == (80.0, 2500.0, 0.0)
+    assert math.isclose(missing.p_ww, SCALE_NOISE_KG ** 2 + WEIGHT_PROCESS_KG ** 2
+                        + (MISSING_INTAKE_KCAL / CALORIES_PER_KG) ** 2)
+
+
+def test_update():
+    """Un pesaje corrige peso y TDEE por la correlación y reduce la incertidumbre"""
+    state = predict(initial_state(80.0, 2500.0), 2000.0)
+    before = _copy(state)
+    update(state, before.weight - 0.5)
+
+    spread = before.p_ww + SCALE_NOISE_KG ** 2
+    assert math.isclose(state.weight, before.weight - 0.5 * before.p_ww / spread)
+    # Pesar menos de lo previsto con p_we < 0 indica un gasto mayor
+    assert math.isclose(state.tdee, before.tdee - 0.5 * before.p_we / spread)
+    assert state.tdee > before.tdee
+    assert state.p_ww < before.p_ww and state.p_ee < before.p_ee
+    assert state.confidence > initial_state(80.0, 2500.0).confidence
+
+
+def test_outlier_gate():
+    """Más allá de OUTLIER_GATE desvíos se infla el ruido: la corrección queda en el umbral"""
+    base = predict(initial_state(80.0, 2500.0), 2000.0)
+    spread = base.p_ww + SCALE_NOISE_KG ** 2
+
+    # Dentro del umbral: ganancia normal
+    inside = base.weight + 0.9 * OUTLIER_GATE * math.sqrt(spread)
+    state = update(_copy(base), inside)
+    assert math.isclose(state.weight - base.weight, (inside - base.weight) * base.p_ww / spread)
+
+    # Lectura atípica: el ruido crece con el cuadrado de la innovación y el
+    # movimiento queda acotado por el de una lectura justo en el umbral
+    at_gate = base.weight + OUTLIER_GATE * math.sqrt(spread)
+    gated = update(_copy(base), base.weight + 10.0)
+    edge = update(_copy(base), at_gate)
+    assert gated.weight - base.weight < 10.0 * base.p_ww / spread
+    assert gated.weight - base.weight <= edge.weight - base.weight + 1e-9
+    excess = 100.0 / (OUTLIER_GATE ** 2 * spread)
+    assert math.isclose(gated.weight - base.weight,
+                        10.0 * base.p_ww / (base.p_ww + SCALE_NOISE_KG ** 2 * excess))
+
+
+def test_advance_start():
+    """Sin estado, invalidado o viejo se reconstruye; al día no hay nada; si no, sigue"""
+    window_start = THROUGH - timedelta(days=REBUILD_DAYS - 1)
+    assert advance_start(None, THROUGH) == (window_start, True)
+    assert advance_start(TDEEState(user_id=1, last_date=None), THROUGH) == (window_start, True)
+    stale = TDEEState(user_id=1, last_date=window_start - timedelta(days=2))
+    assert advance_start(stale, THROUGH) == (window_start, True)
+
+    # El día previo a la ventana todavía empalma: sigue incremental
+    edge = TDEEState(user_id=1, last_date=window_start - timedelta(days=1))
+    assert advance_start(edge, THROUGH) == (window_start, False)
+    recent = TDEEState(user_id=1, last_date=THROUGH - timedelta(days=3))
+    assert advance_start(recent, THROUGH) == (THROUGH - timedelta(days=2), False)
+    assert advance_start(TDEEState(user_id=1, last_date=THROUGH), THROUGH) == (None, False)
+
+
+def test_service_advance_and_day_changed():
+    """advance() incremental == de una vez; day_changed invalida solo días ya procesados"""
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        db = async_sessionmaker(engine, expire_on_commit=False)()
+        user = User(id=1, email="k@example.com", hashed_password="x", full_name="K",
+                    age=35, gender="female", height=165.0, activity_level="light")
+        db.add(user)
+
+        first = THROUGH - timedelta(days=20)
+        intakes, weights = {}, {}
+        for offset in range(21):
+            day = first + timedelta(days=offset)
+            if offset % 4 != 3:
+                intakes[day] = 1900.0 + 10 * (offset % 3)
+                db.add(DailyStats(user_id=1, date=day, meal_count=3, consumed_calories=intakes[day]))
+            if offset % 2 == 0:
+                weights[day] = 70.0 - 0.03 * offset
+                db.add(WeightEntry(user_id=1, date=day, weight=weights[day]))
+        await db.commit()
+
+        # Referencia: step() día a día desde el primer pesaje
+        expected = initial_state(weights[first], prior_tdee(user, weights[first]))
+        for offset in range(21):
+            day = first + timedelta(days=offset)
+            step(expected, intakes.get(day), weights.get(day))
+
+        service = TDEEFilterService(db)
+        state = await service.advance(user, THROUGH - timedelta(days=7))
+        assert state.last_date == THROUGH - timedelta(days=7)
+        state = await service.advance(user, THROUGH)
+        assert state.last_date == THROUGH
+        assert (state.intake_days, state.weigh_ins) == (len(intakes), len(weights))
+        for field in ("weight", "tdee", "p_ww", "p_we", "p_ee"):
+            assert math.isclose(getattr(state, field), getattr(expected, field), rel_tol=1e-9)
+        await db.commit()
+
+        # Ya al día: no cambia nada
+        assert (await service.advance(user, THROUGH)).tdee == state.tdee
+
+        # Un día posterior al último procesado no invalida
+        await service.day_changed(1, THROUGH + timedelta(days=1))
+        await db.commit()
+        assert await db.scalar(select(TDEEState.last_date)) == THROUGH
+
+        # Corregir un día procesado marca el estado; advance() reconstruye con los datos nuevos
+        await service.day_changed(1, first + timedelta(days=4))
+        await db.commit()
+        assert await db.scalar(select(TDEEState.last_date)) is None
+        await db.execute(
+            WeightEntry.__table__.update()
+            .where(WeightEntry.date == first + timedelta(days=4)).values(weight=69.0)
+        )
+        weights[first + timedelta(days=4)] = 69.0
+        rebuilt = await service.advance(user, THROUGH)
+        assert (rebuilt.last_date, rebuilt.intake_days, rebuilt.weigh_ins) == (THROUGH, len(intakes), len(weights))
+        assert rebuilt.weight != expected.weight
+
+        await db.close()
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_filter_batch_matches_step():
+    """filter_batch sobre un lote da lo mismo que step() usuario por usuario"""
+    rng = np.random.default_rng(11)
+    users, days = 6, 40
+    intakes = np.where(rng.random((users, days)) < 0.8, rng.normal(2100, 250, (users, days)), np.nan)
+    weights = np.where(rng.random((users, days)) < 0.5, rng.normal(75, 1.0, (users, days)), np.nan)
+    weights[3, 17] = 90.0  # lectura atípica
+    active = np.ones((users, days), dtype=bool)
+    active[4, :10] = False  # usuario que empieza más tarde
+    prior = rng.normal(2300, 150, users)
+
+    state = np.full((users, 5), np.nan)
+    state[:3] = [[76.0, 2400.0, 0.3, -5.0, 9000.0]] * 3  # con estado previo
+    final, intake_days, weigh_ins = filter_batch(state, prior, intakes, weights, active)
+
+    for user in range(users):
+        current = None if np.isnan(state[user, 0]) else FilterState(*state[user])
+        logged = weighed = 0
+        for day in range(days):
+            if not active[user, day]:
+                continue
+            intake = None if np.isnan(intakes[user, day]) else float(intakes[user, day])
+            weight = None if np.isnan(weights[user, day]) else float(weights[user, day])
+            if current is None:
+                if weight is None:
+                    continue
+                current = initial_state(weight, prior[user])
+            step(current, intake, weight)
+            logged += intake is not None
+            weighed += weight is not None
+        expected = [current.weight, current.tdee, current.p_ww, current.p_we, current.p_ee]
+        assert np.allclose(final[user], expected, rtol=1e-9, atol=1e-9)
+        assert (intake_days[user], weigh_ins[user]) == (logged, weighed)
+
+
+if __name__ == "__main__":
+    print("🔍 Verificando filtro del TDEE...")
+    test_predict()
+    test_update()
+    test_outlier_gate()
+    test_advance_start()
+    test_service_advance_and_day_changed()
+    test_filter_batch_matches_step()
+    print("✅ El filtro del TDEE avanza, se invalida y coincide por lotes")